@@ -2,28 +2,514 @@
 Groq Cloud integration with Llama 3.3 70B for medical triage
 """
 import os
-from typing import Optional, Dict, Any, List
-from groq import Groq
-from langchain_groq import ChatGroq
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.messages import HumanMessage, SystemMessage
+from typing import Optional, Dict, Any, List, Callable
+from groq import Groq, RateLimitError
 import json
 import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import requests
 from dotenv import load_dotenv
+from agents.relevance_classifier import RelevanceClassifier, load_default_classifier
+from agents.semantic_cache import SemanticTriageCache
+from utils.singleflight import SingleFlight, normalize_key
+from agents.rate_governor import (RateLimitGovernor, RateLimitQueueTimeout, estimate_tokens, model_limits,
+                                  PRIORITY_EMERGENCY, PRIORITY_ROUTINE, PRIORITY_BACKGROUND)
 
 # Load environment variables from .env file
 load_dotenv()
 
 
+DEFAULT_GROQ_MODEL = "llama-3.3-70b-versatile"
+DEFAULT_GROQ_FALLBACK_MODELS = ["llama-3.1-8b-instant"]
+DEFAULT_GROQ_SMALL_MODEL = "llama-3.1-8b-instant"
+
+
+class LLMResponse:
+    """Completion returned by an LLM backend (exposes `.content` like a LangChain message)"""
+    
+    def __init__(
+        self,
+        content: str,
+        backend: str,
+        latency: float,
+        headers: Optional[Dict[str, str]] = None
+    ):
+        self.content = content
+        self.backend = backend
+        self.latency = latency
+        self.headers = headers or {}
+
+
+class LLMBackend:
+    """Base class for a single chat-completion backend"""
+    
+    provider = "unknown"
+    
+    def __init__(
+        self,
+        name: str,
+        model: str,
+        timeout: float = 30.0,
+        max_tokens: int = 2048,
+        temperature: float = 0.1
+    ):
+        """
+        Initialize backend
+        
+        Args:
+            name: Unique backend name used in routing statistics
+            model: Model identifier sent to the provider
+            timeout: Per-request timeout in seconds
+            max_tokens: Maximum completion tokens
+            temperature: Sampling temperature
+        """
+        self.name = name
+        self.model = model
+        self.timeout = timeout
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+    
+    def complete(self, prompt: str, priority: int = PRIORITY_ROUTINE) -> LLMResponse:
+        """Run a single-turn completion for the prompt"""
+        raise NotImplementedError
+
+
+class GroqBackend(LLMBackend):
+    """Groq Cloud backend for any hosted model size"""
+    
+    provider = "Groq Cloud"
+    
+    # Typical triage completion length, used for token budgeting
+    expected_completion_tokens = 600
+    
+    def __init__(
+        self,
+        client: Groq,
+        model: str,
+        governor: Optional[RateLimitGovernor] = None,
+        queue_max_wait: Optional[float] = None,
+        **kwargs
+    ):
+        super().__init__(name=kwargs.pop("name", f"groq:{model}"), model=model, **kwargs)
+        self.client = client
+        self.governor = governor
+        # Rate-limit queueing allowed per request, so the call still fits the router deadline
+        self.queue_max_wait = queue_max_wait
+    
+    def complete(self, prompt: str, priority: int = PRIORITY_ROUTINE) -> LLMResponse:
+        estimated = estimate_tokens(prompt) + min(self.max_tokens, self.expected_completion_tokens)
+        if self.governor is not None:
+            # Queue behind the client-side RPM/TPM budget instead of hitting a 429
+            self.governor.acquire(estimated, priority, max_wait=self.queue_max_wait)
+        
+        start_time = time.time()
+        try:
+            raw = self.client.chat.completions.with_raw_response.create(
+                messages=[{"role": "user", "content": prompt}],
+                model=self.model,
+                temperature=self.temperature,
+                max_tokens=self.max_tokens,
+                timeout=self.timeout
+            )
+        except RateLimitError as e:
+            if self.governor is not None:
+                self.governor.on_rate_limited(getattr(e.response, "headers", None))
+            raise
+        
+        completion = raw.parse()
+        headers = dict(raw.headers)
+        if self.governor is not None:
+            self.governor.update_from_headers(headers)
+            usage = getattr(completion, "usage", None)
+            self.governor.record_usage(estimated, getattr(usage, "total_tokens", None))
+        
+        return LLMResponse(
+            content=completion.choices[0].message.content or "",
+            backend=self.name,
+            latency=time.time() - start_time,
+            headers=headers
+        )
+
+
+class OpenAICompatibleBackend(LLMBackend):
+    """Backend for any endpoint implementing the OpenAI chat completions API"""
+    
+    provider = "OpenAI-compatible"
+    
+    def __init__(self, base_url: str, model: str, api_key: Optional[str] = None, **kwargs):
+        super().__init__(name=kwargs.pop("name", f"openai:{model}"), model=model, **kwargs)
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.session = requests.Session()
+    
+    def complete(self, prompt: str, priority: int = PRIORITY_ROUTINE) -> LLMResponse:
+        start_time = time.time()
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        
+        response = self.session.post(
+            f"{self.base_url}/chat/completions",
+            headers=headers,
+            json={
+                "model": self.model,
+                "messages": [{"role": "user", "content": prompt}],
+                "temperature": self.temperature,
+                "max_tokens": self.max_tokens
+            },
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        data = response.json()
+        return LLMResponse(
+            content=data["choices"][0]["message"]["content"] or "",
+            backend=self.name,
+            latency=time.time() - start_time,
+            headers=dict(response.headers)
+        )
+
+
+class LocalBackend(LLMBackend):
+    """In-process stand-in backend driven by a Python callable (last-resort fallback)"""
+    
+    provider = "Local"
+    
+    def __init__(self, responder: Callable[[str], str], name: str = "local", **kwargs):
+        super().__init__(name=name, model=kwargs.pop("model", name), **kwargs)
+        self.responder = responder
+    
+    def complete(self, prompt: str, priority: int = PRIORITY_ROUTINE) -> LLMResponse:
+        start_time = time.time()
+        content = self.responder(prompt)
+        return LLMResponse(content=content, backend=self.name, latency=time.time() - start_time)
+
+
+class BackendStats:
+    """Rolling latency and error statistics for one backend"""
+    
+    def __init__(self, alpha: float = 0.2, window: int = 200):
+        """
+        Args:
+            alpha: EWMA smoothing factor
+            window: Number of recent latencies kept for percentile estimates
+        """
+        self.alpha = alpha
+        self.ewma_latency: Optional[float] = None
+        self.ewma_error_rate = 0.0
+        self.latencies = deque(maxlen=window)
+        self.requests = 0
+        self.failures = 0
+        self.hedged = 0
+        self.wins = 0
+        self._lock = threading.Lock()
+    
+    def record_success(self, latency: float):
+        with self._lock:
+            self.requests += 1
+            self.latencies.append(latency)
+            if self.ewma_latency is None:
+                self.ewma_latency = latency
+            else:
+                self.ewma_latency = self.alpha * latency + (1 - self.alpha) * self.ewma_latency
+            self.ewma_error_rate = (1 - self.alpha) * self.ewma_error_rate
+    
+    def record_failure(self, latency: float):
+        with self._lock:
+            self.requests += 1
+            self.failures += 1
+            # Failures still cost the caller time, so they count toward latency
+            if self.ewma_latency is None:
+                self.ewma_latency = latency
+            else:
+                self.ewma_latency = self.alpha * latency + (1 - self.alpha) * self.ewma_latency
+            self.ewma_error_rate = self.alpha + (1 - self.alpha) * self.ewma_error_rate
+    
+    def record_hedge(self):
+        with self._lock:
+            self.hedged += 1
+    
+    def record_win(self):
+        with self._lock:
+            self.wins += 1
+    
+    def percentile(self, pct: float) -> Optional[float]:
+        """Latency percentile over the recent window (None without samples)"""
+        with self._lock:
+            if not self.latencies:
+                return None
+            ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "hedged": self.hedged,
+            "wins": self.wins,
+            "ewma_latency": self.ewma_latency,
+            "ewma_error_rate": round(self.ewma_error_rate, 4),
+            "p95_latency": self.percentile(95)
+        }
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a half-open probe"""
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, failure_threshold: int = 3, recovery_timeout: float = 30.0):
+        """
+        Args:
+            failure_threshold: Consecutive failures before the circuit opens
+            recovery_timeout: Seconds to wait before allowing a probe request
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+    
+    def is_available(self) -> bool:
+        """Check whether a request could be sent now, without claiming the half-open probe"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                return time.time() - self.opened_at >= self.recovery_timeout
+            return not self._probe_in_flight
+    
+    def allow_request(self) -> bool:
+        """Check whether a request may be sent through this circuit, claiming the half-open probe"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.time() - self.opened_at >= self.recovery_timeout:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+    
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+    
+    def release_probe(self):
+        """Give back a claimed half-open probe when no request was actually sent"""
+        with self._lock:
+            self._probe_in_flight = False
+    
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.time()
+
+
+class LLMRouter:
+    """
+    Routes completions across several backends with latency-aware failover.
+    
+    Backends are tried in their configured (quality) order. Backends whose
+    circuit is open are skipped, and backends that are currently degraded
+    (high EWMA error rate or latency above budget) are moved to the back.
+    If the chosen backend has not answered by its observed p95 latency, a
+    hedged request is sent to the next backend and the first success wins.
+    """
+    
+    def __init__(
+        self,
+        backends: List[LLMBackend],
+        hedge: bool = True,
+        hedge_percentile: float = 95.0,
+        min_hedge_delay: float = 1.0,
+        default_hedge_delay: float = 8.0,
+        latency_budget: float = 15.0,
+        max_error_rate: float = 0.5,
+        overall_timeout: float = 45.0,
+        max_workers: int = 16
+    ):
+        """
+        Initialize router
+        
+        Args:
+            backends: Backends in order of preference
+            hedge: Whether to send hedged requests after the percentile deadline
+            hedge_percentile: Latency percentile used as the hedge deadline
+            min_hedge_delay: Lower bound for the hedge deadline in seconds
+            default_hedge_delay: Hedge deadline used before latencies are observed
+            latency_budget: EWMA latency above which a backend is considered degraded
+            max_error_rate: EWMA error rate above which a backend is considered degraded
+            overall_timeout: Maximum time a single invoke may take
+            max_workers: Size of the thread pool used for (hedged) calls
+        """
+        if not backends:
+            raise ValueError("LLMRouter requires at least one backend")
+        self.backends = backends
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.min_hedge_delay = min_hedge_delay
+        self.default_hedge_delay = default_hedge_delay
+        self.latency_budget = latency_budget
+        self.max_error_rate = max_error_rate
+        self.overall_timeout = overall_timeout
+        self.stats = {backend.name: BackendStats() for backend in backends}
+        self.breakers = {backend.name: CircuitBreaker() for backend in backends}
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-router")
+    
+    @property
+    def primary(self) -> LLMBackend:
+        return self.backends[0]
+    
+    def _is_degraded(self, backend: LLMBackend) -> bool:
+        stats = self.stats[backend.name]
+        if stats.ewma_error_rate > self.max_error_rate:
+            return True
+        return stats.ewma_latency is not None and stats.ewma_latency > self.latency_budget
+    
+    def _candidates(self) -> List[LLMBackend]:
+        """Backends in try order: healthy ones first, degraded ones last, open circuits skipped"""
+        healthy, degraded = [], []
+        for backend in self.backends:
+            if not self.breakers[backend.name].is_available():
+                continue
+            (degraded if self._is_degraded(backend) else healthy).append(backend)
+        return healthy + degraded
+    
+    def _hedge_delay(self, backend: LLMBackend) -> float:
+        p = self.stats[backend.name].percentile(self.hedge_percentile)
+        if p is None:
+            return self.default_hedge_delay
+        return max(self.min_hedge_delay, p)
+    
+    def _call(self, backend: LLMBackend, prompt: str, priority: int) -> LLMResponse:
+        start_time = time.time()
+        try:
+            response = backend.complete(prompt, priority=priority)
+        except RateLimitQueueTimeout:
+            # Our own rate-limit queue gave up before sending anything: the
+            # provider did not fail, so neither its stats nor its circuit change
+            self.breakers[backend.name].release_probe()
+            raise
+        except Exception:
+            self.stats[backend.name].record_failure(time.time() - start_time)
+            self.breakers[backend.name].record_failure()
+            raise
+        # Backends time the provider call only, excluding rate-limit queueing
+        self.stats[backend.name].record_success(response.latency)
+        self.breakers[backend.name].record_success()
+        return response
+    
+    def invoke(self, prompt: str, priority: int = PRIORITY_ROUTINE) -> LLMResponse:
+        """
+        Complete the prompt on the best available backend
+        
+        Args:
+            prompt: Prompt text
+            priority: Rate-limit queue priority (PRIORITY_EMERGENCY first)
+        
+        Returns:
+            LLMResponse from the first backend that succeeds
+        """
+        candidates = self._candidates()
+        if not candidates:
+            raise RuntimeError("No LLM backend available (all circuits open)")
+        
+        deadline = time.time() + self.overall_timeout
+        pending = {}
+        last_error: Optional[Exception] = None
+        next_index = 0
+        
+        def launch() -> Optional[LLMBackend]:
+            # The half-open probe is claimed only when the call is actually sent,
+            # so candidates that are never tried keep their probe available
+            nonlocal next_index
+            while next_index < len(candidates):
+                backend = candidates[next_index]
+                next_index += 1
+                if self.breakers[backend.name].allow_request():
+                    pending[self.executor.submit(self._call, backend, prompt, priority)] = backend
+                    return backend
+            return None
+        
+        current = launch()
+        if current is None:
+            raise RuntimeError("No LLM backend available (all circuits open)")
+        while pending:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            can_hedge = self.hedge and next_index < len(candidates)
+            timeout = min(remaining, self._hedge_delay(current)) if can_hedge else remaining
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            
+            if not done:
+                # Deadline for the in-flight request passed: hedge to the next backend
+                if can_hedge:
+                    hedged = launch()
+                    if hedged is not None:
+                        current = hedged
+                        self.stats[current.name].record_hedge()
+                continue
+            
+            for future in done:
+                backend = pending.pop(future)
+                try:
+                    response = future.result()
+                except Exception as e:
+                    print(f"LLM backend {backend.name} failed: {e}")
+                    last_error = e
+                    continue
+                self.stats[backend.name].record_win()
+                return response
+            
+            # Everything that finished failed: fail over immediately
+            if not pending:
+                current = launch() or current
+        
+        if last_error is not None and not pending:
+            raise last_error
+        raise TimeoutError(f"LLM routing exceeded {self.overall_timeout:.0f}s")
+    
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-backend routing statistics"""
+        return {
+            backend.name: {
+                "provider": backend.provider,
+                "model": backend.model,
+                "circuit": self.breakers[backend.name].state,
+                **self.stats[backend.name].to_dict()
+            }
+            for backend in self.backends
+        }
+
+
 class GroqClient:
     """Groq Cloud client for Llama 3.3 70B medical reasoning"""
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        local_responder: Optional[Callable[[str], str]] = None
+    ):
         """
         Initialize Groq client
         
         Args:
             api_key: Groq API key (if None, will try to get from environment)
+            local_responder: Optional callable used as last-resort local backend
         """
         self.api_key = api_key or os.getenv("GROQ_API_KEY")
         if not self.api_key:
@@ -32,23 +518,105 @@ class GroqClient:
         # Initialize Groq client
         self.client = Groq(api_key=self.api_key)
         
-        # Initialize LangChain Groq
-        self.llm = ChatGroq(
-            groq_api_key=self.api_key,
-            model_name="llama-3.3-70b-versatile",
-            temperature=0.1,  # Low temperature for medical accuracy
-            max_tokens=2048,
-            timeout=30.0
+        self.model_name = os.getenv("GROQ_MODEL", DEFAULT_GROQ_MODEL)
+        self.small_model_name = os.getenv("GROQ_SMALL_MODEL", DEFAULT_GROQ_SMALL_MODEL)
+        self.timeout = float(os.getenv("LLM_TIMEOUT", "30"))
+        
+        # One governor per Groq model, since Groq enforces limits per model
+        self.governors: Dict[str, RateLimitGovernor] = {}
+        queue_max_wait = os.getenv("GROQ_QUEUE_MAX_WAIT")
+        self.queue_max_wait = float(queue_max_wait) if queue_max_wait else None
+        
+        # Route completions across Groq models, optional OpenAI-compatible
+        # endpoint and optional local stand-in
+        self.router = LLMRouter(
+            self._build_backends(local_responder, overall_timeout=self.timeout * 1.5),
+            hedge=os.getenv("LLM_HEDGE", "true").lower() == "true",
+            overall_timeout=self.timeout * 1.5
+        )
+        self.llm = self.router
+        
+        # Small/fast tier for relevance checks and low-acuity triage. No
+        # hedging here: callers escalate to the large tier on failure.
+        self.small_router = LLMRouter(
+            [GroqBackend(self.client, self.small_model_name, governor=self._governor(self.small_model_name),
+                         queue_max_wait=self._queue_max_wait(self.timeout / 2, self.timeout / 3),
+                         timeout=self.timeout / 3, max_tokens=1024, temperature=0.1)],
+            hedge=False,
+            overall_timeout=self.timeout / 2
         )
+        self.small_llm = self.small_router
         
         print("Groq client initialized successfully!")
     
+    def _queue_max_wait(self, router_timeout: float, backend_timeout: float) -> float:
+        """Rate-limit queueing that still leaves a full backend timeout before the router deadline"""
+        budget = max(0.0, router_timeout - backend_timeout)
+        return budget if self.queue_max_wait is None else min(self.queue_max_wait, budget)
+    
+    def _build_backends(
+        self,
+        local_responder: Optional[Callable[[str], str]] = None,
+        overall_timeout: Optional[float] = None
+    ) -> List[LLMBackend]:
+        """Build the ordered backend list from environment configuration"""
+        # Low temperature for medical accuracy
+        backend_kwargs = {"timeout": self.timeout, "max_tokens": 2048, "temperature": 0.1}
+        queue_max_wait = self._queue_max_wait(overall_timeout or self.timeout * 1.5, self.timeout)
+        
+        backends: List[LLMBackend] = [
+            GroqBackend(self.client, self.model_name, governor=self._governor(self.model_name),
+                        queue_max_wait=queue_max_wait, **backend_kwargs)
+        ]
+        
+        fallback_models = os.getenv("GROQ_FALLBACK_MODELS")
+        fallback_models = (
+            [m.strip() for m in fallback_models.split(",") if m.strip()]
+            if fallback_models is not None else DEFAULT_GROQ_FALLBACK_MODELS
+        )
+        for model in fallback_models:
+            if model != self.model_name:
+                backends.append(GroqBackend(self.client, model, governor=self._governor(model),
+                                            queue_max_wait=queue_max_wait, **backend_kwargs))
+        
+        openai_base_url = os.getenv("LLM_OPENAI_BASE_URL")
+        openai_model = os.getenv("LLM_OPENAI_MODEL")
+        if openai_base_url and openai_model:
+            backends.append(OpenAICompatibleBackend(
+                openai_base_url,
+                openai_model,
+                api_key=os.getenv("LLM_OPENAI_API_KEY"),
+                **backend_kwargs
+            ))
+        
+        if local_responder is not None:
+            backends.append(LocalBackend(local_responder))
+        
+        return backends
+    
+    def _governor(self, model: str) -> RateLimitGovernor:
+        """Get or create the rate-limit governor for a Groq model"""
+        if model not in self.governors:
+            # Documented limits for the model unless overridden; the first response's headers take over
+            requests_per_minute, tokens_per_minute = model_limits(model)
+            self.governors[model] = RateLimitGovernor(
+                model,
+                requests_per_minute=float(os.getenv("GROQ_RPM") or requests_per_minute),
+                tokens_per_minute=float(os.getenv("GROQ_TPM") or tokens_per_minute),
+                max_wait=self._queue_max_wait(self.timeout * 1.5, self.timeout)
+            )
+        return self.governors[model]
+    
+    def get_rate_limit_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Bucket levels and queue-wait metrics per Groq model"""
+        return {model: governor.get_stats() for model, governor in self.governors.items()}
+    
     def test_connection(self) -> bool:
         """Test connection to Groq API"""
         try:
             response = self.client.chat.completions.create(
                 messages=[{"role": "user", "content": "Hello, test connection"}],
-                model="llama-3.3-70b-versatile",
+                model=self.model_name,
                 max_tokens=10
             )
             return True
@@ -59,7 +627,8 @@ class GroqClient:
     def get_model_info(self) -> Dict[str, Any]:
         """Get information about the current model"""
         return {
-            "model": "llama-3.3-70b-versatile",
+            "model": self.model_name,
+            "small_model": self.small_model_name,
             "provider": "Groq Cloud",
             "max_tokens": 2048,
             "temperature": 0.1,
@@ -69,22 +638,54 @@ class GroqClient:
                 "Urgency assessment",
                 "Red flag detection",
                 "Multilingual support"
-            ]
+            ],
+            "backends": self.router.get_stats(),
+            "small_backends": self.small_router.get_stats()
         }
 
 
 class MedicalTriageAgent:
-    """LangChain agent for medical triage using Groq/Llama 3.3 70B"""
+    """Medical triage agent cascading from a small Groq model to Llama 3.3 70B"""
     
-    def __init__(self, groq_client: GroqClient):
+    def __init__(self, groq_client: GroqClient, semantic_cache: Optional[SemanticTriageCache] = None):
         """
         Initialize medical triage agent
         
         Args:
             groq_client: Initialized GroqClient instance
+            semantic_cache: Near-duplicate triage cache (built from environment if None)
         """
         self.groq_client = groq_client
         self.llm = groq_client.llm
+        self.small_llm = groq_client.small_llm
+        
+        # Tiered cascade: the small model answers first and the large model
+        # is only consulted when the case looks serious or uncertain
+        self.cascade_enabled = os.getenv("TRIAGE_CASCADE", "true").lower() == "true"
+        self.escalation_urgency = int(os.getenv("TRIAGE_ESCALATION_URGENCY", "6"))
+        self.min_confidence = float(os.getenv("TRIAGE_MIN_CONFIDENCE", "0.7"))
+        self._stats_lock = threading.Lock()
+        self.cascade_stats = {
+            "small": {"requests": 0, "served": 0, "total_latency": 0.0},
+            "large": {"requests": 0, "served": 0, "total_latency": 0.0},
+            "final_tier": {"small": 0, "large": 0},
+            "escalations": {}
+        }
+        
+        # Identical complaints submitted concurrently share one triage call
+        self._triage_flight = SingleFlight("triage")
+        
+        # Paraphrased complaints reuse a prior triage instead of a new LLM call
+        self.semantic_cache = semantic_cache
+        if self.semantic_cache is None and os.getenv("SEMANTIC_CACHE", "true").lower() == "true":
+            try:
+                threshold = os.getenv("SEMANTIC_CACHE_THRESHOLD")
+                self.semantic_cache = SemanticTriageCache(
+                    capacity=int(os.getenv("SEMANTIC_CACHE_CAPACITY", "2000")),
+                    threshold=float(threshold) if threshold else None
+                )
+            except Exception as e:
+                print(f"Warning: Semantic triage cache not available: {e}")
         
         # Emergency keywords for red flag detection
         self.emergency_keywords = {
@@ -125,7 +726,7 @@ class MedicalTriageAgent:
         
         Args:
             text: Patient input text
-            
+        
         Returns:
             List of detected emergency keywords with categories
         """
@@ -150,7 +751,7 @@ class MedicalTriageAgent:
         Args:
             patient_input: Patient's symptom description
             detected_flags: Detected emergency keywords
-            
+        
         Returns:
             Formatted prompt for medical triage
         """
@@ -200,7 +801,8 @@ Please analyze the patient's symptoms and provide a structured assessment in the
     "recommended_specialty": "primary medical specialty needed",
     "triage_category": "immediate|urgent|standard",
     "emergency_detected": true/false,
-    "action_required": "immediate action required"
+    "action_required": "immediate action required",
+    "confidence": 0.0-1.0
 }}
 
 URGENCY SCORING GUIDELINES:
@@ -228,46 +830,63 @@ Respond ONLY with valid JSON. No additional text or explanations.
     
     def analyze_symptoms(self, patient_input: str) -> Dict[str, Any]:
         """
-        Analyze patient symptoms using Llama 3.3 70B
+        Analyze patient symptoms using the tiered model cascade
+        
+        The small model handles the request first; the result is escalated to
+        Llama 3.3 70B when emergency keywords fire, the small model is unsure,
+        or its urgency score reaches the escalation threshold.
         
         Args:
             patient_input: Patient's symptom description
-            
+        
         Returns:
             Structured triage assessment
         """
+        return self._triage_flight.do(normalize_key(patient_input), self._analyze_symptoms, patient_input)
+    
+    def _analyze_symptoms(self, patient_input: str) -> Dict[str, Any]:
+        """Run the cache lookup and model cascade for one input (uncoalesced)"""
         try:
+            start_time = time.time()
+            
             # Detect emergency keywords first
             detected_flags = self.detect_emergency_keywords(patient_input)
+            keywords = frozenset(flag["keyword"] for flag in detected_flags)
+            
+            if self.semantic_cache is not None:
+                cached = self.semantic_cache.lookup(patient_input, keywords)
+                if cached is not None:
+                    cached["chief_complaint"] = patient_input
+                    cached["processing_time"] = time.time() - start_time
+                    return cached
             
             # Create medical triage prompt
             prompt = self.create_triage_prompt(patient_input, detected_flags)
             
+            escalation_reason = "keyword_flags" if detected_flags else None
+            
+            # Emergency-flagged requests jump the rate-limit queue
+            priority = PRIORITY_EMERGENCY if detected_flags else PRIORITY_ROUTINE
+            
+            if self.cascade_enabled and not detected_flags:
+                result = self._run_tier("small", self.small_llm, prompt, priority)
+                escalation_reason = self._escalation_reason(result)
+                if escalation_reason is None:
+                    self._record_final_tier("small")
+                    result["model_tier"] = "small"
+                    result["processing_time"] = time.time() - start_time
+                    self._cache_result(patient_input, keywords, result)
+                    return result
+            
+            if escalation_reason is not None:
+                self._record_escalation(escalation_reason)
+            
             # Get response from Llama 3.3 70B
-            start_time = time.time()
-            response = self.llm.invoke(prompt)
+            result = self._run_tier("large", self.llm, prompt, priority)
             processing_time = time.time() - start_time
+            self._record_final_tier("large")
             
-            # Parse JSON response
-            try:
-                # Clean the response content (remove markdown code blocks if present)
-                content = response.content.strip()
-                if content.startswith("```") and content.endswith("```"):
-                    # Remove markdown code blocks
-                    lines = content.split('\n')
-                    content = '\n'.join(lines[1:-1])  # Remove first and last lines
-                elif content.startswith("```json"):
-                    # Remove json markdown code blocks
-                    lines = content.split('\n')
-                    content = '\n'.join(lines[1:-1])  # Remove first and last lines
-                
-                result = json.loads(content)
-                result["processing_time"] = processing_time
-                return result
-            except json.JSONDecodeError as e:
-                print(f"JSON parsing error: {e}")
-                print(f"Raw response: {response.content}")
-                
+            if result is None:
                 # Fallback: return basic assessment
                 return {
                     "chief_complaint": patient_input,
@@ -276,7 +895,14 @@ Respond ONLY with valid JSON. No additional text or explanations.
                     "error": "Failed to parse AI response",
                     "processing_time": processing_time
                 }
-                
+            
+            result["model_tier"] = "large"
+            if escalation_reason is not None:
+                result["escalation_reason"] = escalation_reason
+            result["processing_time"] = processing_time
+            self._cache_result(patient_input, keywords, result)
+            return result
+        
         except Exception as e:
             print(f"Error in symptom analysis: {e}")
             return {
@@ -286,20 +912,157 @@ Respond ONLY with valid JSON. No additional text or explanations.
                 "error": str(e),
                 "processing_time": 0
             }
+    
+    def _cache_result(self, patient_input: str, keywords: frozenset, result: Dict[str, Any]):
+        if self.semantic_cache is None:
+            return
+        try:
+            self.semantic_cache.store(patient_input, keywords, result)
+        except Exception as e:
+            print(f"Warning: Could not cache triage result: {e}")
+    
+    def _run_tier(
+        self,
+        tier: str,
+        llm: "LLMRouter",
+        prompt: str,
+        priority: int = PRIORITY_ROUTINE
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Invoke one cascade tier and parse its JSON answer
+        
+        Returns:
+            Parsed result, or None if the small tier failed or answered garbage
+            (the large tier propagates exceptions to the caller)
+        """
+        start_time = time.time()
+        try:
+            response = llm.invoke(prompt, priority=priority)
+        except Exception as e:
+            self._record_tier(tier, time.time() - start_time, served=False)
+            if tier == "large":
+                raise
+            print(f"Small model triage failed, escalating: {e}")
+            return None
+        
+        result = self._parse_json_response(response.content)
+        self._record_tier(tier, time.time() - start_time, served=result is not None)
+        return result
+    
+    def _parse_json_response(self, content: str) -> Optional[Dict[str, Any]]:
+        """Parse a JSON model answer, stripping markdown code fences if present"""
+        # Clean the response content (remove markdown code blocks if present)
+        content = content.strip()
+        if content.startswith("```") and content.endswith("```"):
+            # Remove markdown code blocks
+            lines = content.split('\n')
+            content = '\n'.join(lines[1:-1])  # Remove first and last lines
+        elif content.startswith("```json"):
+            # Remove json markdown code blocks
+            lines = content.split('\n')
+            content = '\n'.join(lines[1:-1])  # Remove first and last lines
+        
+        try:
+            result = json.loads(content)
+        except json.JSONDecodeError as e:
+            print(f"JSON parsing error: {e}")
+            print(f"Raw response: {content}")
+            return None
+        return result if isinstance(result, dict) else None
+    
+    def _escalation_reason(self, result: Optional[Dict[str, Any]]) -> Optional[str]:
+        """Decide whether a small-model answer must be escalated to the large model"""
+        if result is None:
+            return "small_model_failed"
+        if result.get("emergency_detected") or result.get("red_flags"):
+            return "red_flags"
+        try:
+            urgency_score = int(result.get("urgency_score", 10))
+        except (TypeError, ValueError):
+            return "invalid_urgency"
+        if urgency_score >= self.escalation_urgency:
+            return "high_urgency"
+        try:
+            confidence = float(result.get("confidence", 0.0))
+        except (TypeError, ValueError):
+            confidence = 0.0
+        if confidence < self.min_confidence:
+            return "low_confidence"
+        return None
+    
+    def _record_tier(self, tier: str, latency: float, served: bool):
+        with self._stats_lock:
+            stats = self.cascade_stats[tier]
+            stats["requests"] += 1
+            stats["total_latency"] += latency
+            if served:
+                stats["served"] += 1
+    
+    def _record_final_tier(self, tier: str):
+        with self._stats_lock:
+            self.cascade_stats["final_tier"][tier] += 1
+    
+    def _record_escalation(self, reason: str):
+        with self._stats_lock:
+            escalations = self.cascade_stats["escalations"]
+            escalations[reason] = escalations.get(reason, 0) + 1
+    
+    def get_cascade_stats(self) -> Dict[str, Any]:
+        """Per-tier routing statistics for the triage cascade"""
+        with self._stats_lock:
+            small = dict(self.cascade_stats["small"])
+            large = dict(self.cascade_stats["large"])
+            final_tier = dict(self.cascade_stats["final_tier"])
+            escalations = dict(self.cascade_stats["escalations"])
+        
+        total = final_tier["small"] + final_tier["large"]
+        for tier in (small, large):
+            tier["avg_latency"] = tier["total_latency"] / tier["requests"] if tier["requests"] else 0.0
+        
+        return {
+            "enabled": self.cascade_enabled,
+            "escalation_urgency": self.escalation_urgency,
+            "min_confidence": self.min_confidence,
+            "small": small,
+            "large": large,
+            "final_tier": final_tier,
+            "escalations": escalations,
+            "small_tier_share": final_tier["small"] / total if total else 0.0
+        }
 
 
 class MedicalRelevanceAgent:
     """Agent to check for medical relevance in a given text"""
     
-    def __init__(self, groq_client: GroqClient):
+    def __init__(
+        self,
+        groq_client: GroqClient,
+        classifier: Optional[RelevanceClassifier] = None,
+        use_classifier: bool = True
+    ):
         """
         Initialize medical relevance agent
         
         Args:
             groq_client: Initialized GroqClient instance
+            classifier: Local relevance classifier (default model is loaded if None)
+            use_classifier: Set to False to always ask the LLM
         """
         self.groq_client = groq_client
-        self.llm = groq_client.llm
+        # Binary classification does not need the 70B model
+        self.llm = groq_client.small_llm
+        self.fallback_llm = groq_client.llm
+        
+        # Local classifier answers confidently-classified inputs; the LLM is
+        # only consulted inside its uncertainty band
+        self.classifier = classifier
+        if self.classifier is None and use_classifier:
+            try:
+                self.classifier = load_default_classifier()
+            except Exception as e:
+                print(f"Warning: Local relevance classifier not available: {e}")
+        self._stats_lock = threading.Lock()
+        self.stats = {"local": 0, "llm": 0}
     
     def create_relevance_prompt(self, text: str) -> str:
         """
@@ -307,7 +1070,7 @@ class MedicalRelevanceAgent:
         
         Args:
             text: The text to analyze
-            
+        
         Returns:
             Formatted prompt for relevance check
         """
@@ -339,16 +1102,54 @@ Respond ONLY with the JSON object.
         
         Args:
             text: The text to analyze
-            
+        
         Returns:
             Dictionary with relevance information
         """
+        probability = None
+        if self.classifier is not None:
+            local_result = self.classifier.classify(text)
+            probability = local_result["probability"]
+            if not local_result["uncertain"]:
+                self._record("local")
+                return {
+                    "is_relevant": local_result["is_relevant"],
+                    "reason": f"Local relevance classifier (p={probability:.2f})",
+                    "probability": probability,
+                    "source": "local"
+                }
+        
+        self._record("llm")
+        result = self._check_relevance_llm(text)
+        result["source"] = "llm"
+        if probability is not None:
+            result["probability"] = probability
+        return result
+    
+    def _record(self, source: str):
+        with self._stats_lock:
+            self.stats[source] += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """How many relevance checks were answered locally vs by the LLM"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        total = stats["local"] + stats["llm"]
+        stats["local_share"] = stats["local"] / total if total else 0.0
+        return stats
+    
+    def _check_relevance_llm(self, text: str) -> Dict[str, Any]:
+        """Ask the LLM whether the text is medically relevant"""
         try:
             # Create relevance prompt
             prompt = self.create_relevance_prompt(text)
             
-            # Get response from Llama 3.3 70B
-            response = self.llm.invoke(prompt)
+            # Get response from the small model, falling back to the large one
+            try:
+                response = self.llm.invoke(prompt, priority=PRIORITY_BACKGROUND)
+            except Exception as e:
+                print(f"Small model relevance check failed, using large model: {e}")
+                response = self.fallback_llm.invoke(prompt, priority=PRIORITY_BACKGROUND)
             
             # Parse JSON response
             try:
@@ -360,7 +1161,7 @@ Respond ONLY with the JSON object.
                 print(f"JSON parsing error in relevance check: {e}")
                 # Default to relevant to avoid false negatives
                 return {"is_relevant": True, "reason": "Error parsing AI response."}
-                
+        
         except Exception as e:
             print(f"Error in relevance check: {e}")
             # Default to relevant in case of other errors
@@ -375,7 +1176,7 @@ def quick_triage(patient_input: str, api_key: Optional[str] = None) -> Dict[str,
     Args:
         patient_input: Patient's symptom description
         api_key: Groq API key (optional)
-        
+    
     Returns:
         Triage assessment result
     """
@@ -394,7 +1195,7 @@ def quick_triage(patient_input: str, api_key: Optional[str] = None) -> Dict[str,
         result = triage_agent.analyze_symptoms(patient_input)
         
         return result
-        
+    
     except Exception as e:
         print(f"Error in quick triage: {e}")
         return {
@@ -430,6 +1231,6 @@ if __name__ == "__main__":
             
             if 'error' in result:
                 print(f"Error: {result['error']}")
-                
+        
         except Exception as e:
             print(f"Test failed: {e}")
@@ -0,0 +1,301 @@
+"""
+Client-side rate-limit governor for Groq
+Token buckets for requests/minute and tokens/minute with a priority queue, so
+bursts are absorbed by queuing (emergencies first) instead of 429 errors
+"""
+import re
+import time
+import heapq
+import itertools
+import threading
+from collections import deque
+from typing import Optional, Dict, Any, Mapping
+
+
+PRIORITY_EMERGENCY = 0
+PRIORITY_ROUTINE = 1
+PRIORITY_BACKGROUND = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_EMERGENCY: "emergency",
+    PRIORITY_ROUTINE: "routine",
+    PRIORITY_BACKGROUND: "background"
+}
+
+# Groq's documented free-tier limits per model (requests/minute, tokens/minute). They only
+# seed the buckets: the first response's x-ratelimit-* headers replace them with the
+# account's real limits, which are far higher on paid tiers.
+GROQ_MODEL_LIMITS = {
+    "llama-3.3-70b-versatile": (30, 12000),
+    "llama-3.1-8b-instant": (30, 6000),
+}
+DEFAULT_MODEL_LIMITS = (30, 6000)
+
+DURATION_PATTERN = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+DURATION_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """
+    Parse Groq reset durations such as "7.66s", "2m59.56s" or "120ms"
+    
+    Args:
+        value: Header value
+    
+    Returns:
+        Duration in seconds, or None if it cannot be parsed
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = DURATION_PATTERN.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def model_limits(model: str):
+    """Starting (requests/minute, tokens/minute) budget for a Groq model"""
+    return GROQ_MODEL_LIMITS.get(model, DEFAULT_MODEL_LIMITS)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for budgeting (about four characters per token)"""
+    return max(1, len(text) // 4)
+
+
+class RateLimitQueueTimeout(TimeoutError):
+    """Raised when a request waited too long for rate-limit budget (nothing was sent)"""
+
+
+class TokenBucket:
+    """Continuously refilling token bucket"""
+    
+    def __init__(self, capacity: float, period: float = 60.0):
+        """
+        Args:
+            capacity: Tokens available per period
+            period: Refill period in seconds
+        """
+        self.capacity = float(capacity)
+        self.period = period
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+    
+    @property
+    def rate(self) -> float:
+        return self.capacity / self.period
+    
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+    
+    def time_until(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (0 if available now)"""
+        self.refill()
+        # A request larger than the bucket waits for a full bucket
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+    
+    def consume(self, amount: float):
+        self.refill()
+        self.tokens -= amount
+    
+    def sync(self, remaining: float, limit: Optional[float] = None, replace: bool = False):
+        """
+        Align the bucket with the provider's view of remaining capacity
+        
+        Args:
+            remaining: Tokens the provider says are left
+            limit: Provider's per-period limit (resizes the bucket)
+            replace: Take `remaining` as is, even above the local level (the local level was a guess)
+        """
+        self.refill()
+        if limit:
+            self.capacity = float(limit)
+        if replace:
+            self.tokens = min(self.capacity, float(remaining))
+        else:
+            self.tokens = min(self.tokens, float(remaining))
+
+
+class RateLimitGovernor:
+    """
+    Admits requests against RPM and TPM budgets in priority order.
+    
+    Callers block in `acquire` until they are the highest-priority waiter
+    (FIFO within a priority) and both buckets can cover the request. The
+    buckets are corrected from the provider's rate-limit headers after each
+    response, and a 429 pauses admission until its Retry-After has passed.
+    The configured token budget is only a starting guess: the first headers
+    replace it, after which they can only lower the local level.
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: float = 30,
+        tokens_per_minute: float = 6000,
+        max_wait: float = 60.0
+    ):
+        """
+        Initialize governor
+        
+        Args:
+            name: Name used in metrics (usually the model)
+            requests_per_minute: Request budget per minute
+            tokens_per_minute: Token budget per minute
+            max_wait: Maximum queueing time before acquire raises TimeoutError
+        """
+        self.name = name
+        self.max_wait = max_wait
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.synced = False
+        self.paused_until = 0.0
+        self._queue = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._wait_samples = {p: deque(maxlen=500) for p in PRIORITY_NAMES}
+        self._wait_stats = {p: {"admitted": 0, "timeouts": 0, "total_wait": 0.0, "max_wait": 0.0}
+                            for p in PRIORITY_NAMES}
+        self.rate_limited = 0
+    
+    def _time_until_admissible(self, estimated_tokens: int) -> float:
+        pause = max(0.0, self.paused_until - time.monotonic())
+        return max(pause, self.requests.time_until(1), self.tokens.time_until(estimated_tokens))
+    
+    def acquire(self, estimated_tokens: int, priority: int = PRIORITY_ROUTINE, max_wait: Optional[float] = None) -> float:
+        """
+        Block until the request may be sent
+        
+        Args:
+            estimated_tokens: Expected prompt plus completion tokens
+            priority: PRIORITY_EMERGENCY, PRIORITY_ROUTINE or PRIORITY_BACKGROUND
+            max_wait: Queueing limit for this request (governor default if None)
+        
+        Returns:
+            Seconds spent waiting in the queue
+        
+        Raises:
+            RateLimitQueueTimeout: The request could not be admitted in time
+        """
+        max_wait = self.max_wait if max_wait is None else max_wait
+        start = time.monotonic()
+        deadline = start + max_wait
+        entry = (priority, next(self._sequence))
+        
+        with self._condition:
+            heapq.heappush(self._queue, entry)
+            try:
+                while True:
+                    if self._queue[0] == entry:
+                        delay = self._time_until_admissible(estimated_tokens)
+                        if delay <= 0:
+                            break
+                    else:
+                        delay = None
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._wait_stats[priority]["timeouts"] += 1
+                        raise RateLimitQueueTimeout(f"Rate-limit queue wait exceeded {max_wait:.0f}s for {self.name}")
+                    self._condition.wait(remaining if delay is None else min(delay, remaining))
+                
+                self.requests.consume(1)
+                self.tokens.consume(estimated_tokens)
+            finally:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                self._condition.notify_all()
+            
+            waited = time.monotonic() - start
+            stats = self._wait_stats[priority]
+            stats["admitted"] += 1
+            stats["total_wait"] += waited
+            stats["max_wait"] = max(stats["max_wait"], waited)
+            self._wait_samples[priority].append(waited)
+        return waited
+    
+    def record_usage(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        """Correct the token bucket once the real usage is known"""
+        if actual_tokens is None:
+            return
+        with self._condition:
+            self.tokens.consume(actual_tokens - estimated_tokens)
+            self._condition.notify_all()
+    
+    def update_from_headers(self, headers: Mapping[str, str]):
+        """
+        Sync buckets with x-ratelimit-* response headers
+        
+        Groq's request headers describe a daily budget, so only the token
+        headers (per minute) resize a bucket; an exhausted request budget
+        pauses admission until its reset time.
+        """
+        if not headers:
+            return
+        headers = {k.lower(): v for k, v in headers.items()}
+        with self._condition:
+            remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+            if remaining_tokens is not None:
+                try:
+                    limit_tokens = headers.get("x-ratelimit-limit-tokens")
+                    self.tokens.sync(float(remaining_tokens), float(limit_tokens) if limit_tokens else None,
+                                     replace=not self.synced)
+                    self.synced = True
+                except ValueError:
+                    pass
+            remaining_requests = headers.get("x-ratelimit-remaining-requests")
+            if remaining_requests is not None:
+                try:
+                    if float(remaining_requests) <= 0:
+                        reset = parse_duration(headers.get("x-ratelimit-reset-requests"))
+                        self._pause(reset or 60.0)
+                except ValueError:
+                    pass
+            self._condition.notify_all()
+    
+    def on_rate_limited(self, headers: Optional[Mapping[str, str]] = None):
+        """Pause admission after a 429 until the provider's Retry-After has passed"""
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+        retry_after = parse_duration(headers.get("retry-after"))
+        if retry_after is None:
+            retry_after = parse_duration(headers.get("x-ratelimit-reset-tokens")) or 5.0
+        with self._condition:
+            self.rate_limited += 1
+            self._pause(retry_after)
+            self._condition.notify_all()
+    
+    def _pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth, bucket levels and queue-wait metrics per priority"""
+        with self._condition:
+            self.requests.refill()
+            self.tokens.refill()
+            queue_wait = {}
+            for priority, name in PRIORITY_NAMES.items():
+                stats = dict(self._wait_stats[priority])
+                samples = sorted(self._wait_samples[priority])
+                stats["avg_wait"] = stats["total_wait"] / stats["admitted"] if stats["admitted"] else 0.0
+                stats["p95_wait"] = samples[int(0.95 * (len(samples) - 1))] if samples else 0.0
+                queue_wait[name] = stats
+            return {
+                "queued": len(self._queue),
+                "requests_available": round(self.requests.tokens, 2),
+                "requests_per_minute": self.requests.capacity,
+                "tokens_available": round(self.tokens.tokens, 1),
+                "tokens_per_minute": self.tokens.capacity,
+                "synced": self.synced,
+                "paused_for": max(0.0, self.paused_until - time.monotonic()),
+                "rate_limited": self.rate_limited,
+                "queue_wait": queue_wait
+            }
@@ -0,0 +1,321 @@
+"""
+Local medical-relevance classifier for Arovia
+Hashed word/character n-grams with a logistic regression model, so the
+"is this about health?" decision runs on-box in well under a millisecond
+"""
+import os
+import re
+import json
+import math
+import zlib
+import unicodedata
+from typing import List, Tuple, Dict, Any, Optional, Iterable
+import numpy as np
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATASETS = [
+    os.path.join(PROJECT_ROOT, "relevance_dataset.json"),
+    os.path.join(PROJECT_ROOT, "golden_dataset.json")
+]
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# Crisis and chronic-condition phrases that must always reach triage. They are
+# rare in the training data, so the model alone can reject them confidently.
+ALWAYS_RELEVANT_PATTERN = re.compile(
+    r"\b(suicid\w*|kill (?:my|him|her)sel(?:f|ves)|end (?:my|his|her) life|self[- ]?harm\w*|overdose\w*"
+    r"|poison\w*|(?:blood )?sugar (?:level|is)|diabet\w*|bp|blood pressure|pregnan\w*|unconscious"
+    r"|not breathing|aatmahatya|khudkushi)\b|आत्महत्या|खुदकुशी"
+)
+
+# Default probability band deferred to the LLM. The lower edge is low because a
+# rejected complaint is never triaged, while an accepted non-medical input only
+# costs an extra LLM call.
+DEFAULT_UNCERTAIN_BAND = (0.1, 0.75)
+
+
+def normalize_text(text: str) -> str:
+    """Unicode-normalize and lowercase text before feature extraction"""
+    return unicodedata.normalize("NFKC", text).lower().strip()
+
+
+def hashed_ngram_features(
+    text: str,
+    n_features: int,
+    char_ngram_range: Tuple[int, int] = (2, 4)
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hash word unigrams, word bigrams and character n-grams of the text
+
+    Args:
+        text: Input text
+        n_features: Size of the hashed feature space
+        char_ngram_range: Inclusive range of character n-gram lengths
+
+    Returns:
+        Tuple of (feature indices, L2-normalized log-count values)
+    """
+    tokens = TOKEN_PATTERN.findall(normalize_text(text))
+    counts: Dict[int, float] = {}
+
+    def add(feature: str):
+        index = zlib.crc32(feature.encode("utf-8")) % n_features
+        counts[index] = counts.get(index, 0.0) + 1.0
+
+    min_n, max_n = char_ngram_range
+    for i, token in enumerate(tokens):
+        add("w:" + token)
+        if i > 0:
+            add("b:" + tokens[i - 1] + " " + token)
+        # Character n-grams make the features robust to spelling and
+        # transliteration variants, and work for any script
+        padded = f" {token} "
+        for n in range(min_n, max_n + 1):
+            for start in range(len(padded) - n + 1):
+                add("c:" + padded[start:start + n])
+
+    if not counts:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+    indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+    values = np.log1p(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+    values /= np.linalg.norm(values)
+    return indices, values
+
+
+class RelevanceClassifier:
+    """Binary medical-relevance classifier over hashed n-gram features"""
+
+    def __init__(
+        self,
+        n_features: int = 2 ** 18,
+        char_ngram_range: Tuple[int, int] = (2, 4),
+        uncertain_band: Tuple[float, float] = DEFAULT_UNCERTAIN_BAND
+    ):
+        """
+        Initialize classifier
+
+        Args:
+            n_features: Size of the hashed feature space
+            char_ngram_range: Inclusive range of character n-gram lengths
+            uncertain_band: Probability band in which the caller should defer to the LLM
+        """
+        self.n_features = n_features
+        self.char_ngram_range = char_ngram_range
+        self.uncertain_band = uncertain_band
+        self.weights = np.zeros(n_features, dtype=np.float32)
+        self.bias = 0.0
+        self.trained = False
+
+    def featurize(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Convert text into a sparse, L2-normalized feature vector
+
+        Args:
+            text: Input text
+
+        Returns:
+            Tuple of (feature indices, feature values)
+        """
+        return hashed_ngram_features(text, self.n_features, self.char_ngram_range)
+
+    def fit(
+        self,
+        texts: List[str],
+        labels: List[bool],
+        epochs: int = 30,
+        learning_rate: float = 0.5,
+        l2: float = 1e-5,
+        seed: int = 0
+    ) -> "RelevanceClassifier":
+        """
+        Train with class-balanced stochastic gradient descent on the logistic loss
+
+        Args:
+            texts: Training texts
+            labels: True for medically relevant texts
+            epochs: Passes over the training data
+            learning_rate: Initial SGD step size
+            l2: L2 regularization strength
+            seed: Shuffle seed
+
+        Returns:
+            The fitted classifier
+        """
+        if len(texts) != len(labels) or not texts:
+            raise ValueError("texts and labels must be non-empty and of equal length")
+
+        features = [self.featurize(text) for text in texts]
+        targets = np.array([1.0 if label else 0.0 for label in labels], dtype=np.float32)
+        positives = float(targets.sum())
+        negatives = float(len(targets) - positives)
+        if positives == 0 or negatives == 0:
+            raise ValueError("Training data must contain both relevant and non-relevant examples")
+        class_weight = {1.0: len(targets) / (2 * positives), 0.0: len(targets) / (2 * negatives)}
+
+        self.weights[:] = 0.0
+        self.bias = 0.0
+        rng = np.random.default_rng(seed)
+        for epoch in range(epochs):
+            step = learning_rate / (1.0 + epoch * 0.1)
+            for i in rng.permutation(len(features)):
+                indices, values = features[i]
+                target = targets[i]
+                margin = float(self.weights[indices] @ values) + self.bias
+                gradient = (_sigmoid(margin) - target) * class_weight[float(target)]
+                self.weights[indices] -= step * (gradient * values + l2 * self.weights[indices])
+                self.bias -= step * gradient
+
+        self.trained = True
+        return self
+
+    def predict_proba(self, text: str) -> float:
+        """Probability that the text is medically relevant"""
+        indices, values = self.featurize(text)
+        if indices.size == 0:
+            return _sigmoid(self.bias)
+        return _sigmoid(float(self.weights[indices] @ values) + self.bias)
+
+    def classify(self, text: str) -> Dict[str, Any]:
+        """
+        Classify text and flag answers that fall in the uncertainty band
+
+        Inputs matching ALWAYS_RELEVANT_PATTERN are relevant whatever the
+        model says.
+
+        Args:
+            text: Input text
+
+        Returns:
+            Dictionary with is_relevant, probability and uncertain
+        """
+        probability = self.predict_proba(text)
+        if ALWAYS_RELEVANT_PATTERN.search(normalize_text(text)):
+            return {"is_relevant": True, "probability": probability, "uncertain": False}
+        low, high = self.uncertain_band
+        return {
+            "is_relevant": probability >= 0.5,
+            "probability": probability,
+            "uncertain": low < probability < high
+        }
+
+    def save(self, path: str):
+        """Save model weights (stored sparsely) to an .npz file"""
+        nonzero = np.flatnonzero(self.weights)
+        np.savez_compressed(
+            path,
+            indices=nonzero,
+            values=self.weights[nonzero],
+            bias=np.array([self.bias]),
+            n_features=np.array([self.n_features]),
+            char_ngram_range=np.array(self.char_ngram_range),
+            uncertain_band=np.array(self.uncertain_band)
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "RelevanceClassifier":
+        """Load a model saved with `save`"""
+        data = np.load(path)
+        classifier = cls(
+            n_features=int(data["n_features"][0]),
+            char_ngram_range=tuple(int(n) for n in data["char_ngram_range"]),
+            uncertain_band=tuple(float(p) for p in data["uncertain_band"])
+        )
+        classifier.weights[data["indices"]] = data["values"]
+        classifier.bias = float(data["bias"][0])
+        classifier.trained = True
+        return classifier
+
+
+def _sigmoid(x: float) -> float:
+    if x >= 0:
+        return 1.0 / (1.0 + math.exp(-x))
+    z = math.exp(x)
+    return z / (1.0 + z)
+
+
+def load_labeled_examples(path: str) -> Tuple[List[str], List[bool]]:
+    """
+    Load relevance labels from a JSON list or JSONL log file
+
+    Accepts `{"text": ..., "is_relevant": ...}` records (logged inputs) and
+    golden_dataset.json-style records, where an expected specialty of "No"
+    or an expected urgency of 0 marks a non-medical input.
+
+    Args:
+        path: Path to a .json or .jsonl file
+
+    Returns:
+        Tuple of (texts, labels)
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            records = [json.loads(line) for line in f if line.strip()]
+        else:
+            records = json.load(f)
+
+    texts, labels = [], []
+    for record in records:
+        text = record.get("text", record.get("input"))
+        if not text:
+            continue
+        if "is_relevant" in record:
+            label = bool(record["is_relevant"])
+        elif "expected_specialty" in record or "expected_urgency" in record:
+            label = (record.get("expected_specialty") != "No"
+                     and record.get("expected_urgency", 1) > 0)
+        else:
+            continue
+        texts.append(text)
+        labels.append(label)
+    return texts, labels
+
+
+def load_training_data(paths: Optional[Iterable[str]] = None) -> Tuple[List[str], List[bool]]:
+    """Load and concatenate labeled examples from several files (missing files are skipped)"""
+    texts, labels = [], []
+    for path in paths or DEFAULT_DATASETS:
+        if not os.path.exists(path):
+            continue
+        file_texts, file_labels = load_labeled_examples(path)
+        texts.extend(file_texts)
+        labels.extend(file_labels)
+    return texts, labels
+
+
+def load_default_classifier() -> RelevanceClassifier:
+    """
+    Load the relevance model from RELEVANCE_MODEL_PATH, or train one on the
+    bundled datasets (takes well under a second)
+    """
+    model_path = os.getenv("RELEVANCE_MODEL_PATH")
+    low = float(os.getenv("RELEVANCE_UNCERTAIN_LOW", str(DEFAULT_UNCERTAIN_BAND[0])))
+    high = float(os.getenv("RELEVANCE_UNCERTAIN_HIGH", str(DEFAULT_UNCERTAIN_BAND[1])))
+
+    if model_path and os.path.exists(model_path):
+        classifier = RelevanceClassifier.load(model_path)
+    else:
+        texts, labels = load_training_data()
+        classifier = RelevanceClassifier().fit(texts, labels)
+
+    classifier.uncertain_band = (low, high)
+    return classifier
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Train the local medical-relevance classifier")
+    parser.add_argument("--data", action="append", help="Labeled .json/.jsonl file (repeatable)")
+    parser.add_argument("--out", default="relevance_model.npz", help="Output model path")
+    parser.add_argument("--epochs", type=int, default=30)
+    args = parser.parse_args()
+
+    texts, labels = load_training_data(args.data)
+    print(f"Training on {len(texts)} examples ({sum(labels)} relevant)...")
+    classifier = RelevanceClassifier().fit(texts, labels, epochs=args.epochs)
+    accuracy = np.mean([classifier.classify(t)["is_relevant"] == l for t, l in zip(texts, labels)])
+    print(f"Training accuracy: {accuracy:.3f}")
+    classifier.save(args.out)
+    print(f"Model saved to {args.out}")
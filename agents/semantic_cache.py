@@ -0,0 +1,434 @@
+"""
+Semantic near-duplicate cache for triage results
+Embeds patient inputs and reuses the triage of a sufficiently similar prior
+input, so paraphrases like "fever since 3 days with cough" and "cough and
+fever for three days" are served without another LLM call
+"""
+import os
+import copy
+import time
+import threading
+from collections import OrderedDict, deque
+from typing import Optional, Dict, Any, List, Tuple, FrozenSet
+import numpy as np
+from agents.relevance_classifier import hashed_ngram_features, normalize_text, TOKEN_PATTERN
+
+try:
+    from sentence_transformers import SentenceTransformer
+    SENTENCE_TRANSFORMERS_AVAILABLE = True
+except ImportError:
+    SentenceTransformer = None
+    SENTENCE_TRANSFORMERS_AVAILABLE = False
+
+try:
+    import hnswlib
+    HNSWLIB_AVAILABLE = True
+except ImportError:
+    hnswlib = None
+    HNSWLIB_AVAILABLE = False
+
+
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+
+# Negation, severity and laterality words that embeddings tend to gloss over
+# ("fever" vs "no fever"); two inputs must use the same ones to share a result
+GUARD_TERMS = frozenset([
+    "no", "not", "never", "without", "nahi", "nahin", "नहीं", "না", "లేదు", "இல்லை",
+    "mild", "slight", "moderate", "severe", "extreme", "very", "unbearable",
+    "left", "right", "baby", "infant", "child", "pregnant"
+])
+
+
+# Number words, so "three days" and "3 days" share a signature
+NUMBER_WORDS = {
+    "one": "1", "two": "2", "three": "3", "four": "4", "five": "5", "six": "6", "seven": "7",
+    "eight": "8", "nine": "9", "ten": "10", "eleven": "11", "twelve": "12", "fifteen": "15",
+    "twenty": "20", "thirty": "30", "forty": "40", "fifty": "50", "hundred": "100",
+    "a": None, "an": None, "couple": "2", "few": "few", "several": "several"
+}
+
+# Duration units (English and common Hindi transliterations), singular form
+DURATION_UNITS = {
+    "minute": "minute", "min": "minute", "hour": "hour", "hr": "hour", "ghanta": "hour", "ghante": "hour",
+    "day": "day", "din": "day", "night": "day", "week": "week", "hafta": "week", "hafte": "week",
+    "month": "month", "mahina": "month", "mahine": "month", "year": "year", "yr": "year", "saal": "year"
+}
+
+# Body sites, body fluids and symptom words that change a triage; two inputs
+# must mention the same ones ("blood in urine" vs "blood in cough")
+CLINICAL_TERMS = frozenset([
+    # Body sites
+    "head", "neck", "chest", "heart", "stomach", "abdomen", "belly", "back", "arm", "leg", "hand",
+    "foot", "feet", "knee", "hip", "shoulder", "eye", "ear", "nose", "throat", "mouth", "tooth",
+    "teeth", "jaw", "tongue", "skin", "face", "lip", "joint", "bone", "kidney", "liver", "lung",
+    "breast", "vagina", "penis", "testicle", "anus", "rectum", "spine", "finger", "toe", "wrist",
+    "ankle", "sar", "pet", "seena", "gala", "kamar",
+    # Body fluids and discharges
+    "blood", "urine", "stool", "pus", "sputum", "phlegm", "mucus", "discharge", "saliva", "water",
+    "khoon", "peshab",
+    # Symptoms and red-flag findings
+    "fever", "cough", "pain", "ache", "headache", "vomit", "vomiting", "nausea", "diarrhea",
+    "diarrhoea", "constipation", "rash", "itch", "itching", "swelling", "swollen", "bleed",
+    "bleeding", "stiff", "stiffness", "dizzy", "dizziness", "faint", "fainting", "unconscious",
+    "seizure", "fit", "fits", "convulsion", "breath", "breathing", "breathless", "wheeze",
+    "burn", "burning", "numb", "numbness", "weak", "weakness", "paralysis", "confusion",
+    "fracture", "cut", "wound", "bite", "sting", "poison", "snake", "dog", "suicide", "overdose",
+    "yellow", "jaundice", "black", "red", "tarry", "cold", "chills", "sweat", "sweating",
+    "bukhar", "khansi", "dard", "ulti", "dast", "chakkar"
+])
+
+
+def guard_signature(text: str) -> FrozenSet[str]:
+    """Guard terms present in the text"""
+    return frozenset(t for t in TOKEN_PATTERN.findall(normalize_text(text)) if t in GUARD_TERMS)
+
+
+def _clinical_term(token: str) -> Optional[str]:
+    """Canonical clinical term for a token (plural, -y and -ing forms folded), or None"""
+    stem = token[:-3] if token.endswith("ing") else None
+    candidates = (stem, stem + "e" if stem else None, token[:-1] if token[-1:] in ("s", "y") else None, token)
+    for candidate in candidates:
+        if candidate and candidate in CLINICAL_TERMS:
+            return candidate
+    return None
+
+
+def clinical_signature(text: str) -> FrozenSet[str]:
+    """
+    Numbers, durations and clinical terms in the text
+    
+    Two inputs can only share a cached triage when these are identical, so
+    "2 days" never matches "20 days", "3 days" never matches "3 weeks" and
+    "stiff neck" or "vomiting blood" never matches a complaint without them.
+    """
+    signature = set()
+    for token in TOKEN_PATTERN.findall(normalize_text(text)):
+        if token.isdigit() or token in NUMBER_WORDS:
+            number = token if token.isdigit() else NUMBER_WORDS[token]
+            if number:
+                signature.add(f"n:{int(number) if number.isdigit() else number}")
+            continue
+        unit = DURATION_UNITS.get(token) or DURATION_UNITS.get(token[:-1] if token.endswith("s") else token)
+        if unit:
+            signature.add(f"u:{unit}")
+            continue
+        term = _clinical_term(token)
+        if term:
+            signature.add(f"t:{term}")
+    return frozenset(signature)
+
+
+class SentenceEmbedder:
+    """Small multilingual sentence-embedding model (unit-normalized vectors)"""
+    
+    default_threshold = 0.92
+    
+    def __init__(self, model_name: str = DEFAULT_EMBEDDING_MODEL):
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.dim = self.model.get_sentence_embedding_dimension()
+    
+    def embed(self, text: str) -> np.ndarray:
+        return self.model.encode(text, normalize_embeddings=True).astype(np.float32)
+
+
+class HashingEmbedder:
+    """
+    Dependency-free hashed word/character n-gram vectors
+    
+    Lexical vectors cannot tell paraphrases from near misses reliably, so
+    this is never picked by default; it is meant for tests and experiments.
+    """
+    
+    default_threshold = 0.8
+    
+    def __init__(self, dim: int = 2048):
+        self.model_name = f"hashing-{dim}"
+        self.dim = dim
+    
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        indices, values = hashed_ngram_features(text, self.dim)
+        vector[indices] = values
+        return vector
+
+
+def load_default_embedder() -> Optional[SentenceEmbedder]:
+    """Sentence-transformers model, or None when it is not installed or fails to load"""
+    if not SENTENCE_TRANSFORMERS_AVAILABLE:
+        return None
+    try:
+        return SentenceEmbedder(os.getenv("SEMANTIC_CACHE_MODEL", DEFAULT_EMBEDDING_MODEL))
+    except Exception as e:
+        print(f"Warning: Could not load sentence embedding model: {e}")
+        return None
+
+
+# Held-out calibration pairs: (input, other input, same triage?). Paraphrases
+# should hit; near misses must not. Near misses that share the same clinical
+# and guard signatures are the ones only the similarity threshold can stop.
+CALIBRATION_PAIRS = [
+    ("fever since 3 days with cough", "cough and fever for three days", True),
+    ("I have fever and cough for 3 days", "I have had fever and cough for three days", True),
+    ("my head has been aching since morning", "headache since this morning", True),
+    ("loose motions and vomiting since yesterday", "vomiting and loose motions from yesterday", True),
+    ("itchy rash on both arms", "rash with itching on both my arms", True),
+    ("burning while passing urine for 2 days", "burning urine since two days", True),
+    ("sore throat and fever", "fever with a sore throat", True),
+    ("headache and fever", "headache and fever with stiff neck", False),
+    ("vomiting since morning", "vomiting blood since morning", False),
+    ("blood in urine", "blood in cough", False),
+    ("fever for 2 days", "fever for 20 days", False),
+    ("cough for 3 days", "cough for 3 weeks", False),
+    ("pain in my calf", "pain in my thigh", False),
+    ("rash after eating peanuts", "rash after eating mushrooms", False),
+    ("headache after taking paracetamol", "headache after taking my insulin", False),
+    ("my grandmother fell in the bathroom", "my grandmother fell from the roof", False),
+    ("cough after working in the field", "cough after working in the mine", False),
+    ("stomach pain after dinner", "stomach pain after drinking pesticide", False),
+]
+
+
+def calibrate_threshold(embedder, pairs=CALIBRATION_PAIRS, margin: float = 0.02) -> Dict[str, Any]:
+    """
+    Similarity threshold that rejects every near-miss calibration pair
+    
+    Only near misses that pass the clinical and guard signature checks count,
+    since the others never reach the threshold comparison. The threshold is
+    the highest of those similarities plus a margin, and never below the
+    embedder's default.
+    
+    Returns:
+        Threshold, the near-miss similarity it was set from and the share of
+        paraphrase pairs that still hit
+    """
+    def similarity(a: str, b: str) -> float:
+        return float(np.dot(embedder.embed(a), embedder.embed(b)))
+    
+    def passes_guards(a: str, b: str) -> bool:
+        return clinical_signature(a) == clinical_signature(b) and guard_signature(a) == guard_signature(b)
+    
+    near_miss = max(
+        (similarity(a, b) for a, b, same in pairs if not same and passes_guards(a, b)),
+        default=0.0
+    )
+    threshold = min(max(embedder.default_threshold, near_miss + margin), 0.99)
+    paraphrases = [(a, b) for a, b, same in pairs if same]
+    recall = sum(
+        1 for a, b in paraphrases if passes_guards(a, b) and similarity(a, b) >= threshold
+    ) / len(paraphrases) if paraphrases else 0.0
+    return {"threshold": round(threshold, 4), "near_miss_similarity": round(near_miss, 4),
+            "paraphrase_recall": round(recall, 4)}
+
+
+class BruteForceIndex:
+    """Exact cosine search over a fixed-capacity slot matrix"""
+    
+    def __init__(self, dim: int, capacity: int):
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.active = np.zeros(capacity, dtype=bool)
+    
+    def add(self, slot: int, vector: np.ndarray):
+        self.vectors[slot] = vector
+        self.active[slot] = True
+    
+    def remove(self, slot: int):
+        self.active[slot] = False
+    
+    def query(self, vector: np.ndarray) -> Optional[Tuple[int, float]]:
+        if not self.active.any():
+            return None
+        scores = self.vectors @ vector
+        scores[~self.active] = -1.0
+        slot = int(np.argmax(scores))
+        return slot, float(scores[slot])
+
+
+class HNSWIndex:
+    """Approximate cosine search backed by hnswlib"""
+    
+    def __init__(self, dim: int, capacity: int, ef: int = 64, m: int = 16):
+        self.index = hnswlib.Index(space="cosine", dim=dim)
+        # Slots are reused by label: re-adding a deleted label un-deletes and overwrites it in place
+        self.index.init_index(max_elements=capacity, ef_construction=200, M=m)
+        self.index.set_ef(ef)
+        self.count = 0
+    
+    def add(self, slot: int, vector: np.ndarray):
+        self.index.add_items(vector[np.newaxis, :], np.array([slot]))
+        self.count += 1
+    
+    def remove(self, slot: int):
+        self.index.mark_deleted(slot)
+        self.count -= 1
+    
+    def query(self, vector: np.ndarray) -> Optional[Tuple[int, float]]:
+        if self.count <= 0:
+            return None
+        labels, distances = self.index.knn_query(vector[np.newaxis, :], k=1)
+        return int(labels[0][0]), 1.0 - float(distances[0][0])
+
+
+class SemanticTriageCache:
+    """
+    Approximate triage cache keyed by input embeddings.
+    
+    A lookup hits when the nearest cached input is above the similarity
+    threshold AND both inputs fired exactly the same emergency keywords, so a
+    cached routine answer can never be served for a red-flag complaint. The
+    inputs must also share the same negation/severity guard terms and the
+    same numbers, durations, body sites and symptoms.
+    Entries are evicted least-recently-used once capacity is reached.
+    """
+    
+    def __init__(
+        self,
+        embedder=None,
+        capacity: int = 5000,
+        threshold: Optional[float] = None,
+        ttl_seconds: float = 24 * 3600,
+        audit_size: int = 200
+    ):
+        """
+        Initialize cache
+        
+        Args:
+            embedder: Object with `embed(text)`, `dim` and `default_threshold`
+                (sentence-transformers model if None)
+            capacity: Maximum number of cached triage results
+            threshold: Cosine similarity required for a hit (calibrated if None)
+            ttl_seconds: Maximum age of a reusable entry
+            audit_size: Number of recent hits kept for false-match audits
+        """
+        self.embedder = embedder or load_default_embedder()
+        if self.embedder is None:
+            raise RuntimeError("sentence-transformers is not installed or its model failed to load")
+        self.capacity = capacity
+        self.calibration = calibrate_threshold(self.embedder) if threshold is None else None
+        self.threshold = threshold if threshold is not None else self.calibration["threshold"]
+        self.ttl_seconds = ttl_seconds
+        
+        if HNSWLIB_AVAILABLE:
+            self.index = HNSWIndex(self.embedder.dim, capacity)
+        else:
+            self.index = BruteForceIndex(self.embedder.dim, capacity)
+        
+        # slot -> entry, ordered from least to most recently used
+        self.entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self.free_slots = list(range(capacity - 1, -1, -1))
+        self.audit_log = deque(maxlen=audit_size)
+        self.stats = {"lookups": 0, "hits": 0, "misses": 0, "keyword_rejections": 0,
+                      "guard_rejections": 0, "clinical_rejections": 0, "expired": 0, "evictions": 0, "stores": 0}
+        self._lock = threading.Lock()
+    
+    def lookup(self, text: str, keywords: FrozenSet[str]) -> Optional[Dict[str, Any]]:
+        """
+        Find a reusable triage result for the input
+        
+        Args:
+            text: Patient input
+            keywords: Emergency keywords detected in the input
+        
+        Returns:
+            Copy of the cached triage result with cache metadata, or None
+        """
+        vector = self.embedder.embed(text)
+        with self._lock:
+            self.stats["lookups"] += 1
+            match = self.index.query(vector)
+            if match is None or match[1] < self.threshold or match[0] not in self.entries:
+                self.stats["misses"] += 1
+                return None
+            
+            slot, similarity = match
+            entry = self.entries[slot]
+            if entry["keywords"] != keywords:
+                self.stats["keyword_rejections"] += 1
+                self.stats["misses"] += 1
+                return None
+            if entry["guard"] != guard_signature(text):
+                self.stats["guard_rejections"] += 1
+                self.stats["misses"] += 1
+                return None
+            if entry["clinical"] != clinical_signature(text):
+                self.stats["clinical_rejections"] += 1
+                self.stats["misses"] += 1
+                return None
+            if time.time() - entry["created_at"] > self.ttl_seconds:
+                self._evict(slot)
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+            
+            self.entries.move_to_end(slot)
+            entry["hits"] += 1
+            self.stats["hits"] += 1
+            self.audit_log.append({
+                "query": text,
+                "matched": entry["text"],
+                "similarity": round(similarity, 4),
+                "timestamp": time.time()
+            })
+            result = copy.deepcopy(entry["result"])
+        
+        result["cache_hit"] = True
+        result["cache_similarity"] = similarity
+        result["cache_matched_input"] = entry["text"]
+        return result
+    
+    def store(self, text: str, keywords: FrozenSet[str], result: Dict[str, Any]):
+        """
+        Cache a triage result for the input
+        
+        Args:
+            text: Patient input
+            keywords: Emergency keywords detected in the input
+            result: Triage result (error results are not cached)
+        """
+        if result.get("error"):
+            return
+        vector = self.embedder.embed(text)
+        with self._lock:
+            if not self.free_slots:
+                self._evict(next(iter(self.entries)))
+                self.stats["evictions"] += 1
+            slot = self.free_slots.pop()
+            self.index.add(slot, vector)
+            self.entries[slot] = {
+                "text": text,
+                "keywords": keywords,
+                "guard": guard_signature(text),
+                "clinical": clinical_signature(text),
+                "result": copy.deepcopy(result),
+                "created_at": time.time(),
+                "hits": 0
+            }
+            self.stats["stores"] += 1
+    
+    def _evict(self, slot: int):
+        self.entries.pop(slot, None)
+        self.index.remove(slot)
+        self.free_slots.append(slot)
+    
+    def clear(self):
+        """Drop every cached entry"""
+        with self._lock:
+            for slot in list(self.entries):
+                self._evict(slot)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit-rate and occupancy statistics"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["size"] = len(self.entries)
+        stats["capacity"] = self.capacity
+        stats["threshold"] = self.threshold
+        stats["calibration"] = self.calibration
+        stats["embedder"] = self.embedder.model_name
+        stats["hit_rate"] = stats["hits"] / stats["lookups"] if stats["lookups"] else 0.0
+        return stats
+    
+    def get_audit_log(self) -> List[Dict[str, Any]]:
+        """Recent hits (query, matched input, similarity) for false-match review"""
+        with self._lock:
+            return list(self.audit_log)
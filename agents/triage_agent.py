@@ -9,6 +9,7 @@ from models.schemas import (TriageResult, VoiceInput, Symptom, RedFlag,
                             PotentialRisk, FacilityInfo, ReferralNote)
 from utils.whisper_client import WhisperClient
 from utils.facility_matcher import FacilityMatcher
+from utils.facility_record import to_facility_infos
 from agents.groq_client import GroqClient, MedicalTriageAgent, MedicalRelevanceAgent
 
 # Load environment variables from .env file
@@ -261,7 +262,11 @@ class AroviaTriageAgent:
                 "model": self.whisper_client.model_size,
                 "supported_languages": len(self.whisper_client.SUPPORTED_LANGUAGES)
             },
-            "groq": self.groq_client.get_model_info()
+            "groq": self.groq_client.get_model_info(),
+            "cascade": self.medical_agent.get_cascade_stats(),
+            "relevance": self.relevance_agent.get_stats(),
+            "semantic_cache": (self.medical_agent.semantic_cache.get_stats()
+                               if self.medical_agent.semantic_cache else None)
         }
     
     def find_recommended_facilities(
@@ -287,56 +292,39 @@ class AroviaTriageAgent:
             # Determine specialty from triage result
             specialty = triage_result.recommended_specialty.lower()
             
-            # Adjust search radius based on urgency
-            if triage_result.urgency_score >= 8:
-                radius_km = min(radius_km, 5.0)  # Closer facilities for emergencies
-            elif triage_result.urgency_score >= 6:
-                radius_km = min(radius_km, 8.0)  # Moderate distance for urgent cases
-            
-            # Find facilities using coordinates if available
-            if user_coordinates:
-                lat, lon = user_coordinates
-                facilities_data = self.facility_matcher.search_nearby_facilities(
-                    lat, lon, radius_km, specialty
-                )
-            else:
-                # Fallback to location string
-                facilities_data = self.facility_matcher.find_facilities_for_condition(
-                    user_location, specialty, radius_km
-                )
-            
-            # Convert to FacilityInfo objects
-            facilities = []
-            for facility_data in facilities_data:
-                # Handle both dict and FacilityInfo objects
-                if isinstance(facility_data, dict):
-                    facility = FacilityInfo(
-                        name=facility_data["name"],
-                        address=facility_data["address"],
-                        distance_km=facility_data["distance_km"],
-                        specialty=facility_data["specialty_match"],
-                        services=facility_data["services"],
-                        contact=facility_data.get("contact"),
-                        map_link=facility_data["map_link"]
-                    )
-                else:
-                    # Already a FacilityInfo object
-                    facility = facility_data
-                facilities.append(facility)
-            
-            # Sort by distance and filter by urgency
-            facilities.sort(key=lambda x: x.distance_km)
+            # Adjust search radius based on urgency. With a road graph the full
+            # radius is searched and facilities are ranked by travel time instead,
+            # since a nearby facility across a river can be the slowest to reach.
+            road_routing = self.facility_matcher.road_router is not None
+            if not road_routing:
+                if triage_result.urgency_score >= 8:
+                    radius_km = min(radius_km, 5.0)  # Closer facilities for emergencies
+                elif triage_result.urgency_score >= 6:
+                    radius_km = min(radius_km, 8.0)  # Moderate distance for urgent cases
+            
+            if not user_coordinates:
+                user_coordinates = self.facility_matcher.geocode_location(user_location)
+                if not user_coordinates:
+                    return []
+            
+            # Rank by travel time, emergency capability and current load
+            lat, lon = user_coordinates
+            facilities_data = self.facility_matcher.search_nearby_facilities(
+                lat, lon, radius_km, specialty
+            )
+            facilities_data = self.facility_matcher.rank_facilities(
+                lat, lon, facilities_data, needs_emergency=triage_result.emergency_detected
+            )
             
-            # For emergencies, prioritize emergency facilities
+            # For emergencies, prioritize emergency-capable facilities
+            limit = 5
             if triage_result.emergency_detected:
-                emergency_facilities = [
-                    f for f in facilities 
-                    if "emergency" in f.services or "trauma" in f.services
-                ]
+                emergency_facilities = [f for f in facilities_data if f.get("emergency_capable")]
                 if emergency_facilities:
-                    return emergency_facilities[:3]
+                    facilities_data, limit = emergency_facilities, 3
             
-            return facilities[:5]  # Return top 5 facilities
+            # Build pydantic models only for the facilities returned
+            return to_facility_infos(facilities_data, limit)
             
         except Exception as e:
             print(f"Error finding facilities: {e}")
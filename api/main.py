@@ -8,13 +8,16 @@ import os
 # Add the parent directory to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Response, Query, Header, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool, iterate_in_threadpool
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 import uvicorn
-import tempfile
+import time
+import hmac
+import threading
 from datetime import datetime
 
 # Import our existing modules - use absolute imports
@@ -22,11 +25,26 @@ try:
     from agents.triage_agent import AroviaTriageAgent
     from models.schemas import TriageResult, VoiceInput, ReferralNote
     from utils.whisper_client import WhisperClient
+    from utils.audio_decoder import AudioDecodeError, decode_audio
+    from utils.language_id import normalize_language
     from utils.facility_matcher import FacilityMatcher
+    from utils.singleflight import get_singleflight_stats
+    from utils.request_scheduler import PriorityScheduler, QueueFullError, classify_priority
+    from utils.triage_store import (BatchWriter, build_record, export_csv, stream_parquet,
+                                    load_default_store, record_to_referral_note, PYARROW_AVAILABLE)
+    from utils.report_generator import get_font_registry, get_report_generator
+    from utils.triage_stats import TriageStatsAggregator
+    from utils.facility_cache import load_clinic_locations, warm_facility_cache
+    from utils.serialization import json_response, raw_json
+    from utils.wire_format import FacilityTable, msgpack_response, schema_description, wants_msgpack
+    from utils.idempotency import IdempotencyStore, IdempotencyConflict, request_fingerprint
+    from utils.job_queue import (JobConflict, JobWorkerPool, check_webhook_target, load_default_job_pool,
+                                 load_default_job_store, load_default_webhook_hosts)
+    from utils.triage_jobs import build_job_handlers
 except ImportError as e:
     print(f"Import error: {e}")
     print("Creating stub implementations for testing...")
-    
+
 app = FastAPI(
     title="Arovia Health Desk API",
     description="AI-powered medical triage and healthcare facility matching API",
@@ -47,12 +65,46 @@ app.add_middleware(
 # Global agent instance
 triage_agent: Optional[AroviaTriageAgent] = None
 whisper_client: Optional[WhisperClient] = None
+triage_store = None
+record_writer: Optional[BatchWriter] = None
+job_store = None
+job_workers: Optional[JobWorkerPool] = None
+triage_stats = TriageStatsAggregator(window_seconds=int(os.getenv("TRIAGE_STATS_WINDOW", "3600")))
+
+# Facility static data already sent to kiosks using the compact wire format
+facility_table = FacilityTable(max_entries=int(os.getenv("WIRE_FACILITY_TABLE_SIZE", "200000")))
+
+# Results of POSTs tagged with a client request id, so retries do not repeat the work
+idempotency_store = IdempotencyStore(
+    ttl_seconds=float(os.getenv("IDEMPOTENCY_TTL", "86400")),
+    max_entries=int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+)
+
+# Triage requests are dispatched by priority class instead of arrival order
+scheduler = PriorityScheduler(
+    workers=int(os.getenv("TRIAGE_WORKERS", "8")),
+    max_queue=int(os.getenv("TRIAGE_MAX_QUEUE", "200")),
+    starvation_timeouts={
+        "urgent": float(os.getenv("TRIAGE_URGENT_PROMOTE_AFTER", "5")),
+        "routine": float(os.getenv("TRIAGE_ROUTINE_PROMOTE_AFTER", "15"))
+    }
+)
 
 # Pydantic models for API requests/responses
 class TriageRequest(BaseModel):
     symptoms: str
+    patient_id: Optional[str] = None
     location: Optional[str] = None
     coordinates: Optional[Dict[str, float]] = None
+    
+    def user_coordinates(self) -> Optional[Tuple[float, float]]:
+        """The {"latitude", "longitude"} coordinates as the (lat, lon) pair the triage agent expects"""
+        if self.coordinates and "latitude" in self.coordinates and "longitude" in self.coordinates:
+            return (self.coordinates["latitude"], self.coordinates["longitude"])
+        return None
+
+class TriageJobRequest(TriageRequest):
+    webhook_url: Optional[str] = None
 
 class VoiceTriageRequest(BaseModel):
     language: Optional[str] = "en"
@@ -62,6 +114,17 @@ class LocationRequest(BaseModel):
     location: str
     coordinates: Optional[Dict[str, float]] = None
 
+class FacilityStateUpdate(BaseModel):
+    facility_id: str
+    opening_hours: Optional[str] = None
+    has_emergency: Optional[bool] = None
+    emergency_available: Optional[bool] = None
+    beds_available: Optional[int] = None
+    queue_length: Optional[int] = None
+
+class FacilityStateBatch(BaseModel):
+    updates: List[FacilityStateUpdate]
+
 class HealthCheck(BaseModel):
     status: str
     timestamp: datetime
@@ -70,7 +133,7 @@ class HealthCheck(BaseModel):
 @app.on_event("startup")
 async def startup_event():
     """Initialize services on startup"""
-    global triage_agent, whisper_client
+    global triage_agent, whisper_client, triage_store, record_writer, job_store, job_workers
     
     try:
         print("🚀 Initializing Arovia Health Desk API...")
@@ -83,12 +146,119 @@ async def startup_event():
         whisper_client = WhisperClient(model_size="large-v3")
         print("✅ Whisper client initialized")
         
-        print("🎉 Arovia Health Desk API ready!")
+        scheduler.start()
+        print(f"✅ Triage scheduler started ({scheduler.workers} workers)")
         
+        # Initialize triage record store
+        triage_store = load_default_store()
+        if triage_store:
+            record_writer = BatchWriter(triage_store)
+            print("✅ Triage record store initialized")
+        
+        # Background triage jobs (JOB_WORKERS=0 leaves them to scripts/job_worker.py processes)
+        job_store = load_default_job_store()
+        if job_store:
+            job_workers = load_default_job_pool(
+                job_store, build_job_handlers(triage_agent, whisper_client, store_triage_record)
+            )
+            if job_workers.workers:
+                job_workers.start()
+            print(f"✅ Job queue initialized ({job_workers.workers} workers)")
+        
+        # Precompute facility results for registered clinics in the background
+        clinic_locations_path = os.getenv("CLINIC_LOCATIONS_PATH")
+        if clinic_locations_path and triage_agent.facility_matcher.facility_cache:
+            threading.Thread(
+                target=warm_facility_cache,
+                args=(
+                    triage_agent.facility_matcher.search_nearby_facilities,
+                    load_clinic_locations(clinic_locations_path),
+                    os.getenv("FACILITY_WARMUP_SPECIALTIES", "general,emergency").split(","),
+                    [5.0, 8.0, 10.0]
+                ),
+                name="facility-cache-warmup",
+                daemon=True
+            ).start()
+            print("✅ Facility cache warmup started")
+        
+        # Parse report fonts once, before the first PDF request
+        fonts = await run_in_threadpool(get_font_registry)
+        print(f"✅ Report fonts loaded ({fonts.family}, scripts: {', '.join(fonts.fallback_families) or 'none'})")
+        
+        print("🎉 Arovia Health Desk API ready!")
+    
     except Exception as e:
         print(f"❌ Error initializing services: {e}")
         raise
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background workers"""
+    scheduler.stop()
+    if job_workers:
+        job_workers.stop()
+    if record_writer:
+        record_writer.close()
+    if triage_store:
+        triage_store.close()
+    if job_store:
+        job_store.close()
+
+def admission_priority(text: str) -> str:
+    """Priority class for a request from the emergency keyword pre-screen"""
+    return classify_priority(triage_agent.medical_agent.detect_emergency_keywords(text))
+
+def store_triage_record(triage_result, input_text: str, started_at: float, **kwargs) -> Optional[str]:
+    """Update live stats and queue the triage for persistence; returns the record id"""
+    triage_stats.record_result(triage_result, time.perf_counter() - started_at, kwargs.get("source", "text"))
+    if not record_writer:
+        return None
+    return record_writer.submit(build_record(triage_result, input_text, **kwargs))
+
+def save_triage_record(response: Response, triage_result, input_text: str, started_at: float, **kwargs):
+    """Store the triage and expose its record id in a header"""
+    record_id = store_triage_record(triage_result, input_text, started_at, **kwargs)
+    if record_id:
+        response.headers["X-Triage-Record-Id"] = record_id
+
+def trusted_response(
+    response: Response,
+    content: Any,
+    accept: Optional[str] = None,
+    accept_encoding: Optional[str] = None
+) -> Response:
+    """Serialize our own result without response-model revalidation, keeping headers set on `response`"""
+    headers = {key: value for key, value in response.headers.items() if key.startswith("x-")}
+    if wants_msgpack(accept):
+        return msgpack_response(content, headers=headers, accept_encoding=accept_encoding)
+    headers["Vary"] = "Accept"
+    return json_response(content, headers=headers, accept_encoding=accept_encoding)
+
+async def run_idempotent(response: Response, request_id: Optional[str], scope: str, fingerprint: str, compute) -> Any:
+    """
+    Run compute() once per client request id
+    
+    A retry with the same id attaches to the original request while it runs
+    and afterwards gets its stored result, including the x-* headers it set
+    (so the triage record id is the same and nothing is stored twice).
+    """
+    if not request_id:
+        return await compute()
+    
+    async def original():
+        content = await compute()
+        return content, {key: value for key, value in response.headers.items() if key.startswith("x-")}
+    
+    try:
+        (content, headers), replayed = await idempotency_store.run(f"{scope}:{request_id}", fingerprint, original)
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    for key, value in headers.items():
+        response.headers[key] = value
+    if replayed:
+        response.headers["X-Idempotent-Replayed"] = "true"
+    return content
+
 @app.get("/", response_model=Dict[str, str])
 async def root():
     """Root endpoint"""
@@ -113,80 +283,264 @@ async def health_check():
     )
 
 @app.post("/triage/text", response_model=TriageResult)
-async def analyze_symptoms_text(request: TriageRequest):
+async def analyze_symptoms_text(
+    request: TriageRequest,
+    response: Response,
+    accept: Optional[str] = Header(None, include_in_schema=False),
+    idempotency_key: Optional[str] = Header(None),
+    x_request_id: Optional[str] = Header(None)
+):
     """
     Analyze symptoms from text input
+    
+    Send an `Idempotency-Key` (or `X-Request-ID`) header to make retries safe:
+    a repeated request returns the original result instead of a new triage.
     """
     if not triage_agent:
         raise HTTPException(status_code=503, detail="Triage agent not available")
     
-    try:
+    started_at = time.perf_counter()
+    priority_class = admission_priority(request.symptoms)
+    
+    async def triage():
         if request.location:
             # Complete triage with facility recommendations
-            referral_note = triage_agent.complete_triage_with_facilities(
+            referral_note = await scheduler.run(
+                priority_class,
+                triage_agent.complete_triage_with_facilities,
                 request.symptoms,
                 request.location,
-                user_coordinates=request.coordinates
+                patient_id=request.patient_id,
+                user_coordinates=request.user_coordinates()
+            )
+            save_triage_record(
+                response, referral_note.triage_result, request.symptoms, started_at,
+                patient_id=request.patient_id, location=request.location, referral_note=referral_note
             )
             return referral_note.triage_result
         else:
             # Basic triage without facilities
-            return triage_agent.analyze_symptoms_from_text(request.symptoms)
-            
+            triage_result, _ = await scheduler.run(
+                priority_class, triage_agent.analyze_symptoms_from_text, request.symptoms
+            )
+            save_triage_record(response, triage_result, request.symptoms, started_at, patient_id=request.patient_id)
+            return triage_result
+    
+    try:
+        triage_result = await run_idempotent(
+            response, idempotency_key or x_request_id, "triage/text",
+            request_fingerprint(request.model_dump_json()), triage
+        )
+        return trusted_response(response, triage_result, accept)
+    
+    except HTTPException:
+        raise
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=f"Triage queue is full, please retry: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error analyzing symptoms: {str(e)}")
 
 @app.post("/triage/voice", response_model=Dict[str, Any])
 async def analyze_symptoms_voice(
+    response: Response,
     audio_file: UploadFile = File(...),
-    language: str = Form("en"),
-    duration: float = Form(10.0)
+    language: Optional[str] = Form(None),
+    duration: float = Form(10.0),
+    session_id: Optional[str] = Form(None),
+    accept: Optional[str] = Header(None, include_in_schema=False),
+    idempotency_key: Optional[str] = Header(None),
+    x_request_id: Optional[str] = Header(None)
 ):
     """
-    Analyze symptoms from voice input
+    Analyze symptoms from voice input (WAV, FLAC, OGG/Opus or WebM/Opus upload)
+    
+    Leave `language` empty (or "auto") to identify it from the first seconds of
+    speech; pass a `session_id` to reuse that language for later recordings.
+    Send an `Idempotency-Key` (or `X-Request-ID`) header so a re-sent upload
+    returns the original result without transcribing it again.
     """
     if not triage_agent or not whisper_client:
         raise HTTPException(status_code=503, detail="Voice processing services not available")
     
     try:
-        # Save uploaded audio file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_file:
-            content = await audio_file.read()
-            temp_file.write(content)
-            temp_file_path = temp_file.name
+        language = normalize_language(language, whisper_client.SUPPORTED_LANGUAGES)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        content = await audio_file.read()
+        started_at = time.perf_counter()
         
-        try:
+        async def triage():
+            # Decode the upload (WAV, OGG/Opus, WebM/Opus, ...) in memory, no temp file
+            try:
+                audio = await run_in_threadpool(decode_audio, content)
+            except AudioDecodeError as e:
+                raise HTTPException(status_code=415, detail=str(e))
+            
             # Transcribe audio
-            voice_result = whisper_client.transcribe_audio(
-                temp_file_path,
-                language=language
+            voice_result = await run_in_threadpool(
+                whisper_client.transcribe_audio,
+                audio,
+                language=language,
+                session_id=session_id
             )
             
             # Analyze symptoms
             if voice_result.transcribed_text.strip():
-                triage_result = triage_agent.analyze_symptoms_from_text(voice_result.transcribed_text)
+                triage_result, _ = await scheduler.run(
+                    admission_priority(voice_result.transcribed_text),
+                    triage_agent.analyze_symptoms_from_text,
+                    voice_result.transcribed_text
+                )
             else:
                 raise HTTPException(status_code=400, detail="No speech detected in audio")
             
+            save_triage_record(
+                response, triage_result, voice_result.transcribed_text, started_at, source="voice"
+            )
+            
             return {
                 "voice_result": {
                     "transcribed_text": voice_result.transcribed_text,
                     "language": voice_result.language,
                     "confidence": voice_result.confidence,
-                    "processing_time": voice_result.processing_time
+                    "processing_time": voice_result.processing_time,
+                    "language_probabilities": voice_result.language_probabilities
                 },
-                "triage_result": triage_result.dict()
+                "triage_result": triage_result
             }
-            
-        finally:
-            # Clean up temporary file
-            os.unlink(temp_file_path)
-            
+        
+        result = await run_idempotent(
+            response, idempotency_key or x_request_id, "triage/voice",
+            request_fingerprint(content, language, session_id), triage
+        )
+        return trusted_response(response, result, accept)
+    
+    except HTTPException:
+        raise
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=f"Triage queue is full, please retry: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing voice input: {str(e)}")
 
+async def check_webhook_url(webhook_url: Optional[str]):
+    """Reject webhook URLs outside JOB_WEBHOOK_HOSTS or pointing at loopback/private addresses"""
+    if not webhook_url:
+        return
+    try:
+        await run_in_threadpool(check_webhook_target, webhook_url, load_default_webhook_hosts())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def job_accepted(response: Response, job: Dict[str, Any], created: bool) -> Dict[str, Any]:
+    """202 response pointing the client at the job's status URL"""
+    response.status_code = 202
+    response.headers["Location"] = f"/jobs/{job['job_id']}"
+    if not created:
+        response.headers["X-Idempotent-Replayed"] = "true"
+    if job_workers and job_workers.workers:
+        job_workers.notify()
+    return {"job_id": job["job_id"], "status": job["status"], "status_url": f"/jobs/{job['job_id']}"}
+
+@app.post("/jobs/triage/text", response_model=Dict[str, Any], status_code=202)
+async def submit_text_triage_job(
+    request: TriageJobRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
+    x_request_id: Optional[str] = Header(None)
+):
+    """
+    Queue a text triage and return its job id immediately
+    
+    Poll `GET /jobs/{job_id}` for the result (the triage assessment appears
+    under `partial` while facilities are still being searched), or pass a
+    `webhook_url` to be notified when the job finishes.
+    """
+    if not triage_agent or not job_store:
+        raise HTTPException(status_code=503, detail="Job queue not available")
+    await check_webhook_url(request.webhook_url)
+    
+    payload = request.model_dump(exclude={"webhook_url"})
+    payload["coordinates"] = request.user_coordinates()
+    try:
+        job, created = await run_in_threadpool(
+            job_store.submit,
+            "triage_text",
+            payload,
+            priority_class=admission_priority(request.symptoms),
+            webhook_url=request.webhook_url,
+            request_key=idempotency_key or x_request_id,
+            fingerprint=request_fingerprint(request.model_dump_json())
+        )
+    except JobConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return job_accepted(response, job, created)
+
+@app.post("/jobs/triage/voice", response_model=Dict[str, Any], status_code=202)
+async def submit_voice_triage_job(
+    response: Response,
+    audio_file: UploadFile = File(...),
+    language: Optional[str] = Form(None),
+    session_id: Optional[str] = Form(None),
+    webhook_url: Optional[str] = Form(None),
+    idempotency_key: Optional[str] = Header(None),
+    x_request_id: Optional[str] = Header(None)
+):
+    """
+    Queue a voice triage (upload as for /triage/voice) and return its job id immediately
+    
+    The transcript appears under `partial` in `GET /jobs/{job_id}` while the
+    triage is still running.
+    """
+    if not triage_agent or not whisper_client or not job_store:
+        raise HTTPException(status_code=503, detail="Job queue not available")
+    await check_webhook_url(webhook_url)
+    try:
+        language = normalize_language(language, whisper_client.SUPPORTED_LANGUAGES)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    content = await audio_file.read()
+    if not content:
+        raise HTTPException(status_code=415, detail="Empty audio upload")
+    try:
+        job, created = await run_in_threadpool(
+            job_store.submit,
+            "triage_voice",
+            {"language": language, "session_id": session_id},
+            audio=content,
+            webhook_url=webhook_url,
+            request_key=idempotency_key or x_request_id,
+            fingerprint=request_fingerprint(content, language, session_id)
+        )
+    except JobConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return job_accepted(response, job, created)
+
+@app.get("/jobs/{job_id}", response_model=Dict[str, Any])
+async def get_job(job_id: str, response: Response):
+    """
+    Get a job's status, the stage it is in, partial results and, once finished, its result or error
+    """
+    if not job_store:
+        raise HTTPException(status_code=503, detail="Job queue not available")
+    
+    job = await run_in_threadpool(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] in ("queued", "running"):
+        response.headers["Retry-After"] = os.getenv("JOB_POLL_INTERVAL", "2")
+    return job
+
 @app.post("/facilities", response_model=List[Dict[str, Any]])
-async def get_nearby_facilities(request: LocationRequest):
+async def get_nearby_facilities(
+    request: LocationRequest,
+    response: Response,
+    accept: Optional[str] = Header(None, include_in_schema=False),
+    accept_encoding: Optional[str] = Header(None, include_in_schema=False),
+    x_facility_cache: Optional[str] = Header(None, include_in_schema=False)
+):
     """
     Get nearby healthcare facilities
     """
@@ -202,26 +556,229 @@ async def get_nearby_facilities(request: LocationRequest):
                 raise HTTPException(status_code=400, detail="Invalid coordinates provided")
         else:
             # Geocode the location
-            coords = triage_agent.facility_matcher.geocode_location(request.location)
+            coords = await run_in_threadpool(
+                triage_agent.facility_matcher.geocode_location, request.location
+            )
             if not coords:
                 raise HTTPException(status_code=400, detail="Could not geocode location")
             lat, lon = coords
         
-        facilities = triage_agent.facility_matcher.search_nearby_facilities(
+        facilities = await run_in_threadpool(
+            triage_agent.facility_matcher.search_nearby_facilities,
             latitude=lat,
             longitude=lon,
             radius_km=10.0
         )
+        # Road routing runs a Dijkstra search, so keep it off the event loop
+        facilities = await run_in_threadpool(triage_agent.facility_matcher.rank_facilities, lat, lon, facilities)
         
-        # Handle both dict and object responses
-        if facilities and isinstance(facilities[0], dict):
-            return facilities
-        else:
-            return [facility.dict() if hasattr(facility, 'dict') else facility for facility in facilities]
+        # Kiosks on the compact format get only what changed for facilities they have cached
+        if wants_msgpack(accept):
+            facilities = facility_table.encode(facilities, x_facility_cache)
+            response.headers["X-Facility-Table"] = facility_table.epoch
         
+        # Records, dicts and models are all encoded by the serializer
+        return trusted_response(response, facilities, accept, accept_encoding)
+    
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error finding facilities: {str(e)}")
 
+@app.get("/wire/schema", response_model=Dict[str, Any])
+async def get_wire_schema():
+    """
+    Get the key dictionary of the compact MessagePack format for kiosk clients
+    """
+    return {**schema_description(), "facility_table": facility_table.epoch}
+
+@app.post("/facilities/state", response_model=Dict[str, Any])
+async def update_facility_state(request: FacilityStateBatch):
+    """
+    Ingest facility availability (opening hours, emergency capacity, beds, queue length)
+    """
+    if not triage_agent:
+        raise HTTPException(status_code=503, detail="Facility matcher not available")
+    
+    updates = [update.model_dump(exclude_none=True) for update in request.updates]
+    try:
+        updated = triage_agent.facility_matcher.facility_state.update_many(updates)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"updated": updated, "facilities": len(triage_agent.facility_matcher.facility_state)}
+
+@app.get("/facilities/state/{facility_id:path}", response_model=Dict[str, Any])
+async def get_facility_state(facility_id: str):
+    """
+    Get the current availability state of a facility
+    """
+    if not triage_agent:
+        raise HTTPException(status_code=503, detail="Facility matcher not available")
+    
+    state = triage_agent.facility_matcher.facility_state.get(facility_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="No state reported for this facility")
+    return state
+
+def require_records_access(
+    x_api_key: Optional[str] = Header(None, include_in_schema=False),
+    authorization: Optional[str] = Header(None, include_in_schema=False)
+):
+    """Allow access to stored patient records only with the configured RECORDS_API_TOKEN"""
+    expected = os.getenv("RECORDS_API_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=403, detail="Record access is disabled (RECORDS_API_TOKEN not set)")
+    
+    supplied = x_api_key
+    if not supplied and authorization and authorization.lower().startswith("bearer "):
+        supplied = authorization[7:].strip()
+    if not supplied or not hmac.compare_digest(supplied.encode(), expected.encode()):
+        raise HTTPException(status_code=401, detail="Invalid or missing API key",
+                            headers={"WWW-Authenticate": "Bearer"})
+
+def record_filters(
+    start: Optional[datetime],
+    end: Optional[datetime],
+    min_urgency: Optional[int],
+    category: Optional[str],
+    specialty: Optional[str],
+    patient_id: Optional[str],
+    emergency: Optional[bool]
+) -> Dict[str, Any]:
+    return {
+        "start": start, "end": end, "min_urgency": min_urgency, "category": category,
+        "specialty": specialty, "patient_id": patient_id, "emergency": emergency
+    }
+
+@app.get("/records", response_model=Dict[str, Any], dependencies=[Depends(require_records_access)])
+async def list_triage_records(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    min_urgency: Optional[int] = Query(None, ge=1, le=10),
+    category: Optional[str] = None,
+    specialty: Optional[str] = None,
+    patient_id: Optional[str] = None,
+    emergency: Optional[bool] = None,
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    accept_encoding: Optional[str] = Header(None, include_in_schema=False)
+):
+    """
+    List stored triage records, newest first
+    """
+    if not triage_store:
+        raise HTTPException(status_code=503, detail="Triage record store not available")
+    
+    filters = record_filters(start, end, min_urgency, category, specialty, patient_id, emergency)
+    records = await run_in_threadpool(triage_store.query, filters, limit, offset)
+    total = await run_in_threadpool(triage_store.count, filters)
+    for record in records:
+        record["payload"] = raw_json(record["payload"])
+    return json_response({
+        "records": records,
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+        "next_offset": offset + limit if offset + limit < total else None
+    }, accept_encoding=accept_encoding)
+
+@app.get("/records/export", dependencies=[Depends(require_records_access)])
+async def export_triage_records(
+    format: str = Query("csv", pattern="^(csv|parquet)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    min_urgency: Optional[int] = Query(None, ge=1, le=10),
+    category: Optional[str] = None,
+    specialty: Optional[str] = None,
+    patient_id: Optional[str] = None,
+    emergency: Optional[bool] = None,
+    include_payload: bool = False,
+    include_identifiers: bool = False
+):
+    """
+    Bulk export of stored triage records as CSV (streamed) or Parquet
+    
+    Patient IDs and the patient's own words are left out unless include_identifiers is set.
+    """
+    if not triage_store:
+        raise HTTPException(status_code=503, detail="Triage record store not available")
+    
+    filters = record_filters(start, end, min_urgency, category, specialty, patient_id, emergency)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    if format == "csv":
+        return StreamingResponse(
+            iterate_in_threadpool(export_csv(triage_store, filters, include_payload, include_identifiers)),
+            media_type="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="triage_records_{stamp}.csv"'}
+        )
+    
+    if not PYARROW_AVAILABLE:
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow (pip install pyarrow)")
+    return StreamingResponse(
+        iterate_in_threadpool(stream_parquet(triage_store, filters, include_payload, include_identifiers)),
+        media_type="application/vnd.apache.parquet",
+        headers={"Content-Disposition": f'attachment; filename="triage_records_{stamp}.parquet"'}
+    )
+
+@app.get("/records/{record_id}", response_model=Dict[str, Any], dependencies=[Depends(require_records_access)])
+async def get_triage_record(record_id: str):
+    """
+    Get a stored triage record
+    """
+    if not triage_store:
+        raise HTTPException(status_code=503, detail="Triage record store not available")
+    
+    record = await run_in_threadpool(triage_store.get, record_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="Triage record not found")
+    record["payload"] = raw_json(record["payload"])
+    return json_response(record)
+
+class ReferralBatchRequest(BaseModel):
+    record_ids: List[str]
+
+async def load_referral_note(record_id: str) -> ReferralNote:
+    """Fetch a stored triage as a ReferralNote, waiting for a pending write if needed"""
+    record = await run_in_threadpool(triage_store.get, record_id)
+    if not record and record_writer:
+        await run_in_threadpool(record_writer.flush)
+        record = await run_in_threadpool(triage_store.get, record_id)
+    if not record:
+        raise HTTPException(status_code=404, detail=f"Triage record not found: {record_id}")
+    return record_to_referral_note(record)
+
+@app.get("/referral/{record_id}.pdf", dependencies=[Depends(require_records_access)])
+async def get_referral_pdf(record_id: str):
+    """
+    Download the referral note for a stored triage as a PDF
+    """
+    if not triage_store:
+        raise HTTPException(status_code=503, detail="Triage record store not available")
+    
+    note = await load_referral_note(record_id)
+    pdf_bytes = await run_in_threadpool(get_report_generator().render, note)
+    return Response(
+        content=pdf_bytes,
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'inline; filename="arovia_referral_{record_id}.pdf"'}
+    )
+
+@app.post("/referrals/pdf", dependencies=[Depends(require_records_access)])
+async def get_referral_pdf_batch(request: ReferralBatchRequest):
+    """
+    Download the referral notes for several stored triages as one PDF
+    """
+    if not triage_store:
+        raise HTTPException(status_code=503, detail="Triage record store not available")
+    if not request.record_ids or len(request.record_ids) > 500:
+        raise HTTPException(status_code=400, detail="Provide between 1 and 500 record IDs")
+    
+    notes = [await load_referral_note(record_id) for record_id in request.record_ids]
+    pdf_bytes = await run_in_threadpool(get_report_generator().render_batch, notes)
+    return Response(
+        content=pdf_bytes,
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'attachment; filename="arovia_referrals_{len(notes)}.pdf"'}
+    )
+
 @app.get("/languages", response_model=Dict[str, str])
 async def get_supported_languages():
     """
@@ -242,6 +799,34 @@ async def get_model_info():
     
     return triage_agent.get_model_info()
 
+@app.get("/stats", response_model=Dict[str, Any])
+async def get_triage_stats():
+    """
+    Get live triage aggregates (volume, urgency mix, latency) for dashboards
+    """
+    return triage_stats.get_snapshot()
+
+@app.get("/metrics", response_model=Dict[str, Any])
+async def get_metrics():
+    """
+    Get runtime counters (request coalescing, rate-limit queues, triage scheduling)
+    """
+    return {
+        "singleflight": get_singleflight_stats(),
+        "scheduler": scheduler.get_stats(),
+        "triage_store": record_writer.get_stats() if record_writer else {},
+        "facility_cache": (triage_agent.facility_matcher.facility_cache.get_stats()
+                           if triage_agent and triage_agent.facility_matcher.facility_cache else {}),
+        "facility_state": triage_agent.facility_matcher.facility_state.get_stats() if triage_agent else {},
+        "wire_format": facility_table.get_stats(),
+        "language_id": whisper_client.language_id.get_stats() if whisper_client else {},
+        "idempotency": idempotency_store.get_stats(),
+        "jobs": job_workers.get_stats() if job_workers else {},
+        "transcription_cache": (whisper_client.transcription_cache.get_stats()
+                                if whisper_client and whisper_client.transcription_cache else {}),
+        "rate_limits": triage_agent.groq_client.get_rate_limit_stats() if triage_agent else {}
+    }
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
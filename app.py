@@ -10,6 +10,7 @@ from typing import Optional
 from dotenv import load_dotenv
 from agents.triage_agent import AroviaTriageAgent, ReferralNote
 from models.schemas import TriageResult, VoiceInput
+from utils.report_generator import generate_referral_pdf
 
 # Load environment variables from .env file
 load_dotenv()
@@ -606,6 +607,12 @@ def display_referral_note():
             file_name=f"arovia_referral_{int(time.time())}.txt",
             mime="text/plain"
         )
+        st.download_button(
+            label="Download as PDF",
+            data=generate_referral_pdf(referral),
+            file_name=f"arovia_referral_{int(time.time())}.pdf",
+            mime="application/pdf"
+        )
     
     # Display referral note content
     with st.expander("📄 View Complete Referral Note", expanded=False):
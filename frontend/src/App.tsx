@@ -11,6 +11,34 @@ import type { TriageResult, Facility } from './types';
 
 const API_BASE_URL = 'http://localhost:8000';
 
+// Lets the backend reuse the spoken language it identified for this browser session
+const getVoiceSessionId = () => {
+  let sessionId = sessionStorage.getItem('arovia-voice-session');
+  if (!sessionId) {
+    sessionId = crypto.randomUUID();
+    sessionStorage.setItem('arovia-voice-session', sessionId);
+  }
+  return sessionId;
+};
+
+// POST with one request id across retries, so the API runs a re-sent triage only once
+const postIdempotent = async (url: string, init: RequestInit, retries = 2): Promise<Response> => {
+  const headers = { ...(init.headers as Record<string, string>), 'Idempotency-Key': crypto.randomUUID() };
+  for (let attempt = 0; ; attempt++) {
+    try {
+      const response = await fetch(url, { ...init, method: 'POST', headers });
+      if (response.status !== 503 || attempt >= retries) {
+        return response;
+      }
+    } catch (err) {
+      if (attempt >= retries) {
+        throw err;
+      }
+    }
+    await new Promise((resolve) => setTimeout(resolve, 1000 * 2 ** attempt));
+  }
+};
+
 function App() {
   const [triageResult, setTriageResult] = useState<TriageResult | null>(null);
   const [facilities, setFacilities] = useState<Facility[]>([]);
@@ -22,8 +50,7 @@ function App() {
     setError(null);
 
     try {
-      const response = await fetch(`${API_BASE_URL}/triage/text`, {
-        method: 'POST',
+      const response = await postIdempotent(`${API_BASE_URL}/triage/text`, {
         headers: {
           'Content-Type': 'application/json',
         },
@@ -68,12 +95,13 @@ function App() {
 
     try {
       const formData = new FormData();
-      formData.append('audio_file', audioBlob, 'recording.wav');
+      const extension = audioBlob.type.includes('ogg') ? 'ogg' : audioBlob.type.includes('webm') ? 'webm' : 'wav';
+      formData.append('audio_file', audioBlob, `recording.${extension}`);
       formData.append('language', language);
+      formData.append('session_id', getVoiceSessionId());
       formData.append('duration', '10');
 
-      const response = await fetch(`${API_BASE_URL}/triage/voice`, {
-        method: 'POST',
+      const response = await postIdempotent(`${API_BASE_URL}/triage/voice`, {
         body: formData,
       });
 
@@ -2,6 +2,9 @@ import React, { useState, useRef, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { MicrophoneIcon, StopIcon, PlayIcon } from '@heroicons/react/24/outline';
 
+// Recording formats the backend decodes in-process, most compact first
+const OPUS_MIME_TYPES = ['audio/webm;codecs=opus', 'audio/ogg;codecs=opus'];
+
 interface VoiceInputProps {
   onSubmit: (audioBlob: Blob, language: string) => void;
   loading: boolean;
@@ -11,7 +14,7 @@ interface VoiceInputProps {
 const VoiceInput: React.FC<VoiceInputProps> = ({ onSubmit, loading, error }) => {
   const navigate = useNavigate();
   const [isRecording, setIsRecording] = useState(false);
-  const [selectedLanguage, setSelectedLanguage] = useState('en');
+  const [selectedLanguage, setSelectedLanguage] = useState('auto');
   const [recordingTime, setRecordingTime] = useState(0);
   const [audioBlob, setAudioBlob] = useState<Blob | null>(null);
 
@@ -20,6 +23,7 @@ const VoiceInput: React.FC<VoiceInputProps> = ({ onSubmit, loading, error }) =>
   const timerRef = useRef<ReturnType<typeof setInterval> | null>(null);
 
   const languages = [
+    { code: 'auto', name: 'Detect automatically' },
     { code: 'en', name: 'English' },
     { code: 'hi', name: 'Hindi' },
     { code: 'bn', name: 'Bengali' },
@@ -34,8 +38,10 @@ const VoiceInput: React.FC<VoiceInputProps> = ({ onSubmit, loading, error }) =>
 
   const startRecording = async () => {
     try {
-      const stream = await navigator.mediaDevices.getUserMedia({ audio: true });
-      const mediaRecorder = new MediaRecorder(stream);
+      const stream = await navigator.mediaDevices.getUserMedia({ audio: { channelCount: 1 } });
+      // Opus at 24 kbit/s is ~10x smaller than WAV and is decoded server-side
+      const mimeType = OPUS_MIME_TYPES.find(type => MediaRecorder.isTypeSupported(type));
+      const mediaRecorder = new MediaRecorder(stream, mimeType ? { mimeType, audioBitsPerSecond: 24000 } : undefined);
       mediaRecorderRef.current = mediaRecorder;
       audioChunksRef.current = [];
 
@@ -46,7 +52,7 @@ const VoiceInput: React.FC<VoiceInputProps> = ({ onSubmit, loading, error }) =>
       };
 
       mediaRecorder.onstop = () => {
-        const audioBlob = new Blob(audioChunksRef.current, { type: 'audio/wav' });
+        const audioBlob = new Blob(audioChunksRef.current, { type: mediaRecorder.mimeType || 'audio/webm' });
         setAudioBlob(audioBlob);
         stream.getTracks().forEach(track => track.stop());
       };
@@ -1,7 +1,7 @@
 """
 Pydantic models for structured medical triage outputs
 """
-from typing import List, Optional, Literal
+from typing import List, Optional, Literal, Dict
 from pydantic import BaseModel, Field
 from datetime import datetime
 
@@ -48,6 +48,16 @@ class TriageResult(BaseModel):
         }
 
 
+class TranscriptSegment(BaseModel):
+    """One transcribed stretch of speech"""
+    start: float = Field(description="Start time in seconds")
+    end: float = Field(description="End time in seconds")
+    text: str = Field(description="Transcribed text")
+    confidence: float = Field(ge=0.0, le=1.0, description="Segment transcription confidence")
+    language: Optional[str] = Field(description="Language detected in this segment", default=None)
+    words: Optional[List[dict]] = Field(description="Word timestamps, when requested", default=None)
+
+
 class VoiceInput(BaseModel):
     """Voice input processing result"""
     audio_file_path: str = Field(description="Path to audio file")
@@ -55,6 +65,10 @@ class VoiceInput(BaseModel):
     language: str = Field(description="Detected language")
     confidence: float = Field(ge=0.0, le=1.0, description="Transcription confidence")
     processing_time: float = Field(description="Processing time in seconds")
+    segments: List[TranscriptSegment] = Field(description="Per-segment transcription", default_factory=list)
+    language_probabilities: Optional[Dict[str, float]] = Field(
+        description="Ranked language identification result", default=None
+    )
 
 
 class MedicalRelevance(BaseModel):
@@ -72,6 +86,8 @@ class FacilityInfo(BaseModel):
     services: List[str] = Field(description="Available services")
     contact: Optional[str] = Field(description="Contact information", default=None)
     map_link: Optional[str] = Field(description="Google Maps link", default=None)
+    travel_time_min: Optional[float] = Field(description="Estimated road travel time in minutes", default=None)
+    expected_wait_min: Optional[float] = Field(description="Expected wait from the current queue", default=None)
 
 
 class ReferralNote(BaseModel):
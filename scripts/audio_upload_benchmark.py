@@ -0,0 +1,62 @@
+"""
+Voice upload benchmark.
+Compares upload size and server-side decode time (to the 16 kHz float array
+Whisper consumes) for float WAV, 16-bit WAV and OGG/Opus recordings.
+"""
+import os
+import io
+import sys
+import time
+import argparse
+import numpy as np
+import soundfile as sf
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.audio_decoder import decode_audio, WHISPER_SAMPLE_RATE, PYAV_AVAILABLE, SOXR_AVAILABLE
+
+
+def speech_like(seconds: float, rate: int) -> np.ndarray:
+    """Voiced harmonics with a syllable-rate envelope and a little noise"""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * rate)) / rate
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / rate
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 12))
+    envelope = np.clip(np.sin(2 * np.pi * 3.5 * t), 0, None)
+    return (0.3 * voiced * envelope + 0.01 * rng.standard_normal(t.size)).astype(np.float32)
+
+
+def encode(audio: np.ndarray, rate: int, fmt: str, subtype: str, **options) -> bytes:
+    buffer = io.BytesIO()
+    sf.write(buffer, audio, rate, format=fmt, subtype=subtype, **options)
+    return buffer.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Voice upload size and decode benchmark")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Recording length")
+    parser.add_argument("--rounds", type=int, default=20, help="Decodes per format")
+    args = parser.parse_args()
+    
+    print(f"Decoders: soundfile {sf.__libsndfile_version__}, PyAV {PYAV_AVAILABLE}, soxr {SOXR_AVAILABLE}")
+    uploads = {
+        "WAV float32 16 kHz": encode(speech_like(args.seconds, 16000), 16000, "WAV", "FLOAT"),
+        "WAV PCM16 16 kHz": encode(speech_like(args.seconds, 16000), 16000, "WAV", "PCM_16"),
+        "WAV PCM16 48 kHz": encode(speech_like(args.seconds, 48000), 48000, "WAV", "PCM_16"),
+        "OGG/Opus default": encode(speech_like(args.seconds, 48000), 48000, "OGG", "OPUS"),
+        # About 30 kbit/s, close to the 24 kbit/s the web recorder requests
+        "OGG/Opus 30 kbit/s": encode(speech_like(args.seconds, 48000), 48000, "OGG", "OPUS", compression_level=0.9),
+    }
+    baseline = len(uploads["WAV float32 16 kHz"])
+    print(f"\n--- {args.seconds:.0f} s recording ---")
+    for label, upload in uploads.items():
+        decode_audio(upload)
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            audio = decode_audio(upload)
+        elapsed_ms = (time.perf_counter() - start) * 1000 / args.rounds
+        print(f"{label:<20} {len(upload) / 1024:8.1f} KiB ({baseline / len(upload):5.1f}x smaller)"
+              f"  decode {elapsed_ms:6.1f} ms -> {audio.size} samples")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Build the offline gazetteer used for local geocoding.
+Converts a place dataset (e.g. the India Post "All India Pincode Directory"
+CSV from data.gov.in) into the compact file loaded from GAZETTEER_PATH, and
+times sample lookups.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.gazetteer import Gazetteer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the offline gazetteer")
+    parser.add_argument("dataset", help="CSV with PIN codes / places and coordinates")
+    parser.add_argument("output", help="Output .json.gz path")
+    parser.add_argument("--queries", type=int, default=10000, help="Sample lookups to time (0 to skip)")
+    args = parser.parse_args()
+    
+    start = time.perf_counter()
+    gazetteer = Gazetteer.from_csv(args.dataset)
+    print(f"Indexed {len(gazetteer)} places and {len(gazetteer.pincodes)} PIN codes "
+          f"in {time.perf_counter() - start:.1f}s")
+    gazetteer.save(args.output)
+    print(f"Saved {args.output} ({os.path.getsize(args.output) / 1024 / 1024:.1f} MiB)")
+    
+    if not args.queries or not len(gazetteer):
+        return
+    rng = random.Random(0)
+    queries = [rng.choice(gazetteer.names) for _ in range(args.queries // 2)]
+    queries += [rng.choice(list(gazetteer.pincodes)) for _ in range(args.queries - len(queries))]
+    start = time.perf_counter()
+    resolved = sum(1 for query in queries if gazetteer.geocode(query))
+    elapsed = time.perf_counter() - start
+    print(f"{resolved}/{len(queries)} sample lookups resolved, {elapsed / len(queries) * 1e6:.1f} µs per lookup")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Build the offline road graph used for travel-time ranking.
+Converts an OpenStreetMap extract (.osm or .osm.pbf) into the compact .npz
+file loaded from ROAD_GRAPH_PATH, and times a sample query.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.road_router import RoadRouter, load_road_graph
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a road graph from an OpenStreetMap extract")
+    parser.add_argument("extract", help="Path to a .osm or .osm.pbf extract")
+    parser.add_argument("output", help="Output .npz path")
+    parser.add_argument("--queries", type=int, default=20, help="Sample queries to time (0 to skip)")
+    parser.add_argument("--targets", type=int, default=20, help="Facilities per sample query")
+    args = parser.parse_args()
+    
+    start = time.perf_counter()
+    graph = load_road_graph(args.extract)
+    print(f"Parsed {graph.node_count} nodes, {graph.edge_count} edges in {time.perf_counter() - start:.1f}s")
+    graph.save(args.output)
+    print(f"Saved {args.output} ({os.path.getsize(args.output) / 1024 / 1024:.1f} MiB)")
+    
+    if not args.queries or not graph.node_count:
+        return
+    router = RoadRouter(graph)
+    rng = random.Random(0)
+    
+    def random_point():
+        node = rng.randrange(graph.node_count)
+        return graph.latitudes[node], graph.longitudes[node]
+    
+    timings = []
+    for _ in range(args.queries):
+        origin = random_point()
+        destinations = [random_point() for _ in range(args.targets)]
+        start = time.perf_counter()
+        router.travel_times(origin[0], origin[1], destinations)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    print(f"Travel times to {args.targets} facilities: p50 {timings[len(timings) // 2]:.1f} ms, "
+          f"max {timings[-1]:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
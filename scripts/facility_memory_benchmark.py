@@ -0,0 +1,100 @@
+"""
+Memory and allocation benchmark for facility results.
+Compares per-result nested dicts (the old search output, converted to
+FacilityInfo for every facility) with FacilityRecord slots records that are
+materialized as pydantic models only for the final top-k.
+"""
+import os
+import sys
+import gc
+import time
+import random
+import argparse
+import tracemalloc
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from models.schemas import FacilityInfo
+from utils.facility_cache import FacilityResultCache
+from utils.facility_record import FacilityRecord, to_facility_infos
+
+CITIES = [("Hyderabad", "Telangana"), ("Nalgonda", "Telangana"), ("Guntur", "Andhra Pradesh"),
+          ("Bengaluru", "Karnataka"), ("Mysuru", "Karnataka"), ("Chennai", "Tamil Nadu")]
+TYPES = ["government", "private", "ngo", "local"]
+SERVICES = ["General Consultation", "Emergency Care", "Surgical Services", "Laboratory Services",
+            "Imaging Services", "Pharmacy"]
+
+
+def seeds(count: int):
+    rng = random.Random(0)
+    for i in range(count):
+        yield i, rng
+
+
+def facility_dict(i: int, rng: random.Random) -> dict:
+    """A facility in the old nested-dict format"""
+    city, state = rng.choice(CITIES)
+    lat, lon = 17.0 + rng.random(), 78.0 + rng.random()
+    services = ["General Consultation"] + rng.sample(SERVICES[1:], rng.randint(0, 3))
+    # Strings built at runtime, as they would be when parsed from an API response
+    return {
+        "facility_id": f"node/{1000000 + i}",
+        "name": f"Facility {i}",
+        "address": f"{i} Main Road, {city}, {state}",
+        "city": "".join(city),
+        "state": "".join(state),
+        "distance_km": 0.0,
+        "facility_type": "".join(rng.choice(TYPES)),
+        "services": ["".join(s) for s in services],
+        "specialty_match": "".join("general"),
+        "type_mask": 1, "service_mask": 0, "specialty_mask": 0,
+        "map_link": f"https://www.google.com/maps?q={lat},{lon}",
+        "contact": None,
+        "coordinates": {"latitude": lat, "longitude": lon}
+    }
+
+
+def measure(label: str, build):
+    """Time one untraced run, then trace allocations of a second run"""
+    gc.collect()
+    start = time.perf_counter()
+    build()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<40} {current / 1024 / 1024:7.1f} MiB retained, {peak / 1024 / 1024:7.1f} MiB peak, "
+          f"{elapsed * 1000:6.0f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Facility result memory benchmark")
+    parser.add_argument("--facilities", type=int, default=100000, help="Number of facilities")
+    parser.add_argument("--top-k", type=int, default=5, help="Facilities returned to the client")
+    args = parser.parse_args()
+    
+    print(f"--- {args.facilities} facilities ---")
+    dicts = measure("Nested dicts", lambda: [facility_dict(i, rng) for i, rng in seeds(args.facilities)])
+    records = measure("FacilityRecord (slots, interned)",
+                      lambda: [FacilityRecord.from_dict(facility_dict(i, rng)) for i, rng in seeds(args.facilities)])
+    
+    print(f"\n--- Query: localize all, return top {args.top_k} ---")
+    
+    def dict_query():
+        localized = FacilityResultCache.localize(dicts, 17.5, 78.5, 500.0, limit=None)
+        return [FacilityInfo(name=f["name"], address=f["address"], distance_km=f["distance_km"],
+                             specialty=f["specialty_match"], services=f["services"], contact=f.get("contact"),
+                             map_link=f["map_link"]) for f in localized][:args.top_k]
+    
+    def record_query():
+        localized = FacilityResultCache.localize(records, 17.5, 78.5, 500.0, limit=None)
+        return to_facility_infos(localized, args.top_k)
+    
+    top_dicts = measure("Dicts (deepcopy, FacilityInfo for all)", dict_query)
+    top_records = measure("Records (slot copy, FacilityInfo top-k)", record_query)
+    assert [f.name for f in top_dicts] == [f.name for f in top_records]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Standalone triage job worker.
+Runs queued jobs from the shared job table (JOB_STORE_PATH) so workers can
+be scaled separately from the API; start the API with JOB_WORKERS=0 to
+leave all jobs to processes like this one.
+"""
+import os
+import sys
+import time
+import argparse
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from agents.triage_agent import AroviaTriageAgent
+from utils.job_queue import load_default_job_pool, load_default_job_store
+from utils.triage_jobs import build_job_handlers
+from utils.triage_store import BatchWriter, build_record, load_default_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run queued triage jobs")
+    parser.add_argument("--workers", type=int, help="Worker threads (JOB_WORKERS)")
+    parser.add_argument("--no-voice", action="store_true", help="Only run text jobs (no Whisper model loaded)")
+    parser.add_argument("--whisper-model", default="large-v3", help="Whisper model size for voice jobs")
+    args = parser.parse_args()
+    
+    job_store = load_default_job_store()
+    if job_store is None:
+        parser.error("The job queue is disabled (JOBS=false)")
+    
+    triage_agent = AroviaTriageAgent()
+    whisper_client = None
+    if not args.no_voice:
+        from utils.whisper_client import WhisperClient
+        whisper_client = WhisperClient(model_size=args.whisper_model)
+    
+    triage_store = load_default_store()
+    record_writer = BatchWriter(triage_store) if triage_store else None
+    
+    def save_record(triage_result, input_text, started_at, **kwargs):
+        return record_writer.submit(build_record(triage_result, input_text, **kwargs)) if record_writer else None
+    
+    pool = load_default_job_pool(
+        job_store, build_job_handlers(triage_agent, whisper_client, save_record), workers=args.workers
+    )
+    pool.start()
+    print(f"Running {', '.join(pool.handlers)} jobs from {job_store.path} with {pool.workers} workers (Ctrl-C to stop)")
+    try:
+        while True:
+            time.sleep(60)
+            print(pool.get_stats())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.stop()
+        if record_writer:
+            record_writer.close()
+        if triage_store:
+            triage_store.close()
+        job_store.close()
+
+
+if __name__ == "__main__":
+    main()
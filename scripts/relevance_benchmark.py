@@ -0,0 +1,104 @@
+"""
+Benchmark and accuracy report for the local medical-relevance classifier.
+Compares against the LLM relevance check when GROQ_API_KEY is available.
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from dotenv import load_dotenv
+from agents.relevance_classifier import RelevanceClassifier, load_training_data
+
+load_dotenv()
+
+
+def cross_validate(texts, labels, folds=5, seed=1):
+    """k-fold predictions so every example is scored by a model that never saw it"""
+    order = np.random.default_rng(seed).permutation(len(texts))
+    predictions = [None] * len(texts)
+    for k in range(folds):
+        test_idx = set(order[k::folds].tolist())
+        train_idx = [i for i in range(len(texts)) if i not in test_idx]
+        model = RelevanceClassifier().fit([texts[i] for i in train_idx], [labels[i] for i in train_idx])
+        for i in test_idx:
+            predictions[i] = model.classify(texts[i])
+    return predictions
+
+
+def throughput(classifier, texts, rounds=50):
+    """Per-prediction latency percentiles in microseconds"""
+    latencies = []
+    for _ in range(rounds):
+        for text in texts:
+            start = time.perf_counter()
+            classifier.predict_proba(text)
+            latencies.append((time.perf_counter() - start) * 1e6)
+    latencies = np.array(latencies)
+    return {
+        "predictions_per_sec": 1e6 / latencies.mean(),
+        "p50_us": float(np.percentile(latencies, 50)),
+        "p99_us": float(np.percentile(latencies, 99))
+    }
+
+
+def llm_baseline(texts):
+    """Run the LLM-only relevance check on every text"""
+    from agents.groq_client import GroqClient, MedicalRelevanceAgent
+    agent = MedicalRelevanceAgent(GroqClient(), use_classifier=False)
+    results, latencies = [], []
+    for text in texts:
+        start = time.perf_counter()
+        results.append(bool(agent.check_relevance(text).get("is_relevant", True)))
+        latencies.append(time.perf_counter() - start)
+    return results, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Relevance classifier benchmark")
+    parser.add_argument("--data", action="append", help="Labeled .json/.jsonl file (repeatable)")
+    parser.add_argument("--skip-llm", action="store_true", help="Do not run the LLM baseline")
+    args = parser.parse_args()
+    
+    texts, labels = load_training_data(args.data)
+    labels_np = np.array(labels)
+    print(f"Examples: {len(texts)} ({int(labels_np.sum())} relevant)")
+    
+    predictions = cross_validate(texts, labels)
+    local = np.array([p["is_relevant"] for p in predictions])
+    confident = np.array([not p["uncertain"] for p in predictions])
+    
+    print("\n--- Local classifier (5-fold cross-validation) ---")
+    print(f"Accuracy (all):            {np.mean(local == labels_np):.3f}")
+    print(f"Answered locally:          {confident.mean():.1%}")
+    if confident.any():
+        print(f"Accuracy (confident only): {np.mean(local[confident] == labels_np[confident]):.3f}")
+    false_negatives = np.sum(confident & ~local & labels_np)
+    print(f"Confident false negatives: {false_negatives}")
+    
+    classifier = RelevanceClassifier().fit(texts, labels)
+    stats = throughput(classifier, texts)
+    print("\n--- Throughput (single thread) ---")
+    print(f"Predictions/sec: {stats['predictions_per_sec']:.0f}")
+    print(f"p50 latency:     {stats['p50_us']:.1f} us")
+    print(f"p99 latency:     {stats['p99_us']:.1f} us")
+    
+    api_key = os.getenv("GROQ_API_KEY")
+    if args.skip_llm or not api_key or api_key == "gsk_your_groq_api_key_here":
+        print("\nLLM baseline skipped (no GROQ_API_KEY)")
+        return
+    
+    llm, latencies = llm_baseline(texts)
+    llm = np.array(llm)
+    # Cascade: local answer when confident, LLM answer inside the band
+    cascade = np.where(confident, local, llm)
+    print("\n--- LLM baseline ---")
+    print(f"LLM accuracy:      {np.mean(llm == labels_np):.3f}")
+    print(f"LLM mean latency:  {np.mean(latencies) * 1000:.0f} ms")
+    print(f"Cascade accuracy:  {np.mean(cascade == labels_np):.3f}")
+    print(f"Local/LLM agreement (confident): {np.mean(local[confident] == llm[confident]):.3f}")
+
+
+if __name__ == "__main__":
+    main()
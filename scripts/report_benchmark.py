@@ -0,0 +1,88 @@
+"""
+Rendering benchmark for referral PDFs.
+Compares cold rendering (fonts parsed per document) with the shared font
+registry, for single notes and for batches rendered into one file.
+"""
+import os
+import sys
+import time
+import argparse
+import logging
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from models.schemas import (ReferralNote, TriageResult, Symptom, RedFlag, PotentialRisk,
+                            FacilityInfo)
+from utils.report_generator import ReferralReportGenerator, FontRegistry, get_font_registry
+
+
+def sample_note(i: int) -> ReferralNote:
+    """Representative referral note with mixed Latin/Devanagari text"""
+    triage = TriageResult(
+        chief_complaint=f"Chest pain radiating to left arm (सीने में दर्द) #{i}",
+        symptoms=[
+            Symptom(name="chest pain", severity="severe", duration="2 hours"),
+            Symptom(name="sweating", severity="moderate"),
+            Symptom(name="shortness of breath", severity="moderate", duration="1 hour")
+        ],
+        urgency_score=9,
+        red_flags=[RedFlag(flag_type="cardiac", description="Possible acute coronary syndrome",
+                           urgency_level="immediate", action_required="Call 108 immediately")],
+        potential_risks=[PotentialRisk(condition="Myocardial infarction", probability="high",
+                                       specialty_needed="Cardiology")],
+        recommended_specialty="Cardiology",
+        triage_category="immediate",
+        emergency_detected=True,
+        action_required="Go to the nearest emergency department"
+    )
+    facilities = [
+        FacilityInfo(name=f"District Hospital {n}", address=f"{n} MG Road, Bengaluru", distance_km=1.2 * n,
+                     specialty="hospital", services=["Emergency", "Cardiology"], contact="080-1234567",
+                     map_link="https://www.google.com/maps/search/?api=1&query=12.97,77.59")
+        for n in range(1, 4)
+    ]
+    return ReferralNote(patient_id=f"P{i:05d}", triage_result=triage, recommended_facilities=facilities)
+
+
+def timed(fn, rounds):
+    latencies = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Referral PDF rendering benchmark")
+    parser.add_argument("--rounds", type=int, default=30, help="Single-note renders per mode")
+    parser.add_argument("--batch", type=int, default=200, help="Notes per batch file")
+    args = parser.parse_args()
+    
+    # Missing-glyph warnings are expected when no Indic font is installed
+    logging.getLogger("fpdf").setLevel(logging.ERROR)
+    
+    start = time.perf_counter()
+    registry = get_font_registry()
+    print(f"Font registry load: {(time.perf_counter() - start) * 1000:.0f} ms {registry.get_info()}")
+    
+    note = sample_note(0)
+    shared = ReferralReportGenerator(registry)
+    shared.render(note)
+    
+    cold = timed(lambda: ReferralReportGenerator(FontRegistry()).render(note), max(5, args.rounds // 3))
+    warm = timed(lambda: shared.render(note), args.rounds)
+    print("\n--- Single note ---")
+    print(f"Fonts parsed per document: p50 {np.percentile(cold, 50):.1f} ms")
+    print(f"Shared font registry:      p50 {np.percentile(warm, 50):.1f} ms, p95 {np.percentile(warm, 95):.1f} ms")
+    
+    notes = [sample_note(i) for i in range(args.batch)]
+    start = time.perf_counter()
+    pdf_bytes = shared.render_batch(notes)
+    elapsed = time.perf_counter() - start
+    print(f"\n--- Batch of {args.batch} notes in one file ---")
+    print(f"Total:    {elapsed * 1000:.0f} ms ({len(pdf_bytes) / 1024:.0f} KiB)")
+    print(f"Per note: {elapsed * 1000 / args.batch:.1f} ms ({args.batch / elapsed:.0f} notes/sec)")
+
+
+if __name__ == "__main__":
+    main()
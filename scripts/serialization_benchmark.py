@@ -0,0 +1,83 @@
+"""
+Serialization benchmark for API responses.
+Compares FastAPI's default response path (response-model validation plus
+jsonable_encoder and json.dumps) with pydantic-core model_dump_json and
+orjson, for single referral notes and for a batch, and reports gzip/brotli
+sizes and costs for the batch body.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from typing import List
+from models.schemas import ReferralNote
+from utils import serialization
+from utils.serialization import dumps, compress
+from report_benchmark import sample_note
+
+
+def timed(fn, rounds):
+    latencies = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(latencies)
+
+
+def report(label, latencies, unit="ms"):
+    print(f"{label:<34} p50 {np.percentile(latencies, 50):8.3f} {unit}  p95 {np.percentile(latencies, 95):8.3f} {unit}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API response serialization benchmark")
+    parser.add_argument("--rounds", type=int, default=2000, help="Single-note encodes per mode")
+    parser.add_argument("--batch", type=int, default=200, help="Notes per batch response")
+    args = parser.parse_args()
+    
+    note = sample_note(0)
+    adapter = TypeAdapter(ReferralNote)
+    
+    def fastapi_default(content):
+        # What FastAPI does for a response_model endpoint returning a model
+        validated = adapter.validate_python(content, from_attributes=True)
+        return json.dumps(jsonable_encoder(validated), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    
+    def orjson_dump(content):
+        return serialization.orjson.dumps(content.model_dump())
+    
+    print(f"--- Single ReferralNote ({len(dumps(note))} bytes) ---")
+    report("FastAPI default (revalidate)", timed(lambda: fastapi_default(note), args.rounds))
+    report("model.dict() + json.dumps", timed(
+        lambda: json.dumps(jsonable_encoder(note.model_dump())).encode("utf-8"), args.rounds))
+    report("model_dump_json (utils.dumps)", timed(lambda: dumps(note), args.rounds))
+    if serialization.ORJSON_AVAILABLE:
+        report("orjson(model_dump())", timed(lambda: orjson_dump(note), args.rounds))
+    
+    notes = [sample_note(i) for i in range(args.batch)]
+    batch_adapter = TypeAdapter(List[ReferralNote])
+    rounds = max(10, args.rounds // args.batch)
+    body = dumps(notes)
+    print(f"\n--- Batch of {args.batch} notes ({len(body) / 1024:.0f} KiB) ---")
+    report("FastAPI default (revalidate)", timed(
+        lambda: json.dumps(jsonable_encoder(batch_adapter.validate_python(notes, from_attributes=True))), rounds))
+    report("utils.dumps", timed(lambda: dumps(notes), rounds))
+    report("TypeAdapter.dump_json", timed(lambda: batch_adapter.dump_json(notes), rounds))
+    
+    print(f"\n--- Compression of the batch body ---")
+    codings = ["gzip"] + (["br"] if serialization.BROTLI_AVAILABLE else [])
+    for coding in codings:
+        compressed, _ = compress(body, coding, min_bytes=0)
+        report(f"{coding} ({len(compressed) / 1024:.0f} KiB, {len(body) / len(compressed):.1f}x)",
+               timed(lambda: compress(body, coding, min_bytes=0), rounds))
+    if not serialization.BROTLI_AVAILABLE:
+        print("brotli not installed (pip install brotli)")
+
+
+if __name__ == "__main__":
+    main()
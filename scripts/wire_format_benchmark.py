@@ -0,0 +1,87 @@
+"""
+Wire format benchmark for kiosk clients on slow links.
+Compares JSON, gzip'd JSON and the compact MessagePack format (with and
+without facility delta encoding) for a triage result and a facility list:
+bytes on the wire, encode/decode cost and the estimated time until the
+kiosk can render the response on 2G/EDGE links.
+"""
+import os
+import sys
+import json
+import gzip
+import time
+import argparse
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.facility_record import FacilityRecord
+from utils.serialization import dumps, compress
+from utils.wire_format import pack, unpack, FacilityTable, merge_facilities, format_id_ranges
+from report_benchmark import sample_note
+
+# Effective downlink throughput (kbit/s) and round-trip time (ms)
+LINKS = {"GPRS": (40, 700), "EDGE": (120, 400), "3G": (1000, 150)}
+
+
+def sample_facilities(count: int):
+    facilities = []
+    for i in range(count):
+        record = FacilityRecord(
+            name=f"Primary Health Centre {i}", address=f"Main Road, Village {i}, Nalgonda District, Telangana",
+            latitude=round(17.05 + i * 0.003, 6), longitude=round(79.27 - i * 0.002, 6),
+            distance_km=round(0.8 * i, 2), facility_type="government",
+            services=["General Consultation", "Emergency Care", "Maternity", "Pharmacy"],
+            facility_id=f"node/{1000 + i}", city="Nalgonda", state="Telangana", contact="+91 8682 222 222"
+        )
+        record.travel_time_min, record.expected_wait_min = 3.5 * i, 12.0
+        record.emergency_capable, record.is_open, record.ranking_score = True, True, 4.0 * i + 12.0
+        facilities.append(record)
+    return facilities
+
+
+def per_call_ms(fn, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) * 1000 / rounds
+
+
+def report(label, body, decode, rounds):
+    decode_ms = per_call_ms(decode, rounds)
+    links = "  ".join(
+        f"{name} {rtt + len(body) * 8 / kbps + decode_ms:7.0f} ms" for name, (kbps, rtt) in LINKS.items()
+    )
+    print(f"{label:<30} {len(body):7d} B  decode {decode_ms:6.3f} ms  {links}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kiosk wire format benchmark")
+    parser.add_argument("--facilities", type=int, default=20, help="Facilities per list response")
+    parser.add_argument("--rounds", type=int, default=500, help="Decode repetitions per format")
+    args = parser.parse_args()
+    
+    triage = sample_note(0).triage_result
+    facilities = sample_facilities(args.facilities)
+    table, kiosk_cache = FacilityTable(), {}
+    merge_facilities(unpack(pack(table.encode(facilities))), kiosk_cache)
+    header = f"{table.epoch}:{format_id_ranges(kiosk_cache)}"
+    
+    for title, content in (("TriageResult", triage), (f"{args.facilities} facilities", facilities)):
+        print(f"\n--- {title} (time to render = RTT + transfer + decode) ---")
+        body = dumps(content)
+        gzipped, _ = compress(body, "gzip", min_bytes=0)
+        compact = pack(content)
+        compact_gzipped, _ = compress(compact, "gzip", min_bytes=0)
+        report("JSON", body, lambda: json.loads(body), args.rounds)
+        report("JSON + gzip", gzipped, lambda: json.loads(gzip.decompress(gzipped)), args.rounds)
+        report("MessagePack", compact, lambda: unpack(compact), args.rounds)
+        report("MessagePack + gzip", compact_gzipped,
+               lambda: unpack(gzip.decompress(compact_gzipped)), args.rounds)
+        if content is facilities:
+            delta = pack(table.encode(facilities, header))
+            report("MessagePack delta (cached)", delta,
+                   lambda: merge_facilities(unpack(delta), dict(kiosk_cache)), args.rounds)
+        print(f"{'encode ms':<30} JSON {per_call_ms(lambda: dumps(content), args.rounds):.3f}"
+              f"  MessagePack {per_call_ms(lambda: pack(content), args.rounds):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Test suite for in-memory audio decoding
+"""
+import io
+import wave
+import numpy as np
+import pytest
+from utils import audio_decoder
+from utils.audio_decoder import (decode_audio, detect_format, resample, AudioDecodeError,
+                                 SOUNDFILE_AVAILABLE, WHISPER_SAMPLE_RATE)
+
+
+def tone(rate: int, seconds: float = 2.0, frequency: float = 440.0) -> np.ndarray:
+    t = np.arange(int(rate * seconds)) / rate
+    return (0.5 * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+
+def dominant_frequency(audio: np.ndarray, rate: int) -> float:
+    spectrum = np.abs(np.fft.rfft(audio))
+    return np.fft.rfftfreq(audio.size, 1 / rate)[np.argmax(spectrum)]
+
+
+def wav_bytes(audio: np.ndarray, rate: int, channels: int = 1) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(channels)
+        writer.setsampwidth(2)
+        writer.setframerate(rate)
+        samples = np.repeat(audio[:, None], channels, axis=1) if channels > 1 else audio
+        writer.writeframes((samples * 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+class TestAudioDecoder:
+    """Test cases for upload decoding and resampling"""
+    
+    def test_detect_format(self):
+        assert detect_format(b"RIFF\x00\x00\x00\x00WAVE") == "wav"
+        assert detect_format(b"OggS\x00\x02") == "ogg"
+        assert detect_format(b"\x1a\x45\xdf\xa3\x9f") == "webm"
+        assert detect_format(b"\x00\x00\x00\x18ftypM4A ") == "mp4"
+        assert detect_format(b"hello") is None
+    
+    def test_resample_keeps_pitch_and_duration(self, monkeypatch):
+        monkeypatch.setattr(audio_decoder, "SOXR_AVAILABLE", False)
+        audio = resample(tone(48000), 48000, WHISPER_SAMPLE_RATE)
+        assert audio.dtype == np.float32 and audio.size == 32000
+        assert dominant_frequency(audio, WHISPER_SAMPLE_RATE) == pytest.approx(440, abs=1)
+        assert np.max(np.abs(audio)) == pytest.approx(0.5, abs=0.02)
+    
+    def test_resample_removes_content_above_new_nyquist(self, monkeypatch):
+        monkeypatch.setattr(audio_decoder, "SOXR_AVAILABLE", False)
+        audio = resample(tone(48000, frequency=12000), 48000, WHISPER_SAMPLE_RATE)
+        assert np.max(np.abs(audio)) < 0.01
+    
+    @pytest.mark.parametrize("use_soundfile", [True, False])
+    def test_stereo_wav(self, monkeypatch, use_soundfile):
+        if use_soundfile and not SOUNDFILE_AVAILABLE:
+            pytest.skip("soundfile not installed")
+        monkeypatch.setattr(audio_decoder, "SOUNDFILE_AVAILABLE", use_soundfile)
+        audio = decode_audio(wav_bytes(tone(44100), 44100, channels=2))
+        assert audio.ndim == 1 and audio.size == 32000
+        assert dominant_frequency(audio, WHISPER_SAMPLE_RATE) == pytest.approx(440, abs=1)
+    
+    @pytest.mark.skipif(not SOUNDFILE_AVAILABLE, reason="soundfile not installed")
+    def test_ogg_opus_is_small_and_decodes(self):
+        import soundfile as sf
+        speech_like = tone(48000, seconds=10.0, frequency=300.0) + tone(48000, seconds=10.0, frequency=900.0) * 0.3
+        buffer = io.BytesIO()
+        try:
+            sf.write(buffer, speech_like, 48000, format="OGG", subtype="OPUS")
+        except Exception as e:
+            pytest.skip(f"libsndfile without Opus support: {e}")
+        upload = buffer.getvalue()
+        float_wav_size = 10 * WHISPER_SAMPLE_RATE * 4
+        assert len(upload) * 5 < float_wav_size
+        audio = decode_audio(upload)
+        assert abs(audio.size - 10 * WHISPER_SAMPLE_RATE) < WHISPER_SAMPLE_RATE // 10
+        assert dominant_frequency(audio, WHISPER_SAMPLE_RATE) == pytest.approx(300, abs=2)
+    
+    def test_bad_uploads(self, monkeypatch):
+        with pytest.raises(AudioDecodeError):
+            decode_audio(b"")
+        with pytest.raises(AudioDecodeError):
+            decode_audio(b"not audio at all" * 10)
+        monkeypatch.setattr(audio_decoder, "PYAV_AVAILABLE", False)
+        with pytest.raises(AudioDecodeError, match="PyAV"):
+            decode_audio(b"\x1a\x45\xdf\xa3" + b"\x00" * 64)
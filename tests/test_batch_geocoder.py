@@ -0,0 +1,98 @@
+"""
+Test suite for batch geocoding
+"""
+import json
+import time
+import threading
+from utils.batch_geocoder import BatchGeocoder, RateLimiter, normalize_address
+
+
+class FakeGeocoder:
+    def __init__(self, known):
+        self.known = known
+        self.calls = []
+        self._lock = threading.Lock()
+    
+    def __call__(self, address):
+        with self._lock:
+            self.calls.append(address)
+        return self.known.get(normalize_address(address))
+
+
+def test_normalize_address():
+    assert normalize_address("Nalgonda,  Telangana, India.") == "nalgonda, telangana"
+    assert normalize_address("  NALGONDA , telangana ") == "nalgonda, telangana"
+    assert normalize_address("H.No 4-1/2, Kukatpally") == "h no 4-1/2, kukatpally"
+
+
+def test_rate_limiter_spaces_calls():
+    limiter = RateLimiter(50)
+    start = time.monotonic()
+    threads = [threading.Thread(target=limiter.wait) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert time.monotonic() - start >= 5 / 50 - 0.01
+
+
+class TestBatchGeocoder:
+    """Test cases for dedupe, local resolution and resumable checkpoints"""
+    
+    def test_dedupes_and_resolves_locally_first(self):
+        remote = FakeGeocoder({"nalgonda, telangana": (17.05, 79.27)})
+        local = {"500081": (17.44, 78.38)}
+        geocoder = BatchGeocoder(remote, resolvers=[lambda a: local.get(a.strip())], rate=0)
+        coordinates, report = geocoder.run(
+            ["Nalgonda, Telangana", "nalgonda, telangana, India", " 500081", "Nowhere", ""]
+        )
+        assert coordinates == [(17.05, 79.27), (17.05, 79.27), (17.44, 78.38), None, None]
+        assert sorted(remote.calls) == ["Nalgonda, Telangana", "Nowhere"]
+        assert report["unique_addresses"] == 3
+        assert (report["local"], report["remote"], report["failed"]) == (1, 1, 1)
+    
+    def test_resumes_from_checkpoint(self, tmp_path):
+        path = str(tmp_path / "geocode.jsonl")
+        addresses = [f"Village {i}, Nalgonda" for i in range(20)]
+        known = {normalize_address(a): (17.0 + i / 100, 79.0) for i, a in enumerate(addresses)}
+        
+        first = FakeGeocoder(known)
+        BatchGeocoder(first, workers=4, rate=0, checkpoint_path=path).run(addresses[:12])
+        with open(path, "a") as f:
+            f.write('{"key": "village 19, nal')  # Interrupted write
+        
+        second = FakeGeocoder(known)
+        coordinates, report = BatchGeocoder(second, workers=4, rate=0, checkpoint_path=path).run(addresses)
+        assert len(second.calls) == 8
+        assert report["checkpoint"] == 12
+        assert coordinates[15] == (17.15, 79.0)
+        with open(path) as f:
+            lines = [line for line in f if line.strip()]
+        assert json.loads(lines[-1])["source"] == "remote"
+    
+    def test_failures_can_be_retried(self, tmp_path):
+        path = str(tmp_path / "geocode.jsonl")
+        BatchGeocoder(FakeGeocoder({}), rate=0, checkpoint_path=path).run(["Nalgonda"])
+        retry = FakeGeocoder({"nalgonda": (17.05, 79.27)})
+        coordinates, _ = BatchGeocoder(retry, rate=0, checkpoint_path=path, retry_failed=True).run(["Nalgonda"])
+        assert coordinates == [(17.05, 79.27)]
+    
+    def test_errors_are_retried_without_retry_failed(self, tmp_path):
+        path = str(tmp_path / "geocode.jsonl")
+        
+        def unavailable(address):
+            raise TimeoutError("Nominatim timed out")
+        
+        coordinates, report = BatchGeocoder(unavailable, rate=0, checkpoint_path=path).run(["Nalgonda", "Nowhere"])
+        assert coordinates == [None, None]
+        assert (report["errors"], report["failed"]) == (2, 0)
+        
+        retry = FakeGeocoder({"nalgonda": (17.05, 79.27)})
+        coordinates, report = BatchGeocoder(retry, rate=0, checkpoint_path=path).run(["Nalgonda", "Nowhere"])
+        assert coordinates == [(17.05, 79.27), None]
+        assert sorted(retry.calls) == ["Nalgonda", "Nowhere"]
+        assert (report["checkpoint"], report["failed"]) == (0, 1)
+        
+        third = FakeGeocoder({})
+        BatchGeocoder(third, rate=0, checkpoint_path=path).run(["Nalgonda", "Nowhere"])
+        assert third.calls == []
@@ -0,0 +1,84 @@
+"""
+Test suite for the geohash facility result cache
+"""
+import time
+import pytest
+from utils.facility_cache import (FacilityResultCache, geohash_encode, geohash_bounds, haversine_km,
+                                  normalize_specialty, radius_bucket, warm_facility_cache)
+from utils.facility_matcher import FacilityMatcher
+
+
+def test_geohash_matches_reference():
+    assert geohash_encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    min_lat, min_lon, max_lat, max_lon = geohash_bounds("u4pruydqqvj")
+    assert min_lat <= 57.64911 <= max_lat and min_lon <= 10.40744 <= max_lon
+
+
+def test_key_normalization():
+    known = ["cardiology", "general", "emergency"]
+    assert normalize_specialty("General Medicine", known) == "general"
+    assert normalize_specialty(" Cardiology ", known) == "cardiology"
+    assert normalize_specialty("ENT", known) == "ent"
+    assert normalize_specialty(None, known) == "general"
+    assert radius_bucket(4.2) == 5.0
+    assert radius_bucket(10.0) == 10.0
+
+
+class TestFacilityResultCache:
+    """Test cases for expiry, invalidation and matcher integration"""
+    
+    def test_ttl_and_invalidation(self):
+        cache = FacilityResultCache(ttl_seconds=0.05)
+        key = cache.key(17.385, 78.4867, 10, "general")
+        cache.put(key, [])
+        assert cache.get(key) == []
+        time.sleep(0.06)
+        assert cache.get(key) is None
+        
+        cache.put(key, [])
+        other = cache.key(28.6139, 77.2090, 10, "general")
+        cache.put(other, [])
+        assert cache.invalidate(key[0][:3]) == 1
+        assert cache.get(other) == []
+    
+    def test_nearby_patients_share_one_search(self, monkeypatch):
+        matcher = FacilityMatcher(facility_cache=FacilityResultCache())
+        calls = []
+        hospital = {"name": "District Hospital", "coordinates": {"latitude": 17.40, "longitude": 78.49}}
+        
+        def fake_fetch(latitude, longitude, radius_km, specialty, limit=10):
+            calls.append((latitude, longitude, radius_km, specialty))
+            return [dict(hospital, distance_km=0.0)]
+        
+        monkeypatch.setattr(matcher, "_fetch_nearby_facilities", fake_fetch)
+        first = matcher.search_nearby_facilities(17.3850, 78.4867, 10.0, "General Medicine")
+        second = matcher.search_nearby_facilities(17.3852, 78.4869, 10.0, "general")
+        
+        assert len(calls) == 1
+        # The cell is searched from its center with a margin covering the whole cell
+        assert calls[0][2] > 10.0
+        assert first[0]["distance_km"] == pytest.approx(haversine_km(17.3850, 78.4867, 17.40, 78.49), abs=0.01)
+        assert second[0]["distance_km"] != first[0]["distance_km"]
+        assert matcher.facility_cache.get_stats()["hits"] == 1
+        
+        # Exact radius still applies to cached results
+        assert matcher.search_nearby_facilities(17.3850, 78.4867, 1.0, "general") == []
+    
+    def test_failed_search_is_not_cached(self, monkeypatch):
+        matcher = FacilityMatcher(facility_cache=FacilityResultCache())
+        
+        def failing_fetch(*args, **kwargs):
+            raise ConnectionError("offline")
+        
+        monkeypatch.setattr(matcher, "_fetch_nearby_facilities", failing_fetch)
+        assert matcher.search_nearby_facilities(17.385, 78.4867, 10.0, "general")
+        assert matcher.facility_cache.get_stats()["size"] == 0
+    
+    def test_warmup_precomputes_clinic_cells(self, monkeypatch):
+        matcher = FacilityMatcher(facility_cache=FacilityResultCache())
+        monkeypatch.setattr(matcher, "_fetch_nearby_facilities", lambda *args, **kwargs: [])
+        clinics = [{"name": "PHC A", "latitude": 17.385, "longitude": 78.4867}]
+        warm_facility_cache(matcher.search_nearby_facilities, clinics, ["general"], [5.0, 10.0], delay_seconds=0)
+        assert matcher.facility_cache.get_stats()["size"] == 2
+        matcher.search_nearby_facilities(17.385, 78.4867, 4.0, "general")
+        assert matcher.facility_cache.get_stats()["hits"] == 1
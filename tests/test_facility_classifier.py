@@ -0,0 +1,85 @@
+"""
+Test suite for precomputed facility classification
+"""
+import json
+from utils.facility_classifier import FacilityClassifier, DEFAULT_FACILITY_TYPES, DEFAULT_SPECIALTIES, load_vocabulary
+from utils.facility_matcher import FacilityMatcher
+
+
+def legacy_classify(name, address):
+    """The per-request keyword scan the classifier replaces"""
+    text = (name + " " + address).lower()
+    for facility_type, keywords in DEFAULT_FACILITY_TYPES.items():
+        if any(keyword in text for keyword in keywords):
+            return facility_type
+    return "local"
+
+
+def legacy_services(name, address, specialty):
+    services = ["General Consultation"]
+    text = (name + " " + address).lower()
+    if specialty in DEFAULT_SPECIALTIES and any(k in text for k in DEFAULT_SPECIALTIES[specialty]):
+        services.append(f"{specialty.title()} Services")
+    for label, keywords in [("Emergency Care", ["emergency", "trauma"]), ("Surgical Services", ["surgery", "surgical"]),
+                            ("Laboratory Services", ["lab", "laboratory"]), ("Imaging Services", ["x-ray", "imaging"]),
+                            ("Pharmacy", ["pharmacy"])]:
+        if any(k in text for k in keywords):
+            services.append(label)
+    return services
+
+
+FACILITIES = [
+    ("Government District Hospital", "Civil Lines, Nagpur"),
+    ("Apollo Heart Institute", "Jubilee Hills, Hyderabad"),
+    ("Mission Trauma and Surgical Centre", "Old City"),
+    ("Rural Health Center", "Near Bus Stand"),
+    ("City Laboratory and X-Ray Clinic", "MG Road"),
+    ("Sri Sai Pharmacy", "Market Street"),
+    ("Child and Women Care", "Kukatpally"),
+    ("", "")
+]
+
+
+class TestFacilityClassifier:
+    """Test cases for the compiled keyword matcher"""
+    
+    def test_matches_legacy_keyword_scan(self):
+        classifier = FacilityClassifier()
+        for name, address in FACILITIES:
+            classification = classifier.classify(name, address)
+            assert classifier.facility_type(classification.type_mask) == legacy_classify(name, address)
+            for specialty in ["cardiology", "emergency", "pediatrics", "general", None]:
+                labels = classifier.service_labels(classification.service_mask, classification.specialty_mask, specialty)
+                assert labels == legacy_services(name, address, specialty)
+    
+    def test_nested_keywords_set_every_bit(self):
+        classifier = FacilityClassifier(services={"Lab": ["lab"], "Laboratory": ["laboratory"]})
+        classification = classifier.classify("Central Laboratory")
+        assert classifier.service_labels(classification.service_mask) == ["General Consultation", "Lab", "Laboratory"]
+    
+    def test_select_uses_bitsets(self):
+        classifier = FacilityClassifier()
+        facilities = [classifier.annotate({"name": name, "address": address}) for name, address in FACILITIES]
+        cardiac = classifier.select(facilities, specialties=["cardiology"])
+        assert [f["name"] for f in cardiac] == ["Apollo Heart Institute"]
+        surgical_er = classifier.select(facilities, services=["Emergency Care", "Surgical Services"])
+        assert [f["name"] for f in surgical_er] == ["Mission Trauma and Surgical Centre"]
+        government = classifier.select(facilities, facility_types=["government"])
+        assert [f["name"] for f in government] == ["Government District Hospital"]
+    
+    def test_vocabulary_file(self, tmp_path):
+        path = tmp_path / "vocabulary.json"
+        path.write_text(json.dumps({"services": {"Dialysis": ["dialysis", "renal"]}}))
+        classifier = FacilityClassifier(**load_vocabulary(str(path)))
+        classification = classifier.classify("Renal Care Centre")
+        assert classifier.service_labels(classification.service_mask) == ["General Consultation", "Dialysis"]
+        assert classifier.specialties == DEFAULT_SPECIALTIES
+    
+    def test_matcher_filters_annotated_facilities(self):
+        matcher = FacilityMatcher(use_cache=False)
+        facilities = matcher._get_mock_facilities(17.385, 78.4867, "general")
+        ngo = matcher.filter_facilities(facilities, facility_type="ngo")
+        assert [f["name"] for f in ngo] == ["Charitable Medical Trust"]
+        # Existing service lists are kept
+        assert ngo[0]["services"] == ["General Consultation", "Emergency Care", "Laboratory Services"]
+        assert matcher.filter_facilities(facilities, services=["Pharmacy"])[0]["name"] == "Community Health Center"
@@ -0,0 +1,48 @@
+"""
+Test suite for compact facility records
+"""
+import pytest
+from utils.facility_record import FacilityRecord, to_facility_infos
+from utils.facility_cache import FacilityResultCache
+
+
+def record(name="District Hospital", lat=17.40, lon=78.49, distance=1.0):
+    return FacilityRecord(name=name, address=f"{name}, Nalgonda", latitude=lat, longitude=lon,
+                          distance_km=distance, facility_type="government",
+                          services=["General Consultation", "Emergency Care"], city="Nalgonda")
+
+
+class TestFacilityRecord:
+    """Test cases for slots records and lazy pydantic materialization"""
+    
+    def test_behaves_like_old_dict(self):
+        facility = record()
+        assert facility["name"] == "District Hospital"
+        assert facility.get("coordinates") == {"latitude": 17.40, "longitude": 78.49}
+        assert facility["map_link"] == "https://www.google.com/maps?q=17.4,78.49"
+        assert facility["services"] == ["General Consultation", "Emergency Care"]
+        assert "service_mask" not in facility and facility.get("travel_time_min", 0) == 0
+        facility["ranking_score"] = 3.5
+        assert facility.to_dict()["ranking_score"] == 3.5
+        with pytest.raises(KeyError):
+            facility["beds"] = 3
+        assert not hasattr(facility, "__dict__")
+    
+    def test_strings_are_shared(self):
+        a, b = record("A"), record("B")
+        assert a.city is b.city and a.services[1] is b.services[1]
+    
+    def test_round_trip_and_copy(self):
+        facility = FacilityRecord.from_dict(record().to_dict())
+        clone = facility.copy()
+        clone["distance_km"] = 9.9
+        assert facility.distance_km == 1.0 and clone.name == facility.name
+    
+    def test_localize_and_top_k(self):
+        facilities = [record(f"F{i}", 17.40 + i * 0.01, 78.49) for i in range(10)]
+        localized = FacilityResultCache.localize(facilities, 17.40, 78.49, 5.0, limit=None)
+        assert [f.name for f in localized[:2]] == ["F0", "F1"]
+        assert facilities[1].distance_km == 1.0  # Cached records are not modified
+        infos = to_facility_infos(localized, 3)
+        assert len(infos) == 3 and infos[1].distance_km == pytest.approx(1.11, abs=0.01)
+        assert infos[0].specialty == "general" and infos[0].services[1] == "Emergency Care"
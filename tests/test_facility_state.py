@@ -0,0 +1,94 @@
+"""
+Test suite for facility availability state and load-aware ranking
+"""
+import time
+import pytest
+from datetime import datetime
+from utils.facility_state import FacilityStateStore, parse_opening_hours, facility_key
+from utils.facility_matcher import FacilityMatcher
+
+
+def facility(name, distance_km, services=("General Consultation",), facility_id=None):
+    return {"facility_id": facility_id, "name": name, "distance_km": distance_km, "services": list(services)}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = time.time()
+    
+    def __call__(self):
+        return self.now
+
+
+class TestFacilityState:
+    """Test cases for the parallel-array state store"""
+    
+    def test_opening_hours(self):
+        assert parse_opening_hours("24/7") == (0, 1440)
+        assert parse_opening_hours("08:30-20:00") == (510, 1200)
+        assert parse_opening_hours(None) == (-1, -1)
+        with pytest.raises(ValueError):
+            parse_opening_hours("mornings")
+    
+    def test_overnight_hours(self):
+        store = FacilityStateStore()
+        now = time.time()
+        local = datetime.fromtimestamp(now, store.timezone)
+        minute = local.hour * 60 + local.minute
+        start = (minute + 60) % 1440
+        end = (minute + 120) % 1440
+        store.update("night", opening_hours=f"{start // 60:02d}:{start % 60:02d}-{minute // 60:02d}:{minute % 60:02d}")
+        store.update("soon", opening_hours=f"{start // 60:02d}:{start % 60:02d}-{end // 60:02d}:{end % 60:02d}")
+        assert store.get("night", now)["is_open"] is False
+        assert store.get("soon", now)["is_open"] is False
+        store.update("night", opening_hours="00:00-00:00")
+        assert store.get("night", now)["is_open"] is True
+    
+    def test_hours_use_facility_timezone(self):
+        now = 1760000000  # 2025-10-09 08:53 UTC, 14:23 in Asia/Kolkata
+        store = FacilityStateStore()
+        store.update("clinic", opening_hours="09:00-17:00")
+        assert store.get("clinic", now)["is_open"] is True
+        utc_store = FacilityStateStore(timezone="UTC")
+        utc_store.update("clinic", opening_hours="09:00-17:00")
+        assert utc_store.get("clinic", now)["is_open"] is False
+    
+    def test_load_spreads_patients(self):
+        clock = FakeClock()
+        store = FacilityStateStore(clock=clock)
+        near, far = facility("Busy Hospital", 2.0, facility_id="way/1"), facility("Quiet Hospital", 5.0, facility_id="way/2")
+        assert [f["name"] for f in store.rank([near, far])] == ["Busy Hospital", "Quiet Hospital"]
+        
+        store.update_many([{"facility_id": "way/1", "queue_length": 30}, {"facility_id": "way/2", "queue_length": 1}])
+        ranked = store.rank([near, far])
+        assert [f["name"] for f in ranked] == ["Quiet Hospital", "Busy Hospital"]
+        assert ranked[1]["expected_wait_min"] == 180.0
+        
+        # Stale load reports are ignored
+        clock.now += 7 * 3600
+        assert [f["name"] for f in store.rank([near, far])] == ["Busy Hospital", "Quiet Hospital"]
+        assert store.get("way/1")["stale"] is True
+    
+    def test_emergency_capability(self):
+        store = FacilityStateStore()
+        clinic = facility("Ramnagar PHC", 1.0)
+        hospital = facility("District Hospital", 8.0, services=["General Consultation", "Emergency Care"])
+        assert store.rank([clinic, hospital], needs_emergency=True)[0]["name"] == "District Hospital"
+        
+        store.update(facility_key(hospital), has_emergency=True, emergency_available=False)
+        store.update(facility_key(clinic), has_emergency=True, opening_hours="24/7")
+        ranked = store.rank([clinic, hospital], needs_emergency=True)
+        assert [f["name"] for f in ranked] == ["Ramnagar PHC", "District Hospital"]
+        assert ranked[0]["emergency_capable"] and ranked[0]["is_open"]
+    
+    def test_unknown_fields_rejected(self):
+        with pytest.raises(ValueError):
+            FacilityStateStore().update("way/1", ventilators=3)
+    
+    def test_matcher_ranks_with_state(self):
+        matcher = FacilityMatcher(use_cache=False, facility_state=FacilityStateStore())
+        facilities = matcher._get_mock_facilities(17.385, 78.4867, "general")
+        matcher.facility_state.update("city general hospital", queue_length=40)
+        ranked = matcher.rank_facilities(17.385, 78.4867, facilities)
+        assert ranked[-1]["name"] == "City General Hospital"
+        assert all("ranking_score" in f for f in ranked)
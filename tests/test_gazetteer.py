@@ -0,0 +1,80 @@
+"""
+Test suite for the offline gazetteer
+"""
+import time
+import pytest
+from utils.gazetteer import Gazetteer, phonetic_key
+from utils.facility_matcher import FacilityMatcher
+
+INDIA_POST_CSV = """CircleName,RegionName,DivisionName,OfficeName,Pincode,OfficeType,Delivery,District,StateName,Latitude,Longitude
+Telangana Circle,Hyderabad Region,Secunderabad Division,Secunderabad H.O,500003,H.O,Delivery,Hyderabad,TELANGANA,17.4399,78.4983
+Telangana Circle,Hyderabad Region,Hyderabad City Division,Kukatpally S.O,500072,S.O,Delivery,Medchal Malkajgiri,TELANGANA,17.4849,78.4138
+Telangana Circle,Hyderabad Region,Hyderabad City Division,KPHB Colony S.O,500072,S.O,Delivery,Medchal Malkajgiri,TELANGANA,17.4937,78.3996
+Telangana Circle,Hyderabad Region,Nalgonda Division,Nalgonda H.O,508001,H.O,Delivery,Nalgonda,TELANGANA,17.0575,79.2684
+Telangana Circle,Hyderabad Region,Nalgonda Division,Ramnagar B.O,508001,B.O,Delivery,Nalgonda,TELANGANA,17.0700,79.2500
+Karnataka Circle,Bangalore Region,Ramanagara Division,Ramnagar S.O,562159,S.O,Delivery,Ramanagara,KARNATAKA,12.7200,77.2800
+Andhra Pradesh Circle,Vijayawada Region,Guntur Division,Broken Coordinates B.O,522001,B.O,Delivery,Guntur,ANDHRA PRADESH,NA,NA
+"""
+
+
+@pytest.fixture
+def gazetteer(tmp_path):
+    path = tmp_path / "pincodes.csv"
+    path.write_text(INDIA_POST_CSV)
+    return Gazetteer.from_csv(str(path))
+
+
+def test_phonetic_key_folds_transliterations():
+    assert phonetic_key("secunderabad") == phonetic_key("sikandrabad")
+    assert phonetic_key("vishakhapatnam") == phonetic_key("visakapatnam")
+
+
+class TestGazetteer:
+    """Test cases for local place and PIN-code lookup"""
+    
+    def test_pincode_and_names(self, gazetteer):
+        assert gazetteer.lookup("Patient from 500072")["match"] == "pincode"
+        assert gazetteer.geocode("500072") == pytest.approx((17.4893, 78.4067))
+        assert gazetteer.geocode("Kukatpally") == (17.4849, 78.4138)
+        assert gazetteer.geocode("Sikandrabad") == (17.4399, 78.4983)
+        assert gazetteer.lookup("broken coordinates") is None
+    
+    def test_district_and_disambiguation(self, gazetteer):
+        # The district entry outranks a same-named post office
+        assert gazetteer.lookup("Nalgonda")["name"] == "nalgonda"
+        assert gazetteer.geocode("Ramnagar, Ramanagara, Karnataka") == (12.72, 77.28)
+        assert gazetteer.geocode("Ramnagar, Nalgonda") == (17.07, 79.25)
+        assert gazetteer.geocode("H.No 4-12, Kukatpally, Hyderabad, India") == (17.4849, 78.4138)
+    
+    def test_fuzzy_and_prefix(self, gazetteer):
+        assert gazetteer.geocode("Kukatpalli") == (17.4849, 78.4138)
+        assert gazetteer.geocode("Kukatpaly") == (17.4849, 78.4138)
+        assert gazetteer.geocode("Kukatpally") == gazetteer.geocode("kukat pally")
+        assert gazetteer.complete("kuk") == ["kukatpally"]
+        assert gazetteer.geocode("Mumbai") is None
+    
+    def test_save_and_load(self, gazetteer, tmp_path):
+        path = str(tmp_path / "gazetteer.json.gz")
+        gazetteer.save(path)
+        loaded = Gazetteer.load(path)
+        assert len(loaded) == len(gazetteer)
+        assert loaded.geocode("Sikandrabad") == gazetteer.geocode("Secunderabad")
+        assert loaded.geocode("508001") == gazetteer.geocode("508001")
+    
+    def test_lookups_are_fast(self, gazetteer):
+        start = time.perf_counter()
+        for _ in range(1000):
+            gazetteer.geocode("500072")
+            gazetteer.geocode("Nalgonda")
+        assert (time.perf_counter() - start) / 2000 < 1e-4
+    
+    def test_matcher_uses_gazetteer_before_network(self, gazetteer, monkeypatch):
+        matcher = FacilityMatcher(use_cache=False, gazetteer=gazetteer)
+        
+        def no_network(location):
+            raise AssertionError("Nominatim should not be called")
+        
+        monkeypatch.setattr(matcher, "_geocode_location", no_network)
+        assert matcher.geocode_location("Sikandrabad") == (17.4399, 78.4983)
+        coordinates, report = matcher.geocode_batch(["500003", "Nalgonda", "nalgonda"], rate=0)
+        assert report["local"] == 2 and coordinates[1] == coordinates[2]
@@ -0,0 +1,112 @@
+"""
+Test suite for idempotent request handling
+"""
+import asyncio
+import time
+
+import pytest
+from utils.idempotency import IdempotencyStore, IdempotencyConflict, request_fingerprint
+
+
+class Triage:
+    def __init__(self, delay: float = 0.05, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+    
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("LLM unavailable")
+        return {"urgency_level": 6, "call": self.calls}
+
+
+class TestIdempotencyStore:
+    """Test cases for retries, concurrent duplicates, conflicts and expiry"""
+    
+    def test_fingerprint(self):
+        assert request_fingerprint(b"audio", "hi", None) == request_fingerprint(b"audio", "hi", None)
+        assert request_fingerprint(b"audio", "hi") != request_fingerprint(b"audio", "bn")
+        # Parts are length-prefixed, so boundaries matter
+        assert request_fingerprint("ab", "c") != request_fingerprint("a", "bc")
+    
+    def test_retry_gets_stored_result(self):
+        store = IdempotencyStore()
+        triage = Triage()
+        
+        async def run():
+            first = await store.run("triage/text:r1", "f", triage)
+            second = await store.run("triage/text:r1", "f", triage)
+            return first, second
+        
+        (first, replayed_first), (second, replayed_second) = asyncio.run(run())
+        assert triage.calls == 1
+        assert first == second and not replayed_first and replayed_second
+        assert store.get_stats()["replayed"] == 1
+    
+    def test_concurrent_duplicates_attach(self):
+        store = IdempotencyStore()
+        triage = Triage()
+        
+        async def run():
+            return await asyncio.gather(*[store.run("r1", "f", triage) for _ in range(3)])
+        
+        results = asyncio.run(run())
+        assert triage.calls == 1
+        assert [replayed for _, replayed in results] == [False, True, True]
+        assert store.get_stats()["attached"] == 2
+    
+    def test_different_ids_run_separately(self):
+        store = IdempotencyStore()
+        triage = Triage(delay=0)
+        
+        async def run():
+            await store.run("r1", "f", triage)
+            await store.run("r2", "f", triage)
+        
+        asyncio.run(run())
+        assert triage.calls == 2
+    
+    def test_reused_id_with_different_payload(self):
+        store = IdempotencyStore()
+        
+        async def run():
+            await store.run("r1", "f1", Triage(delay=0))
+            await store.run("r1", "f2", Triage(delay=0))
+        
+        with pytest.raises(IdempotencyConflict):
+            asyncio.run(run())
+        assert store.get_stats()["conflicts"] == 1
+    
+    def test_failures_are_not_stored(self):
+        store = IdempotencyStore()
+        failing = Triage(fail=True)
+        
+        async def run():
+            outcomes = await asyncio.gather(*[store.run("r1", "f", failing) for _ in range(2)],
+                                            return_exceptions=True)
+            retried = await store.run("r1", "f", Triage(delay=0))
+            return outcomes, retried
+        
+        outcomes, (retried, replayed) = asyncio.run(run())
+        # The attached duplicate sees the same error; a later retry runs again
+        assert all(isinstance(outcome, RuntimeError) for outcome in outcomes)
+        assert failing.calls == 1
+        assert retried["call"] == 1 and not replayed
+    
+    def test_expiry_and_bound(self):
+        store = IdempotencyStore(ttl_seconds=0.05, max_entries=2)
+        triage = Triage(delay=0)
+        
+        async def run():
+            for key in ("r1", "r2", "r3"):
+                await store.run(key, "f", triage)
+            assert len(store) == 2
+            time.sleep(0.1)
+            await store.run("r3", "f", triage)
+        
+        asyncio.run(run())
+        stats = store.get_stats()
+        assert stats["evictions"] == 1 and stats["expired"] >= 1
+        assert triage.calls == 4
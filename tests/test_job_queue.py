@@ -0,0 +1,237 @@
+"""
+Test suite for the asynchronous job queue and triage job handlers
+"""
+import time
+from types import SimpleNamespace
+
+import pytest
+from utils import job_queue
+from utils.job_queue import JobStore, JobWorkerPool, JobConflict, check_webhook_target, webhook_signature
+from utils.triage_jobs import build_job_handlers
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    yield store
+    store.close()
+
+
+def wait_for(store, job_id, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = store.get(job_id)
+        if job["status"] in ("succeeded", "failed"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+class TestJobStore:
+    """Test cases for submitting, claiming and finishing jobs"""
+    
+    def test_submit_and_get(self, store):
+        job, created = store.submit("triage_text", {"symptoms": "fever"})
+        assert created and job["status"] == "queued" and job["result"] is None
+        assert store.get(job["job_id"])["kind"] == "triage_text"
+        assert store.get("missing") is None
+        assert store.counts()["queued"] == 1
+    
+    def test_claims_by_priority_then_age(self, store):
+        routine, _ = store.submit("triage_text", {"symptoms": "cough"}, priority_class="routine")
+        emergency, _ = store.submit("triage_text", {"symptoms": "chest pain"}, priority_class="emergency")
+        claimed = store.claim("w1", ["triage_text"])
+        assert claimed["job_id"] == emergency["job_id"]
+        assert claimed["payload"] == {"symptoms": "chest pain"}
+        assert store.claim("w1", ["triage_text"])["job_id"] == routine["job_id"]
+        assert store.claim("w1", ["triage_text"]) is None
+    
+    def test_claims_only_known_kinds(self, store):
+        store.submit("triage_voice", {}, audio=b"RIFF")
+        assert store.claim("w1", ["triage_text"]) is None
+        assert store.claim("w1", ["triage_voice"])["audio"] == b"RIFF"
+    
+    def test_request_key(self, store):
+        first, created = store.submit("triage_text", {"symptoms": "fever"}, request_key="k1", fingerprint="a")
+        again, created_again = store.submit("triage_text", {"symptoms": "fever"}, request_key="k1", fingerprint="a")
+        assert created and not created_again and again["job_id"] == first["job_id"]
+        with pytest.raises(JobConflict):
+            store.submit("triage_text", {"symptoms": "cough"}, request_key="k1", fingerprint="b")
+    
+    def test_progress_and_finish(self, store):
+        job, _ = store.submit("triage_voice", {}, audio=b"audio")
+        store.claim("w1", ["triage_voice"])
+        store.progress(job["job_id"], "triage", {"voice_result": {"transcribed_text": "bukhar"}})
+        running = store.get(job["job_id"])
+        assert running["status"] == "running" and running["stage"] == "triage"
+        assert running["partial"]["voice_result"]["transcribed_text"] == "bukhar"
+        store.finish(job["job_id"], result={"urgency": 4})
+        done = store.get(job["job_id"])
+        assert done["status"] == "succeeded" and done["result"] == {"urgency": 4} and done["stage"] is None
+    
+    def test_expired_lease_is_reclaimed_then_failed(self, store):
+        job, _ = store.submit("triage_text", {"symptoms": "fever"})
+        assert store.claim("w1", ["triage_text"], lease_seconds=0.05, max_attempts=2)
+        assert store.claim("w2", ["triage_text"], lease_seconds=0.05, max_attempts=2) is None
+        time.sleep(0.1)
+        reclaimed = store.claim("w2", ["triage_text"], lease_seconds=0.05, max_attempts=2)
+        assert reclaimed["worker"] == "w2" and reclaimed["attempts"] == 2
+        time.sleep(0.1)
+        assert store.claim("w3", ["triage_text"], lease_seconds=0.05, max_attempts=2) is None
+        failed = store.get(job["job_id"])
+        assert failed["status"] == "failed" and "Worker stopped" in failed["error"]
+    
+    def test_finish_requires_the_lease_owner(self, store):
+        job, _ = store.submit("triage_text", {"symptoms": "fever"})
+        store.claim("w1", ["triage_text"], lease_seconds=0.05)
+        time.sleep(0.1)
+        store.claim("w2", ["triage_text"], lease_seconds=0.05)
+        assert not store.finish(job["job_id"], result={"from": "w1"}, worker="w1")
+        assert store.get(job["job_id"])["status"] == "running"
+        assert store.finish(job["job_id"], result={"from": "w2"}, worker="w2")
+        assert store.get(job["job_id"])["result"] == {"from": "w2"}
+    
+    def test_purge(self, store):
+        job, _ = store.submit("triage_text", {"symptoms": "fever"})
+        store.submit("triage_text", {"symptoms": "cough"})
+        store.finish(job["job_id"], result={})
+        assert store.purge(-1) == 1
+        assert store.counts()["queued"] == 1
+
+
+class TestJobWorkerPool:
+    """Test cases for running jobs and delivering webhooks"""
+    
+    def test_runs_jobs_with_partial_results(self, store):
+        def handler(job, progress):
+            progress("halfway", {"seen": job["payload"]["symptoms"]})
+            return {"done": True}
+        
+        pool = JobWorkerPool(store, {"triage_text": handler}, workers=2, poll_interval=0.05)
+        pool.start()
+        try:
+            job, _ = store.submit("triage_text", {"symptoms": "fever"})
+            pool.notify()
+            done = wait_for(store, job["job_id"])
+        finally:
+            pool.stop()
+        assert done["status"] == "succeeded" and done["result"] == {"done": True}
+        assert done["partial"] == {"seen": "fever"}
+        assert pool.get_stats()["succeeded"] == 1
+    
+    def test_handler_errors_fail_the_job(self, store):
+        def handler(job, progress):
+            raise ValueError("No speech detected in audio")
+        
+        pool = JobWorkerPool(store, {"triage_voice": handler}, workers=1)
+        job, _ = store.submit("triage_voice", {}, audio=b"x")
+        pool.run_job(store.claim("w1", ["triage_voice"]))
+        failed = store.get(job["job_id"])
+        assert failed["status"] == "failed" and failed["error"] == "No speech detected in audio"
+        assert pool.get_stats()["failed"] == 1
+    
+    def test_purges_finished_jobs_on_a_schedule(self, store):
+        old, _ = store.submit("triage_text", {"symptoms": "fever"})
+        store.finish(old["job_id"], result={})
+        pool = JobWorkerPool(store, {}, workers=0, retention_seconds=0.05, purge_interval=0.05)
+        time.sleep(0.1)
+        pool.start()
+        try:
+            deadline = time.time() + 2
+            while store.get(old["job_id"]) is not None and time.time() < deadline:
+                time.sleep(0.02)
+        finally:
+            pool.stop()
+        assert store.get(old["job_id"]) is None
+        assert pool.get_stats()["purged"] == 1
+    
+    def test_webhook_is_signed_and_retried(self, store, monkeypatch):
+        posts = []
+        
+        def post(url, data, headers, timeout, **kwargs):
+            posts.append((url, data, headers))
+            return SimpleNamespace(status_code=500 if len(posts) == 1 else 204)
+        
+        monkeypatch.setattr(job_queue.requests, "post", post)
+        monkeypatch.setattr(job_queue.time, "sleep", lambda seconds: None)
+        pool = JobWorkerPool(store, {"triage_text": lambda job, progress: {"ok": 1}}, webhook_secret="s3cret",
+                             webhook_hosts=["clinic.example"])
+        job, _ = store.submit("triage_text", {"symptoms": "fever"}, webhook_url="https://clinic.example/hook")
+        pool.run_job(store.claim("w1", ["triage_text"]))
+        assert pool.deliver_webhook(job["job_id"])
+        assert len(posts) == 2
+        url, body, headers = posts[-1]
+        assert url == "https://clinic.example/hook"
+        assert headers["X-Arovia-Signature"] == webhook_signature("s3cret", body)
+        assert b'"succeeded"' in body
+        assert store.get(job["job_id"])["webhook_status"] == "delivered"
+    
+    def test_webhook_targets(self, monkeypatch):
+        def resolve(address):
+            return lambda host, port, proto=0: [(None, None, None, "", (address, port or 443))]
+        
+        monkeypatch.setattr(job_queue.socket, "getaddrinfo", resolve("93.184.216.34"))
+        check_webhook_target("https://clinic.example/hook")
+        for address in ("127.0.0.1", "10.0.0.5", "169.254.169.254", "::1"):
+            monkeypatch.setattr(job_queue.socket, "getaddrinfo", resolve(address))
+            with pytest.raises(ValueError):
+                check_webhook_target("https://clinic.example/hook")
+        with pytest.raises(ValueError):
+            check_webhook_target("ftp://clinic.example/hook")
+        check_webhook_target("http://emr.local/hook", allowed_hosts=["emr.local"])
+        with pytest.raises(ValueError):
+            check_webhook_target("https://clinic.example/hook", allowed_hosts=["emr.local"])
+
+
+class TestTriageJobHandlers:
+    """Test cases for the text and voice triage handlers"""
+    
+    def agent(self):
+        return SimpleNamespace(
+            analyze_symptoms_from_text=lambda text: ({"chief_complaint": text}, 0.1),
+            generate_referral_note=lambda result, location, patient_id, coordinates: SimpleNamespace(
+                recommended_facilities=[{"name": f"PHC {location}"}]
+            )
+        )
+    
+    def test_text_triage_with_facilities(self):
+        saved, stages = [], []
+        handlers = build_job_handlers(self.agent(), save_record=lambda *args, **kwargs: saved.append(kwargs) or "rec-1")
+        assert set(handlers) == {"triage_text"}
+        result = handlers["triage_text"](
+            {"payload": {"symptoms": "fever", "location": "Nagpur"}},
+            lambda stage, partial=None: stages.append((stage, partial))
+        )
+        assert result["recommended_facilities"] == [{"name": "PHC Nagpur"}]
+        assert result["record_id"] == "rec-1" and saved[0]["location"] == "Nagpur"
+        # The assessment is published before the facility search
+        assert stages[-1] == ("facilities", {"triage_result": {"chief_complaint": "fever"}})
+    
+    def test_text_triage_passes_coordinates_as_pair(self):
+        received = []
+        agent = self.agent()
+        agent.generate_referral_note = lambda result, location, patient_id, coordinates: (
+            received.append(coordinates) or SimpleNamespace(recommended_facilities=[])
+        )
+        handlers = build_job_handlers(agent)
+        handlers["triage_text"](
+            {"payload": {"symptoms": "fever", "location": "Nagpur", "coordinates": [21.15, 79.09]}},
+            lambda stage, partial=None: None
+        )
+        assert received == [(21.15, 79.09)]
+    
+    def test_voice_triage_publishes_transcript(self, monkeypatch):
+        from utils import triage_jobs
+        monkeypatch.setattr(triage_jobs, "decode_audio", lambda data: data)
+        whisper = SimpleNamespace(transcribe_audio=lambda audio, language, session_id: SimpleNamespace(
+            transcribed_text="sir dard", language=language, confidence=0.9, processing_time=1.0,
+            language_probabilities={"hi": 0.9}
+        ))
+        stages = []
+        handlers = build_job_handlers(self.agent(), whisper)
+        result = handlers["triage_voice"](
+            {"payload": {"language": "hi"}, "audio": b"pcm"},
+            lambda stage, partial=None: stages.append((stage, partial))
+        )
+        assert result["triage_result"] == {"chief_complaint": "sir dard"}
+        assert stages[-1][0] == "triage" and stages[-1][1]["voice_result"]["transcribed_text"] == "sir dard"
@@ -0,0 +1,75 @@
+"""
+Test suite for the language identification pre-pass
+"""
+import numpy as np
+import pytest
+from utils.language_id import (LanguageIdentifier, normalize_language, decoding_language, LANGUAGE_PROMPTS)
+from utils.whisper_client import WhisperClient
+from utils.long_audio import SAMPLE_RATE
+
+
+def recording(silence_seconds: float = 2.0, speech_seconds: float = 8.0) -> np.ndarray:
+    t = np.arange(int(speech_seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    speech = (0.3 * np.sin(2 * np.pi * 200 * t)).astype(np.float32)
+    return np.concatenate([np.zeros(int(silence_seconds * SAMPLE_RATE), dtype=np.float32), speech])
+
+
+class FakeDetector:
+    def __init__(self, probabilities):
+        self.probabilities = probabilities
+        self.snippets = []
+    
+    def __call__(self, snippet):
+        self.snippets.append(snippet)
+        return dict(self.probabilities)
+
+
+class TestLanguageIdentifier:
+    """Test cases for language choice and the session cache"""
+    
+    def test_detects_on_short_speech_snippet(self):
+        detector = FakeDetector({"hi": 0.5, "ur": 0.2, "en": 0.1, "fr": 0.2})
+        choice = LanguageIdentifier(detector, seconds=3.0).choose(recording())
+        assert choice.language == "hi" and choice.source == "detected"
+        assert choice.prompt == LANGUAGE_PROMPTS["hi"]
+        # Unsupported languages are dropped and the rest renormalized
+        assert [code for code, _ in choice.distribution] == ["hi", "ur", "en"]
+        assert sum(p for _, p in choice.distribution) == pytest.approx(1.0)
+        # Only 3 s, starting at the speech (less 0.2 s padding) rather than the leading silence
+        snippet = detector.snippets[0]
+        assert snippet.size == 3 * SAMPLE_RATE
+        assert np.abs(snippet[int(0.25 * SAMPLE_RATE):int(0.35 * SAMPLE_RATE)]).max() > 0.1
+    
+    def test_session_reuses_confident_detection(self):
+        detector = FakeDetector({"ta": 0.9, "ml": 0.1})
+        identifier = LanguageIdentifier(detector)
+        identifier.choose(recording(), session_id="kiosk-1")
+        second = identifier.choose(recording(), session_id="kiosk-1")
+        assert second.language == "ta" and second.source == "session"
+        assert len(detector.snippets) == 1
+        assert identifier.get_stats() == {"sessions": 1, "detections": 1, "session_hits": 1, "hinted": 0}
+    
+    def test_uncertain_detection_is_not_cached(self):
+        detector = FakeDetector({"hi": 0.35, "ur": 0.33, "mr": 0.32})
+        identifier = LanguageIdentifier(detector, min_confidence=0.5)
+        assert identifier.choose(recording(), session_id="s").language == "hi"
+        identifier.choose(recording(), session_id="s")
+        assert len(detector.snippets) == 2
+    
+    def test_requested_language_skips_detection(self):
+        detector = FakeDetector({"en": 1.0})
+        identifier = LanguageIdentifier(detector)
+        choice = identifier.choose(recording(), language="or", session_id="s")
+        assert choice.language == "bn" and choice.source == "request"
+        assert identifier.choose(recording(), session_id="s").source == "session"
+        assert detector.snippets == []
+    
+    def test_normalize_language(self):
+        supported = WhisperClient.SUPPORTED_LANGUAGES
+        assert normalize_language("Hindi", supported) == "hi"
+        assert normalize_language("te", supported) == "te"
+        assert normalize_language("auto", supported) is None
+        assert normalize_language(None, supported) is None
+        with pytest.raises(ValueError):
+            normalize_language("klingon", supported)
+        assert decoding_language("mai") == "hi" and decoding_language("kn") == "kn"
@@ -0,0 +1,109 @@
+"""
+Test suite for the multi-provider LLM router
+"""
+import time
+import pytest
+from agents.groq_client import LLMRouter, LocalBackend, CircuitBreaker
+from agents.rate_governor import RateLimitQueueTimeout
+
+
+def slow_responder(delay, content="slow"):
+    def respond(prompt):
+        time.sleep(delay)
+        return content
+    return respond
+
+
+def failing_responder(prompt):
+    raise RuntimeError("provider unavailable")
+
+
+class TestLLMRouter:
+    """Test cases for routing, failover and hedging"""
+    
+    def test_primary_backend_used(self):
+        router = LLMRouter([
+            LocalBackend(lambda p: "primary", name="primary"),
+            LocalBackend(lambda p: "secondary", name="secondary")
+        ])
+        response = router.invoke("hello")
+        assert response.content == "primary"
+        assert response.backend == "primary"
+    
+    def test_failover_on_error(self):
+        router = LLMRouter([
+            LocalBackend(failing_responder, name="primary"),
+            LocalBackend(lambda p: "secondary", name="secondary")
+        ])
+        response = router.invoke("hello")
+        assert response.content == "secondary"
+        assert router.get_stats()["primary"]["failures"] == 1
+    
+    def test_hedged_request_bounds_latency(self):
+        router = LLMRouter(
+            [
+                LocalBackend(slow_responder(2.0), name="primary"),
+                LocalBackend(lambda p: "fast", name="secondary")
+            ],
+            min_hedge_delay=0.05,
+            default_hedge_delay=0.1
+        )
+        start_time = time.time()
+        response = router.invoke("hello")
+        assert response.content == "fast"
+        assert time.time() - start_time < 1.0
+        assert router.get_stats()["secondary"]["hedged"] == 1
+    
+    def test_all_backends_fail(self):
+        router = LLMRouter([LocalBackend(failing_responder, name="only")])
+        with pytest.raises(RuntimeError):
+            router.invoke("hello")
+    
+    def test_open_circuit_is_skipped(self):
+        router = LLMRouter([
+            LocalBackend(lambda p: "primary", name="primary"),
+            LocalBackend(lambda p: "secondary", name="secondary")
+        ])
+        for _ in range(router.breakers["primary"].failure_threshold):
+            router.breakers["primary"].record_failure()
+        assert router.invoke("hello").content == "secondary"
+    
+    def test_unused_backend_keeps_half_open_probe(self):
+        primary_ok = [True]
+        
+        def primary(prompt):
+            if not primary_ok[0]:
+                raise RuntimeError("provider unavailable")
+            return "primary"
+        
+        router = LLMRouter([LocalBackend(primary, name="primary"), LocalBackend(lambda p: "secondary", name="secondary")])
+        router.breakers["secondary"].recovery_timeout = 0.05
+        for _ in range(router.breakers["secondary"].failure_threshold):
+            router.breakers["secondary"].record_failure()
+        time.sleep(0.06)
+        # Only the primary is called, so the secondary's probe stays unclaimed
+        assert router.invoke("hello").content == "primary"
+        primary_ok[0] = False
+        assert router.invoke("hello").content == "secondary"
+        assert router.breakers["secondary"].state == CircuitBreaker.CLOSED
+    
+    def test_rate_limit_queue_timeout_is_not_a_provider_failure(self):
+        def queued_out(prompt):
+            raise RateLimitQueueTimeout("Rate-limit queue wait exceeded")
+        
+        router = LLMRouter([LocalBackend(queued_out, name="primary"), LocalBackend(lambda p: "secondary", name="secondary")])
+        for _ in range(router.breakers["primary"].failure_threshold + 1):
+            assert router.invoke("hello").content == "secondary"
+        assert router.get_stats()["primary"]["failures"] == 0
+        assert router.breakers["primary"].state == CircuitBreaker.CLOSED
+
+
+def test_circuit_breaker_half_open_probe():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.allow_request() is False
+    time.sleep(0.06)
+    assert breaker.allow_request() is True
+    assert breaker.allow_request() is False
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,88 @@
+"""
+Test suite for segmented long-audio transcription
+"""
+import time
+import threading
+import numpy as np
+import pytest
+from utils.long_audio import speech_segments, LongAudioTranscriber, confidence_from_logprob, SAMPLE_RATE
+
+
+def recording(pattern):
+    """Concatenate (seconds, is_speech) parts: tone bursts for speech, faint noise for silence"""
+    rng = np.random.default_rng(0)
+    parts = []
+    for seconds, speech in pattern:
+        n = int(seconds * SAMPLE_RATE)
+        noise = 0.001 * rng.standard_normal(n)
+        if speech:
+            t = np.arange(n) / SAMPLE_RATE
+            noise += 0.3 * np.sin(2 * np.pi * 220 * t)
+        parts.append(noise.astype(np.float32))
+    return np.concatenate(parts)
+
+
+def fake_decoder(calls, delay=None):
+    def decode(segments, language, prompt):
+        calls.append(len(segments))
+        if delay:
+            time.sleep(delay())
+        return [{"text": f"{len(s) / SAMPLE_RATE:.0f}s", "avg_logprob": -0.2, "no_speech_prob": 0.01,
+                 "language": "hi"} for s in segments]
+    return decode
+
+
+class TestSpeechSegments:
+    """Test cases for the energy voice activity detector"""
+    
+    def test_cuts_fall_in_silences(self):
+        audio = recording([(1, False), (5, True), (3, False), (4, True), (0.1, False), (2, True), (2, False)])
+        segments = speech_segments(audio)
+        assert len(segments) == 2
+        (s1, e1), (s2, e2) = segments
+        assert s1 / SAMPLE_RATE == pytest.approx(0.8, abs=0.1) and e1 / SAMPLE_RATE == pytest.approx(6.2, abs=0.1)
+        # The 0.1 s pause is bridged, the 3 s pause is not decoded
+        assert s2 / SAMPLE_RATE == pytest.approx(8.8, abs=0.1) and e2 / SAMPLE_RATE == pytest.approx(15.3, abs=0.1)
+    
+    def test_short_pauses_are_packed_up_to_the_limit(self):
+        audio = recording([(10, True), (1, False)] * 6)
+        segments = speech_segments(audio, max_segment_seconds=28)
+        assert len(segments) == 3
+        assert all((end - start) / SAMPLE_RATE <= 28.5 for start, end in segments)
+    
+    def test_unbroken_speech_is_split_and_silence_is_empty(self):
+        segments = speech_segments(recording([(70, True)]))
+        assert len(segments) == 3 and all((e - s) / SAMPLE_RATE <= 28.5 for s, e in segments)
+        assert speech_segments(np.zeros(SAMPLE_RATE * 5, dtype=np.float32)) == []
+
+
+class TestLongAudioTranscriber:
+    """Test cases for parallel decoding and stitching"""
+    
+    def test_parallel_batches_are_stitched_in_order(self):
+        calls, rng, lock = [], np.random.default_rng(1), threading.Lock()
+        def delay():
+            with lock:
+                return float(rng.uniform(0, 0.02))
+        audio = recording([(3, True), (3, False), (6, True), (3, False), (9, True), (3, False), (12, True)])
+        result = LongAudioTranscriber(fake_decoder(calls, delay), workers=4, batch_size=8).transcribe(audio)
+        assert result["text"] == "3s 6s 9s 12s"
+        assert calls == [1, 1, 1, 1]
+        assert [s["start"] for s in result["segments"]] == sorted(s["start"] for s in result["segments"])
+        assert result["language"] == "hi"
+        assert result["confidence"] == pytest.approx(confidence_from_logprob(-0.2))
+    
+    def test_batches_fill_before_adding_workers(self):
+        calls = []
+        audio = recording([(2, True), (3, False)] * 10)
+        LongAudioTranscriber(fake_decoder(calls), workers=2, batch_size=4).transcribe(audio)
+        assert calls == [4, 4, 2]
+    
+    def test_no_speech_segments_are_dropped(self):
+        def decode(segments, language, prompt):
+            return [{"text": "noise", "avg_logprob": -1.5, "no_speech_prob": 0.9},
+                    {"text": "pet dard", "avg_logprob": 0.0, "no_speech_prob": 0.0}][:len(segments)]
+        audio = recording([(2, True), (3, False), (2, True)])
+        result = LongAudioTranscriber(decode, batch_size=2).transcribe(audio, language="hi")
+        assert result["text"] == "pet dard" and len(result["segments"]) == 1
+        assert result["confidence"] == 0.5 and result["language"] == "hi"
@@ -0,0 +1,88 @@
+"""
+Test suite for the Groq rate-limit governor
+"""
+import time
+import threading
+import pytest
+from agents.rate_governor import (RateLimitGovernor, RateLimitQueueTimeout, parse_duration, model_limits,
+                                  PRIORITY_EMERGENCY, PRIORITY_ROUTINE, PRIORITY_BACKGROUND)
+
+
+def test_parse_duration():
+    assert parse_duration("7.66s") == pytest.approx(7.66)
+    assert parse_duration("2m59.56s") == pytest.approx(179.56)
+    assert parse_duration("120ms") == pytest.approx(0.12)
+    assert parse_duration("3") == 3.0
+    assert parse_duration(None) is None
+
+
+class TestRateLimitGovernor:
+    """Test cases for token buckets and priority admission"""
+    
+    def test_admits_within_budget(self):
+        governor = RateLimitGovernor("test", requests_per_minute=60, tokens_per_minute=10000)
+        assert governor.acquire(100) < 0.05
+        assert governor.get_stats()["queue_wait"]["routine"]["admitted"] == 1
+    
+    def test_emergency_jumps_queue(self):
+        # One request per second, bucket starts with a single request
+        governor = RateLimitGovernor("test", requests_per_minute=60, tokens_per_minute=100000)
+        governor.requests.tokens = 0
+        order = []
+        
+        def worker(priority, label):
+            governor.acquire(10, priority)
+            order.append(label)
+        
+        threads = [threading.Thread(target=worker, args=(PRIORITY_BACKGROUND, "relevance")),
+                   threading.Thread(target=worker, args=(PRIORITY_ROUTINE, "routine"))]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        emergency = threading.Thread(target=worker, args=(PRIORITY_EMERGENCY, "emergency"))
+        emergency.start()
+        for thread in threads + [emergency]:
+            thread.join()
+        
+        assert order == ["emergency", "routine", "relevance"]
+        stats = governor.get_stats()["queue_wait"]
+        assert stats["background"]["max_wait"] > stats["emergency"]["max_wait"]
+    
+    def test_headers_shrink_token_bucket(self):
+        governor = RateLimitGovernor("test", tokens_per_minute=6000)
+        governor.update_from_headers({
+            "x-ratelimit-limit-tokens": "12000",
+            "x-ratelimit-remaining-tokens": "50",
+            "x-ratelimit-reset-tokens": "7.66s"
+        })
+        assert governor.tokens.capacity == 12000
+        assert governor.tokens.tokens <= 51
+    
+    def test_first_headers_replace_the_seeded_budget(self):
+        governor = RateLimitGovernor("test", tokens_per_minute=6000)
+        governor.update_from_headers({"x-ratelimit-limit-tokens": "300000", "x-ratelimit-remaining-tokens": "299000"})
+        assert governor.tokens.tokens >= 299000
+        assert governor.get_stats()["synced"] is True
+        # Later headers only ever lower the local level
+        governor.acquire(100000)
+        governor.update_from_headers({"x-ratelimit-limit-tokens": "300000", "x-ratelimit-remaining-tokens": "299000"})
+        assert governor.tokens.tokens < 210000
+    
+    def test_model_limits(self):
+        assert model_limits("llama-3.3-70b-versatile") == (30, 12000)
+        assert model_limits("unknown-model") == (30, 6000)
+    
+    def test_rate_limited_pauses_admission(self):
+        governor = RateLimitGovernor("test", max_wait=0.2)
+        governor.on_rate_limited({"retry-after": "5"})
+        with pytest.raises(TimeoutError):
+            governor.acquire(10)
+        assert governor.get_stats()["rate_limited"] == 1
+    
+    def test_per_request_max_wait(self):
+        governor = RateLimitGovernor("test", max_wait=60)
+        governor.on_rate_limited({"retry-after": "5"})
+        start = time.monotonic()
+        with pytest.raises(RateLimitQueueTimeout):
+            governor.acquire(10, max_wait=0.1)
+        assert time.monotonic() - start < 1
@@ -0,0 +1,88 @@
+"""
+Test suite for the local medical-relevance classifier
+"""
+import json
+import pytest
+from agents.relevance_classifier import RelevanceClassifier, load_training_data, load_labeled_examples
+from agents.groq_client import LLMRouter, LocalBackend, MedicalRelevanceAgent
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    texts, labels = load_training_data()
+    return RelevanceClassifier().fit(texts, labels)
+
+
+class TestRelevanceClassifier:
+    """Test cases for the hashed n-gram relevance model"""
+    
+    def test_obvious_cases(self, classifier):
+        assert classifier.predict_proba("fever and cough for three days") > 0.5
+        assert classifier.predict_proba("what is the weather today") < 0.5
+    
+    @pytest.mark.parametrize("text", ["I want to kill myself", "sugar level is very high today"])
+    def test_held_out_red_flags_are_relevant(self, text):
+        texts, labels = load_training_data()
+        held_out = RelevanceClassifier().fit(
+            [t for t in texts if t != text], [l for t, l in zip(texts, labels) if t != text]
+        )
+        result = held_out.classify(text)
+        assert result["is_relevant"] and not result["uncertain"]
+    
+    def test_no_confident_false_negatives_in_cross_validation(self):
+        texts, labels = load_training_data()
+        folds = 5
+        for k in range(folds):
+            train = [i for i in range(len(texts)) if i % folds != k]
+            model = RelevanceClassifier().fit([texts[i] for i in train], [labels[i] for i in train])
+            for i in range(k, len(texts), folds):
+                result = model.classify(texts[i])
+                assert result["is_relevant"] or result["uncertain"] or not labels[i], texts[i]
+    
+    def test_save_and_load(self, classifier, tmp_path):
+        path = str(tmp_path / "relevance.npz")
+        classifier.save(path)
+        loaded = RelevanceClassifier.load(path)
+        text = "my stomach hurts"
+        assert loaded.predict_proba(text) == pytest.approx(classifier.predict_proba(text), abs=1e-6)
+    
+    def test_golden_dataset_labels(self, tmp_path):
+        path = tmp_path / "golden.json"
+        path.write_text(json.dumps([
+            {"input": "I think I broke my arm.", "expected_urgency": 8, "expected_specialty": "Orthopedics"},
+            {"input": "Im poor", "expected_urgency": 0, "expected_specialty": "No"}
+        ]))
+        texts, labels = load_labeled_examples(str(path))
+        assert labels == [True, False]
+
+
+class TestRelevanceAgentRouting:
+    """Test cases for local-first relevance checking"""
+    
+    def make_agent(self, classifier):
+        class FakeGroqClient:
+            llm_calls = 0
+        
+        client = FakeGroqClient()
+        
+        def respond(prompt):
+            client.llm_calls += 1
+            return '{"is_relevant": true, "reason": "llm"}'
+        
+        client.small_llm = client.llm = LLMRouter([LocalBackend(respond)])
+        return MedicalRelevanceAgent(client, classifier=classifier), client
+    
+    def test_confident_answer_skips_llm(self, classifier, monkeypatch):
+        agent, client = self.make_agent(classifier)
+        monkeypatch.setattr(classifier, "uncertain_band", (0.0, 0.0))
+        result = agent.check_relevance("what is the weather today")
+        assert result["source"] == "local"
+        assert client.llm_calls == 0
+    
+    def test_uncertain_answer_uses_llm(self, classifier, monkeypatch):
+        agent, client = self.make_agent(classifier)
+        monkeypatch.setattr(classifier, "uncertain_band", (0.0, 1.0))
+        result = agent.check_relevance("something ambiguous")
+        assert result["source"] == "llm"
+        assert client.llm_calls == 1
+        assert agent.get_stats()["llm"] == 1
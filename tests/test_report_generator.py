@@ -0,0 +1,86 @@
+"""
+Test suite for referral PDF rendering
+"""
+import re
+from models.schemas import ReferralNote, TriageResult, Symptom, FacilityInfo
+from utils.report_generator import ReferralReportGenerator, FontRegistry, get_font_registry, get_report_generator
+from utils.triage_store import build_record, record_to_referral_note
+
+
+def make_note(complaint: str = "Fever and cough for three days") -> ReferralNote:
+    triage = TriageResult(
+        chief_complaint=complaint,
+        symptoms=[Symptom(name="fever", severity="moderate", duration="3 days")],
+        urgency_score=5,
+        recommended_specialty="General Medicine",
+        triage_category="urgent",
+        emergency_detected=False,
+        action_required="Visit a clinic within 24 hours"
+    )
+    facility = FacilityInfo(name="PHC Ramnagar", address="Ramnagar, Karnataka", distance_km=2.4,
+                            specialty="clinic", services=["General"], map_link="https://maps.example/1")
+    return ReferralNote(patient_id="P001", triage_result=triage, recommended_facilities=[facility])
+
+
+def page_count(pdf_bytes: bytes) -> int:
+    return len(re.findall(rb"/Type /Page\b", pdf_bytes))
+
+
+class TestReferralReportGenerator:
+    """Test cases for single and batch rendering"""
+    
+    def test_render_single_note(self):
+        pdf_bytes = ReferralReportGenerator().render(make_note())
+        assert pdf_bytes.startswith(b"%PDF")
+        assert page_count(pdf_bytes) == 1
+    
+    def test_batch_renders_one_page_run_per_note(self):
+        notes = [make_note(f"Complaint {i}") for i in range(5)]
+        assert page_count(ReferralReportGenerator().render_batch(notes)) == 5
+    
+    def test_documents_do_not_share_subset_state(self):
+        fonts = get_font_registry()
+        before = {key: len(font.subset) for key, font in fonts._fonts.items()}
+        ReferralReportGenerator(fonts).render(make_note("Unusual glyphs: ÆØÅ"))
+        assert {key: len(font.subset) for key, font in fonts._fonts.items()} == before
+    
+    def test_core_font_fallback_replaces_unsupported_text(self):
+        fonts = FontRegistry(search_paths=["/nonexistent"])
+        assert fonts.family == "Helvetica"
+        assert fonts.text("दर्द pain") == "???? pain"
+        assert ReferralReportGenerator(fonts).render(make_note("दर्द pain")).startswith(b"%PDF")
+    
+    def test_shared_generator_reuses_line_breaks(self):
+        generator = get_report_generator()
+        assert get_report_generator() is generator
+        generator.render(make_note())
+        cached = dict(generator._wrapped_lines)
+        generator.render(make_note("Headache"))
+        assert generator._wrapped_lines == cached and cached
+    
+    def test_wrap_cache_is_bounded(self):
+        generator = ReferralReportGenerator(wrap_cache_size=2)
+        pdf = generator._new_document()
+        pdf.add_page()
+        pdf.set_font(generator.fonts.family, "", 8)
+        for i in range(5):
+            generator._static_paragraph(pdf, 4.5, f"Boilerplate {i}")
+        assert len(generator._wrapped_lines) == 2
+    
+    def test_falls_back_to_public_add_font(self, monkeypatch):
+        fonts = FontRegistry()
+        
+        def incompatible(pdf):
+            raise AttributeError("TTFFont has no attribute 'subset'")
+        
+        monkeypatch.setattr(fonts, "_install_copies", incompatible)
+        assert ReferralReportGenerator(fonts).render(make_note()).startswith(b"%PDF")
+        assert fonts._copy_fonts is False
+    
+    def test_stored_record_round_trip(self):
+        note = make_note()
+        record = build_record(note.triage_result, "fever", referral_note=note)
+        rebuilt = record_to_referral_note(record)
+        assert rebuilt.triage_result == note.triage_result
+        assert rebuilt.recommended_facilities == note.recommended_facilities
+        assert rebuilt.patient_id == "P001"
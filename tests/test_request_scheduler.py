@@ -0,0 +1,112 @@
+"""
+Test suite for the priority-aware triage scheduler
+"""
+import time
+import asyncio
+import threading
+import pytest
+from utils.request_scheduler import PriorityScheduler, QueueFullError, classify_priority
+
+
+def test_classify_priority():
+    assert classify_priority([{"category": "cardiac", "urgency": "immediate"}]) == "emergency"
+    assert classify_priority([{"category": "trauma", "urgency": "urgent"}]) == "urgent"
+    assert classify_priority([]) == "routine"
+
+
+class TestPriorityScheduler:
+    """Test cases for class-ordered dispatch and admission control"""
+    
+    def test_emergency_dispatched_before_queued_routine(self):
+        scheduler = PriorityScheduler(workers=1)
+        gate = threading.Event()
+        order = []
+        
+        def job(label):
+            if label == "blocker":
+                gate.wait(2)
+            order.append(label)
+            return label
+        
+        async def scenario():
+            blocker = asyncio.ensure_future(scheduler.run("routine", job, "blocker"))
+            await asyncio.sleep(0.05)
+            routine = [asyncio.ensure_future(scheduler.run("routine", job, f"routine-{i}")) for i in range(5)]
+            await asyncio.sleep(0.01)
+            emergency = asyncio.ensure_future(scheduler.run("emergency", job, "emergency"))
+            await asyncio.sleep(0.01)
+            gate.set()
+            return await asyncio.gather(blocker, emergency, *routine)
+        
+        results = asyncio.run(scenario())
+        scheduler.stop()
+        assert results[1] == "emergency"
+        assert order[:2] == ["blocker", "emergency"]
+        stats = scheduler.get_stats()["classes"]
+        assert stats["emergency"]["queue_time"]["count"] == 1
+        assert stats["routine"]["completed"] == 6
+    
+    def test_starved_routine_is_promoted(self):
+        scheduler = PriorityScheduler(workers=1, starvation_timeouts={"routine": 0.05})
+        scheduler._running = True  # admit without dispatching
+        
+        async def scenario():
+            routine = asyncio.ensure_future(scheduler.run("routine", lambda: None))
+            await asyncio.sleep(0.1)
+            urgent = asyncio.ensure_future(scheduler.run("urgent", lambda: None))
+            await asyncio.sleep(0)
+            with scheduler._condition:
+                picked = [scheduler._next_job().priority_class, scheduler._next_job().priority_class]
+            routine.cancel()
+            urgent.cancel()
+            return picked
+        
+        assert asyncio.run(scenario()) == ["routine", "urgent"]
+        assert scheduler.get_stats()["classes"]["routine"]["promoted"] == 1
+    
+    def test_promotion_never_jumps_waiting_emergency(self):
+        scheduler = PriorityScheduler(workers=1, starvation_timeouts={"urgent": 0.05, "routine": 0.05})
+        scheduler._running = True  # admit without dispatching
+        
+        async def scenario():
+            jobs = [asyncio.ensure_future(scheduler.run(name, lambda: None)) for name in ("routine", "urgent")]
+            await asyncio.sleep(0.1)
+            jobs.append(asyncio.ensure_future(scheduler.run("emergency", lambda: None)))
+            await asyncio.sleep(0)
+            with scheduler._condition:
+                picked = [scheduler._next_job().priority_class for _ in range(3)]
+            for job in jobs:
+                job.cancel()
+            return picked
+        
+        assert asyncio.run(scenario()) == ["emergency", "urgent", "routine"]
+    
+    def test_full_queue_rejects_routine_but_not_emergency(self):
+        scheduler = PriorityScheduler(workers=1, max_queue=1)
+        scheduler._running = True  # admit without dispatching
+        
+        async def scenario():
+            first = asyncio.ensure_future(scheduler.run("routine", lambda: None))
+            await asyncio.sleep(0)
+            with pytest.raises(QueueFullError):
+                await scheduler.run("routine", lambda: None)
+            for _ in range(3):
+                asyncio.ensure_future(scheduler.run("emergency", lambda: None))
+            await asyncio.sleep(0)
+            stats = scheduler.get_stats()["classes"]
+            first.cancel()
+            return stats
+        
+        stats = asyncio.run(scenario())
+        assert stats["routine"]["rejected"] == 1
+        assert stats["emergency"]["queued"] == 3
+    
+    def test_errors_propagate_to_caller(self):
+        scheduler = PriorityScheduler(workers=2)
+        
+        def fail():
+            raise ValueError("boom")
+        
+        with pytest.raises(ValueError):
+            asyncio.run(scheduler.run("urgent", fail))
+        scheduler.stop()
@@ -0,0 +1,76 @@
+"""
+Test suite for offline road routing and travel-time ranking
+"""
+import pytest
+from utils.road_router import RoadGraph, RoadRouter, load_osm_xml, highway_speed
+from utils.facility_matcher import FacilityMatcher
+
+# Patient at node 1. The clinic at node 2 is 2 km east across a river with no
+# bridge; the road goes 10 km north, over a bridge and back. The hospital at
+# node 5 is 4 km west on a straight primary road.
+OSM_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<osm version="0.6">
+  <node id="1" lat="17.0000" lon="78.0000"/>
+  <node id="2" lat="17.0000" lon="78.0188"/>
+  <node id="3" lat="17.0900" lon="78.0000"/>
+  <node id="4" lat="17.0900" lon="78.0188"/>
+  <node id="5" lat="17.0000" lon="77.9624"/>
+  <node id="6" lat="17.0450" lon="77.9624"/>
+  <way id="10"><nd ref="1"/><nd ref="3"/><nd ref="4"/><nd ref="2"/><tag k="highway" v="tertiary"/></way>
+  <way id="11"><nd ref="1"/><nd ref="5"/><tag k="highway" v="primary"/></way>
+  <way id="12"><nd ref="6"/><nd ref="5"/><tag k="highway" v="residential"/><tag k="oneway" v="yes"/></way>
+  <way id="13"><nd ref="2"/><nd ref="5"/><tag k="waterway" v="river"/></way>
+</osm>
+"""
+
+
+@pytest.fixture
+def graph(tmp_path):
+    path = tmp_path / "roads.osm"
+    path.write_text(OSM_XML)
+    return load_osm_xml(str(path))
+
+
+def facility(name, lat, lon, distance_km):
+    return {"name": name, "distance_km": distance_km, "coordinates": {"latitude": lat, "longitude": lon}}
+
+
+class TestRoadRouter:
+    """Test cases for CSR graph construction and multi-target search"""
+    
+    def test_osm_extract_to_csr(self, graph):
+        # The river is not a road; two-way roads get an edge in each direction
+        assert graph.node_count == 6
+        assert graph.edge_count == 2 * 3 + 2 * 1 + 1
+        assert highway_speed("primary_link") == 50.0
+        assert highway_speed("secondary", "30") == 30.0
+        assert highway_speed("footway") is None
+    
+    def test_one_search_for_all_targets(self, graph):
+        router = RoadRouter(graph)
+        clinic, hospital, oneway_start = router.travel_times(
+            17.0, 78.0, [(17.0, 78.0188), (17.0, 77.9624), (17.045, 77.9624)]
+        )
+        assert hospital == pytest.approx(4.0 / 50 * 3600, rel=0.02)
+        assert clinic == pytest.approx(22.0 / 30 * 3600, rel=0.02)
+        # Node 6 can only be left, not reached
+        assert oneway_start is None
+    
+    def test_save_and_load(self, graph, tmp_path):
+        path = str(tmp_path / "roads.npz")
+        graph.save(path)
+        loaded = RoadGraph.load(path)
+        assert loaded.node_count == graph.node_count
+        assert RoadRouter(loaded).travel_times(17.0, 78.0, [(17.0, 77.9624)]) == \
+            RoadRouter(graph).travel_times(17.0, 78.0, [(17.0, 77.9624)])
+    
+    def test_ranking_prefers_faster_facility(self, graph):
+        matcher = FacilityMatcher(use_cache=False, road_router=RoadRouter(graph))
+        ranked = matcher.rank_by_travel_time(17.0, 78.0, [
+            facility("Riverside Clinic", 17.0, 78.0188, 2.0),
+            facility("Offshore Clinic", 12.0, 80.0, 3.0),
+            facility("District Hospital", 17.0, 77.9624, 4.0)
+        ])
+        assert [f["name"] for f in ranked] == ["District Hospital", "Riverside Clinic", "Offshore Clinic"]
+        assert ranked[0]["travel_time_min"] == pytest.approx(4.8, abs=0.2)
+        assert ranked[2]["travel_time_min"] is None
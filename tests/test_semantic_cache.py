@@ -0,0 +1,133 @@
+"""
+Test suite for the semantic near-duplicate triage cache
+"""
+import pytest
+from agents import semantic_cache
+from agents.semantic_cache import (
+    SemanticTriageCache, HashingEmbedder, CALIBRATION_PAIRS, calibrate_threshold, clinical_signature
+)
+
+RESULT = {"chief_complaint": "fever and cough", "urgency_score": 5, "triage_category": "standard"}
+
+
+@pytest.fixture
+def cache():
+    # A low fixed threshold, so the signature checks alone must stop near misses
+    return SemanticTriageCache(embedder=HashingEmbedder(), capacity=3, threshold=0.5)
+
+
+class TestSemanticTriageCache:
+    """Test cases for near-duplicate lookup, guards and eviction"""
+    
+    @pytest.mark.parametrize("stored,query", [
+        ("headache and fever", "headache and fever with stiff neck"),
+        ("vomiting since morning", "vomiting blood since morning"),
+        ("blood in urine", "blood in cough"),
+        ("fever for 2 days", "fever for 20 days"),
+        ("cough for 3 days", "cough for 3 weeks"),
+    ])
+    def test_clinical_near_misses_never_hit(self, cache, stored, query):
+        cache.store(stored, frozenset(), RESULT)
+        assert cache.lookup(query, frozenset()) is None
+        assert cache.get_stats()["clinical_rejections"] == 1
+    
+    def test_clinical_signature_normalizes_numbers_and_plurals(self):
+        assert clinical_signature("fever and coughs for three days") == clinical_signature("3 day fever with cough")
+        assert clinical_signature("bleeding") == clinical_signature("bleeds")
+    
+    def test_paraphrase_hit(self, cache):
+        cache.store("I have fever and cough for 3 days", frozenset(), RESULT)
+        result = cache.lookup("I have had fever and cough for three days", frozenset())
+        assert result is not None
+        assert result["urgency_score"] == 5
+        assert result["cache_hit"] is True
+        assert cache.get_stats()["hit_rate"] == 1.0
+    
+    def test_unrelated_input_misses(self, cache):
+        cache.store("I have fever and cough for 3 days", frozenset(), RESULT)
+        assert cache.lookup("my knee is swollen after a fall", frozenset()) is None
+    
+    def test_different_emergency_keywords_never_hit(self, cache):
+        cache.store("pain in my arm", frozenset(), RESULT)
+        assert cache.lookup("pain in my arm", frozenset(["pain radiating to arm"])) is None
+        assert cache.get_stats()["keyword_rejections"] == 1
+    
+    def test_negation_guard(self, cache):
+        cache.store("my child has fever", frozenset(), RESULT)
+        assert cache.lookup("my child has no fever", frozenset()) is None
+        assert cache.get_stats()["guard_rejections"] == 1
+    
+    def test_lru_eviction(self, cache):
+        for text in ["fever and cough", "sprained ankle while running", "skin rash on both hands"]:
+            cache.store(text, frozenset(), RESULT)
+        cache.lookup("fever and cough", frozenset())
+        cache.store("toothache since yesterday", frozenset(), RESULT)
+        stats = cache.get_stats()
+        assert stats["size"] == 3
+        assert stats["evictions"] == 1
+        assert cache.lookup("sprained ankle while running", frozenset()) is None
+        assert cache.lookup("fever and cough", frozenset()) is not None
+    
+    def test_repeated_eviction_and_refill(self, cache):
+        texts = ["fever and cough", "sprained ankle while running", "skin rash on both hands",
+                 "toothache since yesterday", "ringing in the left ear", "dry eyes after screen use",
+                 "heel pain in the morning", "itchy scalp and dandruff", "hiccups that will not stop"]
+        for round_number in range(3):
+            for text in texts:
+                cache.store(text, frozenset(), RESULT)
+            for text in texts[-3:]:
+                assert cache.lookup(text, frozenset()) is not None
+        stats = cache.get_stats()
+        assert stats["size"] == 3
+        assert stats["evictions"] == 3 * len(texts) - 3
+    
+    @pytest.mark.skipif(not semantic_cache.HNSWLIB_AVAILABLE, reason="hnswlib not installed")
+    def test_hnsw_slot_reuse_keeps_labels(self):
+        embedder = HashingEmbedder()
+        index = semantic_cache.HNSWIndex(embedder.dim, capacity=3)
+        for slot, text in enumerate(["fever and cough", "sprained ankle while running", "skin rash on both hands"]):
+            index.add(slot, embedder.embed(text))
+        # Free several slots at once and refill them, several times
+        for round_number in range(4):
+            for slot in (0, 1):
+                index.remove(slot)
+            for slot in (0, 1):
+                index.add(slot, embedder.embed(f"refill {round_number} slot {slot}"))
+            for slot in (0, 1):
+                assert index.query(embedder.embed(f"refill {round_number} slot {slot}"))[0] == slot
+        for slot in range(3):
+            index.remove(slot)
+        assert index.query(embedder.embed("fever and cough")) is None
+    
+    def test_audit_log_records_matches(self, cache):
+        cache.store("fever and cough", frozenset(), RESULT)
+        cache.lookup("fever and cough", frozenset())
+        audit = cache.get_audit_log()
+        assert audit[0]["matched"] == "fever and cough"
+        assert audit[0]["similarity"] == pytest.approx(1.0, abs=1e-3)
+    
+    def test_error_results_not_cached(self, cache):
+        cache.store("fever", frozenset(), {"error": "timeout", "urgency_score": 5})
+        assert cache.get_stats()["size"] == 0
+
+
+class TestCalibration:
+    """Test cases for the default embedder and threshold calibration"""
+    
+    def test_calibrated_threshold_rejects_near_misses(self):
+        embedder = HashingEmbedder()
+        calibration = calibrate_threshold(embedder)
+        assert calibration["threshold"] > calibration["near_miss_similarity"]
+        cache = SemanticTriageCache(embedder=embedder)
+        assert cache.threshold == calibration["threshold"]
+        for stored, query, same in CALIBRATION_PAIRS:
+            if not same:
+                cache.clear()
+                cache.store(stored, frozenset(), RESULT)
+                assert cache.lookup(query, frozenset()) is None, (stored, query)
+    
+    def test_disabled_without_sentence_model(self, monkeypatch):
+        monkeypatch.setattr(semantic_cache, "SENTENCE_TRANSFORMERS_AVAILABLE", False)
+        assert semantic_cache.load_default_embedder() is None
+        with pytest.raises(RuntimeError):
+            SemanticTriageCache()
@@ -0,0 +1,80 @@
+"""
+Test suite for response serialization and compression
+"""
+import gzip
+import json
+from datetime import datetime
+import pytest
+from models.schemas import TriageResult, ReferralNote, FacilityInfo, Symptom
+from utils import serialization
+from utils.serialization import dumps, raw_json, compress, accepted_encodings, json_response
+from utils.facility_record import FacilityRecord
+
+
+def make_note() -> ReferralNote:
+    triage = TriageResult(
+        chief_complaint="सीने में दर्द",
+        symptoms=[Symptom(name="chest pain", severity="severe", duration="2 hours")],
+        urgency_score=9,
+        recommended_specialty="Cardiology",
+        triage_category="immediate",
+        emergency_detected=True,
+        action_required="Call 108",
+        timestamp=datetime(2024, 5, 1, 10, 30)
+    )
+    facilities = [FacilityInfo(name="District Hospital", address="MG Road", distance_km=1.2,
+                               specialty="cardiology", services=["Emergency Care"])]
+    return ReferralNote(patient_id="P1", triage_result=triage, recommended_facilities=facilities,
+                        generated_at=datetime(2024, 5, 1, 10, 31))
+
+
+class TestSerialization:
+    """Test cases for the fast JSON path"""
+    
+    def test_model_matches_pydantic_json(self):
+        note = make_note()
+        assert json.loads(dumps(note)) == json.loads(note.model_dump_json())
+        assert json.loads(dumps(note))["triage_result"]["timestamp"] == "2024-05-01T10:30:00"
+    
+    @pytest.mark.parametrize("use_orjson", [True, False])
+    def test_containers_with_models_and_records(self, monkeypatch, use_orjson):
+        if use_orjson and not serialization.ORJSON_AVAILABLE:
+            pytest.skip("orjson not installed")
+        monkeypatch.setattr(serialization, "ORJSON_AVAILABLE", use_orjson)
+        note = make_note()
+        record = FacilityRecord(name="PHC", address="Nalgonda", latitude=17.0, longitude=79.2,
+                                services=["General Consultation"])
+        decoded = json.loads(dumps({"triage_result": note.triage_result, "facilities": [record],
+                                    "payload": raw_json('{"a": [1, 2]}')}))
+        assert decoded["triage_result"] == json.loads(note.triage_result.model_dump_json())
+        assert decoded["facilities"][0]["coordinates"] == {"latitude": 17.0, "longitude": 79.2}
+        assert decoded["facilities"][0]["services"] == ["General Consultation"]
+        assert decoded["payload"] == {"a": [1, 2]}
+
+
+class TestCompression:
+    """Test cases for Accept-Encoding negotiation"""
+    
+    def test_accepted_encodings(self):
+        assert accepted_encodings("gzip, deflate, br;q=0") == {"gzip", "deflate"}
+        assert accepted_encodings(None) == set()
+    
+    def test_small_bodies_are_not_compressed(self):
+        assert compress(b"{}", "gzip") == (b"{}", None)
+    
+    def test_gzip_round_trip(self):
+        body = dumps([make_note() for _ in range(20)])
+        compressed, coding = compress(body, "gzip")
+        assert coding == "gzip" and len(compressed) < len(body) / 4
+        assert gzip.decompress(compressed) == body
+        assert compress(body, "identity") == (body, None)
+    
+    def test_json_response_headers(self):
+        records = [{"record_id": str(i), "payload": raw_json('{"x": 1}')} for i in range(200)]
+        response = json_response(records, headers={"X-Triage-Record-Id": "r1"}, accept_encoding="gzip")
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.headers["x-triage-record-id"] == "r1"
+        assert response.media_type == "application/json"
+        assert json.loads(gzip.decompress(response.body))[5]["payload"] == {"x": 1}
+        assert "content-encoding" not in json_response(records).headers
@@ -0,0 +1,121 @@
+"""
+Test suite for single-flight request coalescing
+"""
+import time
+import asyncio
+import threading
+import pytest
+from utils.singleflight import SingleFlight, get_singleflight_stats
+
+
+class TestSingleFlight:
+    """Test cases for threaded and asyncio coalescing"""
+    
+    def test_concurrent_threads_share_one_call(self):
+        flight = SingleFlight("test-threads")
+        calls = []
+        results = []
+        
+        def slow_lookup(value):
+            calls.append(value)
+            time.sleep(0.2)
+            return {"value": value}
+        
+        threads = [
+            threading.Thread(target=lambda: results.append(flight.do("key", slow_lookup, 42)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert calls == [42]
+        assert results == [{"value": 42}] * 5
+        assert flight.get_stats()["coalesced"] == 4
+    
+    def test_sequential_calls_are_not_cached(self):
+        flight = SingleFlight("test-sequential")
+        calls = []
+        flight.do("key", calls.append, 1)
+        flight.do("key", calls.append, 2)
+        assert calls == [1, 2]
+    
+    def test_errors_propagate_to_followers(self):
+        flight = SingleFlight("test-errors")
+        errors = []
+        
+        def failing():
+            time.sleep(0.1)
+            raise ValueError("upstream down")
+        
+        def worker():
+            try:
+                flight.do("key", failing)
+            except ValueError as e:
+                errors.append(e)
+        
+        threads = [threading.Thread(target=worker) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(errors) == 3
+    
+    def test_shared_results_are_copied_for_every_caller(self):
+        flight = SingleFlight("test-copies")
+        started = threading.Event()
+        results = []
+        
+        def slow_lookup():
+            started.set()
+            time.sleep(0.2)
+            return {"facilities": []}
+        
+        leader = threading.Thread(target=lambda: results.append(flight.do("key", slow_lookup)))
+        leader.start()
+        started.wait()
+        follower = threading.Thread(target=lambda: results.append(flight.do("key", slow_lookup)))
+        follower.start()
+        leader.join()
+        follower.join()
+        
+        assert results[0] == results[1] and results[0] is not results[1]
+        results[0]["facilities"].append("PHC")
+        assert results[1] == {"facilities": []}
+        assert get_singleflight_stats()["test-copies"]["coalesced"] == 1
+    
+    def test_asyncio_coalescing(self):
+        flight = SingleFlight("test-async")
+        calls = []
+        
+        async def search(place):
+            calls.append(place)
+            await asyncio.sleep(0.1)
+            return {"place": place, "facilities": []}
+        
+        async def run():
+            return await asyncio.gather(*[flight.do_async("hyderabad", search, "Hyderabad") for _ in range(4)])
+        
+        results = asyncio.run(run())
+        assert calls == ["Hyderabad"]
+        assert results == [{"place": "Hyderabad", "facilities": []}] * 4
+        assert len({id(result) for result in results}) == 4
+        results[0]["facilities"].append("PHC")
+        assert results[1]["facilities"] == []
+        assert flight.in_flight() == 0
+        assert get_singleflight_stats()["test-async"]["coalesced"] == 3
+    
+    def test_asyncio_errors_reach_every_caller(self):
+        flight = SingleFlight("test-async-errors")
+        
+        async def failing():
+            await asyncio.sleep(0.05)
+            raise ConnectionError("upstream down")
+        
+        async def run():
+            return await asyncio.gather(*[flight.do_async("key", failing) for _ in range(3)], return_exceptions=True)
+        
+        results = asyncio.run(run())
+        assert all(isinstance(result, ConnectionError) for result in results)
+        assert flight.get_stats()["executions"] == 1
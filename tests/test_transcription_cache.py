@@ -0,0 +1,175 @@
+"""
+Test suite for the transcription result cache
+"""
+import threading
+import time
+
+import numpy as np
+import pytest
+from models.schemas import VoiceInput
+from utils import whisper_client as whisper_module
+from utils.transcription_cache import (TranscriptionCache, audio_fingerprint, transcription_key,
+                                       load_default_transcription_cache)
+from utils.whisper_client import WhisperClient, IN_MEMORY_AUDIO
+
+
+def clip(seconds: float = 2.0, frequency: float = 220.0) -> np.ndarray:
+    t = np.arange(int(seconds * 16000)) / 16000
+    return (0.3 * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+
+def result(text: str = "bukhar aur sir dard") -> VoiceInput:
+    return VoiceInput(audio_file_path=IN_MEMORY_AUDIO, transcribed_text=text, language="hi",
+                      confidence=0.8, processing_time=1.5)
+
+
+class TestFingerprint:
+    """Test cases for audio fingerprints and cache keys"""
+    
+    def test_same_audio_same_fingerprint(self):
+        audio = clip()
+        assert audio_fingerprint(audio) == audio_fingerprint(audio.copy())
+        # Hashed as 16-bit PCM, whatever float type the decoder produced
+        assert audio_fingerprint(audio.astype(np.float64)) == audio_fingerprint(audio)
+        pcm = np.round(audio * 32767) / 32767
+        assert audio_fingerprint(pcm + 1e-6) == audio_fingerprint(pcm)
+    
+    def test_different_audio_different_fingerprint(self):
+        assert audio_fingerprint(clip()) != audio_fingerprint(clip(frequency=330.0))
+        assert audio_fingerprint(clip()) != audio_fingerprint(clip(seconds=2.5))
+    
+    def test_key_covers_settings(self):
+        audio = clip()
+        base = transcription_key(audio, "large-v3", "hi", None)
+        assert base == transcription_key(audio, "large-v3", "hi", "")
+        assert base != transcription_key(audio, "small", "hi", None)
+        assert base != transcription_key(audio, "large-v3", "bn", None)
+        assert base != transcription_key(audio, "large-v3", None, None)
+        assert base != transcription_key(audio, "large-v3", "hi", "Patient symptoms")
+        assert base != transcription_key(audio, "large-v3", "hi", None, word_timestamps=True)
+
+
+class TestTranscriptionCache:
+    """Test cases for the memory and disk tiers"""
+    
+    def test_hit_and_miss(self):
+        cache = TranscriptionCache(capacity=4)
+        assert cache.get("a") is None
+        cache.put("a", result())
+        cached = cache.get("a")
+        assert cached.transcribed_text == "bukhar aur sir dard"
+        # Callers get copies
+        cached.transcribed_text = "changed"
+        assert cache.get("a").transcribed_text == "bukhar aur sir dard"
+        stats = cache.get_stats()
+        assert stats["hits"] == 2 and stats["memory_hits"] == 2 and stats["misses"] == 1
+        assert stats["hit_rate"] == pytest.approx(2 / 3)
+    
+    def test_lru_eviction(self):
+        cache = TranscriptionCache(capacity=2)
+        cache.put("a", result("a"))
+        cache.put("b", result("b"))
+        cache.get("a")
+        cache.put("c", result("c"))
+        assert cache.get("b") is None
+        assert cache.get("a").transcribed_text == "a"
+        assert cache.get_stats()["evictions"] == 1
+    
+    def test_ttl(self):
+        cache = TranscriptionCache(ttl_seconds=0.05)
+        cache.put("a", result())
+        time.sleep(0.1)
+        assert cache.get("a") is None
+        assert cache.get_stats()["expired"] == 1
+    
+    def test_disk_tier_survives_restart(self, tmp_path):
+        path = str(tmp_path / "cache" / "transcriptions.db")
+        cache = TranscriptionCache(disk_path=path)
+        cache.put("a", result())
+        cache.close()
+        
+        restarted = TranscriptionCache(disk_path=path)
+        cached = restarted.get("a")
+        assert cached == result()
+        # Promoted to memory: the next lookup does not touch the disk
+        restarted.get("a")
+        stats = restarted.get_stats()
+        assert stats["disk_hits"] == 1 and stats["memory_hits"] == 1
+        assert stats["disk_size"] == 1
+        restarted.close()
+    
+    def test_disk_tier_expiry(self, tmp_path):
+        path = str(tmp_path / "transcriptions.db")
+        cache = TranscriptionCache(ttl_seconds=0.05, disk_path=path)
+        cache.put("a", result())
+        time.sleep(0.1)
+        assert cache.purge_expired() == 1
+        assert cache.get_stats()["disk_size"] == 0
+        cache.close()
+    
+    def test_load_default(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("TRANSCRIPTION_CACHE", "false")
+        assert load_default_transcription_cache() is None
+        monkeypatch.setenv("TRANSCRIPTION_CACHE", "true")
+        monkeypatch.setenv("TRANSCRIPTION_CACHE_SIZE", "8")
+        monkeypatch.setenv("TRANSCRIPTION_CACHE_PATH", str(tmp_path / "t.db"))
+        cache = load_default_transcription_cache()
+        assert cache.capacity == 8 and cache.disk_path == str(tmp_path / "t.db")
+        cache.close()
+
+
+class TestWhisperClientCaching:
+    """Test cases for caching in WhisperClient.transcribe_audio"""
+    
+    @pytest.fixture
+    def client(self, monkeypatch):
+        monkeypatch.setenv("TRANSCRIPTION_CACHE", "true")
+        monkeypatch.delenv("TRANSCRIPTION_CACHE_PATH", raising=False)
+        client = WhisperClient(model_size="small")
+        monkeypatch.setattr(whisper_module, "WHISPER_AVAILABLE", True)
+        client.model = object()
+        client.decodes = []
+        client.language_id.detect = lambda snippet: {"hi": 0.9, "bn": 0.1}
+        
+        def fake_transcribe(audio, choice, initial_prompt, word_timestamps, long_audio):
+            client.decodes.append(choice.language)
+            time.sleep(0.05)
+            return result()
+        
+        client._transcribe = fake_transcribe
+        return client
+    
+    def test_retried_upload_is_not_decoded_again(self, client):
+        first = client.transcribe_audio(clip(), language="hi")
+        second = client.transcribe_audio(clip(), language="hi")
+        assert client.decodes == ["hi"]
+        assert second.transcribed_text == first.transcribed_text
+        assert second.audio_file_path == IN_MEMORY_AUDIO
+        assert second.processing_time < 0.05
+        client.transcribe_audio(clip(), language="bn")
+        assert client.decodes == ["hi", "bn"]
+    
+    def test_key_uses_chosen_language(self, client):
+        client.transcribe_audio(clip())
+        assert client.decodes == ["hi"]
+        # The session's language changes the decode, so the auto-detected result is not reused
+        client.language_id.choose(clip(), language="bn", session_id="kiosk-1")
+        client.transcribe_audio(clip(), session_id="kiosk-1")
+        assert client.decodes == ["hi", "bn"]
+    
+    def test_cache_hit_records_session_language(self, client):
+        client.transcribe_audio(clip())
+        client.transcribe_audio(clip(), session_id="kiosk-2")
+        assert client.decodes == ["hi"]
+        assert client.language_id.choose(clip(), session_id="kiosk-2").source == "session"
+    
+    def test_concurrent_duplicates_share_one_decode(self, client):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(client.transcribe_audio(clip())))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(results) == 4
+        assert len(client.decodes) == 1
@@ -0,0 +1,70 @@
+"""
+Test suite for the small-to-large triage model cascade
+"""
+import json
+import pytest
+from agents.groq_client import LLMRouter, LocalBackend, MedicalTriageAgent
+
+
+class FakeGroqClient:
+    """Stand-in for GroqClient exposing only the two routing tiers"""
+    
+    def __init__(self, small_answer, large_answer):
+        self.small_calls = 0
+        self.large_calls = 0
+        
+        def small(prompt):
+            self.small_calls += 1
+            return json.dumps(small_answer)
+        
+        def large(prompt):
+            self.large_calls += 1
+            return json.dumps(large_answer)
+        
+        self.small_llm = LLMRouter([LocalBackend(small, name="small")])
+        self.llm = LLMRouter([LocalBackend(large, name="large")])
+
+
+LOW_ACUITY = {"chief_complaint": "runny nose", "urgency_score": 2, "emergency_detected": False,
+              "red_flags": [], "confidence": 0.9}
+HIGH_ACUITY = {"chief_complaint": "chest pain", "urgency_score": 9, "emergency_detected": True,
+               "red_flags": [], "confidence": 0.95}
+
+
+class TestTriageCascade:
+    """Test cases for tier selection and escalation"""
+    
+    def test_low_acuity_served_by_small_model(self):
+        client = FakeGroqClient(LOW_ACUITY, HIGH_ACUITY)
+        result = MedicalTriageAgent(client).analyze_symptoms("I have a runny nose")
+        assert result["model_tier"] == "small"
+        assert client.large_calls == 0
+    
+    def test_keyword_flags_skip_small_model(self):
+        client = FakeGroqClient(LOW_ACUITY, HIGH_ACUITY)
+        agent = MedicalTriageAgent(client)
+        result = agent.analyze_symptoms("I have chest pain")
+        assert result["model_tier"] == "large"
+        assert result["escalation_reason"] == "keyword_flags"
+        assert client.small_calls == 0
+    
+    def test_high_urgency_escalates(self):
+        client = FakeGroqClient(dict(LOW_ACUITY, urgency_score=7), HIGH_ACUITY)
+        result = MedicalTriageAgent(client).analyze_symptoms("my stomach hurts a lot")
+        assert result["model_tier"] == "large"
+        assert result["escalation_reason"] == "high_urgency"
+    
+    def test_low_confidence_escalates(self):
+        client = FakeGroqClient(dict(LOW_ACUITY, confidence=0.3), HIGH_ACUITY)
+        result = MedicalTriageAgent(client).analyze_symptoms("I feel odd")
+        assert result["escalation_reason"] == "low_confidence"
+    
+    def test_cascade_stats(self):
+        client = FakeGroqClient(LOW_ACUITY, HIGH_ACUITY)
+        agent = MedicalTriageAgent(client)
+        agent.analyze_symptoms("I have a runny nose")
+        agent.analyze_symptoms("I have chest pain")
+        stats = agent.get_cascade_stats()
+        assert stats["final_tier"] == {"small": 1, "large": 1}
+        assert stats["small_tier_share"] == pytest.approx(0.5)
+        assert stats["escalations"]["keyword_flags"] == 1
@@ -0,0 +1,66 @@
+"""
+Test suite for incremental triage statistics
+"""
+import random
+import pytest
+from utils.triage_stats import LogHistogram, TriageStatsAggregator
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_700_000_000.0):
+        self.now = now
+    
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_log_histogram_quantiles_within_bucket_error():
+    rng = random.Random(0)
+    values = [rng.lognormvariate(0, 1) for _ in range(5000)]
+    histogram = LogHistogram()
+    for value in values:
+        histogram.add(value)
+    ordered = sorted(values)
+    estimates = histogram.quantiles([0.5, 0.95])
+    for q in (0.5, 0.95):
+        exact = ordered[int(q * len(ordered)) - 1]
+        assert estimates[q] == pytest.approx(exact, rel=0.06)
+
+
+class TestTriageStatsAggregator:
+    """Test cases for sliding-window rollups"""
+    
+    def test_counts_by_category_and_specialty(self):
+        clock = FakeClock()
+        stats = TriageStatsAggregator(clock=clock)
+        stats.record("immediate", "Cardiology", True, 9, 2.0)
+        stats.record("standard", "General Medicine", False, 3, 1.0, source="voice")
+        clock.now += 1
+        window = stats.get_snapshot()["window"]
+        assert window["count"] == 2
+        assert window["emergencies"] == 1
+        assert window["by_category"] == {"immediate": 1, "standard": 1}
+        assert window["by_source"] == {"text": 1, "voice": 1}
+        assert window["avg_urgency"] == 6.0
+    
+    def test_old_slots_expire_from_window(self):
+        clock = FakeClock()
+        stats = TriageStatsAggregator(window_seconds=600, slot_seconds=60, clock=clock)
+        stats.record("urgent", "ENT", False, 5, 10.0)
+        clock.now += 300
+        stats.record("standard", "ENT", False, 2, 0.5)
+        clock.now += 400
+        snapshot = stats.get_snapshot()
+        assert snapshot["window"]["count"] == 1
+        assert snapshot["window"]["by_category"] == {"standard": 1}
+        assert dict(stats.window.categories) == {"standard": 1}
+        assert snapshot["window"]["latency"]["p99"] < 1.0
+        assert snapshot["lifetime"]["count"] == 2
+    
+    def test_snapshot_cached_until_new_data(self):
+        clock = FakeClock()
+        stats = TriageStatsAggregator(clock=clock)
+        first = stats.get_snapshot()
+        assert stats.get_snapshot() is first
+        stats.record("standard", "ENT", False, 2, 0.5)
+        assert stats.get_snapshot()["window"]["count"] == 1
@@ -0,0 +1,105 @@
+"""
+Test suite for the persistent triage record store
+"""
+import csv
+import io
+from datetime import datetime, timedelta
+import pytest
+from models.schemas import TriageResult
+from utils.triage_store import (SQLiteTriageStore, BatchWriter, build_record, export_csv,
+                                export_parquet, stream_parquet, PYARROW_AVAILABLE)
+
+
+def make_result(urgency: int, category: str, specialty: str, when: datetime) -> TriageResult:
+    return TriageResult(
+        chief_complaint="test complaint",
+        symptoms=[],
+        urgency_score=urgency,
+        recommended_specialty=specialty,
+        triage_category=category,
+        emergency_detected=category == "immediate",
+        action_required="See a doctor",
+        timestamp=when
+    )
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteTriageStore(str(tmp_path / "triage.db"))
+    yield store
+    store.close()
+
+
+class TestTriageStore:
+    """Test cases for storage, queries and export"""
+    
+    def test_batch_writer_persists_records(self, store):
+        writer = BatchWriter(store, batch_size=10, flush_interval=0.05)
+        base = datetime(2025, 10, 1, 9, 0)
+        ids = [writer.submit(build_record(make_result(3, "standard", "General Medicine", base + timedelta(minutes=i)),
+                                          f"cough {i}", patient_id="p1"))
+               for i in range(25)]
+        writer.flush()
+        assert store.count({}) == 25
+        assert store.get(ids[0])["input_text"] == "cough 0"
+        assert writer.get_stats()["batches"] >= 3
+        writer.close()
+    
+    def test_filters_and_pagination(self, store):
+        base = datetime(2025, 10, 1, 9, 0)
+        store.write_many([
+            build_record(make_result(9, "immediate", "Cardiology", base), "chest pain"),
+            build_record(make_result(5, "urgent", "General Medicine", base + timedelta(hours=1)), "fever"),
+            build_record(make_result(2, "standard", "General Medicine", base + timedelta(days=1)), "cold")
+        ])
+        day = {"start": base, "end": base + timedelta(days=1)}
+        assert store.count(day) == 2
+        assert store.count({"min_urgency": 5}) == 2
+        assert store.count({"specialty": "General Medicine", "category": "standard"}) == 1
+        assert store.count({"emergency": True}) == 1
+        
+        first_page = store.query({}, limit=2, offset=0)
+        second_page = store.query({}, limit=2, offset=2)
+        assert [r["input_text"] for r in first_page] == ["cold", "fever"]
+        assert [r["input_text"] for r in second_page] == ["chest pain"]
+        with pytest.raises(ValueError):
+            store.count({"unknown": 1})
+    
+    def test_csv_export(self, store):
+        base = datetime(2025, 10, 1, 9, 0)
+        store.write_many([build_record(make_result(4, "standard", "ENT", base + timedelta(minutes=i)), f"ear pain {i}")
+                          for i in range(3)])
+        rows = list(csv.DictReader(io.StringIO("".join(export_csv(store, {}, include_identifiers=True)))))
+        assert [row["input_text"] for row in rows] == ["ear pain 0", "ear pain 1", "ear pain 2"]
+        assert rows[0]["created_at"] == base.isoformat()
+        assert "payload" not in rows[0]
+    
+    def test_exports_leave_out_identifiers_by_default(self, store):
+        store.write_many([build_record(make_result(4, "standard", "ENT", datetime(2025, 10, 1)), "ear pain",
+                                       patient_id="p1")])
+        rows = list(csv.DictReader(io.StringIO("".join(export_csv(store, {})))))
+        assert "input_text" not in rows[0]
+        assert "patient_id" not in rows[0]
+        assert rows[0]["urgency_score"] == "4"
+    
+    @pytest.mark.skipif(not PYARROW_AVAILABLE, reason="pyarrow not installed")
+    def test_parquet_export(self, store):
+        import pyarrow.parquet as pq
+        store.write_many([build_record(make_result(4, "standard", "ENT", datetime(2025, 10, 1)), "ear pain")])
+        buffer = io.BytesIO()
+        assert export_parquet(store, {}, buffer) == 1
+        buffer.seek(0)
+        assert pq.read_table(buffer).column("urgency_score").to_pylist() == [4]
+    
+    @pytest.mark.skipif(not PYARROW_AVAILABLE, reason="pyarrow not installed")
+    def test_parquet_stream_writes_one_row_group_per_batch(self, store, monkeypatch):
+        import pyarrow.parquet as pq
+        store.write_many([build_record(make_result(i % 10 + 1, "standard", "ENT", datetime(2025, 10, 1)), f"ear pain {i}")
+                          for i in range(25)])
+        iter_records = store.iter_records
+        monkeypatch.setattr(store, "iter_records", lambda filters, batch_size: iter_records(filters, batch_size=10))
+        chunks = list(stream_parquet(store, {}, include_identifiers=True))
+        assert len(chunks) > 1
+        parquet = pq.ParquetFile(io.BytesIO(b"".join(chunks)))
+        assert parquet.metadata.num_row_groups == 3
+        assert sorted(parquet.read().column("input_text").to_pylist()) == sorted(f"ear pain {i}" for i in range(25))
@@ -0,0 +1,113 @@
+"""
+Test suite for the compact kiosk wire format
+"""
+import json
+from datetime import datetime
+import pytest
+from models.schemas import TriageResult, Symptom
+from utils.facility_record import FacilityRecord
+from utils.serialization import dumps
+from utils import wire_format
+from utils.wire_format import (pack, unpack, wants_msgpack, schema_keys, FacilityTable, merge_facilities,
+                               parse_id_ranges, format_id_ranges, msgpack_response, MSGPACK_AVAILABLE)
+
+pytestmark = pytest.mark.skipif(not MSGPACK_AVAILABLE, reason="msgpack not installed")
+
+
+def make_triage() -> TriageResult:
+    return TriageResult(
+        chief_complaint="High fever for 3 days",
+        symptoms=[Symptom(name="fever", severity="moderate", duration="3 days")],
+        urgency_score=6,
+        recommended_specialty="General Medicine",
+        triage_category="urgent",
+        emergency_detected=False,
+        action_required="See a doctor today",
+        timestamp=datetime(2024, 5, 1, 10, 30)
+    )
+
+
+def make_facilities(count: int = 5):
+    facilities = []
+    for i in range(count):
+        record = FacilityRecord(name=f"PHC {i}", address=f"Village {i}, Nalgonda", latitude=round(17.05 + i * 0.01, 2),
+                                longitude=79.27, distance_km=1.5 * i, facility_type="government",
+                                services=["General Consultation", "Emergency Care"], facility_id=f"node/{i}",
+                                city="Nalgonda", state="Telangana")
+        record.ranking_score = 4.0 * i
+        facilities.append(record)
+    return facilities
+
+
+class TestWireFormat:
+    """Test cases for MessagePack encoding against the schema key dictionary"""
+    
+    def test_keys_come_from_schema(self):
+        keys = schema_keys()
+        assert {"chief_complaint", "urgency_score", "map_link", "recommended_facilities"} <= set(keys)
+        assert list(keys) == sorted(keys)
+    
+    def test_negotiation(self):
+        assert wants_msgpack("application/vnd.arovia+msgpack, application/json;q=0.5")
+        assert wants_msgpack("application/msgpack")
+        assert not wants_msgpack("application/json")
+        assert not wants_msgpack(None)
+    
+    def test_round_trip_matches_json_without_nulls(self):
+        triage = make_triage()
+        expected = {key: value for key, value in json.loads(dumps(triage)).items() if value is not None}
+        assert unpack(pack(triage)) == expected
+        assert len(pack(triage)) < len(dumps(triage)) * 0.7
+    
+    def test_map_links_and_records(self):
+        decoded = unpack(pack(make_facilities(2)))
+        assert decoded[1]["map_link"] == "https://www.google.com/maps?q=17.06,79.27"
+        assert decoded[1]["services"] == ["General Consultation", "Emergency Care"]
+        assert decoded[1]["coordinates"]["latitude"] == pytest.approx(17.06, abs=1e-5)
+        assert "travel_time_min" not in decoded[1]
+    
+    def test_id_ranges(self):
+        assert format_id_ranges([5, 0, 1, 2, 7, 8]) == "0-2,5,7-8"
+        assert parse_id_ranges("0-2,5,7-8") == {0, 1, 2, 5, 7, 8}
+    
+    def test_response_headers(self):
+        response = msgpack_response(make_triage(), headers={"X-Triage-Record-Id": "r1"})
+        assert response.media_type == "application/vnd.arovia+msgpack"
+        assert response.headers["x-wire-schema"] == wire_format.SCHEMA_VERSION
+        assert response.headers["x-triage-record-id"] == "r1"
+        assert unpack(response.body)["urgency_score"] == 6
+
+
+class TestFacilityDelta:
+    """Test cases for delta encoding against the kiosk's facility cache"""
+    
+    def test_second_request_sends_only_dynamic_fields(self):
+        table, kiosk_cache = FacilityTable(), {}
+        first = unpack(pack(table.encode(make_facilities())))
+        facilities = merge_facilities(first, kiosk_cache)
+        assert facilities[2]["name"] == "PHC 2" and len(kiosk_cache) == 5
+        
+        header = f"{table.epoch}:{format_id_ranges(kiosk_cache)}"
+        second_body = pack(table.encode(make_facilities(), header))
+        second = unpack(second_body)
+        assert "name" not in second[2] and second[2]["ranking_score"] == 8.0
+        assert merge_facilities(second, kiosk_cache) == facilities
+        assert len(second_body) * 4 < len(pack(first))
+        assert table.get_stats()["delta"] == 5
+    
+    def test_changed_static_data_gets_a_new_id(self):
+        table = FacilityTable()
+        facilities = make_facilities(1)
+        first_id = table.facility_id(facilities[0].to_dict())
+        facilities[0].contact = "08682-222222"
+        assert table.facility_id(facilities[0].to_dict()) != first_id
+        facilities[0].ranking_score = 99.0
+        assert table.facility_id(facilities[0].to_dict()) == first_id + 1
+    
+    def test_stale_epoch_and_full_table(self):
+        table = FacilityTable(max_entries=3)
+        entries = table.encode(make_facilities(2), "deadbeef:0-1")
+        assert all("name" in entry for entry in entries)
+        epoch = table.epoch
+        entries = table.encode(make_facilities(5), f"{epoch}:0-1")
+        assert table.epoch != epoch and all("name" in entry for entry in entries)
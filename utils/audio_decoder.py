@@ -0,0 +1,164 @@
+"""
+In-memory audio decoding for Arovia voice input
+Uploads (WAV, FLAC, OGG/Opus, WebM/Opus, MP3/MP4) are decoded in-process
+and resampled straight to the 16 kHz mono float32 array Whisper expects,
+without temporary files or ffmpeg subprocesses
+"""
+import io
+import wave
+from typing import Optional, Tuple
+
+import numpy as np
+
+try:
+    import soundfile as sf
+    SOUNDFILE_AVAILABLE = True
+except (ImportError, OSError):
+    sf = None
+    SOUNDFILE_AVAILABLE = False
+
+try:
+    import av
+    PYAV_AVAILABLE = True
+except ImportError:
+    av = None
+    PYAV_AVAILABLE = False
+
+try:
+    import soxr
+    SOXR_AVAILABLE = True
+except ImportError:
+    soxr = None
+    SOXR_AVAILABLE = False
+
+
+WHISPER_SAMPLE_RATE = 16000
+
+# Leading bytes of the containers we accept
+_SIGNATURES = (
+    (b"RIFF", "wav"),
+    (b"OggS", "ogg"),
+    (b"\x1a\x45\xdf\xa3", "webm"),
+    (b"fLaC", "flac"),
+    (b"ID3", "mp3"),
+    (b"\xff\xfb", "mp3"),
+    (b"\xff\xf3", "mp3"),
+    (b"\xff\xf2", "mp3"),
+)
+
+
+class AudioDecodeError(ValueError):
+    """Upload is not audio we can decode"""
+
+
+def detect_format(data: bytes) -> Optional[str]:
+    """Container format from the first bytes of an upload ("wav", "ogg", "webm", "flac", "mp3", "mp4")"""
+    for signature, name in _SIGNATURES:
+        if data.startswith(signature):
+            return name
+    if data[4:8] == b"ftyp":
+        return "mp4"
+    return None
+
+
+def resample(audio: np.ndarray, orig_rate: int, target_rate: int = WHISPER_SAMPLE_RATE) -> np.ndarray:
+    """
+    Resample mono audio
+    
+    Uses soxr when installed; otherwise band-limited resampling in the
+    frequency domain, which also removes content above the new Nyquist rate.
+    """
+    if orig_rate == target_rate or audio.size == 0:
+        return audio.astype(np.float32, copy=False)
+    if SOXR_AVAILABLE:
+        return soxr.resample(audio, orig_rate, target_rate).astype(np.float32, copy=False)
+    length = int(round(audio.size * target_rate / orig_rate))
+    spectrum = np.fft.rfft(audio)
+    bins = length // 2 + 1
+    if bins <= spectrum.size:
+        spectrum = spectrum[:bins]
+    else:
+        spectrum = np.concatenate([spectrum, np.zeros(bins - spectrum.size, dtype=spectrum.dtype)])
+    return (np.fft.irfft(spectrum, length) * (length / audio.size)).astype(np.float32)
+
+
+def _to_mono(audio: np.ndarray) -> np.ndarray:
+    return audio.mean(axis=1) if audio.ndim == 2 else audio
+
+
+def _decode_soundfile(data: bytes) -> Tuple[np.ndarray, int]:
+    audio, rate = sf.read(io.BytesIO(data), dtype="float32", always_2d=True)
+    return _to_mono(audio), rate
+
+
+def _decode_wave(data: bytes) -> Tuple[np.ndarray, int]:
+    """16-bit PCM WAV with the standard library (when libsndfile is missing)"""
+    with wave.open(io.BytesIO(data)) as reader:
+        if reader.getsampwidth() != 2:
+            raise AudioDecodeError("Only 16-bit PCM WAV can be decoded without soundfile")
+        frames = np.frombuffer(reader.readframes(reader.getnframes()), dtype="<i2")
+        audio = frames.reshape(-1, reader.getnchannels()).astype(np.float32) / 32768.0
+        return _to_mono(audio), reader.getframerate()
+
+
+def _decode_pyav(data: bytes, sample_rate: int) -> np.ndarray:
+    """Decode with libav in-process, resampling to mono float at the target rate"""
+    chunks = []
+    with av.open(io.BytesIO(data), mode="r") as container:
+        if not container.streams.audio:
+            raise AudioDecodeError("Upload contains no audio stream")
+        resampler = av.AudioResampler(format="flt", layout="mono", rate=sample_rate)
+        for frame in container.decode(container.streams.audio[0]):
+            for resampled in resampler.resample(frame):
+                chunks.append(resampled.to_ndarray().reshape(-1))
+        for resampled in resampler.resample(None):
+            chunks.append(resampled.to_ndarray().reshape(-1))
+    return np.concatenate(chunks).astype(np.float32, copy=False) if chunks else np.zeros(0, dtype=np.float32)
+
+
+def decode_audio(data: bytes, sample_rate: int = WHISPER_SAMPLE_RATE) -> np.ndarray:
+    """
+    Decode an audio upload to a mono float32 array
+    
+    WAV, FLAC and OGG (Vorbis/Opus) are read by libsndfile; WebM, MP4 and
+    anything libsndfile rejects go through PyAV. Both run in-process on the
+    uploaded bytes.
+    
+    Args:
+        data: Uploaded file contents
+        sample_rate: Output sample rate (Whisper needs 16 kHz)
+    
+    Returns:
+        float32 samples in [-1, 1]
+    
+    Raises:
+        AudioDecodeError: Unknown format, corrupt data or no decoder installed
+    """
+    if not data:
+        raise AudioDecodeError("Empty audio upload")
+    container = detect_format(data)
+    errors = []
+    
+    if container in ("wav", "flac", "ogg", "mp3", None) and SOUNDFILE_AVAILABLE:
+        try:
+            audio, rate = _decode_soundfile(data)
+            return resample(audio, rate, sample_rate)
+        except Exception as e:
+            errors.append(f"soundfile: {e}")
+    if container == "wav" and not SOUNDFILE_AVAILABLE:
+        try:
+            audio, rate = _decode_wave(data)
+            return resample(audio, rate, sample_rate)
+        except (wave.Error, EOFError) as e:
+            errors.append(f"wave: {e}")
+    if PYAV_AVAILABLE:
+        try:
+            return _decode_pyav(data, sample_rate)
+        except AudioDecodeError:
+            raise
+        except Exception as e:
+            errors.append(f"pyav: {e}")
+    elif container in ("webm", "mp4"):
+        errors.append(f"{container} uploads need PyAV (pip install av)")
+    
+    raise AudioDecodeError(f"Could not decode {container or 'unknown'} audio: {'; '.join(errors) or 'no decoder available'}")
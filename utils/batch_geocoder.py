@@ -0,0 +1,213 @@
+"""
+Batch geocoding for bulk imports
+Addresses are normalized and deduplicated, resolved locally where possible,
+and the remainder geocoded by a rate-limited worker pool with a resumable
+JSONL checkpoint
+"""
+import os
+import re
+import json
+import time
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional, Dict, Any, List, Tuple, Callable, Iterable
+
+
+Coordinates = Tuple[float, float]
+Resolver = Callable[[str], Optional[Coordinates]]
+
+_PUNCTUATION = re.compile(r"[^\w\s,/-]+")
+_SEPARATORS = re.compile(r"\s*,\s*")
+_WHITESPACE = re.compile(r"\s+")
+_COUNTRY_SUFFIX = re.compile(r"(,\s*)?\b(india|bharat)$")
+
+
+def normalize_address(address: str) -> str:
+    """
+    Normalize an address for deduplication
+    
+    Unicode is NFKC-folded, case and punctuation are dropped, whitespace and
+    commas are collapsed and a trailing country name is removed, so
+    "Nalgonda,  Telangana, India." and "nalgonda, telangana" share a key.
+    """
+    text = unicodedata.normalize("NFKC", address or "").lower()
+    text = _PUNCTUATION.sub(" ", text)
+    text = _WHITESPACE.sub(" ", text).strip()
+    text = _SEPARATORS.sub(", ", text).strip(", ")
+    return _COUNTRY_SUFFIX.sub("", text).strip(", ")
+
+
+class RateLimiter:
+    """Spaces calls evenly at `rate` per second across threads"""
+    
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_at = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_at)
+            self._next_at = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class BatchGeocoder:
+    """
+    Geocode many addresses with deduplication, local resolution and checkpoints.
+    
+    Each unique normalized address is resolved at most once: first from the
+    checkpoint of an earlier run, then by the local resolvers (e.g. the
+    gazetteer), and only then by the remote geocoder through a worker pool
+    limited to `rate` requests per second. Every result is appended to the
+    checkpoint as it arrives, so an interrupted import resumes where it
+    stopped. Addresses whose lookup raised (timeouts, server errors) are not
+    checkpointed and are tried again on the next run; only addresses the
+    geocoder found no result for are recorded as failed.
+    """
+    
+    def __init__(
+        self,
+        geocode: Resolver,
+        resolvers: Iterable[Resolver] = (),
+        workers: int = 4,
+        rate: float = 1.0,
+        checkpoint_path: Optional[str] = None,
+        retry_failed: bool = False
+    ):
+        """
+        Initialize batch geocoder
+        
+        Args:
+            geocode: Remote geocoder, address -> (lat, lon) or None; raises on transient errors
+            resolvers: Local lookups tried before the remote geocoder
+            workers: Concurrent remote requests
+            rate: Maximum remote requests per second (Nominatim's public server allows 1)
+            checkpoint_path: JSONL file of resolved addresses for resuming
+            retry_failed: Retry addresses that had no result in an earlier run
+        """
+        self.geocode = geocode
+        self.resolvers = list(resolvers)
+        self.workers = max(1, workers)
+        self.limiter = RateLimiter(rate)
+        self.checkpoint_path = checkpoint_path
+        self.retry_failed = retry_failed
+        self._checkpoint_lock = threading.Lock()
+    
+    def _load_checkpoint(self) -> Dict[str, Dict[str, Any]]:
+        results = {}
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return results
+        with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Partial line from an interrupted write
+                if entry.get("latitude") is None and (self.retry_failed or "error" in entry):
+                    continue  # Errored entries come from older runs, which checkpointed them as failed
+                results[entry["key"]] = entry
+        return results
+    
+    def _save(self, checkpoint, entry: Dict[str, Any]):
+        if checkpoint is None:
+            return
+        with self._checkpoint_lock:
+            checkpoint.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            checkpoint.flush()
+    
+    def _resolve_remote(self, key: str, address: str) -> Dict[str, Any]:
+        self.limiter.wait()
+        try:
+            coordinates = self.geocode(address)
+            error = None
+        except Exception as e:
+            coordinates, error = None, str(e)
+        entry = {
+            "key": key,
+            "latitude": coordinates[0] if coordinates else None,
+            "longitude": coordinates[1] if coordinates else None,
+            "source": "remote" if coordinates else "failed"
+        }
+        if error:
+            entry["source"] = "error"
+            entry["error"] = error
+        return entry
+    
+    def run(self, addresses: List[str]) -> Tuple[List[Optional[Coordinates]], Dict[str, Any]]:
+        """
+        Geocode addresses
+        
+        Args:
+            addresses: Raw addresses, duplicates allowed
+        
+        Returns:
+            (coordinates per input address, throughput report)
+        """
+        started = time.perf_counter()
+        keys = [normalize_address(address) for address in addresses]
+        originals: Dict[str, str] = {}
+        for key, address in zip(keys, addresses):
+            if key:
+                originals.setdefault(key, address)
+        
+        results = self._load_checkpoint()
+        counts = {"checkpoint": sum(1 for key in originals if key in results), "local": 0, "remote": 0, "failed": 0,
+                  "errors": 0}
+        pending = [key for key in originals if key not in results]
+        
+        checkpoint = open(self.checkpoint_path, "a", encoding="utf-8") if self.checkpoint_path else None
+        try:
+            remote = []
+            for key in pending:
+                for resolver in self.resolvers:
+                    coordinates = resolver(originals[key])
+                    if coordinates:
+                        entry = {"key": key, "latitude": coordinates[0], "longitude": coordinates[1], "source": "local"}
+                        results[key] = entry
+                        self._save(checkpoint, entry)
+                        counts["local"] += 1
+                        break
+                else:
+                    remote.append(key)
+            
+            remote_started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="geocode") as pool:
+                futures = [pool.submit(self._resolve_remote, key, originals[key]) for key in remote]
+                for future in as_completed(futures):
+                    entry = future.result()
+                    results[entry["key"]] = entry
+                    if entry["source"] == "error":
+                        counts["errors"] += 1
+                        continue  # Left out of the checkpoint so the next run retries it
+                    self._save(checkpoint, entry)
+                    counts["remote" if entry["latitude"] is not None else "failed"] += 1
+            remote_elapsed = time.perf_counter() - remote_started
+        finally:
+            if checkpoint is not None:
+                checkpoint.close()
+        
+        coordinates = []
+        for key in keys:
+            entry = results.get(key)
+            if entry and entry.get("latitude") is not None:
+                coordinates.append((entry["latitude"], entry["longitude"]))
+            else:
+                coordinates.append(None)
+        
+        elapsed = time.perf_counter() - started
+        report = {
+            "rows": len(addresses),
+            "unique_addresses": len(originals),
+            "resolved_rows": sum(1 for c in coordinates if c is not None),
+            **counts,
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_second": round(len(addresses) / elapsed, 1) if elapsed else 0.0,
+            "remote_requests_per_second": round(len(remote) / remote_elapsed, 2) if remote and remote_elapsed else 0.0
+        }
+        return coordinates, report
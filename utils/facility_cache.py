@@ -0,0 +1,318 @@
+"""
+Facility search result cache for Arovia
+Results are cached per geohash cell, normalized specialty and radius bucket,
+so patients from the same PHC or village reuse one facility search
+"""
+import os
+import json
+import math
+import copy
+import time
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Tuple, Iterable, Callable
+
+from utils.facility_record import FacilityRecord
+
+
+GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# Search radii are rounded up to one of these (km) before keying the cache
+RADIUS_BUCKETS = [2.0, 5.0, 8.0, 10.0, 15.0, 25.0, 50.0]
+
+EARTH_RADIUS_KM = 6371.0088
+
+CacheKey = Tuple[str, str, float]
+
+
+def geohash_encode(latitude: float, longitude: float, precision: int = 6) -> str:
+    """
+    Encode coordinates as a geohash
+    
+    Args:
+        latitude: Latitude in degrees
+        longitude: Longitude in degrees
+        precision: Number of characters (6 is a cell of about 1.2 x 0.6 km)
+    
+    Returns:
+        Geohash string
+    """
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        value, bounds = (longitude, lon_range) if even else (latitude, lat_range)
+        mid = (bounds[0] + bounds[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            bounds[0] = mid
+        else:
+            bounds[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_BASE32[bits])
+            bits, bit_count = 0, 0
+    return "".join(chars)
+
+
+def geohash_bounds(geohash: str) -> Tuple[float, float, float, float]:
+    """Bounding box (min_lat, min_lon, max_lat, max_lon) of a geohash cell"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = GEOHASH_BASE32.index(char)
+        for shift in range(4, -1, -1):
+            bounds = lon_range if even else lat_range
+            mid = (bounds[0] + bounds[1]) / 2
+            if (value >> shift) & 1:
+                bounds[0] = mid
+            else:
+                bounds[1] = mid
+            even = not even
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in kilometers"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def radius_bucket(radius_km: float) -> float:
+    """Smallest radius bucket that covers the requested radius"""
+    for bucket in RADIUS_BUCKETS:
+        if radius_km <= bucket:
+            return bucket
+    return float(math.ceil(radius_km))
+
+
+def normalize_specialty(specialty: Optional[str], known: Iterable[str] = ()) -> str:
+    """
+    Normalize a specialty for cache keys and searches
+    
+    "General Medicine" and "general" share an entry when "general" is a
+    known specialty; unknown specialties are lowercased.
+    
+    Args:
+        specialty: Specialty as produced by triage
+        known: Specialty names the facility search understands
+    
+    Returns:
+        Normalized specialty ("general" if empty)
+    """
+    value = " ".join((specialty or "").lower().split())
+    if not value:
+        return "general"
+    known = list(known)
+    if value in known:
+        return value
+    for name in known:
+        if name in value:
+            return name
+    return value
+
+
+class FacilityResultCache:
+    """
+    TTL + LRU cache of facility search results per location cell.
+    
+    Each entry holds the facilities found around the cell center for a
+    radius bucket widened by the cell's half-diagonal, so it covers any
+    point inside the cell. `localize` then recomputes distances from the
+    patient's actual coordinates and applies the exact radius.
+    """
+    
+    def __init__(self, precision: int = 6, ttl_seconds: float = 6 * 3600, capacity: int = 5000):
+        """
+        Initialize cache
+        
+        Args:
+            precision: Geohash precision of the location cells
+            ttl_seconds: Maximum age of an entry
+            capacity: Maximum number of entries
+        """
+        self.precision = precision
+        self.ttl_seconds = ttl_seconds
+        self.capacity = capacity
+        self.entries: "OrderedDict[CacheKey, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "stores": 0, "evictions": 0, "invalidations": 0}
+        self._lock = threading.Lock()
+    
+    def key(self, latitude: float, longitude: float, radius_km: float, specialty: str) -> CacheKey:
+        """Cache key for a search (specialty must already be normalized)"""
+        return geohash_encode(latitude, longitude, self.precision), specialty, radius_bucket(radius_km)
+    
+    @staticmethod
+    def search_area(key: CacheKey) -> Tuple[float, float, float]:
+        """Center and radius (km) to search so the entry covers its whole cell"""
+        geohash, _, bucket = key
+        min_lat, min_lon, max_lat, max_lon = geohash_bounds(geohash)
+        center_lat, center_lon = (min_lat + max_lat) / 2, (min_lon + max_lon) / 2
+        margin = haversine_km(center_lat, center_lon, max_lat, max_lon)
+        return center_lat, center_lon, bucket + margin
+    
+    def get(self, key: CacheKey) -> Optional[List[Dict[str, Any]]]:
+        """Cached facilities for the key, or None on a miss"""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            stored_at, facilities = entry
+            if time.time() - stored_at > self.ttl_seconds:
+                del self.entries[key]
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return facilities
+    
+    def put(self, key: CacheKey, facilities: List[Dict[str, Any]]):
+        """Store search results for the key"""
+        with self._lock:
+            self.entries[key] = (time.time(), facilities)
+            self.entries.move_to_end(key)
+            self.stats["stores"] += 1
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+                self.stats["evictions"] += 1
+    
+    def invalidate(self, geohash_prefix: Optional[str] = None) -> int:
+        """
+        Drop cached entries, e.g. after the facility index is refreshed
+        
+        Args:
+            geohash_prefix: Only drop cells inside this geohash (all entries if None)
+        
+        Returns:
+            Number of entries dropped
+        """
+        with self._lock:
+            if geohash_prefix is None:
+                dropped = len(self.entries)
+                self.entries.clear()
+            else:
+                stale = [key for key in self.entries if key[0].startswith(geohash_prefix)]
+                for key in stale:
+                    del self.entries[key]
+                dropped = len(stale)
+            self.stats["invalidations"] += 1
+        return dropped
+    
+    @staticmethod
+    def localize(
+        facilities: List[Dict[str, Any]],
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        limit: int = 10
+    ) -> List[Dict[str, Any]]:
+        """
+        Re-measure cached facilities from the patient's position
+        
+        Args:
+            facilities: Cached facilities (with "coordinates")
+            latitude: Patient latitude
+            longitude: Patient longitude
+            radius_km: Exact search radius
+            limit: Maximum number of facilities returned
+        
+        Returns:
+            Copies of the facilities within the radius, nearest first
+        """
+        nearby = []
+        for facility in facilities:
+            if isinstance(facility, FacilityRecord):
+                facility_lat, facility_lon = facility.latitude, facility.longitude
+            else:
+                coordinates = facility.get("coordinates") or {}
+                if "latitude" not in coordinates:
+                    continue
+                facility_lat, facility_lon = coordinates["latitude"], coordinates["longitude"]
+            distance = haversine_km(latitude, longitude, facility_lat, facility_lon)
+            if distance <= radius_km:
+                nearby.append((distance, facility))
+        nearby.sort(key=lambda item: item[0])
+        
+        results = []
+        for distance, facility in nearby[:limit]:
+            # Records hold only immutable values, so a slot copy is independent
+            result = facility.copy() if isinstance(facility, FacilityRecord) else copy.deepcopy(facility)
+            result["distance_km"] = round(distance, 2)
+            results.append(result)
+        return results
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["size"] = len(self.entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+def load_clinic_locations(path: str) -> List[Dict[str, Any]]:
+    """
+    Load registered clinic locations for cache warmup
+    
+    Args:
+        path: JSON file with a list of {"name", "latitude", "longitude"} records
+    
+    Returns:
+        List of location records
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        records = json.load(f)
+    return [r for r in records if "latitude" in r and "longitude" in r]
+
+
+def warm_facility_cache(
+    search: Callable[[float, float, float, Optional[str]], Any],
+    locations: List[Dict[str, Any]],
+    specialties: Iterable[str],
+    radii: Iterable[float],
+    delay_seconds: float = 1.0
+) -> int:
+    """
+    Precompute facility results for registered clinic locations
+    
+    Args:
+        search: FacilityMatcher.search_nearby_facilities
+        locations: Clinic locations with latitude/longitude
+        specialties: Specialties to precompute
+        radii: Search radii to precompute
+        delay_seconds: Pause between searches (Nominatim allows about one request per second)
+    
+    Returns:
+        Number of searches issued
+    """
+    count = 0
+    for location in locations:
+        for specialty in specialties:
+            for radius in radii:
+                try:
+                    search(float(location["latitude"]), float(location["longitude"]), radius, specialty)
+                    count += 1
+                except Exception as e:
+                    print(f"Error warming facility cache for {location.get('name', location)}: {e}")
+                if delay_seconds:
+                    time.sleep(delay_seconds)
+    return count
+
+
+def load_default_cache() -> Optional[FacilityResultCache]:
+    """Facility cache configured from the environment, or None if disabled"""
+    if os.getenv("FACILITY_CACHE", "true").lower() != "true":
+        return None
+    return FacilityResultCache(
+        precision=int(os.getenv("FACILITY_CACHE_PRECISION", "6")),
+        ttl_seconds=float(os.getenv("FACILITY_CACHE_TTL", str(6 * 3600))),
+        capacity=int(os.getenv("FACILITY_CACHE_CAPACITY", "5000"))
+    )
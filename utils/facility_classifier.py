@@ -0,0 +1,239 @@
+"""
+Facility classification for Arovia
+Facility type, services and specialties are derived once when a facility is
+ingested and stored as integer bitsets, so queries filter with bitwise ops
+"""
+import os
+import re
+import json
+from typing import Optional, Dict, Any, List, Iterable, Tuple
+
+
+DEFAULT_SPECIALTIES: Dict[str, List[str]] = {
+    "cardiology": ["heart", "cardiac", "cardiovascular"],
+    "neurology": ["brain", "neurological", "stroke", "seizure"],
+    "pulmonology": ["lung", "respiratory", "breathing", "asthma"],
+    "orthopedics": ["bone", "joint", "fracture", "spine"],
+    "pediatrics": ["child", "pediatric", "infant", "baby"],
+    "gynecology": ["women", "pregnancy", "maternal", "reproductive"],
+    "dermatology": ["skin", "dermatological", "rash"],
+    "psychiatry": ["mental", "psychiatric", "depression", "anxiety"],
+    "emergency": ["emergency", "trauma", "urgent", "critical"],
+    "general": ["general", "family", "primary", "clinic"]
+}
+
+# Checked in order; the first matching type wins
+DEFAULT_FACILITY_TYPES: Dict[str, List[str]] = {
+    "government": ["government", "public", "municipal", "district", "civil"],
+    "private": ["private", "corporate", "multispecialty", "hospital"],
+    "ngo": ["ngo", "charitable", "trust", "foundation", "mission"],
+    "local": ["local", "community", "rural", "primary", "health center"]
+}
+
+DEFAULT_SERVICES: Dict[str, List[str]] = {
+    "Emergency Care": ["emergency", "trauma"],
+    "Surgical Services": ["surgery", "surgical"],
+    "Laboratory Services": ["lab", "laboratory"],
+    "Imaging Services": ["x-ray", "imaging"],
+    "Pharmacy": ["pharmacy"]
+}
+
+DEFAULT_FACILITY_TYPE = "local"
+BASE_SERVICE = "General Consultation"
+
+
+class FacilityClassification:
+    """Bitsets for one facility"""
+    
+    __slots__ = ("type_mask", "service_mask", "specialty_mask")
+    
+    def __init__(self, type_mask: int = 0, service_mask: int = 0, specialty_mask: int = 0):
+        self.type_mask = type_mask
+        self.service_mask = service_mask
+        self.specialty_mask = specialty_mask
+
+
+class FacilityClassifier:
+    """
+    Compiled keyword matcher for facility enrichment.
+    
+    All vocabularies are merged into one regular expression that is scanned
+    once per facility. Keywords keep the substring semantics of the old
+    per-keyword `in` checks: the pattern is a lookahead tried at every
+    position, longest keyword first, and each keyword also carries the bits
+    of any shorter keyword it contains.
+    """
+    
+    def __init__(
+        self,
+        specialties: Optional[Dict[str, List[str]]] = None,
+        facility_types: Optional[Dict[str, List[str]]] = None,
+        services: Optional[Dict[str, List[str]]] = None
+    ):
+        """
+        Initialize classifier
+        
+        Args:
+            specialties: Specialty name -> keywords
+            facility_types: Facility type -> keywords, in priority order
+            services: Service label -> keywords
+        """
+        self.specialties = specialties or DEFAULT_SPECIALTIES
+        self.facility_types = facility_types or DEFAULT_FACILITY_TYPES
+        self.services = services or DEFAULT_SERVICES
+        
+        self.specialty_names = list(self.specialties)
+        self.type_names = list(self.facility_types)
+        self.service_names = list(self.services)
+        self.specialty_bits = {name: 1 << i for i, name in enumerate(self.specialty_names)}
+        self.type_bits = {name: 1 << i for i, name in enumerate(self.type_names)}
+        self.service_bits = {name: 1 << i for i, name in enumerate(self.service_names)}
+        if DEFAULT_FACILITY_TYPE not in self.type_bits:
+            self.type_bits[DEFAULT_FACILITY_TYPE] = 1 << len(self.type_names)
+            self.type_names.append(DEFAULT_FACILITY_TYPE)
+        
+        # keyword -> [type_mask, service_mask, specialty_mask]
+        masks: Dict[str, List[int]] = {}
+        for vocabulary, bits, slot in (
+            (self.facility_types, self.type_bits, 0),
+            (self.services, self.service_bits, 1),
+            (self.specialties, self.specialty_bits, 2)
+        ):
+            for name, keywords in vocabulary.items():
+                for keyword in keywords:
+                    keyword = keyword.lower()
+                    if keyword:
+                        masks.setdefault(keyword, [0, 0, 0])[slot] |= bits[name]
+        
+        # A keyword that contains a shorter one matches both
+        self._masks: Dict[str, Tuple[int, int, int]] = {}
+        for keyword in masks:
+            combined = [0, 0, 0]
+            for other, other_masks in masks.items():
+                if other in keyword:
+                    for slot in range(3):
+                        combined[slot] |= other_masks[slot]
+            self._masks[keyword] = tuple(combined)
+        
+        alternatives = sorted(self._masks, key=len, reverse=True)
+        self._pattern = re.compile("(?=(" + "|".join(re.escape(k) for k in alternatives) + "))") if alternatives else None
+    
+    def classify(self, *texts: str) -> FacilityClassification:
+        """
+        Classify a facility from its name, address and tags
+        
+        Returns:
+            FacilityClassification with type, service and specialty bitsets
+        """
+        result = FacilityClassification()
+        if self._pattern is None:
+            return result
+        text = " ".join(t for t in texts if t).lower()
+        for keyword in set(self._pattern.findall(text)):
+            type_mask, service_mask, specialty_mask = self._masks[keyword]
+            result.type_mask |= type_mask
+            result.service_mask |= service_mask
+            result.specialty_mask |= specialty_mask
+        return result
+    
+    def facility_type(self, type_mask: int) -> str:
+        """Highest-priority facility type in the mask"""
+        if not type_mask:
+            return DEFAULT_FACILITY_TYPE
+        return self.type_names[(type_mask & -type_mask).bit_length() - 1]
+    
+    def service_labels(self, service_mask: int, specialty_mask: int = 0, specialty: Optional[str] = None) -> List[str]:
+        """Service labels for the masks, with the requested specialty's service if offered"""
+        services = [BASE_SERVICE]
+        bit = self.specialty_bits.get(specialty or "")
+        if bit and specialty_mask & bit:
+            services.append(f"{specialty.title()} Services")
+        services.extend(name for name in self.service_names if service_mask & self.service_bits[name])
+        return services
+    
+    def mask_for(self, names: Iterable[str], bits: Dict[str, int]) -> int:
+        """OR of the bits for the given names (unknown names are ignored)"""
+        mask = 0
+        for name in names:
+            mask |= bits.get(name, 0)
+        return mask
+    
+    def annotate(self, facility: Dict[str, Any], specialty: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Store classification on a facility record (in place)
+        
+        Sets type_mask, service_mask and specialty_mask from the record's name
+        and address (plus any service labels it already lists), and fills
+        facility_type and services if they are missing.
+        """
+        classification = self.classify(facility.get("name", ""), facility.get("address", ""))
+        facility["type_mask"] = classification.type_mask
+        facility["service_mask"] = classification.service_mask | self.mask_for(
+            facility.get("services") or (), self.service_bits
+        )
+        facility["specialty_mask"] = classification.specialty_mask
+        facility.setdefault("facility_type", self.facility_type(classification.type_mask))
+        facility.setdefault("services", self.service_labels(
+            classification.service_mask, classification.specialty_mask, specialty
+        ))
+        return facility
+    
+    def select(
+        self,
+        facilities: List[Dict[str, Any]],
+        specialties: Iterable[str] = (),
+        services: Iterable[str] = (),
+        facility_types: Iterable[str] = ()
+    ) -> List[Dict[str, Any]]:
+        """
+        Filter classified facilities with bitwise tests
+        
+        Args:
+            facilities: Records carrying the *_mask fields (see annotate)
+            specialties: Keep facilities offering any of these specialties
+            services: Keep facilities offering all of these services
+            facility_types: Keep facilities of any of these types
+        
+        Returns:
+            Matching facilities, in input order
+        """
+        specialty_mask = self.mask_for(specialties, self.specialty_bits)
+        service_mask = self.mask_for(services, self.service_bits)
+        type_mask = self.mask_for(facility_types, self.type_bits)
+        selected = []
+        for facility in facilities:
+            if specialty_mask and not facility.get("specialty_mask", 0) & specialty_mask:
+                continue
+            if service_mask and facility.get("service_mask", 0) & service_mask != service_mask:
+                continue
+            if type_mask and not self.type_bits.get(facility.get("facility_type"), 0) & type_mask:
+                continue
+            selected.append(facility)
+        return selected
+
+
+def load_vocabulary(path: str) -> Dict[str, Dict[str, List[str]]]:
+    """
+    Load keyword vocabularies from JSON
+    
+    Args:
+        path: JSON file with any of "specialties", "facility_types" and "services"
+    
+    Returns:
+        Vocabulary dict accepted by FacilityClassifier(**vocabulary)
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return {key: data[key] for key in ("specialties", "facility_types", "services") if key in data}
+
+
+_default_classifier: Optional[FacilityClassifier] = None
+
+
+def get_default_classifier() -> FacilityClassifier:
+    """Process-wide classifier (FACILITY_VOCABULARY_PATH overrides the built-in keywords)"""
+    global _default_classifier
+    if _default_classifier is None:
+        path = os.getenv("FACILITY_VOCABULARY_PATH")
+        _default_classifier = FacilityClassifier(**(load_vocabulary(path) if path else {}))
+    return _default_classifier
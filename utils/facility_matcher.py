@@ -9,6 +9,14 @@ from typing import List, Dict, Any, Optional, Tuple
 from geopy.geocoders import Nominatim
 from geopy.distance import geodesic
 from models.schemas import FacilityInfo
+from utils.singleflight import SingleFlight, normalize_key
+from utils.facility_cache import FacilityResultCache, load_default_cache, normalize_specialty
+from utils.facility_classifier import FacilityClassifier, get_default_classifier
+from utils.road_router import RoadRouter, load_default_router
+from utils.facility_state import FacilityStateStore
+from utils.batch_geocoder import BatchGeocoder
+from utils.gazetteer import Gazetteer, load_default_gazetteer
+from utils.facility_record import FacilityRecord
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -18,32 +26,54 @@ load_dotenv()
 class FacilityMatcher:
     """Facility matching engine for finding nearby healthcare facilities"""
     
-    def __init__(self):
-        """Initialize facility matcher"""
-        self.geocoder = Nominatim(user_agent="arovia-health-desk")
-        self.base_url = "https://nominatim.openstreetmap.org/search"
-        
-        # Medical specialty mappings
-        self.specialty_mappings = {
-            "cardiology": ["heart", "cardiac", "cardiovascular"],
-            "neurology": ["brain", "neurological", "stroke", "seizure"],
-            "pulmonology": ["lung", "respiratory", "breathing", "asthma"],
-            "orthopedics": ["bone", "joint", "fracture", "spine"],
-            "pediatrics": ["child", "pediatric", "infant", "baby"],
-            "gynecology": ["women", "pregnancy", "maternal", "reproductive"],
-            "dermatology": ["skin", "dermatological", "rash"],
-            "psychiatry": ["mental", "psychiatric", "depression", "anxiety"],
-            "emergency": ["emergency", "trauma", "urgent", "critical"],
-            "general": ["general", "family", "primary", "clinic"]
-        }
+    def __init__(
+        self,
+        facility_cache: Optional[FacilityResultCache] = None,
+        use_cache: bool = True,
+        classifier: Optional[FacilityClassifier] = None,
+        road_router: Optional[RoadRouter] = None,
+        facility_state: Optional[FacilityStateStore] = None,
+        gazetteer: Optional[Gazetteer] = None
+    ):
+        """
+        Initialize facility matcher
         
-        # Facility type labels
-        self.facility_types = {
-            "government": ["government", "public", "municipal", "district", "civil"],
-            "private": ["private", "corporate", "multispecialty", "hospital"],
-            "ngo": ["ngo", "charitable", "trust", "foundation", "mission"],
-            "local": ["local", "community", "rural", "primary", "health center"]
-        }
+        Args:
+            facility_cache: Result cache (configured from the environment if None)
+            use_cache: Set False to always search OpenStreetMap
+            classifier: Compiled facility keyword matcher (process default if None)
+            road_router: Offline road router for travel times (from ROAD_GRAPH_PATH if None)
+            facility_state: Live capacity/availability store used for ranking
+            gazetteer: Offline place/PIN-code index consulted before Nominatim (from GAZETTEER_PATH if None)
+        """
+        # NOMINATIM_DOMAIN points at a self-hosted server for bulk imports
+        nominatim_domain = os.getenv("NOMINATIM_DOMAIN", "nominatim.openstreetmap.org")
+        self.geocoder = Nominatim(user_agent="arovia-health-desk", domain=nominatim_domain)
+        self.base_url = f"https://{nominatim_domain}/search"
+        
+        # PIN codes, districts and villages resolve locally without a network call
+        self.gazetteer = gazetteer or load_default_gazetteer()
+        
+        # Coalesce identical concurrent Nominatim lookups
+        self._geocode_flight = SingleFlight("geocode")
+        self._search_flight = SingleFlight("facility_search")
+        
+        # Search results shared by nearby patients (per geohash cell)
+        self.facility_cache = (facility_cache or load_default_cache()) if use_cache else None
+        
+        # Keyword vocabularies, compiled once and applied when facilities are ingested
+        self.classifier = classifier or get_default_classifier()
+        self.specialty_mappings = self.classifier.specialties
+        self.facility_types = self.classifier.facility_types
+        
+        # Travel-time ranking on an offline road graph (None when no graph is configured)
+        self.road_router = road_router or load_default_router()
+        
+        # Opening hours, emergency capacity and queue lengths (fed by the ingest endpoint)
+        self.facility_state = facility_state or FacilityStateStore(
+            stale_after_seconds=float(os.getenv("FACILITY_STATE_TTL", str(6 * 3600))),
+            timezone=os.getenv("FACILITY_TIMEZONE", "Asia/Kolkata")
+        )
     
     def geocode_location(self, location: str) -> Optional[Tuple[float, float]]:
         """
@@ -51,15 +81,58 @@ class FacilityMatcher:
         
         Args:
             location: Location string (address, city, etc.)
-            
+        
         Returns:
             Tuple of (latitude, longitude) or None if not found
         """
+        if self.gazetteer is not None:
+            coordinates = self.gazetteer.geocode(location)
+            if coordinates:
+                return coordinates
+        return self._geocode_flight.do(normalize_key(location), self._geocode_location, location)
+    
+    def geocode_batch(
+        self,
+        locations: List[str],
+        checkpoint_path: Optional[str] = None,
+        workers: Optional[int] = None,
+        rate: Optional[float] = None,
+        retry_failed: bool = False
+    ) -> Tuple[List[Optional[Tuple[float, float]]], Dict[str, Any]]:
+        """
+        Geocode many locations for a bulk import
+        
+        Args:
+            locations: Location strings (duplicates are geocoded once)
+            checkpoint_path: JSONL checkpoint for resuming an interrupted import
+            workers: Concurrent Nominatim requests (GEOCODE_WORKERS)
+            rate: Nominatim requests per second (GEOCODE_RATE, 1 for the public server)
+            retry_failed: Retry addresses that had no result in an earlier run of the checkpoint
+        
+        Returns:
+            (coordinates per location or None, throughput report)
+        """
+        geocoder = BatchGeocoder(
+            self._geocode_remote,
+            resolvers=[self.gazetteer.geocode] if self.gazetteer is not None else [],
+            workers=workers or int(os.getenv("GEOCODE_WORKERS", "4")),
+            rate=rate or float(os.getenv("GEOCODE_RATE", "1")),
+            checkpoint_path=checkpoint_path,
+            retry_failed=retry_failed
+        )
+        return geocoder.run(locations)
+    
+    def _geocode_remote(self, location: str) -> Optional[Tuple[float, float]]:
+        """Geocode through Nominatim; None means no result, errors are raised"""
+        location_data = self.geocoder.geocode(location)
+        if location_data:
+            return (location_data.latitude, location_data.longitude)
+        return None
+    
+    def _geocode_location(self, location: str) -> Optional[Tuple[float, float]]:
+        """Geocode through Nominatim (uncoalesced)"""
         try:
-            location_data = self.geocoder.geocode(location)
-            if location_data:
-                return (location_data.latitude, location_data.longitude)
-            return None
+            return self._geocode_remote(location)
         except Exception as e:
             print(f"Error geocoding location '{location}': {e}")
             return None
@@ -79,79 +152,201 @@ class FacilityMatcher:
             longitude: User's longitude
             radius_km: Search radius in kilometers
             specialty: Medical specialty to filter by
-            
+        
         Returns:
             List of nearby facilities
         """
+        if self.facility_cache is None:
+            key = (round(latitude, 5), round(longitude, 5), radius_km, (specialty or "").lower())
+            return self._search_flight.do(
+                key, self._search_nearby_facilities, latitude, longitude, radius_km, specialty
+            )
+        
+        specialty = normalize_specialty(specialty, self.specialty_mappings)
+        key = self.facility_cache.key(latitude, longitude, radius_km, specialty)
+        facilities = self.facility_cache.get(key)
+        if facilities is None:
+            facilities = self._search_flight.do(key, self._search_cell, key)
+            if facilities is None:
+                return self._get_mock_facilities(latitude, longitude, specialty)
+        return self.facility_cache.localize(facilities, latitude, longitude, radius_km)
+    
+    def _search_cell(self, key) -> Optional[List[Dict[str, Any]]]:
+        """Search around a cache cell's center and store the results (None if the search failed)"""
+        center_lat, center_lon, search_radius = self.facility_cache.search_area(key)
         try:
-            # Build search query
-            query_parts = ["healthcare", "hospital", "clinic", "medical"]
-            
-            if specialty and specialty.lower() in self.specialty_mappings:
-                specialty_keywords = self.specialty_mappings[specialty.lower()]
-                query_parts.extend(specialty_keywords)
-            
-            query = " ".join(query_parts)
-            
-            # Search parameters
-            params = {
-                "q": query,
-                "format": "json",
-                "limit": 20,
-                "addressdetails": 1,
-                "extratags": 1,
-                "bounded": 1,
-                "viewbox": f"{longitude-0.1},{latitude-0.1},{longitude+0.1},{latitude+0.1}"
-            }
-            
-            # Make request to OpenStreetMap
-            response = requests.get(self.base_url, params=params, timeout=10)
-            response.raise_for_status()
-            
-            facilities = response.json()
-            
-            # Filter and process results
-            nearby_facilities = []
-            for facility in facilities:
-                try:
-                    # Calculate distance
-                    facility_lat = float(facility.get("lat", 0))
-                    facility_lon = float(facility.get("lon", 0))
-                    
-                    if facility_lat == 0 or facility_lon == 0:
-                        continue
-                    
-                    distance = geodesic(
-                        (latitude, longitude), 
-                        (facility_lat, facility_lon)
-                    ).kilometers
-                    
-                    # Filter by radius
-                    if distance <= radius_km:
-                        facility_info = self._process_facility_data(facility, distance, specialty)
-                        if facility_info:
-                            nearby_facilities.append(facility_info)
-                
-                except Exception as e:
-                    print(f"Error processing facility: {e}")
-                    continue
-            
-            # Sort by distance
-            nearby_facilities.sort(key=lambda x: x["distance_km"])
-            
-            return nearby_facilities[:10]  # Return top 10
-            
+            facilities = self._fetch_nearby_facilities(
+                center_lat, center_lon, search_radius, key[1], limit=None
+            )
+        except Exception as e:
+            print(f"Error searching facilities: {e}")
+            return None
+        self.facility_cache.put(key, facilities)
+        return facilities
+    
+    def rank_by_travel_time(
+        self,
+        latitude: float,
+        longitude: float,
+        facilities: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Order facilities by road travel time from the patient
+        
+        Sets "travel_time_min" on each facility (None if it cannot be routed).
+        Unroutable facilities follow the routable ones, by distance. Without a
+        road graph the facilities are returned by distance.
+        
+        Args:
+            latitude: Patient latitude
+            longitude: Patient longitude
+            facilities: Facilities with "coordinates"
+        
+        Returns:
+            Facilities sorted by travel time
+        """
+        if self.road_router is None:
+            return sorted(facilities, key=lambda f: f["distance_km"])
+        
+        routable = [f for f in facilities if "latitude" in (f.get("coordinates") or {})]
+        times = self.road_router.travel_times(
+            latitude, longitude,
+            [(f["coordinates"]["latitude"], f["coordinates"]["longitude"]) for f in routable]
+        )
+        for facility in facilities:
+            facility["travel_time_min"] = None
+        for facility, seconds in zip(routable, times):
+            if seconds is not None:
+                facility["travel_time_min"] = round(seconds / 60, 1)
+        return sorted(facilities, key=lambda f: (
+            f["travel_time_min"] is None,
+            f["travel_time_min"] if f["travel_time_min"] is not None else f["distance_km"]
+        ))
+    
+    def rank_facilities(
+        self,
+        latitude: float,
+        longitude: float,
+        facilities: List[Dict[str, Any]],
+        needs_emergency: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Rank facilities by travel time, capability and current load
+        
+        Args:
+            latitude: Patient latitude
+            longitude: Patient longitude
+            facilities: Facilities from search_nearby_facilities
+            needs_emergency: Prefer facilities with emergency capacity
+        
+        Returns:
+            Facilities, best first
+        """
+        if self.road_router is not None:
+            facilities = self.rank_by_travel_time(latitude, longitude, facilities)
+        return self.facility_state.rank(facilities, needs_emergency)
+    
+    def invalidate_facility_cache(self, geohash_prefix: Optional[str] = None) -> int:
+        """
+        Drop cached facility results after the facility data changed
+        
+        Args:
+            geohash_prefix: Only drop cells inside this geohash (everything if None)
+        
+        Returns:
+            Number of cache entries dropped
+        """
+        if self.facility_cache is None:
+            return 0
+        return self.facility_cache.invalidate(geohash_prefix)
+    
+    def _search_nearby_facilities(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        specialty: Optional[str]
+    ) -> List[Dict[str, Any]]:
+        """Search OpenStreetMap for facilities (uncoalesced)"""
+        try:
+            return self._fetch_nearby_facilities(latitude, longitude, radius_km, specialty)
         except Exception as e:
             print(f"Error searching facilities: {e}")
             # Return mock data for demonstration
             return self._get_mock_facilities(latitude, longitude, specialty)
     
+    def _fetch_nearby_facilities(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        specialty: Optional[str],
+        limit: Optional[int] = 10
+    ) -> List[Dict[str, Any]]:
+        """Query OpenStreetMap for facilities within the radius (raises on request errors)"""
+        # Build search query
+        query_parts = ["healthcare", "hospital", "clinic", "medical"]
+        
+        specialty = specialty.lower() if specialty else None
+        if specialty in self.specialty_mappings:
+            query_parts.extend(self.specialty_mappings[specialty])
+        
+        query = " ".join(query_parts)
+        
+        # Search parameters
+        params = {
+            "q": query,
+            "format": "json",
+            "limit": 20,
+            "addressdetails": 1,
+            "extratags": 1,
+            "bounded": 1,
+            "viewbox": f"{longitude-0.1},{latitude-0.1},{longitude+0.1},{latitude+0.1}"
+        }
+        
+        # Make request to OpenStreetMap
+        response = requests.get(self.base_url, params=params, timeout=10)
+        response.raise_for_status()
+        
+        facilities = response.json()
+        
+        # Filter and process results
+        nearby_facilities = []
+        for facility in facilities:
+            try:
+                # Calculate distance
+                facility_lat = float(facility.get("lat", 0))
+                facility_lon = float(facility.get("lon", 0))
+                
+                if facility_lat == 0 or facility_lon == 0:
+                    continue
+                
+                distance = geodesic(
+                    (latitude, longitude), 
+                    (facility_lat, facility_lon)
+                ).kilometers
+                
+                # Filter by radius
+                if distance <= radius_km:
+                    facility_info = self._process_facility_data(facility, distance, specialty)
+                    if facility_info:
+                        nearby_facilities.append(facility_info)
+            
+            except Exception as e:
+                print(f"Error processing facility: {e}")
+                continue
+        
+        # Sort by distance
+        nearby_facilities.sort(key=lambda x: x["distance_km"])
+        
+        return nearby_facilities[:limit]  # Return top 10 by default
+    
     def _process_facility_data(
         self, 
         facility_data: Dict[str, Any], 
         distance: float,
         specialty: Optional[str]
-    ) -> Optional[Dict[str, Any]]:
+    ) -> Optional[FacilityRecord]:
         """
         Process raw facility data into structured format
         
@@ -159,7 +354,7 @@ class FacilityMatcher:
             facility_data: Raw facility data from OpenStreetMap
             distance: Distance from user in kilometers
             specialty: Medical specialty filter
-            
+        
         Returns:
             Processed facility information
         """
@@ -173,76 +368,78 @@ class FacilityMatcher:
             city = address_details.get("city", address_details.get("town", ""))
             state = address_details.get("state", "")
             
-            # Determine facility type
-            facility_type = self._classify_facility_type(name, address)
-            
-            # Determine services
-            services = self._determine_services(name, address, specialty)
+            # Classify once at ingest; type, services and specialties are kept as bitsets
+            classification = self.classifier.classify(name, address)
             
-            # Generate map link
-            map_link = self._generate_map_link(
-                facility_data.get("lat"), 
-                facility_data.get("lon")
+            # Compact record (interned strings, slots) instead of a nested dict
+            facility_info = FacilityRecord(
+                facility_id=(f"{facility_data['osm_type']}/{facility_data['osm_id']}"
+                             if facility_data.get("osm_id") else None),
+                name=name,
+                address=address,
+                city=city,
+                state=state,
+                latitude=float(facility_data.get("lat", 0)),
+                longitude=float(facility_data.get("lon", 0)),
+                distance_km=round(distance, 2),
+                facility_type=self.classifier.facility_type(classification.type_mask),
+                services=self.classifier.service_labels(
+                    classification.service_mask, classification.specialty_mask, specialty
+                ),
+                specialty_match=specialty if specialty else "general",
+                contact=self._extract_contact_info(facility_data),
+                type_mask=classification.type_mask,
+                service_mask=classification.service_mask,
+                specialty_mask=classification.specialty_mask
             )
             
-            # Create facility info
-            facility_info = {
-                "name": name,
-                "address": address,
-                "city": city,
-                "state": state,
-                "distance_km": round(distance, 2),
-                "facility_type": facility_type,
-                "services": services,
-                "specialty_match": specialty if specialty else "general",
-                "map_link": map_link,
-                "contact": self._extract_contact_info(facility_data),
-                "coordinates": {
-                    "latitude": float(facility_data.get("lat", 0)),
-                    "longitude": float(facility_data.get("lon", 0))
-                }
-            }
-            
             return facility_info
-            
+        
         except Exception as e:
             print(f"Error processing facility data: {e}")
             return None
     
     def _classify_facility_type(self, name: str, address: str) -> str:
         """Classify facility type based on name and address"""
-        text = (name + " " + address).lower()
-        
-        for facility_type, keywords in self.facility_types.items():
-            if any(keyword in text for keyword in keywords):
-                return facility_type
-        
-        return "local"  # Default to local clinic
+        return self.classifier.facility_type(self.classifier.classify(name, address).type_mask)
     
     def _determine_services(self, name: str, address: str, specialty: Optional[str]) -> List[str]:
         """Determine available services based on facility information"""
-        services = ["General Consultation"]
-        text = (name + " " + address).lower()
-        
-        # Add specialty-specific services
-        if specialty and specialty.lower() in self.specialty_mappings:
-            specialty_keywords = self.specialty_mappings[specialty.lower()]
-            if any(keyword in text for keyword in specialty_keywords):
-                services.append(f"{specialty.title()} Services")
-        
-        # Add common services based on keywords
-        if "emergency" in text or "trauma" in text:
-            services.append("Emergency Care")
-        if "surgery" in text or "surgical" in text:
-            services.append("Surgical Services")
-        if "lab" in text or "laboratory" in text:
-            services.append("Laboratory Services")
-        if "x-ray" in text or "imaging" in text:
-            services.append("Imaging Services")
-        if "pharmacy" in text:
-            services.append("Pharmacy")
-        
-        return services
+        classification = self.classifier.classify(name, address)
+        return self.classifier.service_labels(
+            classification.service_mask,
+            classification.specialty_mask,
+            specialty.lower() if specialty else None
+        )
+    
+    def filter_facilities(
+        self,
+        facilities: List[Dict[str, Any]],
+        specialty: Optional[str] = None,
+        services: Optional[List[str]] = None,
+        facility_type: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Filter facilities by their precomputed classification
+        
+        Args:
+            facilities: Facilities returned by search_nearby_facilities
+            specialty: Required specialty
+            services: Required service labels (all must be offered)
+            facility_type: Required facility type
+        
+        Returns:
+            Matching facilities
+        """
+        for facility in facilities:
+            if "service_mask" not in facility:
+                self.classifier.annotate(facility, specialty)
+        return self.classifier.select(
+            facilities,
+            specialties=[normalize_specialty(specialty, self.specialty_mappings)] if specialty else (),
+            services=services or (),
+            facility_types=[facility_type] if facility_type else ()
+        )
     
     def _extract_contact_info(self, facility_data: Dict[str, Any]) -> Optional[str]:
         """Extract contact information if available"""
@@ -364,7 +561,7 @@ class FacilityMatcher:
                 }
             ]
         
-        return mock_facilities
+        return [FacilityRecord.from_dict(facility) for facility in mock_facilities]
     
     def find_facilities_for_condition(
         self,
@@ -379,7 +576,7 @@ class FacilityMatcher:
             user_location: User's location (address, city, etc.)
             specialty: Required medical specialty
             radius_km: Search radius in kilometers
-            
+        
         Returns:
             List of facility data dictionaries
         """
@@ -397,7 +594,7 @@ class FacilityMatcher:
             )
             
             return facilities_data
-            
+        
         except Exception as e:
             print(f"Error finding facilities: {e}")
             return []
@@ -416,7 +613,7 @@ def find_nearby_clinics(
         location: User's location
         specialty: Medical specialty needed
         radius_km: Search radius in kilometers
-        
+    
     Returns:
         List of nearby facility data
     """
@@ -0,0 +1,178 @@
+"""
+Compact facility records for Arovia
+Facilities flow through search, caching and ranking as __slots__ records
+with interned strings; pydantic models are built only for the final top-k
+"""
+import sys
+from typing import Optional, Dict, Any, List, Iterable, Iterator
+
+from models.schemas import FacilityInfo
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value else value
+
+
+class FacilityRecord:
+    """
+    One facility, stored in slots instead of a per-result dict.
+    
+    Repeated strings (city, state, type, specialty, service labels) are
+    interned and services are a shared tuple, so many records cost little
+    more than their numbers. Records also behave as read/write mappings
+    (`record["name"]`, `record.get("coordinates")`), so code written for
+    the earlier dict results keeps working.
+    """
+    
+    __slots__ = (
+        "facility_id", "name", "address", "city", "state", "latitude", "longitude",
+        "distance_km", "facility_type", "services", "specialty_match", "contact",
+        "type_mask", "service_mask", "specialty_mask",
+        "travel_time_min", "expected_wait_min", "emergency_capable", "is_open", "ranking_score"
+    )
+    
+    # Keys produced by to_dict(), in the order of the old dict results
+    KEYS = (
+        "facility_id", "name", "address", "city", "state", "distance_km", "facility_type", "services",
+        "specialty_match", "type_mask", "service_mask", "specialty_mask", "map_link", "contact", "coordinates",
+        "travel_time_min", "expected_wait_min", "emergency_capable", "is_open", "ranking_score"
+    )
+    
+    def __init__(
+        self,
+        name: str,
+        address: str,
+        latitude: float,
+        longitude: float,
+        distance_km: float = 0.0,
+        facility_type: str = "local",
+        services: Iterable[str] = (),
+        specialty_match: str = "general",
+        facility_id: Optional[str] = None,
+        city: str = "",
+        state: str = "",
+        contact: Optional[str] = None,
+        type_mask: Optional[int] = None,
+        service_mask: Optional[int] = None,
+        specialty_mask: Optional[int] = None
+    ):
+        self.facility_id = facility_id
+        self.name = name
+        self.address = address
+        self.city = _intern(city)
+        self.state = _intern(state)
+        self.latitude = latitude
+        self.longitude = longitude
+        self.distance_km = distance_km
+        self.facility_type = _intern(facility_type)
+        self.services = tuple(_intern(service) for service in services)
+        self.specialty_match = _intern(specialty_match)
+        self.contact = contact
+        self.type_mask = type_mask
+        self.service_mask = service_mask
+        self.specialty_mask = specialty_mask
+        self.travel_time_min = None
+        self.expected_wait_min = None
+        self.emergency_capable = None
+        self.is_open = None
+        self.ranking_score = None
+    
+    @property
+    def coordinates(self) -> Dict[str, float]:
+        return {"latitude": self.latitude, "longitude": self.longitude}
+    
+    @property
+    def map_link(self) -> str:
+        return f"https://www.google.com/maps?q={self.latitude},{self.longitude}"
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FacilityRecord":
+        """Build a record from a facility dict (with "coordinates")"""
+        coordinates = data.get("coordinates") or {}
+        record = cls(
+            name=data["name"],
+            address=data.get("address", ""),
+            latitude=coordinates.get("latitude", 0.0),
+            longitude=coordinates.get("longitude", 0.0),
+            distance_km=data.get("distance_km", 0.0),
+            facility_type=data.get("facility_type", "local"),
+            services=data.get("services", ()),
+            specialty_match=data.get("specialty_match", "general"),
+            facility_id=data.get("facility_id"),
+            city=data.get("city", ""),
+            state=data.get("state", ""),
+            contact=data.get("contact"),
+            type_mask=data.get("type_mask"),
+            service_mask=data.get("service_mask"),
+            specialty_mask=data.get("specialty_mask")
+        )
+        return record
+    
+    def copy(self) -> "FacilityRecord":
+        """Shallow copy (all fields are immutable, so this is independent)"""
+        clone = FacilityRecord.__new__(FacilityRecord)
+        for slot in self.__slots__:
+            setattr(clone, slot, getattr(self, slot))
+        return clone
+    
+    # Mapping interface for code that treats facilities as dicts
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.KEYS:
+            raise KeyError(key)
+        value = getattr(self, key)
+        return list(value) if key == "services" else value
+    
+    def __setitem__(self, key: str, value: Any):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, tuple(value) if key == "services" else value)
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self.KEYS and getattr(self, key) is not None
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        if key not in self.KEYS:
+            return default
+        value = self[key]
+        return default if value is None else value
+    
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        if key not in self:
+            self[key] = default
+        return self[key]
+    
+    def keys(self) -> Iterator[str]:
+        return iter(self.KEYS)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict in the format of the earlier search results"""
+        return {key: self[key] for key in self.KEYS}
+    
+    def to_facility_info(self) -> FacilityInfo:
+        return FacilityInfo(
+            name=self.name,
+            address=self.address,
+            distance_km=self.distance_km,
+            specialty=self.specialty_match,
+            services=list(self.services),
+            contact=self.contact,
+            map_link=self.map_link,
+            travel_time_min=self.travel_time_min,
+            expected_wait_min=self.expected_wait_min
+        )
+    
+    def __repr__(self) -> str:
+        return f"FacilityRecord({self.name!r}, {self.distance_km} km)"
+
+
+def to_facility_infos(facilities: List[Any], limit: Optional[int] = None) -> List[FacilityInfo]:
+    """Materialize pydantic models for the first `limit` facilities only"""
+    results = []
+    for facility in facilities[:limit]:
+        if isinstance(facility, FacilityRecord):
+            results.append(facility.to_facility_info())
+        elif isinstance(facility, dict):
+            results.append(FacilityRecord.from_dict(facility).to_facility_info())
+        else:
+            results.append(facility)
+    return results
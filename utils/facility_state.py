@@ -0,0 +1,251 @@
+"""
+Facility capacity and availability state for Arovia
+Opening hours, emergency department and bed availability and queue lengths
+are held in compact parallel arrays and combined with travel time to rank
+facility recommendations
+"""
+import re
+import time
+import threading
+from array import array
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from typing import Optional, Dict, Any, List, Iterable
+
+
+# Expected wait per patient already queued at a facility
+MINUTES_PER_QUEUED_PATIENT = 6.0
+
+# Ranking penalties (minutes added to the expected time to care)
+CLOSED_PENALTY_MIN = 240.0
+NO_EMERGENCY_PENALTY_MIN = 90.0
+EMERGENCY_FULL_PENALTY_MIN = 45.0
+NO_BEDS_PENALTY_MIN = 20.0
+
+# Travel-time estimate when no road graph is loaded
+FALLBACK_SPEED_KMH = 25.0
+FALLBACK_DETOUR_FACTOR = 1.3
+
+UNKNOWN = -1
+
+_HOURS_PATTERN = re.compile(r"^\s*(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})\s*$")
+
+
+def parse_opening_hours(value: Optional[str]):
+    """
+    Parse daily opening hours
+    
+    Args:
+        value: "24/7" or "HH:MM-HH:MM" (may wrap past midnight; equal times mean all day)
+    
+    Returns:
+        (open_minute, close_minute); (0, 1440) for 24/7, (UNKNOWN, UNKNOWN) if empty
+    """
+    if not value:
+        return UNKNOWN, UNKNOWN
+    if value.strip().lower() in ("24/7", "24x7", "24 hours"):
+        return 0, 24 * 60
+    match = _HOURS_PATTERN.match(value)
+    if not match:
+        raise ValueError(f"Invalid opening hours: {value!r}")
+    open_h, open_m, close_h, close_m = (int(g) for g in match.groups())
+    return open_h * 60 + open_m, close_h * 60 + close_m
+
+
+def facility_key(facility: Dict[str, Any]) -> str:
+    """State key for a facility record: its OSM id, or its normalized name"""
+    return facility.get("facility_id") or " ".join(facility.get("name", "").lower().split())
+
+
+class FacilityStateStore:
+    """
+    Live facility state in parallel arrays.
+    
+    Each known facility owns one slot; opening hours, emergency capability,
+    availability and queue length live in typed arrays at that slot, so a
+    ranking query costs one dictionary lookup and a few array reads per
+    candidate. Load fields (queue, beds, ED availability) not reported for
+    `stale_after_seconds` are treated as unknown; hours and capability are
+    kept until changed.
+    """
+    
+    FIELDS = ("opening_hours", "has_emergency", "emergency_available", "beds_available", "queue_length")
+    
+    def __init__(self, stale_after_seconds: float = 6 * 3600, clock=time.time, timezone: str = "Asia/Kolkata"):
+        """
+        Initialize store
+        
+        Args:
+            stale_after_seconds: Age after which load fields are ignored
+            clock: Time source (seconds since the epoch)
+            timezone: IANA time zone the opening hours are given in
+        """
+        self.stale_after_seconds = stale_after_seconds
+        self.clock = clock
+        self.timezone = ZoneInfo(timezone)
+        self.ids: List[str] = []
+        self._slots: Dict[str, int] = {}
+        self.open_minute = array("h")
+        self.close_minute = array("h")
+        self.has_emergency = array("b")
+        self.emergency_available = array("b")
+        self.beds_available = array("i")
+        self.queue_length = array("i")
+        self.updated_at = array("d")
+        self.stats = {"updates": 0}
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    def _slot(self, facility_id: str) -> int:
+        """Slot for a facility, allocated on first update; caller holds the lock"""
+        slot = self._slots.get(facility_id)
+        if slot is None:
+            slot = len(self.ids)
+            self._slots[facility_id] = slot
+            self.ids.append(facility_id)
+            for column in (self.open_minute, self.close_minute, self.has_emergency,
+                           self.emergency_available, self.beds_available, self.queue_length):
+                column.append(UNKNOWN)
+            self.updated_at.append(0.0)
+        return slot
+    
+    def update(self, facility_id: str, **fields) -> int:
+        """
+        Update one facility's state (fields that are omitted keep their value)
+        
+        Args:
+            facility_id: Facility key (see facility_key)
+            opening_hours: "24/7" or "HH:MM-HH:MM"
+            has_emergency: Facility runs an emergency department
+            emergency_available: Emergency department is accepting patients
+            beds_available: Free beds
+            queue_length: Patients currently waiting
+        
+        Returns:
+            The facility's slot
+        """
+        unknown = set(fields) - set(self.FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown facility state fields: {sorted(unknown)}")
+        hours = parse_opening_hours(fields["opening_hours"]) if fields.get("opening_hours") else None
+        with self._lock:
+            slot = self._slot(facility_id)
+            if hours:
+                self.open_minute[slot], self.close_minute[slot] = hours
+            if fields.get("has_emergency") is not None:
+                self.has_emergency[slot] = int(bool(fields["has_emergency"]))
+            if fields.get("emergency_available") is not None:
+                self.emergency_available[slot] = int(bool(fields["emergency_available"]))
+            if fields.get("beds_available") is not None:
+                self.beds_available[slot] = max(0, int(fields["beds_available"]))
+            if fields.get("queue_length") is not None:
+                self.queue_length[slot] = max(0, int(fields["queue_length"]))
+            if any(fields.get(name) is not None for name in ("emergency_available", "beds_available", "queue_length")):
+                self.updated_at[slot] = self.clock()
+            self.stats["updates"] += 1
+        return slot
+    
+    def update_many(self, updates: Iterable[Dict[str, Any]]) -> int:
+        """Apply a batch of updates, each with a "facility_id" key"""
+        count = 0
+        for update in updates:
+            update = dict(update)
+            self.update(update.pop("facility_id"), **update)
+            count += 1
+        return count
+    
+    def get(self, facility_id: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Current state of a facility, or None if it has never been updated"""
+        slot = self._slots.get(facility_id)
+        if slot is None:
+            return None
+        now = self.clock() if now is None else now
+        fresh = now - self.updated_at[slot] <= self.stale_after_seconds
+        
+        def value(column):
+            return None if column[slot] == UNKNOWN else column[slot]
+        
+        return {
+            "facility_id": facility_id,
+            "is_open": self.is_open(slot, now),
+            "has_emergency": None if value(self.has_emergency) is None else bool(self.has_emergency[slot]),
+            "emergency_available": (bool(self.emergency_available[slot])
+                                    if fresh and value(self.emergency_available) is not None else None),
+            "beds_available": value(self.beds_available) if fresh else None,
+            "queue_length": value(self.queue_length) if fresh else None,
+            "updated_at": self.updated_at[slot],
+            "stale": not fresh
+        }
+    
+    def is_open(self, slot: int, now: float) -> Optional[bool]:
+        """Whether the facility is open at `now` (in the store's time zone), None if hours are unknown"""
+        open_minute, close_minute = self.open_minute[slot], self.close_minute[slot]
+        if open_minute == UNKNOWN:
+            return None
+        local = datetime.fromtimestamp(now, self.timezone)
+        minute = local.hour * 60 + local.minute
+        if open_minute == close_minute:
+            return True
+        if open_minute < close_minute:
+            return open_minute <= minute < close_minute
+        return minute >= open_minute or minute < close_minute
+    
+    def rank(
+        self,
+        facilities: List[Dict[str, Any]],
+        needs_emergency: bool = False,
+        now: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Rank facilities by expected time to care
+        
+        The score is travel time (road ETA, or an estimate from distance) plus
+        the expected wait from the queue length, plus penalties for being
+        closed, lacking an emergency department when one is needed, or having
+        no free emergency capacity or beds. Sets "expected_wait_min",
+        "emergency_capable", "is_open" and "ranking_score" on each facility.
+        
+        Args:
+            facilities: Facilities with distance_km (and travel_time_min if routed)
+            needs_emergency: Triage detected an emergency
+            now: Ranking time (defaults to the store clock)
+        
+        Returns:
+            Facilities, lowest score first
+        """
+        now = self.clock() if now is None else now
+        for facility in facilities:
+            travel = facility.get("travel_time_min")
+            if travel is None:
+                travel = facility["distance_km"] * FALLBACK_DETOUR_FACTOR / FALLBACK_SPEED_KMH * 60
+            emergency_capable = "Emergency Care" in facility.get("services", ())
+            score, wait, is_open = travel, 0.0, None
+            
+            slot = self._slots.get(facility_key(facility))
+            if slot is not None:
+                fresh = now - self.updated_at[slot] <= self.stale_after_seconds
+                is_open = self.is_open(slot, now)
+                if self.has_emergency[slot] != UNKNOWN:
+                    emergency_capable = bool(self.has_emergency[slot])
+                if fresh and self.queue_length[slot] != UNKNOWN:
+                    wait = self.queue_length[slot] * MINUTES_PER_QUEUED_PATIENT
+                if is_open is False and not (needs_emergency and emergency_capable):
+                    score += CLOSED_PENALTY_MIN
+                if fresh and needs_emergency and self.emergency_available[slot] == 0:
+                    score += EMERGENCY_FULL_PENALTY_MIN
+                if fresh and self.beds_available[slot] == 0:
+                    score += NO_BEDS_PENALTY_MIN
+            if needs_emergency and not emergency_capable:
+                score += NO_EMERGENCY_PENALTY_MIN
+            
+            facility["expected_wait_min"] = round(wait, 1)
+            facility["emergency_capable"] = emergency_capable
+            facility["is_open"] = is_open
+            facility["ranking_score"] = round(score + wait, 1)
+        return sorted(facilities, key=lambda f: f["ranking_score"])
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"facilities": len(self.ids), **self.stats}
@@ -0,0 +1,317 @@
+"""
+Offline gazetteer of Indian places and PIN codes
+Resolves PIN codes, districts, towns and villages to coordinates locally,
+tolerating transliteration variants ("Secunderabad" / "Sikandrabad"), so
+common geocodes never reach Nominatim
+"""
+import os
+import re
+import sys
+import csv
+import gzip
+import json
+import unicodedata
+from array import array
+from bisect import bisect_left
+from typing import Optional, Dict, Any, List, Tuple, Iterable
+
+
+# Lower rank wins when several places share a name
+KIND_RANK = {"state": 0, "district": 1, "subdistrict": 2, "town": 3, "locality": 4, "village": 5}
+
+# India Post office name suffixes (Sub/Branch/Head/General Post Office)
+_OFFICE_SUFFIX = re.compile(r"\s+(s\.?o|b\.?o|h\.?o|g\.?p\.?o|e\.?d\.?o)\.?$", re.IGNORECASE)
+_PINCODE = re.compile(r"\b([1-9]\d{5})\b")
+_NON_WORD = re.compile(r"[^\w\s]+")
+_WHITESPACE = re.compile(r"\s+")
+
+# Romanization variants folded together before building consonant skeletons
+_TRANSLITERATION_RULES = [
+    ("ksh", "x"), ("chh", "c"), ("ch", "c"), ("sh", "s"), ("ph", "f"), ("kh", "k"), ("gh", "g"),
+    ("th", "t"), ("dh", "d"), ("bh", "b"), ("jh", "j"), ("q", "k"), ("z", "j"), ("w", "v"),
+    ("ck", "k"), ("c", "k")
+]
+
+INDIA_BOUNDS = (6.0, 68.0, 37.5, 97.5)
+
+
+def normalize_name(text: str) -> str:
+    """Lowercase, accent- and punctuation-free form of a place name"""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    return _WHITESPACE.sub(" ", _NON_WORD.sub(" ", text)).strip()
+
+
+def phonetic_key(name: str) -> str:
+    """
+    Transliteration-tolerant key for a normalized place name
+    
+    Aspirates and common spelling variants are folded, vowels after the first
+    letter and doubled letters are dropped, so "secunderabad" and
+    "sikandrabad" both become "skndrbd".
+    """
+    text = name.replace(" ", "")
+    for source, target in _TRANSLITERATION_RULES:
+        text = text.replace(source, target)
+    if not text:
+        return ""
+    key = [text[0]]
+    for ch in text[1:]:
+        if ch in "aeiouy" or ch == "h":
+            continue
+        if ch != key[-1]:
+            key.append(ch)
+    return "".join(key)
+
+
+def bounded_edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance, or limit + 1 once it is known to exceed limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j, cb in enumerate(b, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            row_min = min(row_min, current[j])
+        if row_min > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class Gazetteer:
+    """
+    Place-name and PIN-code index.
+    
+    Places are stored column-wise (names, interned district and state names,
+    kind ranks and float arrays of coordinates). Lookups go through exact,
+    phonetic and prefix indexes; the prefix and fuzzy searches use sorted key
+    arrays with bisection, which acts as a compact prefix trie.
+    """
+    
+    def __init__(self):
+        self.names: List[str] = []
+        self.districts: List[str] = []
+        self.states: List[str] = []
+        self.ranks = array("b")
+        self.latitudes = array("d")
+        self.longitudes = array("d")
+        self.pincodes: Dict[str, Tuple[float, float]] = {}
+        self._exact: Dict[str, List[int]] = {}
+        self._phonetic: Dict[str, List[int]] = {}
+        self._sorted_names: List[str] = []
+        self._sorted_phonetic: List[str] = []
+    
+    def __len__(self) -> int:
+        return len(self.names)
+    
+    def add_place(self, name: str, latitude: float, longitude: float, kind: str = "locality",
+                  district: str = "", state: str = ""):
+        """Add a place (call build() after the last one)"""
+        key = normalize_name(name)
+        if not key:
+            return
+        place = len(self.names)
+        self.names.append(key)
+        self.districts.append(sys.intern(normalize_name(district)))
+        self.states.append(sys.intern(normalize_name(state)))
+        self.ranks.append(KIND_RANK.get(kind, KIND_RANK["locality"]))
+        self.latitudes.append(latitude)
+        self.longitudes.append(longitude)
+        self._exact.setdefault(key, []).append(place)
+    
+    def add_pincode(self, pincode: str, latitude: float, longitude: float):
+        self.pincodes[pincode] = (latitude, longitude)
+    
+    def build(self):
+        """Build the phonetic and prefix indexes"""
+        self._phonetic = {}
+        for key, places in self._exact.items():
+            self._phonetic.setdefault(phonetic_key(key), []).extend(places)
+        for places in list(self._exact.values()) + list(self._phonetic.values()):
+            places.sort(key=lambda place: self.ranks[place])
+        self._sorted_names = sorted(self._exact)
+        self._sorted_phonetic = sorted(self._phonetic)
+        return self
+    
+    def _best(self, places: List[int], context: List[str]) -> Optional[int]:
+        """Highest-ranked place, preferring ones whose district or state appears in the context"""
+        if context:
+            for place in places:
+                if any(part in (self.districts[place], self.states[place]) for part in context):
+                    return place
+        return places[0] if places else None
+    
+    def _lookup_name(self, name: str, context: List[str], fuzzy: bool) -> Optional[int]:
+        places = self._exact.get(name)
+        if places:
+            return self._best(places, context)
+        if any(ch.isdigit() for ch in name) or len(name) < 4:
+            return None  # House numbers and abbreviations only match exactly
+        key = phonetic_key(name)
+        places = self._phonetic.get(key)
+        if places:
+            return self._best(places, context)
+        if not fuzzy or len(key) < 5:
+            return None
+        # Phonetic keys within edit distance 1 that share the first two letters
+        start = bisect_left(self._sorted_phonetic, key[:2])
+        candidates = []
+        for other in self._sorted_phonetic[start:]:
+            if not other.startswith(key[:2]):
+                break
+            if bounded_edit_distance(key, other, 1) <= 1:
+                candidates.extend(self._phonetic[other])
+        candidates.sort(key=lambda place: self.ranks[place])
+        return self._best(candidates, context)
+    
+    def lookup(self, query: str, fuzzy: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Resolve a PIN code or place name
+        
+        "Nalgonda", "500081", "Kukatpally, Hyderabad" and "Sikandrabad" are all
+        accepted; later comma-separated parts disambiguate by district or state.
+        
+        Args:
+            query: Location string as typed by the patient
+            fuzzy: Allow one-edit phonetic matches
+        
+        Returns:
+            {"name", "latitude", "longitude", "match"} or None
+        """
+        match = _PINCODE.search(query or "")
+        if match and match.group(1) in self.pincodes:
+            latitude, longitude = self.pincodes[match.group(1)]
+            return {"name": match.group(1), "latitude": latitude, "longitude": longitude, "match": "pincode"}
+        
+        parts = [normalize_name(part) for part in _PINCODE.sub(" ", query or "").split(",")]
+        parts = [part for part in parts if part and part not in ("india", "bharat")]
+        for i, part in enumerate(parts):
+            place = self._lookup_name(part, parts[i + 1:], fuzzy)
+            if place is not None:
+                return {
+                    "name": self.names[place],
+                    "latitude": self.latitudes[place],
+                    "longitude": self.longitudes[place],
+                    "match": "name"
+                }
+        return None
+    
+    def geocode(self, query: str) -> Optional[Tuple[float, float]]:
+        """(latitude, longitude) for a PIN code or place name, or None"""
+        result = self.lookup(query)
+        return (result["latitude"], result["longitude"]) if result else None
+    
+    def complete(self, prefix: str, limit: int = 10) -> List[str]:
+        """Place names starting with a prefix (for autocomplete)"""
+        prefix = normalize_name(prefix)
+        start = bisect_left(self._sorted_names, prefix)
+        results = []
+        for name in self._sorted_names[start:]:
+            if not name.startswith(prefix) or len(results) >= limit:
+                break
+            results.append(name)
+        return results
+    
+    def save(self, path: str):
+        """Save as gzipped JSON (reloaded with Gazetteer.load)"""
+        data = {
+            "places": [
+                [self.names[i], self.ranks[i], self.districts[i], self.states[i],
+                 self.latitudes[i], self.longitudes[i]]
+                for i in range(len(self.names))
+            ],
+            "pincodes": self.pincodes
+        }
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+    
+    @classmethod
+    def load(cls, path: str) -> "Gazetteer":
+        """Load a gazetteer saved with save(), or build one from a CSV dataset"""
+        if path.endswith(".csv"):
+            return cls.from_csv(path)
+        gazetteer = cls()
+        kinds = {rank: kind for kind, rank in KIND_RANK.items()}
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        for name, rank, district, state, latitude, longitude in data["places"]:
+            gazetteer.add_place(name, latitude, longitude, kinds[rank], district, state)
+        for pincode, (latitude, longitude) in data["pincodes"].items():
+            gazetteer.add_pincode(pincode, latitude, longitude)
+        return gazetteer.build()
+    
+    @classmethod
+    def from_csv(cls, path: str) -> "Gazetteer":
+        """
+        Build from a CSV dataset
+        
+        Accepts the India Post "All India Pincode Directory" (OfficeName,
+        Pincode, District, StateName, Latitude, Longitude) and generic place
+        lists (name, kind, district, state, latitude, longitude, pincode).
+        Districts and PIN codes get the mean position of their places.
+        """
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            return cls.from_rows(csv.DictReader(f))
+    
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, str]]) -> "Gazetteer":
+        gazetteer = cls()
+        districts: Dict[Tuple[str, str], List[float]] = {}
+        pincodes: Dict[str, List[float]] = {}
+        for row in rows:
+            row = {key.strip().lower(): (value or "").strip() for key, value in row.items() if key}
+            try:
+                latitude = float(row.get("latitude", ""))
+                longitude = float(row.get("longitude", ""))
+            except ValueError:
+                continue
+            min_lat, min_lon, max_lat, max_lon = INDIA_BOUNDS
+            if not (min_lat <= latitude <= max_lat and min_lon <= longitude <= max_lon):
+                continue  # Missing or swapped coordinates are common in the source data
+            
+            name = _OFFICE_SUFFIX.sub("", row.get("name") or row.get("officename", ""))
+            district = row.get("district", "")
+            state = row.get("state") or row.get("statename", "")
+            gazetteer.add_place(name, latitude, longitude, row.get("kind") or "locality", district, state)
+            if district:
+                totals = districts.setdefault((district, state), [0.0, 0.0, 0])
+                totals[0] += latitude
+                totals[1] += longitude
+                totals[2] += 1
+            pincode = row.get("pincode", "")
+            if _PINCODE.fullmatch(pincode):
+                totals = pincodes.setdefault(pincode, [0.0, 0.0, 0])
+                totals[0] += latitude
+                totals[1] += longitude
+                totals[2] += 1
+        
+        for (district, state), (lat_sum, lon_sum, count) in districts.items():
+            if normalize_name(district) not in gazetteer._exact or all(
+                gazetteer.ranks[p] > KIND_RANK["district"] for p in gazetteer._exact[normalize_name(district)]
+            ):
+                gazetteer.add_place(district, lat_sum / count, lon_sum / count, "district", district, state)
+        for pincode, (lat_sum, lon_sum, count) in pincodes.items():
+            gazetteer.add_pincode(pincode, lat_sum / count, lon_sum / count)
+        return gazetteer.build()
+
+
+_default_gazetteer = None
+
+
+def load_default_gazetteer() -> Optional[Gazetteer]:
+    """Gazetteer at GAZETTEER_PATH (loaded once per process), or None if not configured"""
+    global _default_gazetteer
+    path = os.getenv("GAZETTEER_PATH")
+    if not path:
+        return None
+    if _default_gazetteer is None:
+        try:
+            _default_gazetteer = Gazetteer.load(path)
+            print(f"Gazetteer loaded: {len(_default_gazetteer)} places, {len(_default_gazetteer.pincodes)} PIN codes")
+        except Exception as e:
+            print(f"Error loading gazetteer '{path}': {e}")
+            return None
+    return _default_gazetteer
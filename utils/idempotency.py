@@ -0,0 +1,135 @@
+"""
+Idempotent request handling for Arovia
+Clients tag retried POSTs with a request id; a retry attaches to the
+computation already in flight or receives the stored result instead of
+running the triage (and Whisper) again
+"""
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+def request_fingerprint(*parts: Any) -> str:
+    """Hash of a request's payload, to tell a retry from a different request reusing the same id"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        data = part if isinstance(part, bytes) else str(part).encode("utf-8")
+        digest.update(len(data).to_bytes(8, "little"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class IdempotencyConflict(Exception):
+    """A request id was reused for a different request"""
+
+
+class _Entry:
+    __slots__ = ("fingerprint", "future", "completed_at")
+    
+    def __init__(self, fingerprint: str, future: asyncio.Future):
+        self.fingerprint = fingerprint
+        self.future = future
+        self.completed_at: Optional[float] = None
+
+
+class IdempotencyStore:
+    """
+    Bounded store of in-flight and completed requests by client request id.
+    
+    The first request for a key runs; a duplicate that arrives while it is in
+    flight awaits the same result, and one that arrives later gets the stored
+    result until it expires. Failed requests are not stored, so a retry after
+    an error runs again. Completed results are kept for `ttl_seconds`, at most
+    `max_entries` of them (least recently completed are evicted first).
+    
+    Entries are created and awaited on the event loop, so the store needs no
+    lock; with several API worker processes each keeps its own store.
+    """
+    
+    def __init__(self, ttl_seconds: float = 24 * 3600, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self.stats = {"requests": 0, "executions": 0, "replayed": 0, "attached": 0, "conflicts": 0,
+                      "errors": 0, "evictions": 0, "expired": 0}
+    
+    def _prune(self, now: float):
+        """Drop expired results and evict the oldest beyond the bound (in-flight entries stay)"""
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry.completed_at is None:
+                break
+            if now - entry.completed_at > self.ttl_seconds:
+                self.stats["expired"] += 1
+            elif len(self._entries) > self.max_entries:
+                self.stats["evictions"] += 1
+            else:
+                break
+            del self._entries[key]
+    
+    async def run(self, key: str, fingerprint: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Run fn() once for a request id
+        
+        Args:
+            key: Client request id (scoped by endpoint)
+            fingerprint: request_fingerprint() of the payload
+            fn: Coroutine function computing the result
+        
+        Returns:
+            (result, replayed); replayed is True when the result came from an
+            earlier or concurrent request with the same id
+        
+        Raises:
+            IdempotencyConflict: The id was already used with a different payload
+        """
+        now = time.time()
+        self._prune(now)
+        self.stats["requests"] += 1
+        entry = self._entries.get(key)
+        if entry is not None and entry.completed_at is not None and now - entry.completed_at > self.ttl_seconds:
+            del self._entries[key]
+            self.stats["expired"] += 1
+            entry = None
+        
+        if entry is not None:
+            if entry.fingerprint != fingerprint:
+                self.stats["conflicts"] += 1
+                raise IdempotencyConflict(f"Request id {key!r} was already used for a different request")
+            if entry.future.done():
+                self.stats["replayed"] += 1
+                return entry.future.result(), True
+            self.stats["attached"] += 1
+            # Shield so a disconnected duplicate does not cancel the original request
+            return await asyncio.shield(entry.future), True
+        
+        entry = _Entry(fingerprint, asyncio.get_running_loop().create_future())
+        self._entries[key] = entry
+        self.stats["executions"] += 1
+        try:
+            result = await fn()
+        except BaseException as e:
+            self.stats["errors"] += 1
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+            if isinstance(e, asyncio.CancelledError):
+                entry.future.cancel()
+            else:
+                entry.future.set_exception(e)
+                # Mark retrieved so an error nobody attached to is not logged by asyncio
+                entry.future.exception()
+            raise
+        entry.future.set_result(result)
+        entry.completed_at = time.time()
+        self._entries.move_to_end(key)
+        self._prune(entry.completed_at)
+        return result, False
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        in_flight = sum(1 for entry in self._entries.values() if entry.completed_at is None)
+        return {"entries": len(self._entries), "in_flight": in_flight, **self.stats}
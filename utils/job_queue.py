@@ -0,0 +1,541 @@
+"""
+Asynchronous job queue for Arovia
+Long-running triage is submitted as a job in a persistent SQLite (WAL) table,
+run by a pool of worker threads (in the API process or a separate worker
+process sharing the table), polled by id, and optionally reported to a
+completion webhook
+"""
+import os
+import json
+import hmac
+import time
+import uuid
+import queue
+import socket
+import sqlite3
+import hashlib
+import ipaddress
+import threading
+from urllib.parse import urlsplit
+from typing import Optional, Dict, Any, List, Callable, Tuple, Iterable
+
+import requests
+
+from utils.request_scheduler import PRIORITY_CLASSES
+from utils.serialization import dumps
+
+
+JOB_STATUSES = ("queued", "running", "succeeded", "failed")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    stage TEXT,
+    request_key TEXT,
+    fingerprint TEXT,
+    webhook_url TEXT,
+    webhook_status TEXT,
+    payload TEXT NOT NULL,
+    audio BLOB,
+    partial TEXT,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs (status, priority, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs (finished_at);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_request_key ON jobs (kind, request_key) WHERE request_key IS NOT NULL;
+"""
+
+# Columns returned to clients polling a job (the stored input is not)
+VIEW_COLUMNS = ("job_id", "kind", "status", "stage", "created_at", "started_at", "finished_at", "attempts",
+                "webhook_status", "partial", "result", "error")
+
+# Runs a claimed job: (job, progress) -> JSON-serializable result; progress(stage, partial) records partial results
+JobHandler = Callable[[Dict[str, Any], Callable[..., None]], Any]
+
+
+def new_job_id() -> str:
+    """Time-ordered unique job identifier"""
+    return f"{int(time.time() * 1000):013x}{uuid.uuid4().hex[:12]}"
+
+
+def _json(content: Any) -> Optional[str]:
+    return None if content is None else dumps(content).decode("utf-8")
+
+
+class JobConflict(Exception):
+    """A request key was reused for a different job"""
+
+
+def check_webhook_target(url: str, allowed_hosts: Optional[Iterable[str]] = None):
+    """
+    Validate a completion webhook URL
+    
+    With an allowlist only those hosts are accepted. Otherwise the host must
+    resolve to public addresses only, so a client cannot make the server post
+    to loopback, private, link-local (cloud metadata) or reserved addresses.
+    
+    Args:
+        url: Webhook URL
+        allowed_hosts: Host names webhooks may be sent to (any public host if empty)
+    
+    Raises:
+        ValueError: The URL is not an acceptable webhook target
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError("webhook_url must be an http(s) URL")
+    host = parts.hostname.lower()
+    if allowed_hosts:
+        if host not in {h.strip().lower() for h in allowed_hosts if h.strip()}:
+            raise ValueError(f"webhook host {host!r} is not allowed")
+        return
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, parts.port or None, proto=socket.IPPROTO_TCP)}
+    except (socket.gaierror, UnicodeError):
+        raise ValueError(f"webhook host {host!r} could not be resolved")
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split("%", 1)[0])
+        if not ip.is_global or ip.is_multicast:
+            raise ValueError(f"webhook host {host!r} resolves to a non-public address")
+
+
+class JobStore:
+    """
+    Persistent job table in SQLite (WAL mode).
+    
+    Jobs are claimed with a single conditional UPDATE, so any number of
+    worker threads and processes can share one database file. A job whose
+    worker has not updated it within the lease (the worker died) is claimed
+    again, up to `max_attempts` times, and then marked failed.
+    """
+    
+    def __init__(self, path: str = "jobs.db"):
+        """
+        Initialize store
+        
+        Args:
+            path: Database file path
+        """
+        self.path = path
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+        conn.commit()
+    
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+    
+    def submit(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        audio: Optional[bytes] = None,
+        priority_class: str = "routine",
+        webhook_url: Optional[str] = None,
+        request_key: Optional[str] = None,
+        fingerprint: Optional[str] = None
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Queue a job
+        
+        Args:
+            kind: Handler name
+            payload: Job input
+            audio: Uploaded recording for voice jobs
+            priority_class: One of PRIORITY_CLASSES; claimed in that order
+            webhook_url: URL notified when the job finishes
+            request_key: Client request id; submitting it again returns the same job
+            fingerprint: Payload hash compared when a request key is reused
+        
+        Returns:
+            (job view, created)
+        
+        Raises:
+            JobConflict: The request key belongs to a job with a different payload
+        """
+        now = time.time()
+        job_id = new_job_id()
+        conn = self._connection()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT INTO jobs (job_id, kind, status, priority, created_at, updated_at, request_key, fingerprint,"
+                    " webhook_url, payload, audio) VALUES (?, ?, 'queued', ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, kind, PRIORITY_CLASSES.index(priority_class), now, now, request_key, fingerprint,
+                     webhook_url, _json(payload), audio)
+                )
+        except sqlite3.IntegrityError:
+            if request_key is None:
+                raise
+            row = conn.execute(
+                "SELECT job_id, fingerprint FROM jobs WHERE kind = ? AND request_key = ?", (kind, request_key)
+            ).fetchone()
+            if row["fingerprint"] != fingerprint:
+                raise JobConflict(f"Request id {request_key!r} was already used for a different job")
+            return self.get(row["job_id"]), False
+        return self.get(job_id), True
+    
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Client view of a job, with partial and final results decoded"""
+        row = self._connection().execute(
+            f"SELECT {', '.join(VIEW_COLUMNS)} FROM jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        for column in ("partial", "result"):
+            job[column] = json.loads(job[column]) if job[column] else None
+        return job
+    
+    def claim(self, worker: str, kinds: List[str], lease_seconds: float = 600, max_attempts: int = 2) -> Optional[Dict[str, Any]]:
+        """
+        Take the next job for this worker
+        
+        Queued jobs go by priority class, then age; a running job whose lease
+        expired (its worker died) is taken over.
+        
+        Returns:
+            Job with its payload and audio, or None if nothing is waiting
+        """
+        now = time.time()
+        kind_params = ", ".join("?" for _ in kinds)
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'Worker stopped before finishing', finished_at = ?,"
+                " audio = NULL WHERE status = 'running' AND updated_at < ? AND attempts >= ?",
+                (now, now - lease_seconds, max_attempts)
+            )
+            row = conn.execute(
+                f"SELECT job_id FROM jobs WHERE kind IN ({kind_params}) AND attempts < ? AND"
+                " (status = 'queued' OR (status = 'running' AND updated_at < ?))"
+                " ORDER BY priority, created_at LIMIT 1",
+                (*kinds, max_attempts, now - lease_seconds)
+            ).fetchone()
+            if row is None:
+                return None
+            claimed = conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, started_at = ?, updated_at = ?,"
+                " attempts = attempts + 1 WHERE job_id = ? AND (status = 'queued' OR updated_at < ?)",
+                (worker, now, now, row["job_id"], now - lease_seconds)
+            ).rowcount
+        if not claimed:
+            # Another worker won the race; the caller simply polls again
+            return None
+        job = dict(conn.execute("SELECT * FROM jobs WHERE job_id = ?", (row["job_id"],)).fetchone())
+        job["payload"] = json.loads(job["payload"])
+        return job
+    
+    def progress(self, job_id: str, stage: str, partial: Any = None):
+        """Record the stage a running job reached and its partial results (also renews the lease)"""
+        conn = self._connection()
+        with conn:
+            if partial is None:
+                conn.execute("UPDATE jobs SET stage = ?, updated_at = ? WHERE job_id = ?", (stage, time.time(), job_id))
+            else:
+                conn.execute(
+                    "UPDATE jobs SET stage = ?, partial = ?, updated_at = ? WHERE job_id = ?",
+                    (stage, _json(partial), time.time(), job_id)
+                )
+    
+    def finish(self, job_id: str, result: Any = None, error: Optional[str] = None, worker: Optional[str] = None) -> bool:
+        """
+        Mark a job succeeded (with its result) or failed (with an error), dropping the stored audio
+        
+        Args:
+            worker: Worker that claimed the job; the outcome is dropped if another
+                worker has since taken over its expired lease
+        
+        Returns:
+            Whether the job was updated
+        """
+        now = time.time()
+        query = ("UPDATE jobs SET status = ?, stage = NULL, result = ?, error = ?, finished_at = ?, updated_at = ?,"
+                 " audio = NULL WHERE job_id = ?")
+        params = ("failed" if error else "succeeded", _json(result), error, now, now, job_id)
+        if worker is not None:
+            query += " AND worker = ? AND status = 'running'"
+            params += (worker,)
+        conn = self._connection()
+        with conn:
+            return conn.execute(query, params).rowcount > 0
+    
+    def webhook_target(self, job_id: str) -> Optional[str]:
+        row = self._connection().execute("SELECT webhook_url FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return row["webhook_url"] if row else None
+    
+    def set_webhook_status(self, job_id: str, status: str):
+        conn = self._connection()
+        with conn:
+            conn.execute("UPDATE jobs SET webhook_status = ? WHERE job_id = ?", (status, job_id))
+    
+    def purge(self, older_than_seconds: float) -> int:
+        """Delete finished jobs older than the retention period"""
+        conn = self._connection()
+        with conn:
+            return conn.execute(
+                "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (time.time() - older_than_seconds,)
+            ).rowcount
+    
+    def counts(self) -> Dict[str, int]:
+        """Jobs per status"""
+        rows = self._connection().execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {status: 0 for status in JOB_STATUSES} | {row["status"]: row["n"] for row in rows}
+    
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+
+def webhook_signature(secret: str, body: bytes) -> str:
+    """Value of the X-Arovia-Signature header: HMAC-SHA256 of the body"""
+    return "sha256=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+
+
+class JobWorkerPool:
+    """
+    Worker threads that claim and run jobs from a JobStore.
+    
+    Each worker claims the highest-priority waiting job, runs its handler and
+    stores the result or error. Finished jobs with a webhook are reported by a
+    separate delivery thread (retried with backoff, optionally HMAC-signed),
+    so a slow receiver never holds up triage. Finished jobs older than the
+    retention period are deleted periodically.
+    """
+    
+    def __init__(
+        self,
+        store: JobStore,
+        handlers: Dict[str, JobHandler],
+        workers: int = 2,
+        poll_interval: float = 1.0,
+        lease_seconds: float = 600,
+        webhook_secret: Optional[str] = None,
+        webhook_retries: int = 3,
+        webhook_timeout: float = 10.0,
+        webhook_hosts: Optional[List[str]] = None,
+        retention_seconds: Optional[float] = 7 * 24 * 3600,
+        purge_interval: float = 3600
+    ):
+        """
+        Initialize pool
+        
+        Args:
+            store: Job table
+            handlers: Handler per job kind
+            workers: Number of worker threads
+            poll_interval: Seconds between polls when the queue is empty
+            lease_seconds: A running job not updated for this long is reclaimed
+            webhook_secret: Key for signing webhook bodies (unsigned if None)
+            webhook_retries: Delivery attempts per webhook
+            webhook_timeout: Seconds per delivery attempt
+            webhook_hosts: Hosts webhooks may be sent to (any public host if None)
+            retention_seconds: Finished jobs older than this are deleted (kept forever if None)
+            purge_interval: Seconds between purges
+        """
+        self.store = store
+        self.handlers = handlers
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.webhook_secret = webhook_secret
+        self.webhook_retries = webhook_retries
+        self.webhook_timeout = webhook_timeout
+        self.webhook_hosts = webhook_hosts
+        self.retention_seconds = retention_seconds
+        self.purge_interval = purge_interval
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self.stats = {"claimed": 0, "succeeded": 0, "failed": 0, "lease_lost": 0, "webhooks_delivered": 0,
+                      "webhooks_failed": 0, "purged": 0}
+        self.active = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        self._webhooks: "queue.Queue" = queue.Queue()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._running = False
+    
+    def start(self):
+        """Start the worker, webhook and purge threads"""
+        if self._running:
+            return
+        self._running = True
+        self._stopping.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, args=(f"{self.name}/{i}",), name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._deliver_webhooks, name="job-webhooks", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        if self.retention_seconds is not None:
+            thread = threading.Thread(target=self._purge_finished, name="job-purge", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+    
+    def stop(self):
+        """Stop the threads after their current job"""
+        self._running = False
+        self._stopping.set()
+        self.notify()
+        self._webhooks.put(None)
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+    
+    def notify(self):
+        """Wake idle workers (called after a job is submitted in this process)"""
+        with self._wakeup:
+            self._wakeup.notify_all()
+    
+    def _worker(self, worker_name: str):
+        while self._running:
+            job = self.store.claim(worker_name, list(self.handlers), self.lease_seconds)
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(self.poll_interval)
+                continue
+            self.run_job(job)
+    
+    def run_job(self, job: Dict[str, Any]):
+        """Run a claimed job and store its outcome"""
+        job_id = job["job_id"]
+        with self._lock:
+            self.stats["claimed"] += 1
+            self.active += 1
+        try:
+            result = self.handlers[job["kind"]](job, lambda stage, partial=None: self.store.progress(job_id, stage, partial))
+            outcome = "succeeded"
+            stored = self.store.finish(job_id, result=result, worker=job["worker"])
+        except Exception as e:
+            outcome = "failed"
+            stored = self.store.finish(job_id, error=str(e) or type(e).__name__, worker=job["worker"])
+        finally:
+            with self._lock:
+                self.active -= 1
+        if not stored:
+            # The lease expired and another worker owns the job now
+            outcome = "lease_lost"
+        with self._lock:
+            self.stats[outcome] += 1
+        if stored and job.get("webhook_url"):
+            self._webhooks.put(job_id)
+    
+    def _deliver_webhooks(self):
+        while True:
+            job_id = self._webhooks.get()
+            if job_id is None:
+                return
+            self.deliver_webhook(job_id)
+    
+    def _purge_finished(self):
+        while not self._stopping.is_set():
+            try:
+                purged = self.store.purge(self.retention_seconds)
+                with self._lock:
+                    self.stats["purged"] += purged
+            except sqlite3.Error as e:
+                print(f"Warning: Could not purge finished jobs: {e}")
+            self._stopping.wait(self.purge_interval)
+    
+    def deliver_webhook(self, job_id: str) -> bool:
+        """POST the finished job to its webhook, retrying with exponential backoff"""
+        url = self.store.webhook_target(job_id)
+        job = self.store.get(job_id)
+        if not url or job is None:
+            return False
+        try:
+            # Checked again at delivery, since the host's DNS may have changed since submission
+            check_webhook_target(url, self.webhook_hosts)
+        except ValueError as e:
+            self.store.set_webhook_status(job_id, f"failed: {e}")
+            with self._lock:
+                self.stats["webhooks_failed"] += 1
+            return False
+        body = dumps(job)
+        headers = {"Content-Type": "application/json", "X-Arovia-Job": job_id}
+        if self.webhook_secret:
+            headers["X-Arovia-Signature"] = webhook_signature(self.webhook_secret, body)
+        error = None
+        for attempt in range(self.webhook_retries):
+            if attempt:
+                time.sleep(2 ** (attempt - 1))
+            try:
+                response = requests.post(
+                    url, data=body, headers=headers, timeout=self.webhook_timeout, allow_redirects=False
+                )
+                if response.status_code < 300:
+                    self.store.set_webhook_status(job_id, "delivered")
+                    with self._lock:
+                        self.stats["webhooks_delivered"] += 1
+                    return True
+                error = f"HTTP {response.status_code}"
+            except requests.RequestException as e:
+                error = type(e).__name__
+        self.store.set_webhook_status(job_id, f"failed: {error}")
+        with self._lock:
+            self.stats["webhooks_failed"] += 1
+        return False
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {"workers": self.workers, "active": self.active, **self.stats}
+        stats["jobs"] = self.store.counts()
+        stats["webhooks_pending"] = self._webhooks.qsize()
+        return stats
+
+
+def load_default_job_store() -> Optional[JobStore]:
+    """SQLite job table at JOB_STORE_PATH, or None if JOBS is disabled"""
+    if os.getenv("JOBS", "true").lower() != "true":
+        return None
+    return JobStore(os.getenv("JOB_STORE_PATH", "jobs.db"))
+
+
+def load_default_webhook_hosts() -> Optional[List[str]]:
+    """Webhook host allowlist from JOB_WEBHOOK_HOSTS (comma-separated), or None"""
+    hosts = [h.strip() for h in os.getenv("JOB_WEBHOOK_HOSTS", "").split(",") if h.strip()]
+    return hosts or None
+
+
+def load_default_job_pool(store: JobStore, handlers: Dict[str, JobHandler], workers: Optional[int] = None) -> JobWorkerPool:
+    """
+    Worker pool configured from the environment (JOB_WORKERS, JOB_LEASE_SECONDS,
+    JOB_WEBHOOK_SECRET, JOB_WEBHOOK_HOSTS, JOB_RETENTION_SECONDS)
+    """
+    retention = float(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+    return JobWorkerPool(
+        store,
+        handlers,
+        workers=int(os.getenv("JOB_WORKERS", "2")) if workers is None else workers,
+        lease_seconds=float(os.getenv("JOB_LEASE_SECONDS", "600")),
+        webhook_secret=os.getenv("JOB_WEBHOOK_SECRET") or None,
+        webhook_hosts=load_default_webhook_hosts(),
+        retention_seconds=retention if retention > 0 else None,
+        purge_interval=min(3600.0, retention / 10) if retention > 0 else 3600.0
+    )
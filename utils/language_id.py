@@ -0,0 +1,214 @@
+"""
+Spoken language identification for Arovia voice input
+A short pass over the first seconds of speech ranks the supported
+languages, picks the decoding language and a medical initial prompt, and
+remembers the choice for the rest of the session
+"""
+import time
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Tuple, Callable
+
+import numpy as np
+
+from utils.long_audio import speech_segments, SAMPLE_RATE
+
+
+# Languages Whisper can decode among those we support
+WHISPER_LANGUAGES = frozenset({"hi", "en", "bn", "te", "mr", "ta", "gu", "ur", "kn", "ml", "pa", "as", "ne", "sa"})
+
+# Supported languages Whisper has no model for, decoded as the closest language it knows
+DECODING_FALLBACK = {
+    "or": "bn",   # Odia (Eastern Indo-Aryan)
+    "gom": "mr",  # Konkani
+    "mni": "bn",  # Manipuri (commonly written in Bengali script)
+    "brx": "as",  # Bodo (Assam)
+    "doi": "hi",  # Dogri
+    "ks": "ur",   # Kashmiri (Perso-Arabic script)
+    "mai": "hi",  # Maithili
+    "sat": "bn",  # Santali
+}
+
+# Initial prompts that prime decoding with the script and symptom vocabulary of each language
+LANGUAGE_PROMPTS = {
+    "en": "Patient symptoms: fever, headache, stomach pain, cough.",
+    "hi": "मरीज़ के लक्षण: बुखार, सिरदर्द, पेट दर्द, खांसी।",
+    "ur": "مریض کی علامات: بخار، سر درد، پیٹ درد، کھانسی۔",
+    "bn": "রোগীর উপসর্গ: জ্বর, মাথাব্যথা, পেটব্যথা, কাশি।",
+    "te": "రోగి లక్షణాలు: జ్వరం, తలనొప్పి, కడుపు నొప్పి, దగ్గు.",
+    "ta": "நோயாளியின் அறிகுறிகள்: காய்ச்சல், தலைவலி, வயிற்று வலி, இருமல்.",
+    "mr": "रुग्णाची लक्षणे: ताप, डोकेदुखी, पोटदुखी, खोकला.",
+    "gu": "દર્દીના લક્ષણો: તાવ, માથાનો દુખાવો, પેટમાં દુખાવો, ઉધરસ.",
+    "kn": "ರೋಗಿಯ ಲಕ್ಷಣಗಳು: ಜ್ವರ, ತಲೆನೋವು, ಹೊಟ್ಟೆ ನೋವು, ಕೆಮ್ಮು.",
+    "ml": "രോഗിയുടെ ലക്ഷണങ്ങൾ: പനി, തലവേദന, വയറുവേദന, ചുമ.",
+    "pa": "ਮਰੀਜ਼ ਦੇ ਲੱਛਣ: ਬੁਖਾਰ, ਸਿਰ ਦਰਦ, ਪੇਟ ਦਰਦ, ਖੰਘ।",
+}
+
+# Detects languages in a 16 kHz snippet: code -> probability over Whisper's languages
+LanguageDetector = Callable[[np.ndarray], Dict[str, float]]
+
+
+def normalize_language(value: Optional[str], supported: Dict[str, str]) -> Optional[str]:
+    """
+    Language code for a request value
+    
+    Args:
+        value: Code ("hi"), name ("hindi"), or None/""/"auto" for detection
+        supported: Language name -> code map (WhisperClient.SUPPORTED_LANGUAGES)
+    
+    Raises:
+        ValueError: Unsupported language
+    """
+    if value is None or value.strip().lower() in ("", "auto"):
+        return None
+    value = value.strip().lower()
+    if value in supported.values():
+        return value
+    if value in supported:
+        return supported[value]
+    raise ValueError(f"Unsupported language: {value}")
+
+
+def decoding_language(code: str) -> str:
+    """Language Whisper should decode a supported language as"""
+    return DECODING_FALLBACK.get(code, code)
+
+
+class LanguageChoice:
+    """Decoding language, prompt and the evidence behind them"""
+    
+    __slots__ = ("language", "prompt", "distribution", "source")
+    
+    def __init__(self, language: str, prompt: Optional[str], distribution: List[Tuple[str, float]], source: str):
+        self.language = language
+        self.prompt = prompt
+        self.distribution = distribution
+        self.source = source
+    
+    def probabilities(self, top: int = 5) -> Dict[str, float]:
+        return {code: round(probability, 4) for code, probability in self.distribution[:top]}
+
+
+class LanguageIdentifier:
+    """
+    Language identification pre-pass with a per-session cache.
+    
+    The detector sees only the first `seconds` of speech (after leading
+    silence), and only the languages we support are ranked. A confident
+    result (or a language the client asked for) is remembered for the
+    session, so later recordings from the same patient or kiosk session skip
+    detection altogether.
+    """
+    
+    def __init__(
+        self,
+        detect: LanguageDetector,
+        seconds: float = 3.0,
+        min_confidence: float = 0.5,
+        default_language: str = "hi",
+        session_ttl_seconds: float = 1800,
+        max_sessions: int = 10000
+    ):
+        """
+        Initialize identifier
+        
+        Args:
+            detect: Language detector over a short snippet
+            seconds: Speech analysed per recording
+            min_confidence: Probability needed to trust (and cache) a detection
+            default_language: Used when nothing was detected and the session has no language
+            session_ttl_seconds: How long a session's language is remembered
+            max_sessions: Sessions kept (least recently used are evicted)
+        """
+        self.detect = detect
+        self.seconds = seconds
+        self.min_confidence = min_confidence
+        self.default_language = default_language
+        self.session_ttl_seconds = session_ttl_seconds
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, Tuple[float, LanguageChoice]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"detections": 0, "session_hits": 0, "hinted": 0}
+    
+    def snippet(self, audio: np.ndarray, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+        """The first `seconds` of speech in a recording"""
+        segments = speech_segments(audio, sample_rate)
+        start = segments[0][0] if segments else 0
+        return audio[start:start + int(self.seconds * sample_rate)]
+    
+    def distribution(self, audio: np.ndarray, sample_rate: int = SAMPLE_RATE) -> List[Tuple[str, float]]:
+        """Supported languages ranked by probability (renormalized over the supported set)"""
+        probabilities = self.detect(self.snippet(audio, sample_rate))
+        supported = {code: p for code, p in probabilities.items() if code in WHISPER_LANGUAGES}
+        total = sum(supported.values())
+        if not total:
+            return []
+        return sorted(((code, p / total) for code, p in supported.items()), key=lambda item: -item[1])
+    
+    def _session(self, session_id: Optional[str]) -> Optional[LanguageChoice]:
+        if not session_id:
+            return None
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            stored_at, choice = entry
+            if time.time() - stored_at > self.session_ttl_seconds:
+                del self._sessions[session_id]
+                return None
+            self._sessions.move_to_end(session_id)
+            return choice
+    
+    def remember(self, session_id: Optional[str], choice: LanguageChoice):
+        """Remember a session's language"""
+        if not session_id:
+            return
+        with self._lock:
+            self._sessions[session_id] = (time.time(), choice)
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+    
+    def choose(
+        self,
+        audio: np.ndarray,
+        language: Optional[str] = None,
+        session_id: Optional[str] = None,
+        sample_rate: int = SAMPLE_RATE
+    ) -> LanguageChoice:
+        """
+        Choose the decoding language and initial prompt for a recording
+        
+        Args:
+            audio: 16 kHz mono samples
+            language: Language the client asked for (skips detection)
+            session_id: Session whose earlier choice may be reused
+        
+        Returns:
+            LanguageChoice with source "request", "session", "detected" or "default"
+        """
+        if language:
+            self.stats["hinted"] += 1
+            code = decoding_language(language)
+            choice = LanguageChoice(code, LANGUAGE_PROMPTS.get(code), [(code, 1.0)], "request")
+            self.remember(session_id, choice)
+            return choice
+        
+        cached = self._session(session_id)
+        if cached is not None:
+            self.stats["session_hits"] += 1
+            return LanguageChoice(cached.language, cached.prompt, cached.distribution, "session")
+        
+        self.stats["detections"] += 1
+        ranked = self.distribution(audio, sample_rate)
+        if ranked and ranked[0][1] >= self.min_confidence:
+            code = ranked[0][0]
+            choice = LanguageChoice(code, LANGUAGE_PROMPTS.get(code), ranked, "detected")
+            self.remember(session_id, choice)
+            return choice
+        code = ranked[0][0] if ranked else self.default_language
+        return LanguageChoice(code, LANGUAGE_PROMPTS.get(code), ranked, "detected" if ranked else "default")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"sessions": len(self._sessions), **self.stats}
@@ -0,0 +1,193 @@
+"""
+Long-audio transcription for Arovia voice input
+Recordings are split at silences found by an energy-based voice activity
+detector, the speech segments are decoded in batches across a pool of
+model replicas, and the text is stitched back together in order
+"""
+import math
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Tuple, Callable
+
+import numpy as np
+
+
+SAMPLE_RATE = 16000
+
+# Whisper decodes 30 s windows; segments stay under that so each is one window
+MAX_SEGMENT_SECONDS = 28.0
+
+# Longer pauses end a segment even if the next speech would still fit
+MERGE_GAP_SECONDS = 2.0
+
+# Whisper's own no-speech rule: skip a segment that is probably silence and decoded poorly
+NO_SPEECH_THRESHOLD = 0.6
+LOGPROB_THRESHOLD = -1.0
+
+# Decodes one batch: (segments, language, initial_prompt) -> one result dict per segment
+# with "text", "avg_logprob" and optionally "no_speech_prob" and "language"
+BatchDecoder = Callable[[List[np.ndarray], Optional[str], Optional[str]], List[Dict[str, Any]]]
+
+
+def confidence_from_logprob(avg_logprob: float) -> float:
+    """Map Whisper's average token log probability to a 0-1 confidence"""
+    return float(min(1.0, max(0.0, (avg_logprob + 1) / 2)))
+
+
+def frame_levels(audio: np.ndarray, frame_length: int) -> np.ndarray:
+    """RMS level in dBFS of consecutive frames"""
+    frames = audio[:len(audio) // frame_length * frame_length].reshape(-1, frame_length)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+
+def speech_segments(
+    audio: np.ndarray,
+    sample_rate: int = SAMPLE_RATE,
+    max_segment_seconds: float = MAX_SEGMENT_SECONDS,
+    min_silence_seconds: float = 0.3,
+    frame_ms: int = 30,
+    padding_seconds: float = 0.2
+) -> List[Tuple[int, int]]:
+    """
+    Split audio into speech segments at silence boundaries
+    
+    Frames louder than an adaptive threshold (between the noise floor and
+    the loudest frame) are speech. Speech separated by less than
+    `min_silence_seconds` is one region; regions less than
+    MERGE_GAP_SECONDS apart are packed into segments of at most
+    `max_segment_seconds`, so every cut falls in a silence unless someone
+    talks for longer than that without pausing.
+    
+    Returns:
+        (start, end) sample offsets in order; leading, trailing and long
+        internal silences are not covered
+    """
+    frame = max(1, int(sample_rate * frame_ms / 1000))
+    if len(audio) < frame:
+        return []
+    levels = frame_levels(audio, frame)
+    noise_floor = np.percentile(levels, 10)
+    peak = levels.max()
+    if peak < -60:
+        return []
+    # Recordings without pauses have no noise floor to measure; keep everything near the peak
+    threshold = min(max(noise_floor + 10, peak - 40, -60), peak - 6)
+    is_speech = levels > threshold
+    
+    # Runs of speech frames, merging gaps shorter than the minimum silence
+    min_gap = max(1, int(round(min_silence_seconds * 1000 / frame_ms)))
+    regions: List[List[int]] = []
+    for index in np.flatnonzero(is_speech):
+        if regions and index - regions[-1][1] <= min_gap:
+            regions[-1][1] = index + 1
+        else:
+            regions.append([index, index + 1])
+    
+    # Pack regions into segments of bounded length
+    max_frames = max(1, int(max_segment_seconds * 1000 / frame_ms))
+    max_gap = int(MERGE_GAP_SECONDS * 1000 / frame_ms)
+    segments: List[List[int]] = []
+    for start, end in regions:
+        while end - start > max_frames:
+            segments.append([start, start + max_frames])
+            start += max_frames
+        if segments and end - segments[-1][0] <= max_frames and start - segments[-1][1] <= max_gap:
+            segments[-1][1] = end
+        else:
+            segments.append([start, end])
+    
+    padding = int(padding_seconds * sample_rate)
+    total = len(audio)
+    return [(max(0, start * frame - padding), min(total, end * frame + padding)) for start, end in segments]
+
+
+class LongAudioTranscriber:
+    """
+    Transcribe long recordings segment by segment.
+    
+    Segments from speech_segments() are grouped into batches and decoded
+    concurrently by `workers` threads (one per model replica); results are
+    reassembled in recording order, so the transcript reads the same as a
+    serial decode. Silent stretches are never decoded.
+    """
+    
+    def __init__(self, decode_batch: BatchDecoder, workers: int = 1, batch_size: int = 8):
+        """
+        Initialize transcriber
+        
+        Args:
+            decode_batch: Decodes a list of segments (see BatchDecoder)
+            workers: Batches decoded at once (the number of model replicas)
+            batch_size: Maximum segments per batch
+        """
+        self.decode_batch = decode_batch
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+    
+    def transcribe(
+        self,
+        audio: np.ndarray,
+        language: Optional[str] = None,
+        initial_prompt: Optional[str] = None,
+        sample_rate: int = SAMPLE_RATE
+    ) -> Dict[str, Any]:
+        """
+        Transcribe a recording
+        
+        Returns:
+            {"text", "language", "confidence", "segments"}; each segment has
+            start/end seconds, text, confidence and the detected language
+        """
+        bounds = speech_segments(audio, sample_rate)
+        if not bounds:
+            return {"text": "", "language": language, "confidence": 0.0, "segments": []}
+        
+        # Spread segments so every worker gets a batch before any gets a second
+        batch_size = min(self.batch_size, math.ceil(len(bounds) / self.workers))
+        batches = [list(range(i, min(i + batch_size, len(bounds)))) for i in range(0, len(bounds), batch_size)]
+        results: List[Optional[Dict[str, Any]]] = [None] * len(bounds)
+        
+        def run(batch: List[int]):
+            decoded = self.decode_batch([audio[bounds[i][0]:bounds[i][1]] for i in batch], language, initial_prompt)
+            for i, result in zip(batch, decoded):
+                results[i] = result
+        
+        if len(batches) == 1 or self.workers == 1:
+            for batch in batches:
+                run(batch)
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(batches)), thread_name_prefix="whisper") as pool:
+                for future in [pool.submit(run, batch) for batch in batches]:
+                    future.result()
+        
+        segments = []
+        for (start, end), result in zip(bounds, results):
+            avg_logprob = result.get("avg_logprob", 0.0)
+            if result.get("no_speech_prob", 0.0) > NO_SPEECH_THRESHOLD and avg_logprob < LOGPROB_THRESHOLD:
+                continue
+            text = result.get("text", "").strip()
+            if not text:
+                continue
+            segments.append({
+                "start": round(start / sample_rate, 2),
+                "end": round(end / sample_rate, 2),
+                "text": text,
+                "confidence": confidence_from_logprob(avg_logprob),
+                "language": result.get("language") or language
+            })
+        
+        # Duration-weighted confidence and majority language over the kept segments
+        durations = [segment["end"] - segment["start"] for segment in segments]
+        total = sum(durations)
+        confidence = sum(d * s["confidence"] for d, s in zip(durations, segments)) / total if total else 0.0
+        languages = Counter()
+        for duration, segment in zip(durations, segments):
+            if segment["language"]:
+                languages[segment["language"]] += duration
+        return {
+            "text": " ".join(segment["text"] for segment in segments),
+            "language": languages.most_common(1)[0][0] if languages else language,
+            "confidence": confidence,
+            "segments": segments
+        }
@@ -1,3 +1,410 @@
 """
 Utility to generate health reports in PDF format
+Renders ReferralNote objects to printable PDFs with fpdf2, with fonts loaded
+once per process and support for Devanagari and other Indic scripts
 """
+import os
+import io
+import copy
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Dict, Iterable, Tuple
+from fontTools import ttLib
+from fpdf import FPDF
+from fpdf.fonts import TTFFont, SubsetMap
+from models.schemas import ReferralNote
+
+try:
+    import uharfbuzz  # noqa: F401 (enables fpdf2 text shaping for Indic conjuncts)
+    TEXT_SHAPING_AVAILABLE = True
+except ImportError:
+    TEXT_SHAPING_AVAILABLE = False
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FONT_SEARCH_PATHS = [
+    os.path.join(PROJECT_ROOT, "fonts"),
+    "/usr/share/fonts",
+    "/usr/local/share/fonts",
+    "/Library/Fonts",
+    "C:\\Windows\\Fonts"
+]
+
+# Base family candidates (regular, bold), in order of preference
+BASE_FONTS = [
+    ("NotoSans-Regular.ttf", "NotoSans-Bold.ttf"),
+    ("DejaVuSans.ttf", "DejaVuSans-Bold.ttf")
+]
+
+# Script fonts used as fallbacks for characters missing from the base family
+SCRIPT_FONTS = {
+    "devanagari": "NotoSansDevanagari-Regular.ttf",
+    "bengali": "NotoSansBengali-Regular.ttf",
+    "gurmukhi": "NotoSansGurmukhi-Regular.ttf",
+    "gujarati": "NotoSansGujarati-Regular.ttf",
+    "oriya": "NotoSansOriya-Regular.ttf",
+    "tamil": "NotoSansTamil-Regular.ttf",
+    "telugu": "NotoSansTelugu-Regular.ttf",
+    "kannada": "NotoSansKannada-Regular.ttf",
+    "malayalam": "NotoSansMalayalam-Regular.ttf"
+}
+
+URGENCY_COLORS = {
+    "immediate": (198, 40, 40),
+    "urgent": (239, 108, 0),
+    "standard": (46, 125, 50)
+}
+
+# OpenType layout tables are only read when fpdf2 shapes text with HarfBuzz;
+# without it they only slow down per-document subsetting
+LAYOUT_TABLES = ["GSUB", "GPOS", "GDEF", "BASE", "JSTF", "MATH", "kern", "morx", "FFTM"]
+
+DISCLAIMER = ("This is a triage support tool, not a medical diagnosis. "
+              "Please consult a healthcare professional for definitive medical advice.")
+
+
+def find_font_file(file_name: str, search_paths: Iterable[str]) -> Optional[str]:
+    """Find a font file by name in the search paths (searched recursively)"""
+    for base in search_paths:
+        if not base or not os.path.isdir(base):
+            continue
+        direct = os.path.join(base, file_name)
+        if os.path.exists(direct):
+            return direct
+        for root, _, files in os.walk(base):
+            if file_name in files:
+                return os.path.join(root, file_name)
+    return None
+
+
+class FontRegistry:
+    """
+    Fonts parsed once per process and shared by every rendered document.
+    
+    fpdf2 re-reads and re-indexes a TTF file on every `add_font` call; the
+    registry does that once per file and hands every new document a shallow
+    copy of the parsed font. The glyph width and cmap tables are shared (they
+    only depend on the font file). Each document gets its own lazily loaded
+    font tables from the cached file bytes, because fpdf2 subsets them in
+    place on output, and its own subset map. That copy relies on fpdf2
+    internals (tested with the 2.8 series pinned in requirements); if they
+    change, documents fall back to the public `add_font`.
+    """
+    
+    def __init__(self, search_paths: Optional[List[str]] = None):
+        """
+        Initialize registry
+        
+        Args:
+            search_paths: Directories to search for font files (REPORT_FONT_DIR is searched first)
+        """
+        paths = list(search_paths or FONT_SEARCH_PATHS)
+        if os.getenv("REPORT_FONT_DIR"):
+            paths.insert(0, os.getenv("REPORT_FONT_DIR"))
+        
+        self.family = "Helvetica"
+        self.unicode = False
+        self.fallback_families: List[str] = []
+        self._fonts: Dict[str, TTFFont] = {}
+        self._font_bytes: Dict[str, bytes] = {}
+        self._font_files: List[Tuple[str, str, str]] = []
+        self._copy_fonts = True
+        scratch = FPDF()
+        
+        for regular, bold in BASE_FONTS:
+            regular_path = find_font_file(regular, paths)
+            if not regular_path:
+                continue
+            self.family = "base"
+            self.unicode = True
+            bold_path = find_font_file(bold, paths)
+            self._font_files += [("base", "", regular_path), ("base", "B", bold_path or regular_path)]
+            break
+        
+        if self.unicode:
+            for script, file_name in SCRIPT_FONTS.items():
+                path = find_font_file(file_name, paths)
+                if path:
+                    self._font_files.append((script, "", path))
+                    self.fallback_families.append(script)
+        
+        for family, style, path in self._font_files:
+            scratch.add_font(family, style, path)
+        self._fonts = dict(scratch.fonts)
+        for font in self._fonts.values():
+            self._font_bytes[font.fontkey] = self._embeddable_bytes(font)
+    
+    @staticmethod
+    def _embeddable_bytes(font: TTFFont) -> bytes:
+        with open(font.ttffile, "rb") as f:
+            data = f.read()
+        if TEXT_SHAPING_AVAILABLE:
+            return data
+        ttfont = ttLib.TTFont(io.BytesIO(data), recalcTimestamp=False, fontNumber=font.collection_font_number)
+        for tag in LAYOUT_TABLES:
+            if tag in ttfont:
+                del ttfont[tag]
+        buffer = io.BytesIO()
+        ttfont.save(buffer)
+        return buffer.getvalue()
+    
+    def apply(self, pdf: FPDF):
+        """Install the preloaded fonts into a new document"""
+        if self._copy_fonts:
+            try:
+                self._install_copies(pdf)
+            except (AttributeError, TypeError) as e:
+                print(f"Warning: Could not reuse parsed fonts with this fpdf2 version ({e}); loading fonts per document")
+                self._copy_fonts = False
+                pdf.fonts.clear()
+        if not self._copy_fonts:
+            for family, style, path in self._font_files:
+                pdf.add_font(family, style, path)
+        if self.fallback_families:
+            pdf.set_fallback_fonts(self.fallback_families, exact_match=False)
+        if self.unicode and TEXT_SHAPING_AVAILABLE:
+            pdf.set_text_shaping(True)
+    
+    def _install_copies(self, pdf: FPDF):
+        for fontkey, font in self._fonts.items():
+            font_copy = copy.copy(font)
+            font_copy.i = len(pdf.fonts) + 1
+            font_copy.ttfont = ttLib.TTFont(
+                io.BytesIO(self._font_bytes[fontkey]),
+                recalcTimestamp=False,
+                fontNumber=font.collection_font_number,
+                lazy=True
+            )
+            font_copy._hbfont = None
+            font_copy.subset = SubsetMap(font_copy)
+            font_copy.missing_glyphs = []
+            font_copy.biggest_size_pt = 0
+            pdf.fonts[fontkey] = font_copy
+    
+    def text(self, value) -> str:
+        """Make text safe for the active font (core fonts only cover Latin-1)"""
+        value = "" if value is None else str(value)
+        if self.unicode:
+            return value
+        return value.encode("latin-1", "replace").decode("latin-1")
+    
+    def get_info(self) -> Dict[str, object]:
+        return {
+            "family": self.family,
+            "unicode": self.unicode,
+            "scripts": list(self.fallback_families),
+            "text_shaping": self.unicode and TEXT_SHAPING_AVAILABLE
+        }
+
+
+_registry: Optional[FontRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_font_registry() -> FontRegistry:
+    """Process-wide font registry, created on first use"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = FontRegistry()
+        return _registry
+
+
+class ReferralReportGenerator:
+    """Renders referral notes to PDF (thread-safe; share one per process, see get_report_generator)"""
+    
+    def __init__(self, fonts: Optional[FontRegistry] = None, wrap_cache_size: int = 256):
+        """
+        Initialize generator
+        
+        Args:
+            fonts: Font registry (the shared process-wide registry if None)
+            wrap_cache_size: Boilerplate paragraphs whose line breaks are kept
+        """
+        self.fonts = fonts or get_font_registry()
+        self.wrap_cache_size = wrap_cache_size
+        self._wrapped_lines: "OrderedDict[tuple, List[str]]" = OrderedDict()
+        self._wrap_lock = threading.Lock()
+    
+    def _new_document(self) -> FPDF:
+        pdf = FPDF(format="A4")
+        pdf.set_auto_page_break(auto=True, margin=18)
+        pdf.set_margins(16, 16, 16)
+        pdf.set_creator("Arovia Health Desk")
+        self.fonts.apply(pdf)
+        return pdf
+    
+    def render(self, note: ReferralNote) -> bytes:
+        """
+        Render a single referral note
+        
+        Args:
+            note: Referral note
+        
+        Returns:
+            PDF file contents
+        """
+        return self.render_batch([note])
+    
+    def render_batch(self, notes: List[ReferralNote]) -> bytes:
+        """
+        Render several referral notes into one PDF, one note per page run
+        
+        Fonts are embedded once for the whole file, so batches are much
+        cheaper per note than separate documents.
+        
+        Args:
+            notes: Referral notes
+        
+        Returns:
+            PDF file contents
+        """
+        pdf = self._new_document()
+        pdf.set_title("Arovia Referral Note" if len(notes) == 1 else f"Arovia Referral Notes ({len(notes)})")
+        for note in notes:
+            pdf.add_page()
+            self._draw_note(pdf, note)
+        return bytes(pdf.output())
+    
+    def _paragraph(self, pdf: FPDF, height: float, text: str):
+        """
+        Write text to the right margin, wrapping if needed
+        
+        fpdf2's multi_cell line breaking dominates render time, so text that
+        fits on the rest of the line is written with a plain cell instead.
+        """
+        if "\n" not in text and pdf.get_string_width(text) < pdf.w - pdf.r_margin - pdf.get_x():
+            pdf.cell(0, height, text, new_x="LMARGIN", new_y="NEXT")
+        else:
+            pdf.multi_cell(0, height, text, new_x="LMARGIN", new_y="NEXT")
+    
+    def _static_paragraph(self, pdf: FPDF, height: float, text: str):
+        """Write boilerplate text, reusing its line breaks across notes and documents"""
+        key = (text, pdf.font_family, pdf.font_style, pdf.font_size_pt, pdf.epw)
+        with self._wrap_lock:
+            lines = self._wrapped_lines.get(key)
+            if lines is not None:
+                self._wrapped_lines.move_to_end(key)
+        if lines is None:
+            lines = pdf.multi_cell(pdf.epw, height, text, dry_run=True, output="LINES")
+            with self._wrap_lock:
+                self._wrapped_lines[key] = lines
+                while len(self._wrapped_lines) > self.wrap_cache_size:
+                    self._wrapped_lines.popitem(last=False)
+        for line in lines:
+            pdf.cell(0, height, line, new_x="LMARGIN", new_y="NEXT")
+    
+    def _heading(self, pdf: FPDF, text: str):
+        pdf.ln(3)
+        pdf.set_font(self.fonts.family, "B", 11)
+        pdf.set_text_color(33, 33, 33)
+        pdf.cell(0, 7, text, new_x="LMARGIN", new_y="NEXT")
+        pdf.set_draw_color(200, 200, 200)
+        pdf.line(pdf.l_margin, pdf.get_y(), pdf.w - pdf.r_margin, pdf.get_y())
+        pdf.ln(1.5)
+        pdf.set_font(self.fonts.family, "", 10)
+    
+    def _field(self, pdf: FPDF, label: str, value, label_width: float = 42):
+        pdf.set_font(self.fonts.family, "B", 10)
+        pdf.cell(label_width, 6, label)
+        pdf.set_font(self.fonts.family, "", 10)
+        self._paragraph(pdf, 6, self.fonts.text(value))
+    
+    def _draw_note(self, pdf: FPDF, note: ReferralNote):
+        triage = note.triage_result
+        text = self.fonts.text
+        color = URGENCY_COLORS.get(triage.triage_category, (66, 66, 66))
+        
+        # Header band
+        pdf.set_fill_color(*color)
+        pdf.set_text_color(255, 255, 255)
+        pdf.set_font(self.fonts.family, "B", 15)
+        pdf.cell(0, 11, "  Arovia Health Desk - Referral Note", fill=True, new_x="LMARGIN", new_y="NEXT")
+        pdf.set_font(self.fonts.family, "", 9)
+        pdf.cell(
+            0, 6,
+            text(f"  {triage.triage_category.upper()}  |  Urgency {triage.urgency_score}/10"
+                 f"  |  Generated {note.generated_at.strftime('%Y-%m-%d %H:%M')}"),
+            fill=True, new_x="LMARGIN", new_y="NEXT"
+        )
+        pdf.set_text_color(33, 33, 33)
+        pdf.ln(2)
+        
+        if note.patient_id:
+            self._field(pdf, "Patient ID", note.patient_id)
+        
+        self._heading(pdf, "Clinical Summary")
+        self._field(pdf, "Chief complaint", triage.chief_complaint)
+        self._field(pdf, "Specialty", triage.recommended_specialty)
+        self._field(pdf, "Action required", triage.action_required)
+        if triage.symptoms:
+            self._heading(pdf, "Symptoms")
+            for symptom in triage.symptoms:
+                details = f"{symptom.name} ({symptom.severity}"
+                details += f", {symptom.duration})" if symptom.duration else ")"
+                self._paragraph(pdf, 5.5, text(f"- {details}"))
+        
+        if triage.red_flags:
+            self._heading(pdf, "Red Flags")
+            pdf.set_text_color(*URGENCY_COLORS["immediate"])
+            for flag in triage.red_flags:
+                self._paragraph(
+                    pdf, 5.5, text(f"- [{flag.urgency_level.upper()}] {flag.description}: {flag.action_required}")
+                )
+            pdf.set_text_color(33, 33, 33)
+        
+        if triage.potential_risks:
+            self._heading(pdf, "Potential Risks")
+            for risk in triage.potential_risks:
+                self._paragraph(
+                    pdf, 5.5, text(f"- {risk.condition} ({risk.probability} probability, {risk.specialty_needed})")
+                )
+        
+        self._heading(pdf, "Recommended Facilities")
+        if note.recommended_facilities:
+            for i, facility in enumerate(note.recommended_facilities, 1):
+                pdf.set_font(self.fonts.family, "B", 10)
+                self._paragraph(pdf, 5.5, text(f"{i}. {facility.name}"))
+                pdf.set_font(self.fonts.family, "", 9)
+                lines = [facility.address, f"{facility.distance_km} km - {facility.specialty.title()}"]
+                if facility.contact:
+                    lines.append(f"Contact: {facility.contact}")
+                for line in lines:
+                    self._paragraph(pdf, 5, text(line))
+                if facility.map_link:
+                    pdf.set_text_color(25, 118, 210)
+                    pdf.cell(0, 5, "Open in maps", link=facility.map_link, new_x="LMARGIN", new_y="NEXT")
+                    pdf.set_text_color(33, 33, 33)
+                pdf.ln(1)
+        else:
+            pdf.cell(0, 6, "No facilities found in the specified area", new_x="LMARGIN", new_y="NEXT")
+        
+        pdf.ln(4)
+        pdf.set_font(self.fonts.family, "", 8)
+        pdf.set_text_color(117, 117, 117)
+        self._static_paragraph(pdf, 4.5, f"Disclaimer: {DISCLAIMER}")
+        pdf.set_text_color(33, 33, 33)
+
+
+_generator: Optional[ReferralReportGenerator] = None
+
+
+def get_report_generator() -> ReferralReportGenerator:
+    """Process-wide report generator, so cached line breaks are reused across requests"""
+    global _generator
+    fonts = get_font_registry()
+    with _registry_lock:
+        if _generator is None:
+            _generator = ReferralReportGenerator(fonts)
+        return _generator
+
+
+def generate_referral_pdf(note: ReferralNote) -> bytes:
+    """Render a referral note to PDF bytes with the shared font registry"""
+    return get_report_generator().render(note)
+
+
+def generate_referral_pdf_batch(notes: List[ReferralNote]) -> bytes:
+    """Render several referral notes into a single PDF"""
+    return get_report_generator().render_batch(notes)
@@ -0,0 +1,231 @@
+"""
+Priority-aware request scheduler for the Arovia API
+Requests are admitted into priority classes and dispatched to a bounded
+worker pool, so emergencies are not stuck behind routine traffic
+"""
+import time
+import asyncio
+import threading
+from bisect import bisect_left
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+
+PRIORITY_CLASSES = ["emergency", "urgent", "routine"]
+
+# Upper bounds (seconds) of the queue-time histogram buckets
+HISTOGRAM_BUCKETS = [0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float("inf")]
+
+
+class QueueFullError(Exception):
+    """Raised when a priority class has no room for another request"""
+
+
+class _Job:
+    def __init__(self, priority_class: str, fn: Callable[..., Any], args, kwargs, loop, future):
+        self.priority_class = priority_class
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.loop = loop
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class QueueTimeHistogram:
+    """Cumulative queue-time histogram with recent-sample percentiles"""
+    
+    def __init__(self, window: int = 1000):
+        self.counts = [0] * len(HISTOGRAM_BUCKETS)
+        self.total = 0
+        self.sum = 0.0
+        self.samples = deque(maxlen=window)
+    
+    def observe(self, seconds: float):
+        self.counts[bisect_left(HISTOGRAM_BUCKETS, seconds)] += 1
+        self.total += 1
+        self.sum += seconds
+        self.samples.append(seconds)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        ordered = sorted(self.samples)
+        
+        def pct(p):
+            return ordered[int(p * (len(ordered) - 1))] if ordered else 0.0
+        
+        return {
+            "count": self.total,
+            "avg": self.sum / self.total if self.total else 0.0,
+            "p50": pct(0.50),
+            "p95": pct(0.95),
+            "p99": pct(0.99),
+            "buckets": {("+Inf" if b == float("inf") else str(b)): c
+                        for b, c in zip(HISTOGRAM_BUCKETS, self.counts)}
+        }
+
+
+class PriorityScheduler:
+    """
+    Strict-priority dispatcher with starvation protection.
+    
+    Workers always take the oldest job of the highest non-empty class,
+    except that a job which has waited longer than its class's starvation
+    timeout is taken first while no emergency is waiting. Routine and
+    urgent queues are bounded; the emergency queue never rejects.
+    """
+    
+    def __init__(
+        self,
+        workers: int = 8,
+        max_queue: int = 200,
+        starvation_timeouts: Optional[Dict[str, float]] = None
+    ):
+        """
+        Initialize scheduler
+        
+        Args:
+            workers: Number of worker threads
+            max_queue: Maximum queued requests per non-emergency class
+            starvation_timeouts: Seconds after which a waiting job of the class is promoted
+        """
+        self.workers = workers
+        self.max_queue = max_queue
+        self.starvation_timeouts = starvation_timeouts or {"urgent": 5.0, "routine": 15.0}
+        self.queues = {name: deque() for name in PRIORITY_CLASSES}
+        self.histograms = {name: QueueTimeHistogram() for name in PRIORITY_CLASSES}
+        self.counters = {name: {"admitted": 0, "rejected": 0, "promoted": 0, "completed": 0}
+                         for name in PRIORITY_CLASSES}
+        self.active = 0
+        self._condition = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._running = False
+    
+    def start(self):
+        """Start the worker threads"""
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"triage-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+    
+    def stop(self):
+        """Stop the worker threads after their current job"""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+    
+    async def run(self, priority_class: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Queue fn(*args, **kwargs) in a priority class and await its result
+        
+        Args:
+            priority_class: One of PRIORITY_CLASSES
+            fn: Blocking function to run on a worker
+        
+        Returns:
+            Result of fn
+        """
+        if priority_class not in self.queues:
+            raise ValueError(f"Unknown priority class: {priority_class}")
+        if not self._running:
+            self.start()
+        
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        job = _Job(priority_class, fn, args, kwargs, loop, future)
+        with self._condition:
+            queue = self.queues[priority_class]
+            if priority_class != "emergency" and len(queue) >= self.max_queue:
+                self.counters[priority_class]["rejected"] += 1
+                raise QueueFullError(f"{priority_class} queue is full")
+            queue.append(job)
+            self.counters[priority_class]["admitted"] += 1
+            self._condition.notify()
+        return await future
+    
+    def _next_job(self) -> Optional[_Job]:
+        """Pick the next job; caller holds the condition lock"""
+        # Promotion only reorders urgent and routine work; a waiting
+        # emergency is always dispatched first
+        if not self.queues["emergency"]:
+            now = time.monotonic()
+            for name, timeout in self.starvation_timeouts.items():
+                queue = self.queues[name]
+                if queue and now - queue[0].enqueued_at >= timeout:
+                    self.counters[name]["promoted"] += 1
+                    return queue.popleft()
+        for name in PRIORITY_CLASSES:
+            if self.queues[name]:
+                return self.queues[name].popleft()
+        return None
+    
+    def _worker(self):
+        while True:
+            with self._condition:
+                job = self._next_job()
+                while job is None:
+                    if not self._running:
+                        return
+                    self._condition.wait()
+                    job = self._next_job()
+                self.histograms[job.priority_class].observe(time.monotonic() - job.enqueued_at)
+                self.active += 1
+            
+            try:
+                result = job.fn(*job.args, **job.kwargs)
+                job.loop.call_soon_threadsafe(_set_result, job.future, result)
+            except BaseException as e:
+                job.loop.call_soon_threadsafe(_set_exception, job.future, e)
+            finally:
+                with self._condition:
+                    self.active -= 1
+                    self.counters[job.priority_class]["completed"] += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depths, counters and queue-time histograms per class"""
+        with self._condition:
+            return {
+                "workers": self.workers,
+                "active": self.active,
+                "classes": {
+                    name: {
+                        "queued": len(self.queues[name]),
+                        **self.counters[name],
+                        "queue_time": self.histograms[name].to_dict()
+                    }
+                    for name in PRIORITY_CLASSES
+                }
+            }
+
+
+def _set_result(future: asyncio.Future, result: Any):
+    if not future.done():
+        future.set_result(result)
+
+
+def _set_exception(future: asyncio.Future, error: BaseException):
+    if not future.done():
+        future.set_exception(error)
+
+
+def classify_priority(detected_flags: List[Dict[str, Any]]) -> str:
+    """
+    Map keyword pre-screen flags to a priority class
+    
+    Args:
+        detected_flags: Output of MedicalTriageAgent.detect_emergency_keywords
+    
+    Returns:
+        "emergency" for immediate flags, "urgent" for other flags, else "routine"
+    """
+    if any(flag.get("urgency") == "immediate" for flag in detected_flags):
+        return "emergency"
+    if detected_flags:
+        return "urgent"
+    return "routine"
@@ -0,0 +1,335 @@
+"""
+Offline road-network routing for Arovia
+Loads an OpenStreetMap road extract into compact CSR arrays and computes
+travel times from a patient to many facilities with one Dijkstra search
+"""
+import os
+import math
+import heapq
+import xml.etree.ElementTree as ET
+from array import array
+from typing import Optional, Dict, Any, List, Tuple, Iterable
+import numpy as np
+
+try:
+    import osmium
+    OSMIUM_AVAILABLE = True
+except ImportError:
+    OSMIUM_AVAILABLE = False
+
+from utils.facility_cache import haversine_km
+
+
+# Typical travel speeds (km/h) by OSM highway class on rural Indian roads
+HIGHWAY_SPEEDS_KMH = {
+    "motorway": 80, "trunk": 60, "primary": 50, "secondary": 40, "tertiary": 30,
+    "unclassified": 25, "road": 25, "residential": 20, "living_street": 10,
+    "service": 15, "track": 10
+}
+
+# Speed used to reach the road network from an off-road point
+ACCESS_SPEED_KMH = 10.0
+
+# Size (degrees) of the grid cells used to snap points to the nearest node
+SNAP_CELL_DEGREES = 0.01
+
+
+def highway_speed(highway: Optional[str], maxspeed: Optional[str] = None) -> Optional[float]:
+    """
+    Travel speed for a way, or None if it is not a drivable road
+    
+    Args:
+        highway: OSM highway tag
+        maxspeed: OSM maxspeed tag (km/h), caps the class speed
+    """
+    if not highway:
+        return None
+    speed = HIGHWAY_SPEEDS_KMH.get(highway[:-5] if highway.endswith("_link") else highway)
+    if speed is None:
+        return None
+    if maxspeed:
+        try:
+            speed = min(speed, float(maxspeed.split()[0]))
+        except ValueError:
+            pass
+    return float(speed)
+
+
+class RoadGraph:
+    """
+    Directed road graph in compressed sparse row form.
+    
+    Node i's outgoing edges are targets[offsets[i]:offsets[i + 1]] with
+    travel times (seconds) in the same slice of weights. Arrays are kept as
+    `array.array`, which is compact and fast to index from Python.
+    """
+    
+    def __init__(self, latitudes, longitudes, offsets, targets, weights):
+        self.latitudes = array("d", np.asarray(latitudes, dtype=np.float64).tobytes())
+        self.longitudes = array("d", np.asarray(longitudes, dtype=np.float64).tobytes())
+        self.offsets = array("q", np.asarray(offsets, dtype=np.int64).tobytes())
+        self.targets = array("i", np.asarray(targets, dtype=np.int32).tobytes())
+        self.weights = array("f", np.asarray(weights, dtype=np.float32).tobytes())
+        self._grid: Dict[Tuple[int, int], List[int]] = {}
+        for node in range(len(self.latitudes)):
+            self._grid.setdefault(self._cell(self.latitudes[node], self.longitudes[node]), []).append(node)
+    
+    @property
+    def node_count(self) -> int:
+        return len(self.latitudes)
+    
+    @property
+    def edge_count(self) -> int:
+        return len(self.targets)
+    
+    @staticmethod
+    def _cell(latitude: float, longitude: float) -> Tuple[int, int]:
+        return int(math.floor(latitude / SNAP_CELL_DEGREES)), int(math.floor(longitude / SNAP_CELL_DEGREES))
+    
+    @classmethod
+    def from_edges(
+        cls,
+        coordinates: List[Tuple[float, float]],
+        edges: Iterable[Tuple[int, int, float]]
+    ) -> "RoadGraph":
+        """
+        Build a graph from node coordinates and directed edges
+        
+        Args:
+            coordinates: (latitude, longitude) per node
+            edges: (source, target, seconds) tuples
+        """
+        edge_array = np.array(list(edges), dtype=np.float64).reshape(-1, 3)
+        sources = edge_array[:, 0].astype(np.int64)
+        order = np.argsort(sources, kind="stable")
+        counts = np.bincount(sources, minlength=len(coordinates))
+        offsets = np.zeros(len(coordinates) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        coords = np.array(coordinates, dtype=np.float64).reshape(-1, 2)
+        return cls(coords[:, 0], coords[:, 1], offsets, edge_array[order, 1], edge_array[order, 2])
+    
+    @classmethod
+    def load(cls, path: str) -> "RoadGraph":
+        """Load a graph saved by save() (see scripts/build_road_graph.py)"""
+        with np.load(path) as data:
+            return cls(data["latitudes"], data["longitudes"], data["offsets"], data["targets"], data["weights"])
+    
+    def save(self, path: str):
+        """Save the graph as a compressed .npz file"""
+        np.savez_compressed(
+            path,
+            latitudes=np.frombuffer(self.latitudes, dtype=np.float64),
+            longitudes=np.frombuffer(self.longitudes, dtype=np.float64),
+            offsets=np.frombuffer(self.offsets, dtype=np.int64),
+            targets=np.frombuffer(self.targets, dtype=np.int32),
+            weights=np.frombuffer(self.weights, dtype=np.float32)
+        )
+    
+    def nearest_node(self, latitude: float, longitude: float, max_rings: int = 5) -> Optional[Tuple[int, float]]:
+        """
+        Snap a point to the nearest road node
+        
+        Returns:
+            (node, distance_km), or None if no node is within max_rings grid cells
+        """
+        row, col = self._cell(latitude, longitude)
+        cell_km = SNAP_CELL_DEGREES * 111.0 * math.cos(math.radians(latitude))
+        best, best_distance = None, float("inf")
+        for ring in range(max_rings + 1):
+            for r in range(row - ring, row + ring + 1):
+                for c in range(col - ring, col + ring + 1):
+                    if max(abs(r - row), abs(c - col)) != ring:
+                        continue
+                    for node in self._grid.get((r, c), ()):
+                        distance = haversine_km(latitude, longitude, self.latitudes[node], self.longitudes[node])
+                        if distance < best_distance:
+                            best, best_distance = node, distance
+            # Nodes in the next ring are at least `ring` cells away
+            if best is not None and best_distance <= ring * cell_km:
+                break
+        return (best, best_distance) if best is not None else None
+    
+    def shortest_times(self, source: int, targets: Iterable[int], cutoff_seconds: float = float("inf")) -> Dict[int, float]:
+        """
+        Multi-target Dijkstra: travel times from source to each reachable target
+        
+        The search stops once every target is settled or the cutoff is passed.
+        """
+        remaining = set(targets)
+        offsets, edge_targets, weights = self.offsets, self.targets, self.weights
+        best = {source: 0.0}
+        settled = set()
+        found: Dict[int, float] = {}
+        heap = [(0.0, source)]
+        while heap and remaining:
+            time_so_far, node = heapq.heappop(heap)
+            if node in settled:
+                continue
+            if time_so_far > cutoff_seconds:
+                break
+            settled.add(node)
+            if node in remaining:
+                found[node] = time_so_far
+                remaining.discard(node)
+            for edge in range(offsets[node], offsets[node + 1]):
+                neighbor = edge_targets[edge]
+                candidate = time_so_far + weights[edge]
+                if candidate < best.get(neighbor, float("inf")):
+                    best[neighbor] = candidate
+                    heapq.heappush(heap, (candidate, neighbor))
+        return found
+
+
+class RoadRouter:
+    """Travel-time estimates between a patient and candidate facilities"""
+    
+    def __init__(self, graph: RoadGraph, max_snap_km: float = 5.0, cutoff_seconds: float = 3 * 3600):
+        """
+        Initialize router
+        
+        Args:
+            graph: Road graph
+            max_snap_km: Points farther than this from any road are unroutable
+            cutoff_seconds: Stop searching beyond this travel time
+        """
+        self.graph = graph
+        self.max_snap_km = max_snap_km
+        self.cutoff_seconds = cutoff_seconds
+    
+    def _snap(self, latitude: float, longitude: float) -> Optional[Tuple[int, float]]:
+        snapped = self.graph.nearest_node(latitude, longitude)
+        if snapped is None or snapped[1] > self.max_snap_km:
+            return None
+        node, distance_km = snapped
+        return node, distance_km / ACCESS_SPEED_KMH * 3600
+    
+    def travel_times(
+        self,
+        latitude: float,
+        longitude: float,
+        destinations: List[Tuple[float, float]]
+    ) -> List[Optional[float]]:
+        """
+        Travel times (seconds) from a point to each destination
+        
+        Args:
+            latitude: Patient latitude
+            longitude: Patient longitude
+            destinations: (latitude, longitude) of each facility
+        
+        Returns:
+            Seconds per destination, None where it cannot be reached
+        """
+        origin = self._snap(latitude, longitude)
+        if origin is None:
+            return [None] * len(destinations)
+        snapped = [self._snap(lat, lon) for lat, lon in destinations]
+        found = self.graph.shortest_times(
+            origin[0], {s[0] for s in snapped if s is not None}, self.cutoff_seconds
+        )
+        times = []
+        for target in snapped:
+            if target is None or target[0] not in found:
+                times.append(None)
+            else:
+                times.append(origin[1] + found[target[0]] + target[1])
+        return times
+    
+    def get_info(self) -> Dict[str, Any]:
+        return {"nodes": self.graph.node_count, "edges": self.graph.edge_count}
+
+
+def _build_graph(nodes: Dict[int, Tuple[float, float]], ways: List[Tuple[List[int], float, str]]) -> RoadGraph:
+    """Renumber the nodes used by ways and build directed, time-weighted edges"""
+    index: Dict[int, int] = {}
+    coordinates: List[Tuple[float, float]] = []
+    edges: List[Tuple[int, int, float]] = []
+    for refs, speed, oneway in ways:
+        refs = [ref for ref in refs if ref in nodes]
+        if oneway == "-1":
+            refs.reverse()
+        for ref in refs:
+            if ref not in index:
+                index[ref] = len(coordinates)
+                coordinates.append(nodes[ref])
+        for a, b in zip(refs, refs[1:]):
+            seconds = haversine_km(*nodes[a], *nodes[b]) / speed * 3600
+            edges.append((index[a], index[b], seconds))
+            if oneway not in ("yes", "true", "1", "-1"):
+                edges.append((index[b], index[a], seconds))
+    return RoadGraph.from_edges(coordinates, edges)
+
+
+def load_osm_xml(path: str) -> RoadGraph:
+    """
+    Build a road graph from an OpenStreetMap XML extract (.osm)
+    
+    Args:
+        path: Path to the .osm file
+    """
+    nodes: Dict[int, Tuple[float, float]] = {}
+    ways: List[Tuple[List[int], float, str]] = []
+    for _, element in ET.iterparse(path, events=("end",)):
+        if element.tag == "node":
+            nodes[int(element.get("id"))] = (float(element.get("lat")), float(element.get("lon")))
+            element.clear()
+        elif element.tag == "way":
+            tags = {tag.get("k"): tag.get("v") for tag in element.iter("tag")}
+            speed = highway_speed(tags.get("highway"), tags.get("maxspeed"))
+            if speed:
+                refs = [int(nd.get("ref")) for nd in element.iter("nd")]
+                ways.append((refs, speed, tags.get("oneway", "no")))
+            element.clear()
+    return _build_graph(nodes, ways)
+
+
+def load_osm_pbf(path: str) -> RoadGraph:
+    """
+    Build a road graph from an OpenStreetMap PBF extract (requires pyosmium)
+    
+    Args:
+        path: Path to the .osm.pbf file
+    """
+    if not OSMIUM_AVAILABLE:
+        raise ImportError("Reading .pbf extracts requires osmium. Install with: pip install osmium")
+    
+    nodes: Dict[int, Tuple[float, float]] = {}
+    ways: List[Tuple[List[int], float, str]] = []
+    
+    class _RoadHandler(osmium.SimpleHandler):
+        def way(self, way):
+            speed = highway_speed(way.tags.get("highway"), way.tags.get("maxspeed"))
+            if not speed:
+                return
+            refs = []
+            for node in way.nodes:
+                if node.location.valid():
+                    nodes[node.ref] = (node.location.lat, node.location.lon)
+                    refs.append(node.ref)
+            ways.append((refs, speed, way.tags.get("oneway", "no")))
+    
+    _RoadHandler().apply_file(path, locations=True)
+    return _build_graph(nodes, ways)
+
+
+def load_road_graph(path: str) -> RoadGraph:
+    """Load a road graph from .npz, .osm or .osm.pbf"""
+    if path.endswith(".npz"):
+        return RoadGraph.load(path)
+    if path.endswith(".pbf"):
+        return load_osm_pbf(path)
+    return load_osm_xml(path)
+
+
+def load_default_router() -> Optional[RoadRouter]:
+    """Router for the graph at ROAD_GRAPH_PATH, or None if routing is not configured"""
+    path = os.getenv("ROAD_GRAPH_PATH")
+    if not path:
+        return None
+    try:
+        graph = load_road_graph(path)
+    except Exception as e:
+        print(f"Error loading road graph '{path}': {e}")
+        return None
+    print(f"Road graph loaded: {graph.node_count} nodes, {graph.edge_count} edges")
+    return RoadRouter(graph, max_snap_km=float(os.getenv("ROAD_MAX_SNAP_KM", "5")))
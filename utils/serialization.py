@@ -0,0 +1,135 @@
+"""
+Response serialization for Arovia
+JSON encoding straight from pydantic-core or orjson, without FastAPI's
+response-model revalidation, and gzip/brotli compression for large bodies
+"""
+import os
+import gzip
+import json
+from datetime import date, datetime
+from typing import Optional, Dict, Any, Tuple
+
+from fastapi import Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    brotli = None
+    BROTLI_AVAILABLE = False
+
+
+# Bodies smaller than this are sent uncompressed (headers would dominate)
+COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+COMPRESSION_ENABLED = os.getenv("RESPONSE_COMPRESSION", "true").lower() == "true"
+
+# Fast levels: JSON compresses well, and latency matters more than the last few percent
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+
+def _default(obj: Any) -> Any:
+    """Encode values orjson/json do not know natively"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Encode content as JSON bytes
+    
+    Pydantic models are encoded by pydantic-core directly (model_dump_json),
+    other content by orjson when installed, falling back to the standard
+    library; nested models and facility records are handled in either case.
+    """
+    if isinstance(content, BaseModel):
+        return content.model_dump_json().encode("utf-8")
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def raw_json(text: str) -> Any:
+    """
+    Embed already-encoded JSON (e.g. a stored payload) in a response
+    
+    With orjson the text is spliced in as-is instead of being parsed and
+    re-encoded; otherwise it is parsed.
+    """
+    if ORJSON_AVAILABLE and hasattr(orjson, "Fragment"):
+        return orjson.Fragment(text)
+    return json.loads(text)
+
+
+def accepted_encodings(accept_encoding: Optional[str]) -> set:
+    """Content codings a client accepts, from its Accept-Encoding header"""
+    encodings = set()
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().lower().partition(";")
+        quality = params.strip()
+        if quality.startswith("q=") and quality[2:].strip() in ("0", "0.0", "0.00", "0.000"):
+            continue
+        if coding:
+            encodings.add(coding.strip())
+    return encodings
+
+
+def compress(body: bytes, accept_encoding: Optional[str], min_bytes: int = COMPRESS_MIN_BYTES) -> Tuple[bytes, Optional[str]]:
+    """
+    Compress a body for a client
+    
+    Args:
+        body: Encoded response body
+        accept_encoding: The client's Accept-Encoding header
+        min_bytes: Smallest body worth compressing
+    
+    Returns:
+        (body, content coding) - the coding is None if the body is unchanged
+    """
+    if len(body) < min_bytes:
+        return body, None
+    encodings = accepted_encodings(accept_encoding)
+    if BROTLI_AVAILABLE and "br" in encodings:
+        return brotli.compress(body, quality=BROTLI_QUALITY), "br"
+    if "gzip" in encodings:
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0), "gzip"
+    return body, None
+
+
+def json_response(
+    content: Any,
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None,
+    accept_encoding: Optional[str] = None
+) -> Response:
+    """
+    JSON response for trusted internal objects
+    
+    Returning a Response from an endpoint bypasses FastAPI's response-model
+    validation and jsonable_encoder pass; the endpoint's response_model still
+    documents the schema. Pass the request's Accept-Encoding header to
+    compress large bodies.
+    """
+    body = dumps(content)
+    headers = dict(headers or {})
+    if accept_encoding is not None and COMPRESSION_ENABLED:
+        body, coding = compress(body, accept_encoding)
+        headers["Vary"] = "Accept-Encoding"
+        if coding:
+            headers["Content-Encoding"] = coding
+    return Response(content=body, status_code=status_code, headers=headers, media_type="application/json")
@@ -0,0 +1,189 @@
+"""
+Request coalescing (single-flight) for Arovia
+Concurrent identical calls share one upstream request and all receive its result
+"""
+import copy
+import asyncio
+import threading
+import weakref
+from typing import Any, Callable, Dict, Hashable, Awaitable
+
+
+class _Call:
+    """An in-flight call that followers wait on"""
+    
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+        self.followers = 0
+
+
+class _AsyncCall:
+    """An in-flight coroutine call that followers await"""
+    
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+        self.followers = 0
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls by key.
+    
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it is in flight block until it finishes and receive the same
+    result (or exception). Nothing is cached once the call completes.
+    `do_async` does the same for coroutine functions, per event loop.
+    
+    With `copy_results`, a result that was shared is deep-copied for every
+    caller, the leader included, so no two callers hold the same object; a
+    call nobody joined returns the function's own result uncopied.
+    """
+    
+    def __init__(self, name: str, copy_results: bool = True):
+        """
+        Initialize single-flight group
+        
+        Args:
+            name: Name used in metrics
+            copy_results: Give each caller of a shared call its own deep copy
+        """
+        self.name = name
+        self.copy_results = copy_results
+        self._calls: Dict[Hashable, _Call] = {}
+        self._async_calls: Dict[Any, Dict[Hashable, _AsyncCall]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "executions": 0, "coalesced": 0, "errors": 0}
+        _REGISTRY.add(self)
+    
+    def _share(self, result: Any) -> Any:
+        return copy.deepcopy(result) if self.copy_results else result
+    
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run fn(*args, **kwargs) unless an identical call is already in flight
+        
+        Args:
+            key: Identity of the call
+            fn: Function to run
+        
+        Returns:
+            Result of the (possibly shared) call
+        """
+        with self._lock:
+            self.stats["calls"] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.followers += 1
+                self.stats["coalesced"] += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.stats["executions"] += 1
+                leader = True
+        
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return self._share(call.result)
+        
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self.stats["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+                shared = call.followers > 0
+            call.event.set()
+        # Followers copy call.result after the event, so the leader must not
+        # get the original object back once anyone shares it
+        return self._share(call.result) if shared else call.result
+    
+    async def do_async(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        Async variant of `do` for coroutine functions on the running event loop
+        
+        Args:
+            key: Identity of the call
+            fn: Coroutine function to await
+        
+        Returns:
+            Result of the (possibly shared) call
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self.stats["calls"] += 1
+            calls = self._async_calls.setdefault(loop, {})
+            call = calls.get(key)
+            if call is not None:
+                call.followers += 1
+                self.stats["coalesced"] += 1
+                leader = False
+            else:
+                call = _AsyncCall(loop.create_future())
+                calls[key] = call
+                self.stats["executions"] += 1
+                leader = True
+        
+        if not leader:
+            # Shield so a cancelled follower does not cancel the shared call
+            return self._share(await asyncio.shield(call.future))
+        
+        try:
+            result = await fn(*args, **kwargs)
+            call.future.set_result(result)
+        except BaseException as e:
+            with self._lock:
+                self.stats["errors"] += 1
+            if isinstance(e, asyncio.CancelledError):
+                call.future.cancel()
+            else:
+                call.future.set_exception(e)
+                # Mark retrieved so an unobserved error is not logged by asyncio
+                call.future.exception()
+            raise
+        finally:
+            with self._lock:
+                calls = self._async_calls.get(loop, {})
+                calls.pop(key, None)
+                if not calls:
+                    self._async_calls.pop(loop, None)
+                shared = call.followers > 0
+        return self._share(result) if shared else result
+    
+    def in_flight(self) -> int:
+        """Number of distinct calls currently running"""
+        with self._lock:
+            return len(self._calls) + sum(len(calls) for calls in self._async_calls.values())
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        stats["in_flight"] = self.in_flight()
+        return stats
+
+
+_REGISTRY: "weakref.WeakSet[SingleFlight]" = weakref.WeakSet()
+
+
+def get_singleflight_stats() -> Dict[str, Dict[str, Any]]:
+    """Coalescing counters for every live single-flight group, summed by name"""
+    totals: Dict[str, Dict[str, Any]] = {}
+    for group in list(_REGISTRY):
+        stats = group.get_stats()
+        merged = totals.setdefault(group.name, dict.fromkeys(stats, 0))
+        for counter, value in stats.items():
+            merged[counter] += value
+    return totals
+
+
+def normalize_key(text: str) -> str:
+    """Case- and whitespace-insensitive key for free-text requests"""
+    return " ".join(text.lower().split())
@@ -0,0 +1,165 @@
+"""
+Transcription result cache for Arovia voice input
+Results are keyed by a fingerprint of the decoded PCM plus the model,
+language and prompt, held in memory with an optional SQLite tier, so
+re-uploaded or duplicated clips skip Whisper entirely
+"""
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+
+import numpy as np
+
+from models.schemas import VoiceInput
+
+
+def audio_fingerprint(audio: np.ndarray) -> str:
+    """
+    Content hash of decoded audio
+    
+    Samples are quantized to 16 bits before hashing, so the same clip hashes
+    the same whether it arrived as WAV or was decoded with tiny float
+    differences.
+    """
+    pcm = np.clip(np.round(np.asarray(audio, dtype=np.float32) * 32767), -32768, 32767).astype("<i2")
+    return hashlib.blake2b(pcm.tobytes(), digest_size=16).hexdigest()
+
+
+def transcription_key(
+    audio: np.ndarray,
+    model: str,
+    language: Optional[str],
+    initial_prompt: Optional[str],
+    word_timestamps: bool = False
+) -> str:
+    """Cache key for transcribing `audio` with the given settings (language None means auto-detect)"""
+    parts = (audio_fingerprint(audio), model, language or "auto", initial_prompt or "", "words" if word_timestamps else "")
+    return hashlib.blake2b("\x1f".join(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+
+class TranscriptionCache:
+    """
+    TTL + LRU cache of transcriptions with an optional disk tier.
+    
+    Recent results live in memory; with `disk_path` every result is also
+    written to a small SQLite table, so a restart or another worker process
+    still finds it. A disk hit is promoted back into memory.
+    """
+    
+    def __init__(self, capacity: int = 256, ttl_seconds: float = 24 * 3600, disk_path: Optional[str] = None):
+        """
+        Initialize cache
+        
+        Args:
+            capacity: Results kept in memory
+            ttl_seconds: Maximum age of a result (memory and disk)
+            disk_path: SQLite file for the disk tier (None for memory only)
+        """
+        self.capacity = capacity
+        self.ttl_seconds = ttl_seconds
+        self.disk_path = disk_path
+        self.entries: "OrderedDict[str, Tuple[float, VoiceInput]]" = OrderedDict()
+        self.stats = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0,
+                      "evictions": 0, "expired": 0}
+        self._lock = threading.Lock()
+        self._db = None
+        if disk_path:
+            os.makedirs(os.path.dirname(os.path.abspath(disk_path)), exist_ok=True)
+            self._db = sqlite3.connect(disk_path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS transcriptions (key TEXT PRIMARY KEY, created_at REAL, payload TEXT)"
+            )
+    
+    def _from_disk(self, key: str, now: float) -> Optional[Tuple[float, VoiceInput]]:
+        row = self._db.execute("SELECT created_at, payload FROM transcriptions WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if now - row[0] > self.ttl_seconds:
+            self._db.execute("DELETE FROM transcriptions WHERE key = ?", (key,))
+            self.stats["expired"] += 1
+            return None
+        return row[0], VoiceInput.model_validate_json(row[1])
+    
+    def _remember(self, key: str, stored_at: float, result: VoiceInput):
+        """Insert into the memory tier; caller holds the lock"""
+        self.entries[key] = (stored_at, result)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.stats["evictions"] += 1
+    
+    def get(self, key: str) -> Optional[VoiceInput]:
+        """Cached transcription (a copy), or None on a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None and now - entry[0] > self.ttl_seconds:
+                del self.entries[key]
+                self.stats["expired"] += 1
+                entry = None
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.stats["memory_hits"] += 1
+            elif self._db is not None:
+                entry = self._from_disk(key, now)
+                if entry is not None:
+                    self._remember(key, *entry)
+                    self.stats["disk_hits"] += 1
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            return entry[1].model_copy(deep=True)
+    
+    def put(self, key: str, result: VoiceInput):
+        """Store a transcription"""
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, result.model_copy(deep=True))
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO transcriptions (key, created_at, payload) VALUES (?, ?, ?)",
+                    (key, now, result.model_dump_json())
+                )
+            self.stats["stores"] += 1
+    
+    def purge_expired(self) -> int:
+        """Delete expired results from the disk tier"""
+        if self._db is None:
+            return 0
+        with self._lock:
+            cursor = self._db.execute("DELETE FROM transcriptions WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            return cursor.rowcount
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["size"] = len(self.entries)
+            if self._db is not None:
+                stats["disk_size"] = self._db.execute("SELECT COUNT(*) FROM transcriptions").fetchone()[0]
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+    
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+def load_default_transcription_cache() -> Optional[TranscriptionCache]:
+    """Transcription cache configured from the environment, or None if disabled"""
+    if os.getenv("TRANSCRIPTION_CACHE", "true").lower() != "true":
+        return None
+    cache = TranscriptionCache(
+        capacity=int(os.getenv("TRANSCRIPTION_CACHE_SIZE", "256")),
+        ttl_seconds=float(os.getenv("TRANSCRIPTION_CACHE_TTL", str(24 * 3600))),
+        disk_path=os.getenv("TRANSCRIPTION_CACHE_PATH") or None
+    )
+    cache.purge_expired()
+    return cache
@@ -0,0 +1,81 @@
+"""
+Triage job handlers for the Arovia job queue
+Text and voice triage as background jobs, recording partial results
+(transcript, triage before facilities) as each stage completes
+"""
+import time
+from typing import Optional, Dict, Any, Callable
+
+from utils.audio_decoder import decode_audio
+from utils.job_queue import JobHandler
+
+
+# Stores a finished triage: (triage_result, input_text, started_at, **record fields) -> record id or None
+RecordSaver = Callable[..., Optional[str]]
+
+
+def build_job_handlers(triage_agent, whisper_client=None, save_record: Optional[RecordSaver] = None) -> Dict[str, JobHandler]:
+    """
+    Job handlers by kind ("triage_text", and "triage_voice" when a Whisper client is given)
+    
+    Args:
+        triage_agent: AroviaTriageAgent
+        whisper_client: WhisperClient for voice jobs
+        save_record: Persists finished triages (see RecordSaver)
+    """
+    def save(triage_result, input_text: str, started_at: float, **kwargs) -> Optional[str]:
+        return save_record(triage_result, input_text, started_at, **kwargs) if save_record else None
+    
+    def triage_text(job: Dict[str, Any], progress) -> Dict[str, Any]:
+        payload = job["payload"]
+        started_at = time.perf_counter()
+        progress("triage")
+        triage_result, _ = triage_agent.analyze_symptoms_from_text(payload["symptoms"])
+        if not payload.get("location"):
+            record_id = save(triage_result, payload["symptoms"], started_at, patient_id=payload.get("patient_id"))
+            return {"triage_result": triage_result, "record_id": record_id}
+        
+        # Clients can show the assessment while facilities are still being searched
+        progress("facilities", {"triage_result": triage_result})
+        coordinates = payload.get("coordinates")  # [lat, lon] after the JSON round trip
+        referral_note = triage_agent.generate_referral_note(
+            triage_result, payload["location"], payload.get("patient_id"), tuple(coordinates) if coordinates else None
+        )
+        record_id = save(
+            triage_result, payload["symptoms"], started_at, patient_id=payload.get("patient_id"),
+            location=payload["location"], referral_note=referral_note
+        )
+        return {
+            "triage_result": triage_result,
+            "recommended_facilities": referral_note.recommended_facilities,
+            "record_id": record_id
+        }
+    
+    def triage_voice(job: Dict[str, Any], progress) -> Dict[str, Any]:
+        payload = job["payload"]
+        started_at = time.perf_counter()
+        progress("transcription")
+        voice_result = whisper_client.transcribe_audio(
+            decode_audio(job["audio"]),
+            language=payload.get("language"),
+            session_id=payload.get("session_id")
+        )
+        if not voice_result.transcribed_text.strip():
+            raise ValueError("No speech detected in audio")
+        voice = {
+            "transcribed_text": voice_result.transcribed_text,
+            "language": voice_result.language,
+            "confidence": voice_result.confidence,
+            "processing_time": voice_result.processing_time,
+            "language_probabilities": voice_result.language_probabilities
+        }
+        
+        progress("triage", {"voice_result": voice})
+        triage_result, _ = triage_agent.analyze_symptoms_from_text(voice_result.transcribed_text)
+        record_id = save(triage_result, voice_result.transcribed_text, started_at, source="voice")
+        return {"voice_result": voice, "triage_result": triage_result, "record_id": record_id}
+    
+    handlers = {"triage_text": triage_text}
+    if whisper_client is not None:
+        handlers["triage_voice"] = triage_voice
+    return handlers
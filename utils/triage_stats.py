@@ -0,0 +1,227 @@
+"""
+Incremental triage statistics for live dashboards
+Completed triages are folded into per-minute and per-hour rollups as they
+happen, so reading the current load, urgency mix and latency is cheap
+"""
+import math
+import time
+import threading
+from collections import Counter, deque
+from typing import Optional, Dict, Any, List
+
+
+class LogHistogram:
+    """
+    Fixed log-spaced histogram for latency quantiles.
+    
+    Bucket boundaries grow by `growth` per bucket, so any quantile is known
+    to within that relative error; histograms can be added and subtracted,
+    which is what lets sliding windows expire old observations.
+    """
+    
+    def __init__(self, min_value: float = 0.001, max_value: float = 600.0, growth: float = 1.05):
+        self.min_value = min_value
+        self.growth = growth
+        self._log_growth = math.log(growth)
+        self.size = int(math.ceil(math.log(max_value / min_value) / self._log_growth)) + 2
+        self.counts = [0] * self.size
+        self.total = 0
+        self.sum = 0.0
+    
+    def _index(self, value: float) -> int:
+        if value <= self.min_value:
+            return 0
+        return min(self.size - 1, 1 + int(math.log(value / self.min_value) / self._log_growth))
+    
+    def _upper_bound(self, index: int) -> float:
+        return self.min_value * self.growth ** index
+    
+    def add(self, value: float, count: int = 1):
+        self.counts[self._index(value)] += count
+        self.total += count
+        self.sum += value * count
+    
+    def merge(self, other: "LogHistogram", sign: int = 1):
+        """Add (sign=1) or remove (sign=-1) another histogram's observations"""
+        for i, count in enumerate(other.counts):
+            if count:
+                self.counts[i] += sign * count
+        self.total += sign * other.total
+        self.sum += sign * other.sum
+    
+    def quantiles(self, qs: List[float]) -> Dict[float, float]:
+        """Approximate quantiles (bucket upper bounds) in a single pass"""
+        result = {q: 0.0 for q in qs}
+        if self.total <= 0:
+            return result
+        targets = sorted((max(1, math.ceil(q * self.total)), q) for q in qs)
+        cumulative, t = 0, 0
+        for i, count in enumerate(self.counts):
+            cumulative += count
+            while t < len(targets) and cumulative >= targets[t][0]:
+                result[targets[t][1]] = self._upper_bound(i)
+                t += 1
+            if t == len(targets):
+                break
+        return result
+
+
+class _Rollup:
+    """Counts for one time slot"""
+    
+    def __init__(self, start: float):
+        self.start = start
+        self.count = 0
+        self.emergencies = 0
+        self.urgency_sum = 0
+        self.categories = Counter()
+        self.specialties = Counter()
+        self.sources = Counter()
+        self.latency = LogHistogram()
+
+
+class TriageStatsAggregator:
+    """
+    Sliding-window triage aggregates.
+    
+    Each completed triage updates the current minute slot and the window
+    totals in O(1); slots that fall out of the window are subtracted from
+    the totals as the clock advances. A 24-hour per-hour series is kept
+    alongside. Snapshots are cached per second, so frequent polling costs
+    a dictionary lookup.
+    """
+    
+    QUANTILES = [0.5, 0.9, 0.95, 0.99]
+    
+    def __init__(self, window_seconds: int = 3600, slot_seconds: int = 60, clock=time.time):
+        """
+        Initialize aggregator
+        
+        Args:
+            window_seconds: Length of the sliding window
+            slot_seconds: Granularity at which old observations expire
+            clock: Time source (seconds since the epoch)
+        """
+        self.window_seconds = window_seconds
+        self.slot_seconds = slot_seconds
+        self.clock = clock
+        self.slots: "deque[_Rollup]" = deque()
+        self.window = _Rollup(0.0)
+        self.hourly: "deque[List[float]]" = deque()  # [hour_start, count, emergencies]
+        self.lifetime = {"count": 0, "emergencies": 0}
+        self.started_at = clock()
+        self._lock = threading.Lock()
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._snapshot_second = None
+    
+    def record(
+        self,
+        triage_category: str,
+        recommended_specialty: str,
+        emergency_detected: bool,
+        urgency_score: int,
+        latency_seconds: float,
+        source: str = "text"
+    ):
+        """
+        Fold one completed triage into the aggregates
+        
+        Args:
+            triage_category: immediate, urgent or standard
+            recommended_specialty: Recommended specialty
+            emergency_detected: Whether an emergency was detected
+            urgency_score: Urgency score (1-10)
+            latency_seconds: End-to-end handling time
+            source: Input channel ("text", "voice", ...)
+        """
+        now = self.clock()
+        with self._lock:
+            self._advance(now)
+            slot_start = now - now % self.slot_seconds
+            if not self.slots or self.slots[-1].start != slot_start:
+                self.slots.append(_Rollup(slot_start))
+            hour_start = now - now % 3600
+            if not self.hourly or self.hourly[-1][0] != hour_start:
+                self.hourly.append([hour_start, 0, 0])
+            
+            for rollup in (self.slots[-1], self.window):
+                rollup.count += 1
+                rollup.emergencies += int(emergency_detected)
+                rollup.urgency_sum += urgency_score
+                rollup.categories[triage_category] += 1
+                rollup.specialties[recommended_specialty] += 1
+                rollup.sources[source] += 1
+                rollup.latency.add(latency_seconds)
+            self.hourly[-1][1] += 1
+            self.hourly[-1][2] += int(emergency_detected)
+            self.lifetime["count"] += 1
+            self.lifetime["emergencies"] += int(emergency_detected)
+            self._snapshot = None
+    
+    def record_result(self, triage_result, latency_seconds: float, source: str = "text"):
+        """Record a TriageResult model"""
+        self.record(
+            triage_result.triage_category,
+            triage_result.recommended_specialty,
+            triage_result.emergency_detected,
+            triage_result.urgency_score,
+            latency_seconds,
+            source
+        )
+    
+    def _advance(self, now: float):
+        """Expire slots that have left the window; caller holds the lock"""
+        cutoff = now - self.window_seconds
+        while self.slots and self.slots[0].start + self.slot_seconds <= cutoff:
+            old = self.slots.popleft()
+            self.window.count -= old.count
+            self.window.emergencies -= old.emergencies
+            self.window.urgency_sum -= old.urgency_sum
+            # In-place Counter difference drops keys that reach zero, so
+            # categories seen once do not accumulate forever
+            self.window.categories -= old.categories
+            self.window.specialties -= old.specialties
+            self.window.sources -= old.sources
+            self.window.latency.merge(old.latency, sign=-1)
+            self._snapshot = None
+        while self.hourly and self.hourly[0][0] <= now - 24 * 3600:
+            self.hourly.popleft()
+            self._snapshot = None
+    
+    def get_snapshot(self) -> Dict[str, Any]:
+        """Current aggregates; rebuilt at most once per second or on new data"""
+        now = self.clock()
+        second = int(now)
+        with self._lock:
+            if self._snapshot is not None and self._snapshot_second == second:
+                return self._snapshot
+            self._advance(now)
+            window = self.window
+            quantiles = window.latency.quantiles(self.QUANTILES)
+            recent = sum(slot.count for slot in self.slots if slot.start >= now - 5 * 60)
+            self._snapshot = {
+                "generated_at": now,
+                "window_seconds": self.window_seconds,
+                "window": {
+                    "count": window.count,
+                    "emergencies": window.emergencies,
+                    "emergency_rate": window.emergencies / window.count if window.count else 0.0,
+                    "avg_urgency": window.urgency_sum / window.count if window.count else 0.0,
+                    "per_minute_last_5m": recent / 5.0,
+                    "by_category": {k: v for k, v in window.categories.items() if v > 0},
+                    "by_specialty": {k: v for k, v in window.specialties.most_common() if v > 0},
+                    "by_source": {k: v for k, v in window.sources.items() if v > 0},
+                    "latency": {
+                        "avg": window.latency.sum / window.latency.total if window.latency.total else 0.0,
+                        **{f"p{int(q * 100)}": value for q, value in quantiles.items()}
+                    }
+                },
+                "hourly": [
+                    {"hour": hour_start, "count": count, "emergencies": emergencies}
+                    for hour_start, count, emergencies in self.hourly
+                ],
+                "lifetime": dict(self.lifetime),
+                "uptime_seconds": now - self.started_at
+            }
+            self._snapshot_second = second
+            return self._snapshot
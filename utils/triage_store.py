@@ -0,0 +1,518 @@
+"""
+Persistent triage record store for Arovia
+Append-only SQLite (WAL) storage for triage results and referral notes, with
+a background batch writer, indexed paginated queries and bulk export
+"""
+import os
+import io
+import csv
+import json
+import time
+import uuid
+import queue
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Iterator, Tuple
+from models.schemas import ReferralNote, TriageResult, FacilityInfo
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    pa = None
+    pq = None
+    PYARROW_AVAILABLE = False
+
+
+# Flat columns stored alongside the JSON payload; these are what queries filter on
+RECORD_COLUMNS = [
+    "record_id", "created_at", "patient_id", "source", "input_text", "chief_complaint",
+    "urgency_score", "triage_category", "recommended_specialty", "emergency_detected",
+    "location"
+]
+
+EXPORT_COLUMNS = RECORD_COLUMNS + ["payload"]
+
+# Columns that identify or quote the patient; exports leave them out unless asked
+IDENTIFYING_COLUMNS = ["patient_id", "input_text"]
+
+
+def export_columns(include_payload: bool = False, include_identifiers: bool = False) -> List[str]:
+    """Columns written by the bulk exports"""
+    columns = EXPORT_COLUMNS if include_payload else RECORD_COLUMNS
+    if include_identifiers:
+        return list(columns)
+    return [column for column in columns if column not in IDENTIFYING_COLUMNS]
+
+FILTER_CLAUSES = {
+    "start": "created_at >= ?",
+    "end": "created_at < ?",
+    "min_urgency": "urgency_score >= ?",
+    "category": "triage_category = ?",
+    "specialty": "recommended_specialty = ?",
+    "patient_id": "patient_id = ?",
+    "emergency": "emergency_detected = ?"
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS triage_records (
+    record_id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    patient_id TEXT,
+    source TEXT,
+    input_text TEXT,
+    chief_complaint TEXT,
+    urgency_score INTEGER,
+    triage_category TEXT,
+    recommended_specialty TEXT,
+    emergency_detected INTEGER,
+    location TEXT,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_triage_created_at ON triage_records (created_at);
+CREATE INDEX IF NOT EXISTS idx_triage_urgency ON triage_records (urgency_score, created_at);
+CREATE INDEX IF NOT EXISTS idx_triage_category ON triage_records (triage_category, created_at);
+CREATE INDEX IF NOT EXISTS idx_triage_specialty ON triage_records (recommended_specialty, created_at);
+CREATE INDEX IF NOT EXISTS idx_triage_patient ON triage_records (patient_id, created_at);
+"""
+
+
+def new_record_id() -> str:
+    """Time-ordered unique record identifier"""
+    return f"{int(time.time() * 1000):013x}{uuid.uuid4().hex[:12]}"
+
+
+def build_record(
+    triage_result,
+    input_text: str,
+    source: str = "text",
+    patient_id: Optional[str] = None,
+    location: Optional[str] = None,
+    referral_note=None,
+    record_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Flatten a TriageResult (and optional ReferralNote) into a store record
+    
+    Args:
+        triage_result: TriageResult model
+        input_text: Patient input the triage was made from
+        source: Input channel ("text", "voice", ...)
+        patient_id: Optional patient identifier
+        location: Optional user location
+        referral_note: Optional ReferralNote with facility recommendations
+        record_id: Identifier to use (generated if None)
+    
+    Returns:
+        Record dictionary with RECORD_COLUMNS and a JSON payload
+    """
+    payload = {"triage_result": json.loads(triage_result.model_dump_json())}
+    if referral_note is not None:
+        payload["recommended_facilities"] = [
+            json.loads(facility.model_dump_json()) for facility in referral_note.recommended_facilities
+        ]
+        patient_id = patient_id or referral_note.patient_id
+    return {
+        "record_id": record_id or new_record_id(),
+        "created_at": triage_result.timestamp.timestamp(),
+        "patient_id": patient_id,
+        "source": source,
+        "input_text": input_text,
+        "chief_complaint": triage_result.chief_complaint,
+        "urgency_score": triage_result.urgency_score,
+        "triage_category": triage_result.triage_category,
+        "recommended_specialty": triage_result.recommended_specialty,
+        "emergency_detected": int(triage_result.emergency_detected),
+        "location": location,
+        "payload": json.dumps(payload, ensure_ascii=False)
+    }
+
+
+def record_to_referral_note(record: Dict[str, Any]) -> ReferralNote:
+    """
+    Rebuild a ReferralNote from a stored record
+    
+    Args:
+        record: Record as returned by `TriageStore.get` or `query`
+    
+    Returns:
+        Referral note (without facilities if none were stored)
+    """
+    payload = record["payload"]
+    if isinstance(payload, str):
+        payload = json.loads(payload)
+    return ReferralNote(
+        patient_id=record.get("patient_id"),
+        triage_result=TriageResult.model_validate(payload["triage_result"]),
+        recommended_facilities=[FacilityInfo.model_validate(f) for f in payload.get("recommended_facilities", [])],
+        generated_at=datetime.fromtimestamp(record["created_at"])
+    )
+
+
+def _where(filters: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    clauses, params = [], []
+    for name, value in filters.items():
+        if value is None:
+            continue
+        if name not in FILTER_CLAUSES:
+            raise ValueError(f"Unknown filter: {name}")
+        if isinstance(value, datetime):
+            value = value.timestamp()
+        if isinstance(value, bool):
+            value = int(value)
+        clauses.append(FILTER_CLAUSES[name])
+        params.append(value)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+class TriageStore:
+    """
+    Storage interface for triage records.
+    
+    Backends implement `write_many`, `query`, `count`, `get` and `iter_records`;
+    records are dictionaries with RECORD_COLUMNS plus a JSON `payload`.
+    """
+    
+    def write_many(self, records: List[Dict[str, Any]]):
+        raise NotImplementedError
+    
+    def query(self, filters: Dict[str, Any], limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+    
+    def count(self, filters: Dict[str, Any]) -> int:
+        raise NotImplementedError
+    
+    def get(self, record_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+    
+    def iter_records(self, filters: Dict[str, Any], batch_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        raise NotImplementedError
+    
+    def close(self):
+        pass
+
+
+class SQLiteTriageStore(TriageStore):
+    """
+    SQLite backend in WAL mode.
+    
+    Every thread gets its own connection, so exports and dashboard queries
+    read a consistent snapshot while the batch writer keeps appending.
+    """
+    
+    def __init__(self, path: str = "triage_records.db"):
+        """
+        Initialize store
+        
+        Args:
+            path: Database file path
+        """
+        self.path = path
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+        conn.commit()
+    
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+    
+    def write_many(self, records: List[Dict[str, Any]]):
+        """Insert records in a single transaction"""
+        if not records:
+            return
+        conn = self._connection()
+        placeholders = ", ".join("?" for _ in EXPORT_COLUMNS)
+        with conn:
+            conn.executemany(
+                f"INSERT OR IGNORE INTO triage_records ({', '.join(EXPORT_COLUMNS)}) VALUES ({placeholders})",
+                [tuple(record.get(column) for column in EXPORT_COLUMNS) for record in records]
+            )
+    
+    def query(self, filters: Dict[str, Any], limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+        """Newest-first page of records matching the filters"""
+        where, params = _where(filters)
+        rows = self._connection().execute(
+            f"SELECT * FROM triage_records{where} ORDER BY created_at DESC, record_id DESC LIMIT ? OFFSET ?",
+            params + [limit, offset]
+        ).fetchall()
+        return [dict(row) for row in rows]
+    
+    def count(self, filters: Dict[str, Any]) -> int:
+        where, params = _where(filters)
+        return self._connection().execute(f"SELECT COUNT(*) FROM triage_records{where}", params).fetchone()[0]
+    
+    def get(self, record_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            "SELECT * FROM triage_records WHERE record_id = ?", (record_id,)
+        ).fetchone()
+        return dict(row) if row else None
+    
+    def iter_records(self, filters: Dict[str, Any], batch_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """Oldest-first batches of matching records, read with a cursor"""
+        where, params = _where(filters)
+        cursor = self._connection().execute(
+            f"SELECT * FROM triage_records{where} ORDER BY created_at, record_id", params
+        )
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield [dict(row) for row in rows]
+    
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+
+class BatchWriter:
+    """
+    Buffers records and writes them to the store from a background thread,
+    so persisting a triage never adds a database commit to the request path
+    """
+    
+    def __init__(self, store: TriageStore, batch_size: int = 100, flush_interval: float = 1.0):
+        """
+        Initialize writer
+        
+        Args:
+            store: Destination store
+            batch_size: Maximum records per transaction
+            flush_interval: Maximum seconds a record waits before being written
+        """
+        self.store = store
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue" = queue.Queue()
+        self.stats = {"submitted": 0, "written": 0, "batches": 0, "errors": 0}
+        self._thread = threading.Thread(target=self._run, name="triage-store-writer", daemon=True)
+        self._thread.start()
+    
+    def submit(self, record: Dict[str, Any]) -> str:
+        """Queue a record for writing and return its record_id"""
+        self.stats["submitted"] += 1
+        self._queue.put(record)
+        return record["record_id"]
+    
+    def flush(self, timeout: float = 10.0):
+        """Block until every record submitted so far is written"""
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+    
+    def close(self):
+        """Write pending records and stop the writer thread"""
+        self._queue.put(None)
+        self._thread.join(timeout=10)
+    
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch, markers, stop = [], [], False
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    markers.append(item)
+                else:
+                    batch.append(item)
+                if stop or markers or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            
+            if batch:
+                try:
+                    self.store.write_many(batch)
+                    self.stats["written"] += len(batch)
+                    self.stats["batches"] += 1
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    print(f"Error writing triage records: {e}")
+            for marker in markers:
+                marker.set()
+            if stop:
+                return
+    
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats["pending"] = self._queue.qsize()
+        return stats
+
+
+def export_csv(
+    store: TriageStore,
+    filters: Dict[str, Any],
+    include_payload: bool = False,
+    include_identifiers: bool = False
+) -> Iterator[str]:
+    """
+    Stream matching records as CSV text chunks (one chunk per batch)
+    
+    Args:
+        store: Source store
+        filters: Query filters
+        include_payload: Include the full JSON payload column
+        include_identifiers: Include the patient_id and input_text columns
+    """
+    columns = export_columns(include_payload, include_identifiers)
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    for batch in store.iter_records(filters):
+        for record in batch:
+            record["created_at"] = datetime.fromtimestamp(record["created_at"]).isoformat()
+            writer.writerow(record)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+class _ChunkSink:
+    """Write-only file object whose written bytes are taken in chunks as they arrive"""
+    
+    closed = False
+    
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+    
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+    
+    def tell(self) -> int:
+        return self.position
+    
+    def flush(self):
+        pass
+    
+    def close(self):
+        self.closed = True
+    
+    def take(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _parquet_schema(columns: List[str]):
+    schema = pa.schema([
+        ("record_id", pa.string()),
+        ("created_at", pa.timestamp("ms")),
+        ("patient_id", pa.string()),
+        ("source", pa.string()),
+        ("input_text", pa.string()),
+        ("chief_complaint", pa.string()),
+        ("urgency_score", pa.int8()),
+        ("triage_category", pa.string()),
+        ("recommended_specialty", pa.string()),
+        ("emergency_detected", pa.bool_()),
+        ("location", pa.string()),
+        ("payload", pa.string())
+    ])
+    return pa.schema([schema.field(column) for column in columns])
+
+
+def _parquet_batch(batch: List[Dict[str, Any]], columns: List[str], schema):
+    data = {column: [record[column] for record in batch] for column in columns}
+    data["created_at"] = [datetime.fromtimestamp(value) for value in data["created_at"]]
+    data["emergency_detected"] = [bool(value) for value in data["emergency_detected"]]
+    return pa.RecordBatch.from_pydict(data, schema=schema)
+
+
+def export_parquet(
+    store: TriageStore,
+    filters: Dict[str, Any],
+    sink,
+    include_payload: bool = False,
+    include_identifiers: bool = False
+) -> int:
+    """
+    Write matching records to a Parquet file, one row group per batch
+    
+    Args:
+        store: Source store
+        filters: Query filters
+        sink: File path or writable binary file object
+        include_payload: Include the full JSON payload column
+        include_identifiers: Include the patient_id and input_text columns
+    
+    Returns:
+        Number of records written
+    """
+    if not PYARROW_AVAILABLE:
+        raise ImportError("Parquet export requires pyarrow (pip install pyarrow)")
+    
+    columns = export_columns(include_payload, include_identifiers)
+    schema = _parquet_schema(columns)
+    written = 0
+    with pq.ParquetWriter(sink, schema) as writer:
+        for batch in store.iter_records(filters, batch_size=10000):
+            writer.write_batch(_parquet_batch(batch, columns, schema))
+            written += len(batch)
+    return written
+
+
+def stream_parquet(
+    store: TriageStore,
+    filters: Dict[str, Any],
+    include_payload: bool = False,
+    include_identifiers: bool = False
+) -> Iterator[bytes]:
+    """
+    Stream matching records as Parquet file chunks (one row group per batch)
+    
+    Only one batch is held in memory; the file footer is the last chunk.
+    
+    Args:
+        store: Source store
+        filters: Query filters
+        include_payload: Include the full JSON payload column
+        include_identifiers: Include the patient_id and input_text columns
+    """
+    if not PYARROW_AVAILABLE:
+        raise ImportError("Parquet export requires pyarrow (pip install pyarrow)")
+    
+    columns = export_columns(include_payload, include_identifiers)
+    schema = _parquet_schema(columns)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for batch in store.iter_records(filters, batch_size=10000):
+            writer.write_batch(_parquet_batch(batch, columns, schema))
+            chunk = sink.take()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    yield sink.take()
+
+
+def load_default_store() -> Optional[TriageStore]:
+    """SQLite store at TRIAGE_STORE_PATH, or None if TRIAGE_STORE is disabled"""
+    if os.getenv("TRIAGE_STORE", "true").lower() != "true":
+        return None
+    return SQLiteTriageStore(os.getenv("TRIAGE_STORE_PATH", "triage_records.db"))
@@ -3,20 +3,32 @@ Whisper-Large integration for speech-to-text with 22 Indic languages support
 """
 try:
     import whisper
+    import torch
     WHISPER_AVAILABLE = True
 except ImportError as e:
     print(f"Warning: Whisper not available: {e}")
     WHISPER_AVAILABLE = False
     whisper = None
+    torch = None
 
 import sounddevice as sd
 import numpy as np
 import tempfile
 import os
-from typing import Optional, Dict, Any
-from models.schemas import VoiceInput
+import queue
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, Union, List
+from models.schemas import VoiceInput, TranscriptSegment
+from utils.audio_decoder import decode_audio, WHISPER_SAMPLE_RATE
+from utils.long_audio import LongAudioTranscriber, confidence_from_logprob
+from utils.language_id import LanguageChoice, LanguageIdentifier
+from utils.transcription_cache import load_default_transcription_cache, transcription_key
+from utils.singleflight import SingleFlight
 import time
 
+# audio_file_path reported for transcriptions of in-memory audio
+IN_MEMORY_AUDIO = "<in-memory>"
+
 
 class WhisperClient:
     """Whisper-Large client for multilingual speech recognition"""
@@ -47,31 +59,115 @@ class WhisperClient:
         "santali": "sat"
     }
     #def __init__(self, model_size: str = "small"):
-    def __init__(self, model_size: str = "large-v3"):
+    def __init__(self, model_size: str = "large-v3", replicas: Optional[int] = None, batch_size: Optional[int] = None):
         """
         Initialize Whisper client
         
         Args:
             model_size: Whisper model size (tiny, base, small, medium, large, large-v2, large-v3)
+            replicas: Model copies decoding concurrently (default WHISPER_REPLICAS or 1)
+            batch_size: Segments per batched decode in long-audio mode (default WHISPER_BATCH_SIZE or 8)
         """
         self.model_size = model_size
+        self.replicas = max(1, replicas or int(os.getenv("WHISPER_REPLICAS", "1")))
+        self.long_audio_seconds = float(os.getenv("WHISPER_LONG_AUDIO_SECONDS", "30"))
         self.model = None
+        self._models: "queue.Queue" = queue.Queue()
         self._load_model()
+        self.long_audio = LongAudioTranscriber(
+            self._decode_batch,
+            workers=self._models.qsize(),
+            batch_size=batch_size or int(os.getenv("WHISPER_BATCH_SIZE", "8"))
+        )
+        self.language_id = LanguageIdentifier(
+            self._detect_language,
+            seconds=float(os.getenv("WHISPER_LID_SECONDS", "3")),
+            min_confidence=float(os.getenv("WHISPER_LID_MIN_CONFIDENCE", "0.5"))
+        )
+        self.transcription_cache = load_default_transcription_cache()
+        self._transcription_flight = SingleFlight("transcription")
     
     def _load_model(self):
-        """Load Whisper model"""
+        """Load Whisper model (one copy per replica)"""
         if not WHISPER_AVAILABLE:
             print("Warning: Whisper is not available. Voice input will be disabled.")
             self.model = None
             return
-            
+        
         try:
-            print(f"Loading Whisper {self.model_size} model...")
-            self.model = whisper.load_model(self.model_size)
+            print(f"Loading Whisper {self.model_size} model ({self.replicas} replica(s))...")
+            for _ in range(self.replicas):
+                model = whisper.load_model(self.model_size)
+                self._models.put(model)
+                self.model = self.model or model
             print("Whisper model loaded successfully!")
         except Exception as e:
             print(f"Error loading Whisper model: {e}")
-            self.model = None
+            if self.model is None:
+                self._models = queue.Queue()
+    
+    @contextmanager
+    def _checkout(self):
+        """Borrow a model replica; a Whisper model must not decode two requests at once"""
+        model = self._models.get()
+        try:
+            yield model
+        finally:
+            self._models.put(model)
+    
+    def _detect_language(self, audio: np.ndarray) -> Dict[str, float]:
+        """Language probabilities from one encoder pass and a single decoder step"""
+        with self._checkout() as model:
+            mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(torch.from_numpy(audio)), n_mels=model.dims.n_mels)
+            _, probabilities = model.detect_language(mel.to(model.device))
+            return probabilities
+    
+    def _decode_batch(self, segments: List[np.ndarray], language: Optional[str], initial_prompt: Optional[str]) -> List[Dict[str, Any]]:
+        """
+        Decode up-to-30 s segments in one batched forward pass on a replica
+        
+        Segments whose batched greedy decode looks degenerate (repetitive or
+        very unlikely text) are re-transcribed alone with Whisper's temperature
+        fallback.
+        """
+        with self._checkout() as model:
+            mel = torch.stack([
+                whisper.log_mel_spectrogram(whisper.pad_or_trim(torch.from_numpy(segment)), n_mels=model.dims.n_mels)
+                for segment in segments
+            ]).to(model.device)
+            options = whisper.DecodingOptions(
+                language=language,
+                prompt=initial_prompt,
+                without_timestamps=True,
+                fp16=model.device.type == "cuda"
+            )
+            decoded = whisper.decode(model, mel, options)
+            
+            results = []
+            for segment, result in zip(segments, decoded):
+                degenerate = result.compression_ratio > 2.4 or result.avg_logprob < -1.0
+                if degenerate and result.no_speech_prob <= 0.6:
+                    retry = model.transcribe(
+                        segment,
+                        language=language or result.language,
+                        initial_prompt=initial_prompt,
+                        condition_on_previous_text=False
+                    )
+                    logprobs = [seg.get("avg_logprob", 0.0) for seg in retry.get("segments", [])]
+                    results.append({
+                        "text": retry["text"],
+                        "avg_logprob": float(np.mean(logprobs)) if logprobs else result.avg_logprob,
+                        "no_speech_prob": result.no_speech_prob,
+                        "language": retry.get("language", result.language)
+                    })
+                else:
+                    results.append({
+                        "text": result.text,
+                        "avg_logprob": result.avg_logprob,
+                        "no_speech_prob": result.no_speech_prob,
+                        "language": result.language
+                    })
+            return results
     
     def record_audio(self, duration: float = 10.0, sample_rate: int = 16000) -> str:
         """
@@ -80,7 +176,7 @@ class WhisperClient:
         Args:
             duration: Recording duration in seconds
             sample_rate: Audio sample rate
-            
+        
         Returns:
             Path to recorded audio file
         """
@@ -111,34 +207,47 @@ class WhisperClient:
             sf.write(temp_file.name, audio_np, sample_rate)
             
             return temp_file.name
-            
+        
         except Exception as e:
             print(f"Error recording audio: {e}")
             raise
     
     def transcribe_audio(
         self, 
-        audio_file_path: str, 
+        audio_file_path: Union[str, np.ndarray], 
         language: Optional[str] = None,
-        initial_prompt: Optional[str] = None
+        initial_prompt: Optional[str] = None,
+        word_timestamps: bool = False,
+        long_audio: Optional[bool] = None,
+        session_id: Optional[str] = None
     ) -> VoiceInput:
         """
         Transcribe audio file to text
         
+        Recordings longer than WHISPER_LONG_AUDIO_SECONDS are split at
+        silences and decoded in batches across the model replicas. Results
+        are cached by audio fingerprint, model, and the language and prompt
+        chosen for the clip, so a re-uploaded clip is not decoded again.
+        
         Args:
-            audio_file_path: Path to audio file
+            audio_file_path: Path to audio file, or 16 kHz mono float32 samples
             language: Language code (e.g., 'hi' for Hindi, 'en' for English)
             initial_prompt: Optional prompt to guide transcription
-            
+            word_timestamps: Align word timestamps (slower; always a single serial pass)
+            long_audio: Force (True) or disable (False) segmented decoding
+            session_id: Session whose identified language is reused when language is None
+        
         Returns:
             VoiceInput object with transcription results
         """
         start_time = time.time()
+        in_memory = isinstance(audio_file_path, np.ndarray)
+        source = IN_MEMORY_AUDIO if in_memory else audio_file_path
         
         if not WHISPER_AVAILABLE or self.model is None:
             # Return a mock result when whisper is not available
             return VoiceInput(
-                audio_file_path=audio_file_path,
+                audio_file_path=source,
                 transcribed_text="[Voice input not available - Whisper not installed]",
                 language=language or "en",
                 confidence=0.0,
@@ -146,42 +255,111 @@ class WhisperClient:
             )
         
         try:
-            if not os.path.exists(audio_file_path):
+            if in_memory:
+                audio = audio_file_path.astype(np.float32, copy=False)
+            elif not os.path.exists(audio_file_path):
                 raise FileNotFoundError(f"Audio file not found: {audio_file_path}")
+            else:
+                with open(audio_file_path, "rb") as f:
+                    audio = decode_audio(f.read(), WHISPER_SAMPLE_RATE)
             
-            # Transcribe with Whisper
-            result = self.model.transcribe(
-                audio_file_path,
-                language=language,
-                initial_prompt=initial_prompt,
-                word_timestamps=True
-            )
+            # Pick the decoding language and prompt before decoding, instead of Whisper's 30 s autodetect.
+            # This also runs on cache hits, so the session still learns the language.
+            choice = self.language_id.choose(audio, language=language, session_id=session_id)
+            initial_prompt = initial_prompt or choice.prompt
             
-            processing_time = time.time() - start_time
+            if self.transcription_cache is None:
+                result = self._transcribe(audio, choice, initial_prompt, word_timestamps, long_audio)
+            else:
+                # Kiosks retry uploads: serve a clip we already transcribed, and let concurrent duplicates share one decode
+                key = transcription_key(audio, self.model_size, choice.language, initial_prompt, word_timestamps)
+                result = self.transcription_cache.get(key)
+                if result is None:
+                    result = self._transcription_flight.do(
+                        key, self._transcribe, audio, choice, initial_prompt, word_timestamps, long_audio
+                    )
+                    self.transcription_cache.put(key, result)
+            result.audio_file_path = source
+            result.processing_time = time.time() - start_time
+            return result
+        
+        except Exception as e:
+            print(f"Error transcribing audio: {e}")
+            raise
+    
+    def _transcribe(
+        self,
+        audio: np.ndarray,
+        choice: LanguageChoice,
+        initial_prompt: Optional[str],
+        word_timestamps: bool,
+        long_audio: Optional[bool]
+    ) -> VoiceInput:
+        """Decode 16 kHz samples in the chosen language (the uncached path of transcribe_audio)"""
+        start_time = time.time()
+        language = choice.language
+        
+        if long_audio is None:
+            long_audio = audio.size / WHISPER_SAMPLE_RATE > self.long_audio_seconds
+        
+        if long_audio and not word_timestamps:
+            # Segment at silences and decode the segments in parallel
+            result = self.long_audio.transcribe(audio, language=language, initial_prompt=initial_prompt)
+            detected_language = result["language"] or language or "unknown"
+            avg_confidence = result["confidence"]
+            segments = [TranscriptSegment(**segment) for segment in result["segments"]]
+        else:
+            # Transcribe with Whisper
+            with self._checkout() as model:
+                result = model.transcribe(
+                    audio,
+                    language=language,
+                    initial_prompt=initial_prompt,
+                    word_timestamps=word_timestamps
+                )
             
             # Extract language from result
             detected_language = result.get("language", language or "unknown")
             
             # Get confidence from segments
-            segments = result.get("segments", [])
-            avg_confidence = 0.0
-            if segments:
-                confidences = [seg.get("avg_logprob", 0) for seg in segments]
-                avg_confidence = np.mean(confidences) if confidences else 0.0
-                # Convert log probability to confidence (0-1)
-                avg_confidence = min(1.0, max(0.0, (avg_confidence + 1) / 2))
-            
-            return VoiceInput(
-                audio_file_path=audio_file_path,
-                transcribed_text=result["text"].strip(),
-                language=detected_language,
-                confidence=float(avg_confidence),
-                processing_time=processing_time
-            )
-            
-        except Exception as e:
-            print(f"Error transcribing audio: {e}")
-            raise
+            logprobs = [seg.get("avg_logprob", 0) for seg in result.get("segments", [])]
+            avg_confidence = confidence_from_logprob(np.mean(logprobs)) if logprobs else 0.0
+            segments = [
+                TranscriptSegment(
+                    start=seg["start"],
+                    end=seg["end"],
+                    text=seg["text"].strip(),
+                    confidence=confidence_from_logprob(seg.get("avg_logprob", 0)),
+                    language=detected_language,
+                    words=seg.get("words") if word_timestamps else None
+                )
+                for seg in result.get("segments", [])
+            ]
+        
+        return VoiceInput(
+            audio_file_path=IN_MEMORY_AUDIO,
+            transcribed_text=result["text"].strip(),
+            language=detected_language,
+            confidence=float(avg_confidence),
+            processing_time=time.time() - start_time,
+            segments=segments,
+            language_probabilities=choice.probabilities()
+        )
+    
+    def transcribe_bytes(
+        self,
+        audio_data: bytes,
+        language: Optional[str] = None,
+        initial_prompt: Optional[str] = None
+    ) -> VoiceInput:
+        """
+        Decode an uploaded recording (WAV, OGG/Opus, WebM/Opus, ...) in memory and transcribe it
+        
+        Raises:
+            AudioDecodeError: If the upload cannot be decoded
+        """
+        audio = decode_audio(audio_data, WHISPER_SAMPLE_RATE)
+        return self.transcribe_audio(audio, language=language, initial_prompt=initial_prompt)
     
     def get_language_name(self, language_code: str) -> str:
         """Get full language name from code"""
@@ -217,7 +395,7 @@ def transcribe_voice_input(
         language: Language code (e.g., 'hi', 'en')
         duration: Recording duration in seconds
         model_size: Whisper model size
-        
+    
     Returns:
         VoiceInput object
     """
@@ -0,0 +1,283 @@
+"""
+Compact binary wire format for Arovia kiosk clients
+MessagePack bodies with integer keys from a dictionary derived from
+models/schemas.py, short map links, and facility lists delta-encoded
+against the facilities a kiosk has already cached
+"""
+import os
+import hashlib
+import threading
+from datetime import date, datetime
+from typing import Optional, Dict, Any, List, Tuple, Iterable
+
+from fastapi import Response
+from pydantic import BaseModel
+
+from models.schemas import (TriageResult, Symptom, RedFlag, PotentialRisk, FacilityInfo,
+                            ReferralNote, VoiceInput, TranscriptSegment)
+from utils.facility_record import FacilityRecord
+from utils.facility_state import facility_key
+from utils.serialization import compress, COMPRESSION_ENABLED
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    msgpack = None
+    MSGPACK_AVAILABLE = False
+
+
+MSGPACK_MEDIA_TYPE = "application/vnd.arovia+msgpack"
+ACCEPTED_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/msgpack", "application/x-msgpack")
+
+# Models whose field names make up the key dictionary (the JSON schema stays the source of truth)
+SCHEMA_MODELS = (TriageResult, Symptom, RedFlag, PotentialRisk, FacilityInfo, ReferralNote, VoiceInput,
+                 TranscriptSegment)
+
+# Keys of API envelopes and facility search results that are not model fields
+EXTRA_KEYS = ("voice_result", "latitude", "longitude", "ref") + FacilityRecord.KEYS
+
+# Map links are sent as ExtType(MAP_LINK_EXT, <prefix index byte> + <rest of the URL>)
+MAP_LINK_EXT = 1
+MAP_LINK_PREFIXES = (
+    "https://www.google.com/maps?q=",
+    "https://www.google.com/maps/search/?api=1&query=",
+)
+
+# Facility fields that change per request; everything else is cached by the kiosk
+DYNAMIC_FACILITY_FIELDS = frozenset({
+    "distance_km", "travel_time_min", "expected_wait_min", "emergency_capable", "is_open", "ranking_score"
+})
+
+
+def schema_keys() -> Tuple[str, ...]:
+    """Sorted field names of the schema models plus envelope keys; a key is sent as its index"""
+    names = set(EXTRA_KEYS)
+    for model in SCHEMA_MODELS:
+        names.update(model.model_fields)
+    return tuple(sorted(names))
+
+
+SCHEMA_KEYS = schema_keys()
+KEY_INDEX = {key: index for index, key in enumerate(SCHEMA_KEYS)}
+SCHEMA_VERSION = hashlib.blake2b("\n".join(SCHEMA_KEYS + MAP_LINK_PREFIXES).encode(), digest_size=4).hexdigest()
+
+
+def wants_msgpack(accept: Optional[str]) -> bool:
+    """Whether the client's Accept header asks for the compact format"""
+    if not MSGPACK_AVAILABLE or not accept:
+        return False
+    requested = {part.split(";")[0].strip().lower() for part in accept.split(",")}
+    return any(media_type in requested for media_type in ACCEPTED_MEDIA_TYPES)
+
+
+def schema_description() -> Dict[str, Any]:
+    """Key dictionary for clients (GET /wire/schema)"""
+    return {
+        "version": SCHEMA_VERSION,
+        "media_type": MSGPACK_MEDIA_TYPE,
+        "keys": list(SCHEMA_KEYS),
+        "map_link_ext": MAP_LINK_EXT,
+        "map_link_prefixes": list(MAP_LINK_PREFIXES),
+        "dynamic_facility_fields": sorted(DYNAMIC_FACILITY_FIELDS)
+    }
+
+
+def _compact(value: Any) -> Any:
+    """Plain structure with dictionary keys, None values dropped and short map links"""
+    if isinstance(value, BaseModel):
+        value = value.model_dump(mode="json", exclude_none=True)
+    elif isinstance(value, FacilityRecord):
+        value = value.to_dict()
+    if isinstance(value, dict):
+        return {KEY_INDEX.get(key, key): _compact(item) for key, item in value.items() if item is not None}
+    if isinstance(value, (list, tuple)):
+        return [_compact(item) for item in value]
+    if isinstance(value, str):
+        for index, prefix in enumerate(MAP_LINK_PREFIXES):
+            if value.startswith(prefix):
+                return msgpack.ExtType(MAP_LINK_EXT, bytes([index]) + value[len(prefix):].encode("utf-8"))
+        return value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def pack(content: Any) -> bytes:
+    """
+    Encode content in the compact format
+    
+    Known keys become small integers, None values are omitted (every
+    optional schema field defaults to None), map links are sent without
+    their URL prefix and floats are single precision.
+    """
+    if not MSGPACK_AVAILABLE:
+        raise ImportError("msgpack is required for the compact wire format (pip install msgpack)")
+    return msgpack.packb(_compact(content), use_bin_type=True, use_single_float=True)
+
+
+def _ext_hook(code: int, data: bytes) -> Any:
+    if code == MAP_LINK_EXT:
+        return MAP_LINK_PREFIXES[data[0]] + data[1:].decode("utf-8")
+    return msgpack.ExtType(code, data)
+
+
+def _expand(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {SCHEMA_KEYS[key] if isinstance(key, int) else key: _expand(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_expand(item) for item in value]
+    return value
+
+
+def unpack(body: bytes) -> Any:
+    """Decode a compact body back to JSON-equivalent structures (reference client)"""
+    return _expand(msgpack.unpackb(body, ext_hook=_ext_hook, strict_map_key=False, raw=False))
+
+
+def parse_id_ranges(text: str) -> set:
+    """Parse "0-14,17,20-22" into a set of ids"""
+    ids = set()
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, _, end = part.partition("-")
+        ids.update(range(int(start), int(end or start) + 1))
+    return ids
+
+
+def format_id_ranges(ids: Iterable[int]) -> str:
+    """Format ids as "0-14,17,20-22" (the X-Facility-Cache header a kiosk sends)"""
+    ranges = []
+    for value in sorted(set(ids)):
+        if ranges and value == ranges[-1][1] + 1:
+            ranges[-1][1] = value
+        else:
+            ranges.append([value, value])
+    return ",".join(str(start) if start == end else f"{start}-{end}" for start, end in ranges)
+
+
+class FacilityTable:
+    """
+    Server-side table of facility static data for delta encoding.
+    
+    Each distinct version of a facility's static fields (name, address,
+    services, contact, location) gets a small integer id. A kiosk caches the
+    static fields of every facility it receives and reports the ids it holds
+    in an X-Facility-Cache header ("<epoch>:<ranges>"); facilities it already
+    holds are then sent as their id plus the per-request fields (distance,
+    travel time, wait, ranking). Changed static data gets a new id, so a
+    cached id never goes stale. When the table fills up it starts a new
+    epoch and clients rebuild their cache.
+    """
+    
+    def __init__(self, max_entries: int = 200_000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._reset()
+        self.stats = {"full": 0, "delta": 0}
+    
+    def _reset(self):
+        self.epoch = os.urandom(4).hex()
+        self._ids: Dict[Tuple[str, bytes], int] = {}
+        self._size = 0
+    
+    @staticmethod
+    def _static_fields(facility: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: value for key, value in facility.items()
+                if key not in DYNAMIC_FACILITY_FIELDS and value is not None}
+    
+    def facility_id(self, facility: Dict[str, Any]) -> int:
+        """Table id for the current static data of a facility"""
+        static = self._static_fields(facility)
+        key = facility_key(facility) or f"{facility.get('name', '')}|{facility.get('address', '')}"
+        digest = hashlib.blake2b(repr(sorted(static.items())).encode("utf-8"), digest_size=8).digest()
+        with self._lock:
+            if self._size >= self.max_entries:
+                self._reset()
+            table_id = self._ids.get((key, digest))
+            if table_id is None:
+                table_id = self._ids[(key, digest)] = self._size
+                self._size += 1
+            return table_id
+    
+    def known_ids(self, header: Optional[str]) -> set:
+        """Ids the client holds for the current epoch, from its X-Facility-Cache header"""
+        if not header:
+            return set()
+        epoch, _, ranges = header.partition(":")
+        if epoch.strip() != self.epoch:
+            return set()
+        try:
+            return parse_id_ranges(ranges)
+        except ValueError:
+            return set()
+    
+    def encode(self, facilities: List[Any], cache_header: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Delta-encode a facility list
+        
+        Args:
+            facilities: Facility records, dicts or FacilityInfo models
+            cache_header: The client's X-Facility-Cache header
+        
+        Returns:
+            Entries with "ref" and the dynamic fields, plus the static fields
+            for facilities the client does not hold
+        """
+        facilities = [
+            facility.model_dump(mode="json") if isinstance(facility, BaseModel)
+            else facility.to_dict() if isinstance(facility, FacilityRecord) else facility
+            for facility in facilities
+        ]
+        epoch = self.epoch
+        known = self.known_ids(cache_header)
+        table_ids = [self.facility_id(facility) for facility in facilities]
+        if self.epoch != epoch:
+            # The table filled up mid-list: send everything under the new epoch
+            known = set()
+            table_ids = [self.facility_id(facility) for facility in facilities]
+        
+        entries = []
+        for facility, table_id in zip(facilities, table_ids):
+            if table_id in known:
+                entry = {key: value for key, value in facility.items() if key in DYNAMIC_FACILITY_FIELDS}
+                self.stats["delta"] += 1
+            else:
+                entry = dict(facility)
+                self.stats["full"] += 1
+            entry["ref"] = table_id
+            entries.append(entry)
+        return entries
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {"epoch": self.epoch, "entries": self._size, **self.stats}
+
+
+def merge_facilities(entries: List[Dict[str, Any]], cache: Dict[int, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Client side of delta encoding: cache new static fields and rebuild full facilities"""
+    facilities = []
+    for entry in entries:
+        entry = dict(entry)
+        table_id = entry.pop("ref")
+        static = {key: value for key, value in entry.items() if key not in DYNAMIC_FACILITY_FIELDS}
+        if static:
+            cache[table_id] = static
+        facilities.append({**cache.get(table_id, {}), **entry})
+    return facilities
+
+
+def msgpack_response(
+    content: Any,
+    headers: Optional[Dict[str, str]] = None,
+    accept_encoding: Optional[str] = None
+) -> Response:
+    """Compact-format response, compressed like the JSON responses when it is still large"""
+    body = pack(content)
+    headers = {**(headers or {}), "X-Wire-Schema": SCHEMA_VERSION, "Vary": "Accept, Accept-Encoding"}
+    if accept_encoding is not None and COMPRESSION_ENABLED:
+        body, coding = compress(body, accept_encoding)
+        if coding:
+            headers["Content-Encoding"] = coding
+    return Response(content=body, headers=headers, media_type=MSGPACK_MEDIA_TYPE)